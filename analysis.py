@@ -275,6 +275,43 @@ def calculate_irr(cash_flows, max_iterations=100, tolerance=1e-6):
     
     return rate
 
+def mean_price(price) -> float:
+    """Mittlerer Preis einer Preisreihe (bzw. der Festpreis) für die Bewertung der Ersparnis."""
+    return float(price.mean()) if isinstance(price, pd.Series) else float(price)
+
+
+def calculate_energy_savings(reduced_grid_import, reduced_grid_export, price_grid_per_kwh, price_feed_in_per_kwh) -> dict:
+    """
+    Bewertet verringerten Netzbezug und verringerte Einspeisung mit den mittleren Preisen.
+
+    Gemeinsame Preiskonvention aller Ersparnis- und Deckungsbeitrags-KPIs (erstes Jahr,
+    Lebensdauer-Simulation und Systemgrößen-Raster); die Energien dürfen auch Arrays sein.
+
+    Returns:
+        dict: 'annual_savings', 'savings_from_reduced_import' und 'loss_from_reduced_export' (Euro)
+    """
+    savings_from_reduced_import = reduced_grid_import * mean_price(price_grid_per_kwh)
+    loss_from_reduced_export = reduced_grid_export * mean_price(price_feed_in_per_kwh)
+    return {
+        'annual_savings': savings_from_reduced_import - loss_from_reduced_export,
+        'savings_from_reduced_import': savings_from_reduced_import,
+        'loss_from_reduced_export': loss_from_reduced_export
+    }
+
+
+def _savings_by_year(first_year_savings: float, annual_savings_by_year: list, project_lifetime_years: int) -> list:
+    """
+    Ersparnis je Projektjahr aus der Lebensdauer-Simulation, auf die Ersparnis des ersten Jahres bezogen:
+    die Simulation liefert die Veränderung gegenüber Jahr 1, das erste Jahr selbst stammt aus
+    denselben Energiesummen wie die übrigen KPIs.
+    """
+    first_simulated_year = float(annual_savings_by_year[0])
+    return [
+        float(first_year_savings) + float(year_savings) - first_simulated_year
+        for year_savings in annual_savings_by_year[:project_lifetime_years]
+    ]
+
+
 def calculate_financial_kpis(
     annual_energy_cost_with_battery: float, # Jährliche Energiekosten mit Batteriespeicher
     total_consumption: float, # Gesamter jährlicher Verbrauch
@@ -297,10 +334,16 @@ def calculate_financial_kpis(
     max_soc_percent: float = 90.0, # Für tatsächliche Simulation
     grid_import_with_battery: float = None, # Netzbezug mit Batterie
     grid_export_with_battery: float = None, # Netzeinspeisung mit Batterie
-    no_battery_sim_result: dict = None  # OPTIMIERUNG: Bereits berechnete Simulation ohne Batterie
+    no_battery_sim_result: dict = None,  # OPTIMIERUNG: Bereits berechnete Simulation ohne Batterie
+    annual_savings_by_year: list = None  # Simulierte Ersparnis je Jahr (model.simulate_lifetime)
 ) -> dict:
     """
     Berechnet finanzielle KPIs wie Amortisationszeit und Net Present Value (NPV).
+
+    Mit annual_savings_by_year (eine simulierte Ersparnis je Projektjahr, z.B. aus
+    model.simulate_lifetime) folgen die Cash Flows dem simulierten Jahresverlauf, statt die Ersparnis
+    des ersten Jahres mit dem Kapazitätsverlust hochzurechnen. Alle Ersparnisse werden mit
+    calculate_energy_savings bewertet; das erste Jahr stammt aus den übergebenen Energiesummen.
     """
     # Spezialfall: 0 kWh Batteriekapazität (Referenzfall ohne Batterie)
     if battery_capacity_kwh == 0:
@@ -346,7 +389,8 @@ def calculate_financial_kpis(
                     price_feed_in_per_kwh=price_feed_in_per_kwh,
                     max_soc_percent=0.0,
                     annual_capacity_loss_percent=0.0,
-                    simulation_year=1
+                    simulation_year=1,
+                    return_time_series=False  # Nur KPIs benötigt
                 )
                 grid_import_no_battery = no_battery_sim["kpis"]["total_grid_import_kwh"]
                 grid_export_no_battery = no_battery_sim["kpis"]["total_grid_export_kwh"]
@@ -378,18 +422,13 @@ def calculate_financial_kpis(
         # KORREKTE Ersparnis-Berechnung nach der Formel
         # Ersparnis = Weniger Netzbezug (Kosteneinsparung) - Weniger Einspeisung (Kostenverlust)
         # Da reduced_grid_export positiv ist (mehr Einspeisung ohne Batterie), ist das ein Kostenverlust
-        if isinstance(price_grid_per_kwh, pd.Series):
-            annual_savings = (reduced_grid_import * price_grid_per_kwh.mean()) - (reduced_grid_export * price_feed_in_per_kwh.mean())
-        else:
-            annual_savings = (reduced_grid_import * price_grid_per_kwh) - (reduced_grid_export * price_feed_in_per_kwh)
-        
-        # Berechne die einzelnen Komponenten der Ersparnis für transparente Darstellung
-        if isinstance(price_grid_per_kwh, pd.Series):
-            savings_from_reduced_import = reduced_grid_import * price_grid_per_kwh.mean()
-            loss_from_reduced_export = reduced_grid_export * price_feed_in_per_kwh.mean()
-        else:
-            savings_from_reduced_import = reduced_grid_import * price_grid_per_kwh
-            loss_from_reduced_export = reduced_grid_export * price_feed_in_per_kwh
+        # (einschließlich der einzelnen Komponenten für transparente Darstellung)
+        energy_savings = calculate_energy_savings(
+            reduced_grid_import, reduced_grid_export, price_grid_per_kwh, price_feed_in_per_kwh
+        )
+        annual_savings = energy_savings['annual_savings']
+        savings_from_reduced_import = energy_savings['savings_from_reduced_import']
+        loss_from_reduced_export = energy_savings['loss_from_reduced_export']
         
         # Debug-Ausgabe
         print(f"DEBUG calculate_financial_kpis:")
@@ -419,16 +458,24 @@ def calculate_financial_kpis(
         
         annual_savings = annual_cost_no_battery - annual_energy_cost_with_battery
 
+    # Ersparnis je Projektjahr: simuliert (Lebensdauer-Simulation) oder über die Degradation hochgerechnet
+    if annual_savings_by_year is not None:
+        yearly_savings = _savings_by_year(annual_savings, annual_savings_by_year, project_lifetime_years)
+    else:
+        # Degradation der Ersparnisse über die Jahre (nicht der Kapazität!)
+        # Wenn die Batteriekapazität um 1% abnimmt, nehmen auch die Ersparnisse um ~1% ab
+        yearly_savings = [
+            annual_savings * (1.0 - annual_capacity_loss_percent / 100.0) ** (year - 1)
+            for year in range(1, project_lifetime_years + 1)
+        ]
+
     # Amortisationszeit (Payback Period) - KORRIGIERT: Degradation der Ersparnisse statt Kapazität
     payback_period = np.nan # Initialisiere mit NaN
     if annual_savings > 0:
         # Berechne kumulierte Ersparnisse über die Zeit mit Degradation
         cumulative_savings = 0
         for year in range(1, project_lifetime_years + 1):
-            # Degradation der Ersparnisse über die Jahre (nicht der Kapazität!)
-            # Wenn die Batteriekapazität um 1% abnimmt, nehmen auch die Ersparnisse um ~1% ab
-            degradation_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (year - 1)
-            year_savings = annual_savings * degradation_factor
+            year_savings = yearly_savings[year - 1]
             
             cumulative_savings += year_savings
             
@@ -455,12 +502,7 @@ def calculate_financial_kpis(
     cash_flows = [-investment_cost] # Initialinvestition
     
     # Berechne jährliche Ersparnisse mit Degradation
-    for year in range(1, project_lifetime_years + 1):
-        # Degradation der Ersparnisse über die Jahre (nicht der Kapazität!)
-        degradation_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (year - 1)
-        year_savings = annual_savings * degradation_factor
-        
-        cash_flows.append(year_savings)
+    cash_flows.extend(yearly_savings)
     
     # Manuelle NPV-Berechnung (da np.npv in neueren NumPy-Versionen entfernt wurde)
     npv = 0
@@ -495,7 +537,9 @@ def calculate_financial_kpis(
         'loss_from_reduced_export': loss_from_reduced_export,  # Verlust durch reduzierte Einspeisung
         'payback_period_years': payback_period,
         'npv': npv,
-        'irr_percentage': irr_percentage
+        'irr_percentage': irr_percentage,
+        # Ersparnis je Projektjahr der Cash Flows (nur mit annual_savings_by_year)
+        'annual_savings_by_year': yearly_savings if annual_savings_by_year is not None else None
     }
 
 def calculate_contribution_margin_kpis(
@@ -515,7 +559,8 @@ def calculate_contribution_margin_kpis(
     grid_import_without_battery: float = None,
     grid_export_without_battery: float = None,
     consumption_series: pd.Series = None,  # Für echte Simulation ohne Batterie
-    pv_generation_series: pd.Series = None  # Für echte Simulation ohne Batterie
+    pv_generation_series: pd.Series = None,  # Für echte Simulation ohne Batterie
+    annual_savings_by_year: list = None  # Simulierter DB I je Jahr (model.simulate_lifetime)
 ) -> dict:
     """
     Berechnet Deckungsbeitrags-KPIs basierend auf der bestehenden Excel-Struktur.
@@ -538,6 +583,9 @@ def calculate_contribution_margin_kpis(
         grid_export_without_battery: Netzeinspeisung ohne Batterie (optional)
         consumption_series: Verbrauchszeitreihe für Simulation ohne Batterie
         pv_generation_series: PV-Erzeugungszeitreihe für Simulation ohne Batterie
+        annual_savings_by_year: Simulierte Ersparnis (DB I) je Projektjahr, z.B. aus model.simulate_lifetime.
+            Dann gilt je Jahr DB III = DB I des Jahres - Abschreibung - Zinsen (statt Hochrechnung mit Degradation),
+            wobei DB I des ersten Jahres aus den Energiesummen oben stammt (siehe _savings_by_year).
     
     Returns:
         dict: Deckungsbeitrags-KPIs
@@ -597,7 +645,8 @@ def calculate_contribution_margin_kpis(
             price_feed_in_per_kwh=price_feed_in_per_kwh,
             max_soc_percent=0.0,
             annual_capacity_loss_percent=0.0,
-            simulation_year=1
+            simulation_year=1,
+            return_time_series=False  # Nur KPIs benötigt
         )
         grid_import_without_battery = no_battery_sim["kpis"]["total_grid_import_kwh"]
         grid_export_without_battery = no_battery_sim["kpis"]["total_grid_export_kwh"]
@@ -618,16 +667,12 @@ def calculate_contribution_margin_kpis(
     
     # Umsatz = Ersparnis durch reduzierten Netzbezug
     # Konsistente Behandlung von float und pd.Series (wie in calculate_financial_kpis)
-    if isinstance(price_grid_per_kwh, pd.Series):
-        annual_revenue = reduced_grid_import * price_grid_per_kwh.mean()
-    else:
-        annual_revenue = reduced_grid_import * price_grid_per_kwh
-    
-    # Variable Kosten = Verlust durch reduzierte Einspeisung
-    if isinstance(price_feed_in_per_kwh, pd.Series):
-        annual_variable_costs = reduced_grid_export * price_feed_in_per_kwh.mean()
-    else:
-        annual_variable_costs = reduced_grid_export * price_feed_in_per_kwh
+    # Variable Kosten = Verlust durch reduzierte Einspeisung (beides wie in calculate_financial_kpis)
+    energy_savings = calculate_energy_savings(
+        reduced_grid_import, reduced_grid_export, price_grid_per_kwh, price_feed_in_per_kwh
+    )
+    annual_revenue = energy_savings['savings_from_reduced_import']
+    annual_variable_costs = energy_savings['loss_from_reduced_export']
     
     # DB I = Umsatz - Variable Kosten
     contribution_margin_1 = annual_revenue - annual_variable_costs
@@ -654,16 +699,25 @@ def calculate_contribution_margin_kpis(
     print(f"  annual_interest: {annual_interest:.2f} EUR")
     print(f"  contribution_margin_3: {contribution_margin_3:.2f} EUR")
     
+    # DB III je Projektjahr: aus simulierter Ersparnis je Jahr oder über die Degradation hochgerechnet
+    if annual_savings_by_year is not None:
+        yearly_db3 = [
+            year_db1 - annual_depreciation - annual_interest
+            for year_db1 in _savings_by_year(contribution_margin_1, annual_savings_by_year, project_lifetime_years)
+        ]
+    else:
+        yearly_db3 = [
+            contribution_margin_3 * (1 - annual_capacity_loss_percent / 100.0) ** (year - 1)
+            for year in range(1, project_lifetime_years + 1)
+        ]
+
     # Berechne Summen über Projektlaufzeit mit Degradation
     total_db3_nominal = 0
     total_db3_present_value = 0
     
     for year in range(1, project_lifetime_years + 1):
-        # Degradationsfaktor für dieses Jahr
-        degradation_factor = (1 - annual_capacity_loss_percent / 100.0) ** (year - 1)
-        
         # Nominal-Werte (mit Degradation)
-        year_db3_nominal = contribution_margin_3 * degradation_factor
+        year_db3_nominal = yearly_db3[year - 1]
         total_db3_nominal += year_db3_nominal
         
         # Barwert-Werte (mit Degradation und Abzinsung)
@@ -679,8 +733,7 @@ def calculate_contribution_margin_kpis(
     if contribution_margin_3 > 0:
         cumulative_db3 = 0
         for year in range(1, project_lifetime_years + 1):
-            degradation_factor = (1 - annual_capacity_loss_percent / 100.0) ** (year - 1)
-            year_db3 = contribution_margin_3 * degradation_factor
+            year_db3 = yearly_db3[year - 1]
             cumulative_db3 += year_db3
             
             if cumulative_db3 >= investment_cost:
@@ -2105,7 +2158,8 @@ def plot_cost_comparison_with_without_battery(
             min_soc_percent=0.0,
             max_soc_percent=0.0,
             annual_capacity_loss_percent=0.0,
-            simulation_year=1
+            simulation_year=1,
+            return_time_series=False  # Nur KPIs benötigt
         )
         annual_cost_no_battery = no_battery_sim["kpis"]["annual_energy_cost"]
         grid_export_no_battery = no_battery_sim["kpis"]["total_grid_export_kwh"]
@@ -0,0 +1,137 @@
+# benchmark_kernel.py
+# Führe dieses Skript aus, um die Laufzeit des Simulationskerns mit und ohne Batteriekennlinien zu vergleichen
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from model import (run_dispatch_kernel, run_totals_kernel, simulate_capacity_batch, resolve_battery_curves,
+                   arbitrage_parameters)
+
+# Zielwert: Kennlinien dürfen den Kern um höchstens 20% verlangsamen
+MAX_OVERHEAD_PERCENT = 20.0
+REPEATS = 20
+# Größte erlaubte Abweichung zwischen numba- und Python/numpy-Backend (kWh bzw. Euro)
+MAX_BACKEND_DIFFERENCE = 1e-6
+
+# Beispielkennlinien (Leistungsreduktion bei hohem/niedrigem SOC, Teillast-Wirkungsgrad)
+EXAMPLE_CURVES = {
+    'charge_power': [(0.0, 1.0), (0.8, 1.0), (1.0, 0.3)],
+    'discharge_power': [(0.0, 0.4), (0.15, 1.0), (1.0, 1.0)],
+    'charge_efficiency': [(0.0, 0.90), (0.2, 1.0), (1.0, 0.98)],
+    'discharge_efficiency': [(0.0, 0.88), (0.3, 1.0), (1.0, 0.97)],
+}
+
+
+def synthetic_profiles(num_periods=35040, seed=0):
+    """Synthetisches Jahresprofil (15 min) für PV-Erzeugung und Verbrauch in kWh."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2023-01-01', periods=num_periods, freq='15min')
+    hour = index.hour + index.minute / 60
+    season = 0.5 + 0.5 * np.sin((index.dayofyear - 80) / 365 * 2 * np.pi)
+    pv = np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None) * season * 2.0 * rng.uniform(0.3, 1, num_periods)
+    load = (0.3 + 0.4 * rng.random(num_periods) + 0.5 * ((hour > 17) & (hour < 22))) * 0.25
+    return pd.Series(load, index), pd.Series(pv, index)
+
+
+def max_difference(a, b):
+    """Größte absolute Abweichung zwischen zwei Ergebnissen (Dicts, Listen, DataFrames, Arrays, Zahlen)."""
+    if isinstance(a, dict):
+        return max((max_difference(a[key], b[key]) for key in a), default=0.0)
+    if isinstance(a, pd.DataFrame):
+        return max_difference(a.select_dtypes('number').to_numpy(), b.select_dtypes('number').to_numpy())
+    if isinstance(a, (list, tuple)):
+        return max((max_difference(x, y) for x, y in zip(a, b)), default=0.0)
+    if isinstance(a, (np.ndarray, float, int)) and not isinstance(a, bool):
+        difference = np.abs(np.asarray(a, dtype=float) - np.asarray(b, dtype=float))
+        return float(difference[~np.isnan(difference)].max(initial=0.0))
+    return 0.0
+
+
+def best_times(*functions):
+    """
+    Beste Laufzeit je Funktion aus REPEATS Wiederholungen (nach einem Aufwärmlauf für die
+    JIT-Kompilierung). Die Funktionen laufen abwechselnd, damit Lastschwankungen alle gleich treffen.
+    """
+    for function in functions:
+        function()
+    times = [[] for _ in functions]
+    for _ in range(REPEATS):
+        for function, function_times in zip(functions, times):
+            start = time.perf_counter()
+            function()
+            function_times.append(time.perf_counter() - start)
+    return [min(function_times) for function_times in times]
+
+
+consumption, pv_generation = synthetic_profiles()
+kernel_params = dict(
+    initial_soc_kwh=5.0, min_soc_kwh=1.0, max_soc_kwh=9.0,
+    max_charge_kwh=5 * 0.25, max_discharge_kwh=5 * 0.25,
+    battery_efficiency_charge=0.95, battery_efficiency_discharge=0.95,
+    backend="numba"
+)
+batch_params = dict(
+    battery_capacities_kwh=np.arange(0, 41), battery_efficiency_charge=0.95, battery_efficiency_discharge=0.95,
+    battery_max_charge_kw=5, battery_max_discharge_kw=5, price_grid_per_kwh=0.30, price_feed_in_per_kwh=0.08,
+    backend="numba", use_cache=False
+)
+constant_curves = resolve_battery_curves({name: None for name in EXAMPLE_CURVES})
+example_curves = resolve_battery_curves(EXAMPLE_CURVES)
+
+benchmarks = {
+    'run_dispatch_kernel': lambda curves: run_dispatch_kernel(
+        pv_generation, consumption, **kernel_params, battery_curves=curves),
+    'run_totals_kernel': lambda curves: run_totals_kernel(
+        pv_generation, consumption, 0.30, 0.08, **kernel_params, battery_curves=curves),
+    'simulate_capacity_batch (41 Kapazitäten)': lambda curves: simulate_capacity_batch(
+        consumption, pv_generation, **batch_params, battery_curves=curves),
+}
+
+print("Laufzeitvergleich des Simulationskerns (numba, 15 min, 1 Jahr)")
+print("-" * 70)
+all_ok = True
+for name, run in benchmarks.items():
+    constant_time, curve_time = best_times(lambda: run(constant_curves), lambda: run(example_curves))
+    overhead_percent = (curve_time / constant_time - 1.0) * 100.0
+    ok = overhead_percent <= MAX_OVERHEAD_PERCENT
+    all_ok = all_ok and ok
+    print(f"{name:42s} konstant {constant_time * 1000:8.2f} ms | Kennlinien {curve_time * 1000:8.2f} ms | "
+          f"{overhead_percent:+6.1f}% {'OK' if ok else 'ZU LANGSAM'}")
+print("-" * 70)
+print(f"Ziel: höchstens {MAX_OVERHEAD_PERCENT:.0f}% Mehraufwand -> {'erfüllt' if all_ok else 'nicht erfüllt'}")
+
+# Gleichheit der Backends: alle Kerne teilen einen Intervall-Schritt (_dispatch_interval), die JIT-
+# Varianten müssen daher mit Kennlinien und Arbitrage dieselben Ergebnisse liefern wie reines Python/numpy
+hour = pv_generation.index.hour.to_numpy()
+price_grid = pd.Series(0.30 + 0.20 * np.sin(hour / 24 * 2 * np.pi), pv_generation.index)
+price_feed_in = pd.Series(0.08 + 0.35 * np.sin(hour / 24 * 2 * np.pi), pv_generation.index)
+arbitrage = arbitrage_parameters("threshold", 0.25)
+parity_runs = {
+    'run_dispatch_kernel': lambda backend: run_dispatch_kernel(
+        pv_generation, consumption, **dict(kernel_params, backend=backend), price_grid_per_kwh=price_grid,
+        price_feed_in_per_kwh=price_feed_in, arbitrage=arbitrage, battery_curves=example_curves),
+    'run_totals_kernel': lambda backend: run_totals_kernel(
+        pv_generation, consumption, price_grid, price_feed_in, **dict(kernel_params, backend=backend),
+        arbitrage=arbitrage, battery_curves=example_curves),
+    'simulate_capacity_batch (41 Kapazitäten)': lambda backend: simulate_capacity_batch(
+        consumption, pv_generation, **dict(batch_params, backend=backend, price_grid_per_kwh=price_grid,
+                                           price_feed_in_per_kwh=price_feed_in),
+        dispatch_strategy="threshold", battery_curves=example_curves, return_cycles=True),
+}
+
+print()
+print("Gleichheit numba gegen Python/numpy (Kennlinien, Schwellenwert-Arbitrage)")
+print("-" * 70)
+all_equal = True
+for name, run in parity_runs.items():
+    difference = max_difference(run("numba"), run("python"))
+    equal = difference <= MAX_BACKEND_DIFFERENCE
+    all_equal = all_equal and equal
+    print(f"{name:42s} max. Abweichung {difference:10.2e} {'OK' if equal else 'ABWEICHUNG'}")
+print("-" * 70)
+print(f"Ziel: höchstens {MAX_BACKEND_DIFFERENCE:.0e} Abweichung -> {'erfüllt' if all_equal else 'nicht erfüllt'}")
@@ -23,6 +23,85 @@ DEFAULT_PROJECT_LIFETIME_YEARS = 15  # Projektlaufzeit in Jahren (vereinheitlich
 DEFAULT_DISCOUNT_RATE = 0.02  # Abzinsungssatz (vereinheitlicht)
 DEFAULT_PROJECT_INTEREST_RATE_DB = 0.03  # Zinssatz für Deckungsbeitragsrechnung
 
+# Lebensdauer-Simulation (alle Projektjahre mit gealterter Kapazität statt Hochrechnung von Jahr 1)
+DEFAULT_LIFETIME_SIMULATION = False
+DEFAULT_ANNUAL_PV_DEGRADATION_PERCENT = 0.0 # Jährlicher Rückgang der PV-Erzeugung in %
+DEFAULT_ANNUAL_LOAD_GROWTH_PERCENT = 0.0 # Jährliche Änderung des Verbrauchs in %
+
+# Wechselrichter- und Einspeisebegrenzung (data_import.apply_pv_grid_limits, in nativer Auflösung)
+# AC-Nennleistung des PV-Wechselrichters in kW (Abregelung darüber = Clipping); None: keine Begrenzung
+INVERTER_AC_POWER_KW = None
+# Einspeisebegrenzung in % der PV-Peakleistung (z.B. 60 oder 70), angewandt auf den Überschuss nach
+# Eigenverbrauch; None: keine Begrenzung
+FEED_IN_LIMIT_PERCENT = None
+
+# Alterungsmodell der Lebensdauer-Simulation (model.simulate_lifetime)
+# "flat": fester jährlicher Kapazitätsverlust (annual_capacity_loss_percent)
+# "cycle_calendar": Zyklenalterung aus Rainflow-Zählung des SOC-Verlaufs plus kalendarische Alterung
+DEFAULT_AGING_MODEL = "flat"
+# Quantisierung des nutzbaren SOC-Bereichs für die Rainflow-Zählung (Stufen; Auflösung der Zyklentiefe)
+RAINFLOW_SOC_LEVELS = 100
+# Zyklenfestigkeit: Vollzyklen (100% Entladetiefe) bis zum Lebensende bei AGING_END_OF_LIFE_CAPACITY_PERCENT
+AGING_CYCLE_LIFE = 6000
+AGING_END_OF_LIFE_CAPACITY_PERCENT = 80.0
+# Wöhler-Exponent: Schädigung je Zyklus der Tiefe d (Anteil 0-1) = d^k / AGING_CYCLE_LIFE
+AGING_DOD_EXPONENT = 1.5
+# Kalendarische Alterung in % pro Jahr bei mittlerem SOC 0% bzw. 100% (dazwischen linear)
+AGING_CALENDAR_LOSS_PERCENT_EMPTY = 0.5
+AGING_CALENDAR_LOSS_PERCENT_FULL = 1.5
+# Klassen des Entladetiefen-Histogramms (gleich breit über 0-100% des nutzbaren Bereichs)
+AGING_DOD_HISTOGRAM_BINS = 10
+
+# Screening mit Typtagen (model.cluster_typical_days, scenarios.find_optimal_size mit screening=True)
+DEFAULT_SCREENING = False
+# Anzahl repräsentativer Tage (k-Medoids über die Tagesprofile von Last und PV) und Startwert
+SCREENING_TYPICAL_DAYS = 12
+TYPICAL_DAYS_SEED = 42
+# Start-SOC-Stufen je Typtag (min. bis max. SOC); der SOC wird in Kalenderreihenfolge über die Tage
+# fortgeschrieben und zwischen den Stufen interpoliert. Aufwand ~ Typtage × Stufen statt 365 Tage
+TYPICAL_DAYS_SOC_LEVELS = 3
+# Anzahl Kapazitäten (gleichmäßig über den Suchbereich), an denen das Screening gegen die
+# Volljahressimulation geprüft wird (Fehlerangabe); 0: keine Prüfung
+SCREENING_VERIFY_CAPACITIES = 3
+
+# Paralleler Suchlauf über die Speichergrößen (scenarios.find_optimal_size, Prozesspool mit Shared Memory)
+# 1: seriell; >1: Anzahl Worker-Prozesse; 0: alle Kerne (os.cpu_count())
+DEFAULT_SWEEP_WORKERS = 1
+# Teilmengen je Worker (Lastausgleich; die Kapazitäten werden verschränkt aufgeteilt)
+SWEEP_CHUNKS_PER_WORKER = 2
+# Mindestaufwand für den Prozesspool, darunter rechnet der Suchlauf seriell. Aufwand = Kapazitäten ×
+# Zeitschritte (Typtage beim Screening) × Projektjahre (Lebensdauer-Simulation), bei "optimal" und
+# "rolling_horizon" zusätzlich × SWEEP_DP_WORK_FACTOR. Gemessen (35.040 Viertelstunden, 1 Kern):
+# PV-first ca. 10 ns je Kapazität und Zeitschritt, DP ca. 10 µs; 61 Kapazitäten PV-first seriell
+# 0,4 s, mit 4 Workern 2,2 s (Start des Pools mit Import und JIT je Worker 2-5 s). Der Pool lohnt
+# sich erst ab einigen Sekunden serieller Rechenzeit: ein volles Jahr mit DP-Strategie oder sehr
+# viele Kapazitäten bzw. lange, hochaufgelöste Reihen mit Lebensdauer-Simulation.
+SWEEP_PARALLEL_MIN_WORK = 500_000_000
+SWEEP_DP_WORK_FACTOR = 1000
+# Mindestanzahl Kapazitäten je Worker (weniger: seriell)
+SWEEP_MIN_CAPACITIES_PER_WORKER = 4
+
+# Suche der optimalen Speichergröße (scenarios.find_optimal_size)
+# "grid": alle Kapazitäten des Rasters; "adaptive": Grobraster plus Goldener Schnitt auf den Rasterpunkten;
+# "coarse_to_fine": zweistufig über die Zeitauflösung (siehe COARSE_TO_FINE_*);
+# "interpolated": Stützstellen plus monotone Interpolation (siehe INTERPOLATION_*)
+DEFAULT_SEARCH_MODE = "grid"
+# Punkte des Grobrasters der adaptiven Suche (gleichmäßig über den Suchbereich)
+ADAPTIVE_SEARCH_COARSE_POINTS = 7
+# Adaptive Suche: volles Raster im Hintergrund nachrechnen und das Optimum vergleichen
+DEFAULT_VERIFY_GRID = False
+# "coarse_to_fine": alle Kapazitäten mit zusammengefassten Zeitreihen (Stufe 1), danach nur die
+# Nachbarschaft des Optimums in Originalauflösung (Stufe 2, Abweichung in search_metadata unter 'resolution_error')
+COARSE_TO_FINE_INTERVAL_HOURS = 1.0
+# Rasterpunkte je Seite um das Optimum der Stufe 1, die in Originalauflösung nachgerechnet werden
+COARSE_TO_FINE_NEIGHBOR_STEPS = 2
+# "interpolated": nur Stützstellen simulieren, Energie-KPIs der übrigen Rasterpunkte monoton (PCHIP)
+# interpolieren; Anzahl Stützstellen zu Beginn (gleichmäßig über den Suchbereich)
+INTERPOLATION_ANCHOR_POINTS = 6
+# Zusätzliche Stützstelle, solange der geschätzte Interpolationsfehler eines Intervalls (Abstand
+# PCHIP zu linearer Interpolation) diesen Anteil am Jahresverbrauch in % übersteigt
+INTERPOLATION_TOLERANCE_PERCENT = 0.1
+
 # Batteriekosten - Excel-Datei mit Kostenkurve
 # Verwende absoluten Pfad basierend auf dem Verzeichnis der config.py
 BATTERY_COST_EXCEL_PATH = os.path.join(_CONFIG_DIR, "Batteriespeicherkosten.xlsm")
@@ -45,6 +124,73 @@ THRESHOLD_BUY_PRICE = 0.15 # Euro/kWh: Wenn der Preis darunter liegt, aus Netz l
 THRESHOLD_SELL_PRICE = 0.40 # Euro/kWh: Wenn der Preis darüber liegt, ins Netz entladen
 MAX_GRID_CHARGE_KW = 3.0 # Max. Leistung für Laden aus Netz
 MAX_GRID_DISCHARGE_KW = 3.0 # Max. Leistung für Entladen ins Netz
+# Betriebsstrategie des Speichers (model.py): "pv_first" (Eigenverbrauch),
+# "threshold" (zusätzlich Arbitrage mit den obigen Schwellenwerten) oder
+# "optimal" (kostenoptimal mit vollständiger Voraussicht, dynamische Programmierung) oder
+# "rolling_horizon" (kostenoptimal über ein rollierendes Prognosefenster, siehe MPC_* unten)
+DEFAULT_DISPATCH_STRATEGY = "pv_first"
+# Kennlinien des Speichers (model.py): Stützstellen ((x, Faktor), ...), dazwischen linear; None: konstant
+# SOC als Anteil des nutzbaren Bereichs (0 = min. SOC, 1 = max. SOC) -> Faktor auf die max. Lade-/Entladeleistung,
+# z.B. Abregelung der Ladeleistung nahe Vollladung: ((0.0, 1.0), (0.8, 1.0), (1.0, 0.3))
+BATTERY_CHARGE_POWER_CURVE = None
+BATTERY_DISCHARGE_POWER_CURVE = None
+# Leistung als Anteil der Nennleistung -> Faktor auf den Lade-/Entladewirkungsgrad,
+# z.B. geringerer Wirkungsgrad bei Teillast: ((0.0, 0.85), (0.1, 0.96), (0.3, 1.0), (1.0, 1.0))
+BATTERY_CHARGE_EFFICIENCY_CURVE = None
+BATTERY_DISCHARGE_EFFICIENCY_CURVE = None
+# Stützstellen der gleichabständigen Nachschlagetabellen im Simulationskern
+BATTERY_CURVE_TABLE_SIZE = 1001
+# Anzahl SOC-Stufen der optimalen Fahrweise (Genauigkeit vs. Rechenzeit)
+DEFAULT_OPTIMAL_DISPATCH_SOC_LEVELS = 100
+# Speicherbudget der optimalen Politik (Zeit × Kapazitäten × SOC-Stufen); größere Batches werden geteilt
+OPTIMAL_DISPATCH_MAX_POLICY_BYTES = 64 * 1024 * 1024
+# Rollierende Optimierung (dispatch_strategy="rolling_horizon"): Fensterlänge und Abstand der Neuplanung
+MPC_HORIZON_HOURS = 24
+MPC_REOPTIMIZE_HOURS = 4
+# Prognose von PV-Überschuss und Restlast im Fenster: "persistence" (letzte 24 h wiederholt),
+# "noisy" (Istwerte mit relativem Rauschen MPC_FORECAST_NOISE) oder "perfect" (Istwerte)
+# Preise gelten im Fenster als bekannt (Day-Ahead)
+MPC_FORECAST = "persistence"
+MPC_FORECAST_NOISE = 0.2
+MPC_FORECAST_SEED = 42
+# SOC-Stufen je Fenster (weniger als bei "optimal", da das Fenster oft neu gelöst wird)
+MPC_SOC_LEVELS = 100
+# Zeitbudget je Fensterlösung in Sekunden; bei Überschreitung wird der vorige Plan weitergefahren (None: aus)
+MPC_WINDOW_TIME_BUDGET_SECONDS = None
+
+# Simulationskern (model.py)
+# "auto": JIT-Backend (numba) falls installiert, sonst reines Python
+# "numba": JIT-Backend erzwingen, "python": Referenz-Backend erzwingen
+DEFAULT_SIMULATION_BACKEND = "auto"
+# Verzeichnis für den Kompilier-Cache des JIT-Backends
+NUMBA_CACHE_DIR = os.path.join(_CONFIG_DIR, ".numba_cache")
+
+# Speicherformat der Simulationsergebnisse (SimulationResult in model.py)
+# "float64": verlustfrei, "float32": halber Speicherbedarf (ca. 7 signifikante Stellen)
+DEFAULT_RESULT_STORAGE_DTYPE = "float64"
+# Überwiegend leere Spalten (Ladung, Entladung, Einspeisung, Verluste) dünn besetzt speichern
+DEFAULT_RESULT_SPARSE = True
+
+# Speicherbudget des Dispatch-Caches (Energieflüsse je Parametersatz, unabhängig von Preisen)
+DISPATCH_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Prüfstufe der Energiebilanz in model.py
+# "off": keine Prüfung, "summary": Jahressummen aus den Akkumulatoren des Kerns (praktisch kostenlos),
+# "interval": zusätzlich Prüfung jedes Intervalls (nur zum Debuggen)
+DEFAULT_ENERGY_BALANCE_VALIDATION = "summary"
+
+# Zeitparallele Simulation (Abschnitte mit angenommenem Start-SOC, bitgleiche Nachrechnung)
+# 1: sequentiell; >1: Anzahl Threads (nur mit JIT-Backend wirksam, lohnt sich v.a. bei 1-min-Daten)
+DEFAULT_TIME_PARALLEL_WORKERS = 1
+
+# Zeitauflösung (model.detect_time_resolution): Die Intervalldauer wird aus dem Zeitindex bestimmt.
+# Unregelmäßige Intervalle werden auf ein gemeinsames Raster (größter gemeinsamer Teiler der Dauern)
+# aufgeteilt; höchstens so viele Rasterschritte je Eingangsintervall im Mittel (sonst vorher resamplen)
+MAX_TIME_GRID_EXPANSION = 16
+# Zeitstempel mit leichtem Jitter (z.B. Logger 15 min ± wenige Sekunden): Liegt jede Intervalldauer
+# höchstens diesen Anteil des Median-Schritts neben einem Vielfachen davon, wird auf das Raster des
+# Median-Schritts gerundet, statt ein Sekundenraster über den größten gemeinsamen Teiler zu bilden
+TIME_GRID_SNAP_TOLERANCE = 0.05
 
 # Weitere Konstanten können hier hinzugefügt werden
 # Beispiel: Pfade zu Standard-Lastprofilen, etc. 
\ No newline at end of file
@@ -635,6 +635,242 @@ def _normalize_energy_series(series: pd.Series | None, base_minutes: int) -> pd.
     return series
 
 
+def read_time_series_csv_chunks(
+    file_path,
+    timestamp_column: str,
+    consumption_column: str,
+    pv_column: str,
+    chunk_periods: int = 96 * 7,
+    sep: str = ';',
+    decimal: str = ','
+):
+    """
+    Liest Verbrauchs- und PV-Zeitreihen blockweise aus einer CSV-Datei (z.B. 1-Minuten-Smart-Meter-Daten
+    oder mehrere Jahre), ohne die gesamte Datei in den Speicher zu laden.
+    Die Blöcke können direkt an model.simulate_streaming() übergeben werden.
+
+    Args:
+        file_path: Pfad oder Datei-Objekt der CSV-Datei.
+        timestamp_column (str): Spalte mit Zeitstempeln.
+        consumption_column (str): Spalte mit Verbrauch in kWh je Intervall.
+        pv_column (str): Spalte mit PV-Erzeugung in kWh je Intervall.
+        chunk_periods (int): Anzahl Zeilen je Block (Standard: eine Woche bei 15-Minuten-Daten).
+        sep (str): Spaltentrennzeichen.
+        decimal (str): Dezimaltrennzeichen.
+
+    Yields:
+        tuple: (consumption_chunk, pv_generation_chunk) als pd.Series mit Zeitindex.
+    """
+    reader = pd.read_csv(
+        file_path,
+        sep=sep,
+        decimal=decimal,
+        usecols=[timestamp_column, consumption_column, pv_column],
+        chunksize=chunk_periods
+    )
+    for chunk in reader:
+        chunk.index = pd.to_datetime(chunk.pop(timestamp_column))
+        yield (
+            pd.to_numeric(chunk[consumption_column], errors='coerce').fillna(0.0).astype(float),
+            pd.to_numeric(chunk[pv_column], errors='coerce').fillna(0.0).astype(float)
+        )
+
+
+def feed_in_limit_kw(pv_peak_power_kwp: float, feed_in_limit_percent: float | None = None) -> float | None:
+    """
+    Einspeisegrenze in kW aus der PV-Peakleistung (z.B. 60%- oder 70%-Regel).
+
+    Args:
+        pv_peak_power_kwp (float): Installierte PV-Leistung in kWp.
+        feed_in_limit_percent (float | None): Grenze in % der Peakleistung. None: FEED_IN_LIMIT_PERCENT aus config.py.
+
+    Returns:
+        float | None: Einspeisegrenze in kW oder None (keine Begrenzung).
+    """
+    from config import FEED_IN_LIMIT_PERCENT
+    if feed_in_limit_percent is None:
+        feed_in_limit_percent = FEED_IN_LIMIT_PERCENT
+    if feed_in_limit_percent is None:
+        return None
+    return pv_peak_power_kwp * feed_in_limit_percent / 100.0
+
+
+def apply_pv_grid_limits(
+    time_series_chunks,
+    inverter_ac_kw: float | None = None,
+    export_limit_kw: float | None = None,
+    simulation_interval_minutes: int = 15
+) -> dict:
+    """
+    Wendet Wechselrichter-Begrenzung (Clipping) und Einspeisegrenze in der nativen Auflösung an
+    (z.B. 1- oder 5-Minuten-Messdaten) und summiert die Ergebnisse blockweise auf das
+    Simulationsintervall. Die hochaufgelösten Reihen werden nie vollständig im Speicher gehalten.
+
+    Je nativem Intervall (Dauer aus den Zeitstempeln):
+        Clipping = max(PV - inverter_ac_kw × Dauer, 0)
+        Abregelung = max(PV nach Clipping - Verbrauch - export_limit_kw × Dauer, 0)
+    Die Einspeisegrenze wirkt auf den Überschuss nach Eigenverbrauch, aber vor dem Speicher
+    (konservativ: ein Speicher, der gezielt die Spitzen aufnimmt, könnte Abregelung vermeiden).
+    Ohne Verbrauchsreihe (None je Block) gilt die Grenze für die PV-Erzeugung selbst (starre Begrenzung).
+
+    Args:
+        time_series_chunks: Iterierbare Blöcke (consumption_chunk, pv_generation_chunk) als pd.Series in kWh
+            je Intervall mit gemeinsamem Zeitindex, z.B. aus read_time_series_csv_chunks() oder
+            model.iter_series_chunks(); ein einzelnes Paar ganzer Reihen als [(consumption, pv)].
+        inverter_ac_kw (float | None): AC-Nennleistung des Wechselrichters. None: INVERTER_AC_POWER_KW aus config.py.
+        export_limit_kw (float | None): Einspeisegrenze in kW (siehe feed_in_limit_kw). None: keine Begrenzung.
+        simulation_interval_minutes (int): Zielauflösung der Simulation in Minuten.
+
+    Returns:
+        dict: 'consumption_series' und 'pv_generation_series' (eingespeiste bzw. nutzbare PV-Erzeugung)
+        im Simulationsintervall, 'inverter_clipping_series' und 'export_curtailment_series' (kWh je
+        Intervall) sowie die Summen 'inverter_clipping_kwh' und 'export_curtailment_kwh'. Die Summen
+        stehen zusätzlich in pv_generation_series.attrs; für die KPIs von model.py werden sie explizit
+        als curtailment_totals übergeben (attrs überstehen das Resampling nicht).
+    """
+    from config import INVERTER_AC_POWER_KW
+    if inverter_ac_kw is None:
+        inverter_ac_kw = INVERTER_AC_POWER_KW
+    interval = pd.Timedelta(minutes=simulation_interval_minutes)
+    columns = ('consumption', 'pv_generation', 'inverter_clipping', 'export_curtailment')
+    aggregated_blocks = []
+    pending = None  # letztes (evtl. unvollständiges) Simulationsintervall des vorigen Blocks
+    native_hours = None
+    has_consumption = True
+    for consumption_chunk, pv_chunk in time_series_chunks:
+        if len(pv_chunk) == 0:
+            continue
+        index = pd.DatetimeIndex(pv_chunk.index)
+        steps = np.diff(index.values) / np.timedelta64(1, 'h')
+        if len(steps):
+            native_hours = float(np.median(steps))
+        elif native_hours is None:
+            native_hours = simulation_interval_minutes / 60.0
+        # Dauer je Intervall bis zum nächsten Zeitstempel (letzter Wert: typische Dauer)
+        durations = np.append(steps, native_hours)
+        pv = pv_chunk.to_numpy(dtype=np.float64)
+        has_consumption = consumption_chunk is not None
+        load = consumption_chunk.to_numpy(dtype=np.float64) if has_consumption else np.zeros(len(pv))
+
+        clipping = np.zeros(len(pv))
+        if inverter_ac_kw is not None:
+            clipping = np.maximum(pv - inverter_ac_kw * durations, 0.0)
+        pv_ac = pv - clipping
+        curtailment = np.zeros(len(pv))
+        if export_limit_kw is not None:
+            curtailment = np.maximum(pv_ac - load - export_limit_kw * durations, 0.0)
+
+        block = pd.DataFrame(
+            dict(zip(columns, (load, pv_ac - curtailment, clipping, curtailment))), index=index
+        ).resample(interval).sum()
+        if pending is not None:
+            if block.index[0] == pending.index[-1]:
+                block.iloc[0] += pending.iloc[-1]
+                pending = pending.iloc[:-1]
+            aggregated_blocks.append(pending)
+        pending = block
+    if pending is None:
+        print("Keine Daten für die Wechselrichter-/Einspeisebegrenzung erhalten.")
+        return None
+    aggregated_blocks.append(pending)
+    aggregated = pd.concat(aggregated_blocks)
+
+    totals = {
+        'inverter_clipping_kwh': float(aggregated['inverter_clipping'].sum()),
+        'export_curtailment_kwh': float(aggregated['export_curtailment'].sum()),
+    }
+    pv_generation_series = aggregated['pv_generation'].rename('PV_Erzeugung_kWh')
+    pv_generation_series.attrs = {
+        **totals,
+        'inverter_ac_kw': inverter_ac_kw,
+        'export_limit_kw': export_limit_kw,
+        'native_interval_minutes': native_hours * 60.0,
+    }
+    print(f"Wechselrichter-/Einspeisebegrenzung ({native_hours * 60:g} min -> {simulation_interval_minutes} min):")
+    print(f"  Clipping (Wechselrichter {inverter_ac_kw} kW): {totals['inverter_clipping_kwh']:.2f} kWh")
+    print(f"  Abregelung (Einspeisegrenze {export_limit_kw} kW): {totals['export_curtailment_kwh']:.2f} kWh")
+    return {
+        'consumption_series': aggregated['consumption'] if has_consumption else None,
+        'pv_generation_series': pv_generation_series,
+        'inverter_clipping_series': aggregated['inverter_clipping'],
+        'export_curtailment_series': aggregated['export_curtailment'],
+        **totals,
+    }
+
+
+def _consumption_on_native_index(consumption_series: pd.Series, index: pd.DatetimeIndex) -> pd.Series | None:
+    """
+    Verteilt den Verbrauch (kWh je Intervall) auf die nativen Intervalle der PV-Datei (konstante
+    Leistung je Verbrauchsintervall). Zugeordnet wird über die Zeit seit Jahresbeginn, da PV-Dateien
+    oft ein anderes Bezugsjahr haben (z.B. PVGIS). None, wenn der Verbrauch nicht zuordenbar ist.
+    """
+    def seconds_of_year(times):
+        times = pd.DatetimeIndex(times)
+        return ((times.dayofyear - 1) * 86400 + times.hour * 3600 + times.minute * 60 + times.second).to_numpy(dtype=np.float64)
+
+    def interval_bounds(times):
+        seconds = seconds_of_year(times)
+        last_step = float(np.median(np.diff(seconds))) if len(seconds) > 1 else 0.0
+        return np.append(seconds, seconds[-1] + last_step)
+
+    if not isinstance(consumption_series.index, pd.DatetimeIndex) or len(consumption_series) < 2:
+        return None
+    consumption_bounds = interval_bounds(consumption_series.index)
+    if np.any(np.diff(consumption_bounds) <= 0):
+        print("Verbrauchszeitstempel nicht streng steigend, Einspeisegrenze ohne Verbrauch angewandt.")
+        return None
+    cumulative_kwh = np.append(0.0, np.cumsum(consumption_series.to_numpy(dtype=np.float64)))
+    native_kwh = np.diff(np.interp(interval_bounds(index), consumption_bounds, cumulative_kwh))
+    return pd.Series(np.maximum(native_kwh, 0.0), index=index)
+
+
+def _limit_native_pv_generation(
+    pv_generation_series: pd.Series | None,
+    pv_peak_power_kwp: float | None = None,
+    consumption_series: pd.Series | None = None
+) -> tuple:
+    """
+    Wendet beim Import Wechselrichter-Clipping (INVERTER_AC_POWER_KW) und Einspeisegrenze
+    (feed_in_limit_kw der Anlagengröße) in der nativen Auflösung an, vor dem Resampling auf 15 Minuten.
+    Mit consumption_series wird nur der eingespeiste Überschuss begrenzt (Verbrauch auf die nativen
+    Intervalle verteilt, siehe _consumption_on_native_index); ohne Verbrauchsreihe gilt die
+    Einspeisegrenze für die PV-Erzeugung selbst (siehe apply_pv_grid_limits).
+
+    Returns:
+        tuple: (PV-Erzeugung, pv_limits) mit den Summen und Grenzen der Begrenzung als dict
+        ('inverter_clipping_kwh', 'export_curtailment_kwh', ...) oder None ohne Begrenzung.
+    """
+    from config import INVERTER_AC_POWER_KW
+    export_limit_kw = feed_in_limit_kw(pv_peak_power_kwp) if pv_peak_power_kwp else None
+    if pv_generation_series is None or pv_generation_series.empty or (INVERTER_AC_POWER_KW is None and export_limit_kw is None):
+        return pv_generation_series, None
+    native_minutes = _infer_interval_minutes(pv_generation_series.index.to_series())
+    native_consumption = None
+    if consumption_series is not None and export_limit_kw is not None:
+        native_consumption = _consumption_on_native_index(consumption_series, pv_generation_series.index)
+    limited = apply_pv_grid_limits(
+        [(native_consumption, pv_generation_series)],
+        export_limit_kw=export_limit_kw,
+        simulation_interval_minutes=native_minutes
+    )
+    if limited is None:
+        return pv_generation_series, None
+    limited_series = limited['pv_generation_series']
+    pv_limits = dict(limited_series.attrs)
+    limited_series.attrs = {}
+    return limited_series, pv_limits
+
+
+def _pv_import_output(pv_generation_series: pd.Series | None, pv_limits: dict | None, return_pv_limits: bool):
+    """
+    Rückgabe der PV-Ladefunktionen: die Reihe oder mit return_pv_limits ein dict mit
+    'pv_generation_series' und 'pv_limits' (für curtailment_totals der Simulation; None bei Fehler).
+    """
+    if not return_pv_limits or pv_generation_series is None:
+        return pv_generation_series
+    return {'pv_generation_series': pv_generation_series, 'pv_limits': pv_limits}
+
+
 def _parse_semicolon_timestamp_csv(text_content: str) -> pd.Series | None:
     """
     Verarbeitet CSVs vom Typ 'timestamp;load' mit Dezimal-Komma.
@@ -777,16 +1013,25 @@ def _finalize_pv_series(series: pd.Series | None, selected_year: int, source_lab
     return pv_generation_series_15min
 
 
-def load_pv_generation_from_csv(file_path, selected_year=2024):
+def load_pv_generation_from_csv(file_path, selected_year=2024, pv_peak_power_kwp=None, return_pv_limits=False,
+                                consumption_series=None):
     """
     Lädt PV-Erzeugungsdaten aus einer CSV-Datei (z.B. PVGIS-Format).
+
+    Wechselrichter- und Einspeisebegrenzung (config.py) werden in der nativen Auflösung der Datei
+    vor der Interpolation auf 15 Minuten angewandt (_limit_native_pv_generation).
     
     Args:
         file_path (str): Pfad zur CSV-Datei mit PV-Erzeugungsdaten
         selected_year (int): Jahr für die Daten
+        pv_peak_power_kwp (float): PV-Anlagengröße in kWp für die Einspeisegrenze (None: keine Einspeisegrenze)
+        return_pv_limits (bool): Zusätzlich die Summen der Begrenzung zurückgeben (dict statt Series)
+        consumption_series (pd.Series): Verbrauch für die Einspeisegrenze (nur der Überschuss wird begrenzt;
+            None: Begrenzung der PV-Erzeugung selbst)
     
     Returns:
-        pd.Series: PV-Erzeugungsdaten mit 15-Minuten-Intervallen oder None bei Fehler
+        pd.Series: PV-Erzeugungsdaten mit 15-Minuten-Intervallen oder None bei Fehler; mit
+        return_pv_limits ein dict mit 'pv_generation_series' und 'pv_limits' (siehe _pv_import_output)
     """
     try:
         # Lade CSV-Datei (robust für PVGIS: Header finden, Kommentare/Metadaten überspringen)
@@ -817,12 +1062,20 @@ def load_pv_generation_from_csv(file_path, selected_year=2024):
         format_hint = _detect_custom_pv_csv_format(lines)
 
         if format_hint == 'semicolon_timestamp':
-            normalized_series = _parse_semicolon_timestamp_csv(text_content)
-            return _finalize_pv_series(normalized_series, selected_year, "timestamp;load CSV")
+            normalized_series, pv_limits = _limit_native_pv_generation(
+                _parse_semicolon_timestamp_csv(text_content), pv_peak_power_kwp, consumption_series
+            )
+            return _pv_import_output(
+                _finalize_pv_series(normalized_series, selected_year, "timestamp;load CSV"), pv_limits, return_pv_limits
+            )
 
         if format_hint == 'daily_report':
-            normalized_series = _parse_daily_report_csv(text_content)
-            return _finalize_pv_series(normalized_series, selected_year, "daily report CSV")
+            normalized_series, pv_limits = _limit_native_pv_generation(
+                _parse_daily_report_csv(text_content), pv_peak_power_kwp, consumption_series
+            )
+            return _pv_import_output(
+                _finalize_pv_series(normalized_series, selected_year, "daily report CSV"), pv_limits, return_pv_limits
+            )
 
         header_idx = None
         delimiter = ','
@@ -965,6 +1218,9 @@ def load_pv_generation_from_csv(file_path, selected_year=2024):
         
         print(f"PV-Daten nach Stunden aggregiert: {len(hourly_pv_kwh)} Stunden, Jahresertrag: {hourly_pv_kwh.sum():.2f} kWh")
         
+        # Wechselrichter- und Einspeisebegrenzung in stündlicher Auflösung (vor der Interpolation)
+        hourly_pv_kwh, pv_limits = _limit_native_pv_generation(hourly_pv_kwh, pv_peak_power_kwp, consumption_series)
+
         # Verwende die neue allgemeine Interpolationsfunktion
         print("Interpoliere PV-Daten auf 15-Minuten-Intervalle...")
         
@@ -988,7 +1244,7 @@ def load_pv_generation_from_csv(file_path, selected_year=2024):
         
         print(f"15-Minuten-PV-Daten erstellt: {len(pv_generation_series_15min)} Datenpunkte, Jahresertrag: {pv_generation_series_15min.sum():.2f} kWh")
 
-        return pv_generation_series_15min
+        return _pv_import_output(pv_generation_series_15min, pv_limits, return_pv_limits)
         
     except Exception as e:
         print(f"Fehler beim Laden der PV-Erzeugungsdaten aus CSV: {e}")
@@ -996,16 +1252,25 @@ def load_pv_generation_from_csv(file_path, selected_year=2024):
         traceback.print_exc()
         return None
 
-def load_pv_generation_from_excel(file_path, selected_year=2024):
+def load_pv_generation_from_excel(file_path, selected_year=2024, pv_peak_power_kwp=None, return_pv_limits=False,
+                                  consumption_series=None):
     """
     Lädt PV-Erzeugungsdaten aus einer separaten Excel-Datei.
+
+    Wechselrichter- und Einspeisebegrenzung werden wie bei load_pv_generation_from_csv in der
+    nativen Auflösung vor dem Resampling angewandt.
     
     Args:
         file_path (str): Pfad zur Excel-Datei mit PV-Erzeugungsdaten
         selected_year (int): Jahr für die Daten
+        pv_peak_power_kwp (float): PV-Anlagengröße in kWp für die Einspeisegrenze (None: keine Einspeisegrenze)
+        return_pv_limits (bool): Zusätzlich die Summen der Begrenzung zurückgeben (dict statt Series)
+        consumption_series (pd.Series): Verbrauch für die Einspeisegrenze (nur der Überschuss wird begrenzt;
+            None: Begrenzung der PV-Erzeugung selbst)
     
     Returns:
-        pd.Series: PV-Erzeugungsdaten mit 15-Minuten-Intervallen oder None bei Fehler
+        pd.Series: PV-Erzeugungsdaten mit 15-Minuten-Intervallen oder None bei Fehler; mit
+        return_pv_limits ein dict mit 'pv_generation_series' und 'pv_limits' (siehe _pv_import_output)
     """
     try:
         # Versuche verschiedene Sheet-Namen für PV-Erzeugung
@@ -1080,6 +1345,9 @@ def load_pv_generation_from_excel(file_path, selected_year=2024):
         # Stelle sicher, dass der Index ein DatetimeIndex ist
         if not isinstance(pv_generation_series.index, pd.DatetimeIndex):
             pv_generation_series.index = pd.to_datetime(pv_generation_series.index)
+
+        # Wechselrichter- und Einspeisebegrenzung in der nativen Auflösung (vor dem Resampling)
+        pv_generation_series, pv_limits = _limit_native_pv_generation(pv_generation_series, pv_peak_power_kwp, consumption_series)
         
         # Prüfe, ob die Daten stündlich sind und interpoliere auf 15-Minuten-Intervalle
         if len(pv_generation_series) <= 8760:  # Stündliche Daten (max 8784 für Schaltjahr)
@@ -1117,7 +1385,7 @@ def load_pv_generation_from_excel(file_path, selected_year=2024):
         
         print(f"PV-Erzeugungsdaten erfolgreich geladen: {len(pv_generation_series)} Datenpunkte, Jahresertrag: {pv_generation_series.sum():.2f} kWh")
         
-        return pv_generation_series
+        return _pv_import_output(pv_generation_series, pv_limits, return_pv_limits)
         
     except Exception as e:
         print(f"Fehler beim Laden der PV-Erzeugungsdaten: {e}")
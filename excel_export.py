@@ -2279,8 +2279,12 @@ def create_comprehensive_excel(optimization_results, optimal_sim_result, variabl
             
             # Nur vorhandene Spalten in gewünschter Reihenfolge
             available_cols = [col for col in desired_order if col in df_results.columns]
-            # Füge eventuell übrige Spalten am Ende hinzu
-            remaining_cols = [col for col in df_results.columns if col not in available_cols]
+            # Füge eventuell übrige Spalten am Ende hinzu, aber nur Tabellenwerte: Spalten mit Listen,
+            # dicts oder ausschließlich None (z.B. Angaben zum Suchlauf) kann openpyxl nicht schreiben
+            remaining_cols = [
+                col for col in df_results.columns
+                if col not in available_cols and df_results[col].map(np.isscalar).all()
+            ]
             final_cols = available_cols + remaining_cols
             df_results = df_results[final_cols]
             
@@ -4035,8 +4039,9 @@ def create_comprehensive_excel(optimization_results, optimal_sim_result, variabl
         # 2b. Monatsgrafiken (falls verfügbar) - Verwende plot_energy_flows_for_period wie in der UI
         if optimal_sim_result and "time_series_data" in optimal_sim_result:
             try:
-                # Bestimme das Jahr aus den Daten
-                year = optimal_sim_result["time_series_data"].index.year[0]
+                # DataFrame-Ansicht einmalig erzeugen und das Jahr aus den Daten bestimmen
+                optimal_time_series = optimal_sim_result["time_series_data"]
+                year = optimal_time_series.index.year[0]
                 
                 # Verwende die tatsächliche optimale Batteriekapazität
                 optimal_capacity = current_settings.get('optimal_battery_capacity_kwh', 10.0) if current_settings else 10.0
@@ -4057,7 +4062,7 @@ def create_comprehensive_excel(optimization_results, optimal_sim_result, variabl
                 for month in range(1, 13):
                     try:
                         month_img = create_monthly_energy_flow_png(
-                            optimal_sim_result["time_series_data"], 
+                            optimal_time_series, 
                             year, 
                             month, 
                             settings_with_capacity
@@ -1,6 +1,47 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+
 import numpy as np
 import pandas as pd
 
+from config import (
+    DEFAULT_SIMULATION_BACKEND, NUMBA_CACHE_DIR,
+    DEFAULT_RESULT_STORAGE_DTYPE, DEFAULT_RESULT_SPARSE,
+    DISPATCH_CACHE_MAX_BYTES, DEFAULT_ENERGY_BALANCE_VALIDATION,
+    DEFAULT_TIME_PARALLEL_WORKERS, DEFAULT_DISPATCH_STRATEGY,
+    THRESHOLD_BUY_PRICE, THRESHOLD_SELL_PRICE, MAX_GRID_CHARGE_KW, MAX_GRID_DISCHARGE_KW,
+    DEFAULT_OPTIMAL_DISPATCH_SOC_LEVELS, OPTIMAL_DISPATCH_MAX_POLICY_BYTES,
+    MPC_HORIZON_HOURS, MPC_REOPTIMIZE_HOURS, MPC_FORECAST, MPC_FORECAST_NOISE, MPC_FORECAST_SEED,
+    MPC_SOC_LEVELS, MPC_WINDOW_TIME_BUDGET_SECONDS,
+    BATTERY_CHARGE_POWER_CURVE, BATTERY_DISCHARGE_POWER_CURVE,
+    BATTERY_CHARGE_EFFICIENCY_CURVE, BATTERY_DISCHARGE_EFFICIENCY_CURVE, BATTERY_CURVE_TABLE_SIZE,
+    MAX_TIME_GRID_EXPANSION, TIME_GRID_SNAP_TOLERANCE, DEFAULT_AGING_MODEL, RAINFLOW_SOC_LEVELS, AGING_CYCLE_LIFE,
+    AGING_END_OF_LIFE_CAPACITY_PERCENT, AGING_DOD_EXPONENT, AGING_CALENDAR_LOSS_PERCENT_EMPTY,
+    AGING_CALENDAR_LOSS_PERCENT_FULL, AGING_DOD_HISTOGRAM_BINS, SCREENING_TYPICAL_DAYS, TYPICAL_DAYS_SEED,
+    TYPICAL_DAYS_SOC_LEVELS
+)
+
+# Optionaler JIT-Compiler für den Simulationskern (numba ist keine Pflichtabhängigkeit).
+# Der Kompilier-Cache wird auf der Festplatte abgelegt, damit nur der erste Start kompilieren muss.
+os.environ.setdefault("NUMBA_CACHE_DIR", NUMBA_CACHE_DIR)
+try:
+    from numba import njit
+    from numba import types as numba_types
+    from numba.core import cgutils
+    from numba.extending import intrinsic, overload, register_jitable
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = None
+    numba_types = cgutils = intrinsic = overload = register_jitable = None
+    NUMBA_AVAILABLE = False
+
 def get_supported_data_resolutions():
     """
     Gibt die unterstützten Datenauflösungen zurück.
@@ -17,48 +58,118 @@ def get_supported_data_resolutions():
         "1min": {"periods_normal": 525600, "periods_leap": 527040, "interval_hours": 1.0/60.0}
     }
 
-def validate_energy_balance(results_df, battery_efficiency_charge, battery_efficiency_discharge, tolerance_percent=0.01):
+# Spalten der Zeitreihen und zugehörige Schlüssel der Jahressummen
+_TOTALS_BY_COLUMN = {
+    'PV_Generation_kWh': 'pv_generation',
+    'Consumption_kWh': 'consumption',
+    'Direct_Self_Consumption_kWh': 'direct_self_consumption',
+    'Battery_Charge_kWh': 'battery_charge',
+    'Battery_Discharge_kWh': 'battery_discharge',
+    'Battery_Charge_Losses_kWh': 'battery_charge_losses',
+    'Battery_Discharge_Losses_kWh': 'battery_discharge_losses',
+    'Grid_Import_kWh': 'grid_import',
+    'Grid_Export_kWh': 'grid_export',
+}
+
+# Prüfstufen der Energiebilanz
+ENERGY_BALANCE_VALIDATION_LEVELS = ("off", "summary", "interval")
+
+
+def resolve_validation_level(validation_level: str | None = None) -> str:
+    """
+    Bestimmt die Prüfstufe der Energiebilanz.
+
+    Args:
+        validation_level (str | None): "off" (keine Prüfung), "summary" (Jahressummen aus den
+            Akkumulatoren des Kerns) oder "interval" (zusätzlich jedes Intervall, zum Debuggen).
+            None verwendet DEFAULT_ENERGY_BALANCE_VALIDATION.
+
+    Returns:
+        str: Prüfstufe
+    """
+    level = (validation_level or DEFAULT_ENERGY_BALANCE_VALIDATION).lower()
+    if level not in ENERGY_BALANCE_VALIDATION_LEVELS:
+        raise ValueError(f"Unbekannte Prüfstufe der Energiebilanz: {level}. "
+                         f"Erlaubt: {', '.join(ENERGY_BALANCE_VALIDATION_LEVELS)}.")
+    return level
+
+
+def validate_energy_balance(results_df, battery_efficiency_charge, battery_efficiency_discharge, tolerance_percent=0.01, verbose=False):
     """
-    Validiert die Energiebilanz einer Simulation.
+    Validiert die Energiebilanz einer Simulation anhand ihrer Zeitreihen.
     Prüft ob Energieerhaltung gilt und Verluste plausibel sind.
     
     Args:
-        results_df (pd.DataFrame): DataFrame mit Simulationsergebnissen
+        results_df (pd.DataFrame | dict): Simulationsergebnisse (DataFrame oder Spaltenname -> Array)
         battery_efficiency_charge (float): Lade-Wirkungsgrad (0-1)
         battery_efficiency_discharge (float): Entlade-Wirkungsgrad (0-1)
         tolerance_percent (float): Maximale erlaubte Abweichung in %
+        verbose (bool): Auch bei erfolgreicher Prüfung eine Meldung ausgeben
+    
+    Returns:
+        dict: Validierungsergebnisse mit Status und Fehlerwerten
+    """
+    totals = {key: results_df[column].sum() for column, key in _TOTALS_BY_COLUMN.items()}
+    return validate_energy_balance_totals(
+        totals, battery_efficiency_charge, battery_efficiency_discharge, tolerance_percent, verbose
+    )
+
+
+def validate_energy_balance_totals(totals, battery_efficiency_charge, battery_efficiency_discharge, tolerance_percent=0.01, verbose=False):
+    """
+    Validiert die Energiebilanz anhand der Jahressummen (z.B. aus den laufenden Akkumulatoren
+    des Simulationskerns). Es werden keine Zeitreihen benötigt, die Prüfung ist damit praktisch kostenlos.
+    
+    Args:
+        totals (dict): Summen wie in build_simulation_kpis ('pv_generation', 'consumption',
+            'direct_self_consumption', 'battery_charge', 'battery_discharge', 'battery_charge_losses',
+            'battery_discharge_losses', 'grid_import', 'grid_export'; bei Arbitrage zusätzlich
+            'grid_charge' und 'grid_discharge')
+        battery_efficiency_charge (float | None): Lade-Wirkungsgrad (0-1). None bei leistungsabhängigem
+            Wirkungsgrad (Kennlinie): die Plausibilitätsprüfung der Verluste entfällt.
+        battery_efficiency_discharge (float | None): Entlade-Wirkungsgrad (0-1), None wie oben.
+        tolerance_percent (float): Maximale erlaubte Abweichung in %
+        verbose (bool): Auch bei erfolgreicher Prüfung eine Meldung ausgeben
     
     Returns:
         dict: Validierungsergebnisse mit Status und Fehlerwerten
     """
     
+    # Arbitrage: Netzladung ist Teil des Netzbezugs, Netzentladung Teil der Einspeisung
+    grid_charge = totals.get('grid_charge', 0.0)
+    grid_discharge = totals.get('grid_discharge', 0.0)
+
     # 1. PV-BILANZ: PV = Direktverbrauch + Ladung + Einspeisung
-    pv_total = results_df['PV_Generation_kWh'].sum()
-    pv_used = (results_df['Direct_Self_Consumption_kWh'].sum() + 
-               results_df['Battery_Charge_kWh'].sum() + 
-               results_df['Grid_Export_kWh'].sum())
+    pv_total = totals['pv_generation']
+    pv_used = (totals['direct_self_consumption'] + 
+               totals['battery_charge'] + 
+               (totals['grid_export'] - grid_discharge))
     
     pv_balance_error = abs(pv_total - pv_used) / pv_total * 100 if pv_total > 0 else 0
     
     # 2. VERBRAUCHER-BILANZ: Verbrauch = Direktverbrauch + Batterieentladung + Netzbezug
-    consumption_total = results_df['Consumption_kWh'].sum()
-    consumption_covered = (results_df['Direct_Self_Consumption_kWh'].sum() + 
-                          results_df['Battery_Discharge_kWh'].sum() + 
-                          results_df['Grid_Import_kWh'].sum())
+    consumption_total = totals['consumption']
+    consumption_covered = (totals['direct_self_consumption'] + 
+                          totals['battery_discharge'] + 
+                          (totals['grid_import'] - grid_charge))
     
     consumption_balance_error = abs(consumption_total - consumption_covered) / consumption_total * 100 if consumption_total > 0 else 0
     
     # 3. BATTERIE-VERLUSTE: Plausibilitätsprüfung
-    total_charge = results_df['Battery_Charge_kWh'].sum()
-    total_discharge_netto = results_df['Battery_Discharge_kWh'].sum()
-    total_charge_losses = results_df['Battery_Charge_Losses_kWh'].sum()
-    total_discharge_losses = results_df['Battery_Discharge_Losses_kWh'].sum()
+    total_charge = totals['battery_charge'] + grid_charge
+    total_discharge_netto = totals['battery_discharge'] + grid_discharge
+    total_charge_losses = totals['battery_charge_losses']
+    total_discharge_losses = totals['battery_discharge_losses']
     
-    # Erwartete Verluste berechnen
-    expected_charge_losses = total_charge * (1 - battery_efficiency_charge)
-    # Bei Entladung: Netto-Entladung / η gibt Brutto-Entladung, Verluste = Brutto - Netto
-    expected_discharge_brutto = total_discharge_netto / battery_efficiency_discharge if battery_efficiency_discharge > 0 else 0
-    expected_discharge_losses = expected_discharge_brutto - total_discharge_netto
+    # Erwartete Verluste berechnen (bei Wirkungsgradkennlinie None: tatsächliche Verluste übernehmen)
+    if battery_efficiency_charge is None or battery_efficiency_discharge is None:
+        expected_charge_losses = total_charge_losses
+        expected_discharge_losses = total_discharge_losses
+    else:
+        expected_charge_losses = total_charge * (1 - battery_efficiency_charge)
+        # Bei Entladung: Netto-Entladung / η gibt Brutto-Entladung, Verluste = Brutto - Netto
+        expected_discharge_brutto = total_discharge_netto / battery_efficiency_discharge if battery_efficiency_discharge > 0 else 0
+        expected_discharge_losses = expected_discharge_brutto - total_discharge_netto
     
     # Abweichungen berechnen
     charge_loss_error = abs(total_charge_losses - expected_charge_losses) / expected_charge_losses * 100 if expected_charge_losses > 0 else 0
@@ -97,8 +208,8 @@ def validate_energy_balance(results_df, battery_efficiency_charge, battery_effic
         print(f"  Erwartet: {expected_discharge_losses:.2f} kWh")
         print(f"  Fehler: {discharge_loss_error:.4f}%")
     
-    if all_ok:
-        # Optional: Debug-Ausgabe bei Erfolg (kann auskommentiert werden bei Bedarf)
+    if all_ok and verbose:
+        # Debug-Ausgabe bei Erfolg nur auf Wunsch (nicht bei jedem Lauf einer Optimierung)
         print(f"✅ Energiebilanz-Validierung OK (PV: {pv_balance_error:.4f}%, Verbrauch: {consumption_balance_error:.4f}%)")
     
     return {
@@ -113,295 +224,4756 @@ def validate_energy_balance(results_df, battery_efficiency_charge, battery_effic
         'discharge_loss_error_percent': discharge_loss_error
     }
 
-def simulate_one_year(
-    consumption_series: pd.Series, 
-    pv_generation_series: pd.Series, 
-    battery_capacity_kwh: float, 
-    battery_efficiency_charge: float, # Wirkungsgrad beim Laden
-    battery_efficiency_discharge: float, # Wirkungsgrad beim Entladen
-    battery_max_charge_kw: float, # Maximale Ladeleistung in kW
-    battery_max_discharge_kw: float, # Maximale Entladeleistung in kW
-    price_grid_per_kwh: float, # Preis für Netzbezug in Euro/kWh (kann auch ein pd.Series für variable Tarife sein)
-    price_feed_in_per_kwh: float, # Preis für Netzeinspeisung in Euro/kWh (kann auch ein pd.Series für variable Tarife sein)
-    initial_soc_percent: float = 50.0, # Anfangsladezustand der Batterie in %
-    min_soc_percent: float = 10.0, # Minimaler Ladezustand in %
-    max_soc_percent: float = 90.0, # Maximaler Ladezustand in %
-    annual_capacity_loss_percent: float = 2.0, # Jährlicher Kapazitätsverlust in %
-    simulation_year: int = 1 # Jahr der Simulation (für Kapazitätsalterung)
-) -> dict:
+def check_energy_balance_per_interval(flows, pv_generation, consumption, battery_efficiency_charge,
+                                      battery_efficiency_discharge, initial_soc_kwh=None, tolerance_kwh=1e-9):
     """
-    Simuliert die Energieflüsse für ein Jahr mit automatischer Erkennung der Datenauflösung.
+    Prüft die Energiebilanz für jedes einzelne Intervall (Debug-Stufe "interval").
+
+    Geprüft werden PV-Bilanz, Verbraucher-Bilanz, Lade-/Entladeverluste und die SOC-Fortschreibung.
 
     Args:
-        consumption_series (pd.Series): Stromverbrauch in kWh (1h, 30min, 15min, 10min, 5min oder 1min).
-        pv_generation_series (pd.Series): PV-Erzeugung in kWh (1h, 30min, 15min, 10min, 5min oder 1min).
-        battery_capacity_kwh (float): Speicherkapazität der Batterie in kWh.
-        battery_efficiency_charge (float): Wirkungsgrad der Batterie beim Laden (0-1).
-        battery_efficiency_discharge (float): Wirkungsgrad der Batterie beim Entladen (0-1).
-        battery_max_charge_kw (float): Maximale Ladeleistung der Batterie in kW.
-        battery_max_discharge_kw (float): Maximale Entladeleistung der Batterie in kW.
-        price_grid_per_kwh (float | pd.Series): Preis für Netzbezug in Euro/kWh. Kann eine Konstante oder eine Zeitreihe sein.
-        price_feed_in_per_kwh (float | pd.Series): Preis für Netzeinspeisung in Euro/kWh. Kann eine Konstante oder eine Zeitreihe sein.
-        initial_soc_percent (float): Anfangsladezustand der Batterie in % (0-100).
-        min_soc_percent (float): Minimaler Ladezustand der Batterie in % (0-100).
-        max_soc_percent (float): Maximaler Ladezustand der Batterie in % (0-100).
-        annual_capacity_loss_percent (float): Jährlicher Kapazitätsverlust in % (0-10).
-        simulation_year (int): Jahr der Simulation (für Kapazitätsalterung).
+        flows (dict): Arrays je Spalte aus KERNEL_OUTPUT_COLUMNS (optional zusätzlich
+            ARBITRAGE_OUTPUT_COLUMNS).
+        pv_generation, consumption (np.ndarray): Eingangsreihen in kWh.
+        battery_efficiency_charge, battery_efficiency_discharge (float | None): Wirkungsgrade (0-1).
+            None bei Wirkungsgradkennlinie: nur Bilanzen und SOC-Fortschreibung werden geprüft.
+        initial_soc_kwh (float | None): SOC vor dem ersten Intervall (für die SOC-Prüfung des ersten Intervalls).
+        tolerance_kwh (float): Absolute Toleranz je Intervall in kWh.
+
+    Raises:
+        AssertionError: Beim ersten Intervall, in dem eine Bilanz verletzt ist.
+    """
+    grid_charge = flows.get('Grid_Charge_kWh', 0.0)
+    grid_discharge = flows.get('Grid_Discharge_kWh', 0.0)
+    charge = flows['Battery_Charge_kWh'] + grid_charge
+    discharge = flows['Battery_Discharge_kWh'] + grid_discharge
+    charge_losses = flows['Battery_Charge_Losses_kWh']
+    discharge_losses = flows['Battery_Discharge_Losses_kWh']
+    direct = flows['Direct_Self_Consumption_kWh']
+    soc = flows['SOC_kWh']
+
+    soc_before = np.empty_like(soc)
+    if len(soc):
+        soc_before[0] = soc[0] if initial_soc_kwh is None else initial_soc_kwh
+        soc_before[1:] = soc[:-1]
+    expected_soc = soc_before + (charge - charge_losses) - (discharge + discharge_losses)
+
+    checks = {
+        'PV-Bilanz': (pv_generation, direct + flows['Battery_Charge_kWh'] + (flows['Grid_Export_kWh'] - grid_discharge)),
+        'Verbraucher-Bilanz': (consumption, direct + flows['Battery_Discharge_kWh'] + (flows['Grid_Import_kWh'] - grid_charge)),
+        'Ladeverluste': (charge_losses, charge * (1 - battery_efficiency_charge)
+                         if battery_efficiency_charge is not None else charge_losses),
+        'Entladeverluste': (discharge_losses, discharge / battery_efficiency_discharge - discharge
+                            if battery_efficiency_discharge else discharge_losses),
+        'SOC-Fortschreibung': (soc[1:] if initial_soc_kwh is None else soc,
+                               expected_soc[1:] if initial_soc_kwh is None else expected_soc),
+    }
+    for name, (actual, expected) in checks.items():
+        deviation = np.abs(actual - expected)
+        violations = np.flatnonzero(deviation > tolerance_kwh + 1e-9 * np.abs(expected))
+        if len(violations):
+            i = violations[0]
+            raise AssertionError(f"Energiebilanz verletzt ({name}) in Intervall {i}: "
+                                 f"{actual[i]:.9f} kWh statt {expected[i]:.9f} kWh "
+                                 f"({len(violations)} Intervalle betroffen)")
+
+
+def _summarize_energy_balance(validation_level, totals, battery_efficiency_charge, battery_efficiency_discharge):
+    """Summenprüfung der Energiebilanz je nach Prüfstufe (None bei "off")."""
+    if validation_level == "off":
+        return None
+    return validate_energy_balance_totals(
+        totals,
+        battery_efficiency_charge,
+        battery_efficiency_discharge,
+        tolerance_percent=0.01  # 0.01% Toleranz für Rundungsfehler
+    )
+
+
+def _check_simulation_intervals(flows, pv_generation, consumption, kernel_params):
+    """Intervallprüfung der Energiebilanz mit den Parametern eines Kernaufrufs."""
+    variable_efficiency = has_variable_efficiency(resolve_battery_curves(kernel_params.get('battery_curves')))
+    check_energy_balance_per_interval(
+        flows,
+        _as_float_array(pv_generation),
+        _as_float_array(consumption),
+        None if variable_efficiency else kernel_params['battery_efficiency_charge'],
+        None if variable_efficiency else kernel_params['battery_efficiency_discharge'],
+        initial_soc_kwh=min(max(kernel_params['initial_soc_kwh'], kernel_params['min_soc_kwh']),
+                            kernel_params['max_soc_kwh'])
+    )
+
+
+def _battery_curve_lookup(
+    min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh, battery_efficiency_discharge,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+):
+    """
+    Index-Skalierung der Kennlinien eines Speichers für _dispatch_interval (Tabellenindex =
+    Anteil × (Länge - 1), gerundet). Leistungskennlinien werden nur im Indexbereich [first, last]
+    mit Faktor ungleich 1 nachgeschlagen; None = konstant (numba übersetzt die Zweige dann nicht).
 
     Returns:
-        dict: Ein Dictionary mit Zeitreihen der Energieflüsse, KPIs und Simulationsmetadaten.
-        Die Lade-/Entladegeschwindigkeiten werden automatisch basierend auf der Datenauflösung angepasst.
+        tuple: (charge_power_scale, discharge_power_scale, charge_efficiency_scale,
+        discharge_efficiency_scale, charge_power_floor_kwh, discharge_power_floor_kwh,
+        inverse_efficiency_discharge, inverse_efficiency_discharge_max, charge_power_first,
+        charge_power_last, discharge_power_first, discharge_power_last); nur floats, damit der
+        Batch-Kern die Werte je Kapazität als Zeile einer Matrix ablegen kann.
     """
+    usable_kwh = max_soc_kwh - min_soc_kwh
+    inverse_efficiency_discharge = 1.0 / battery_efficiency_discharge if battery_efficiency_discharge > 0 else 0.0
+    charge_power_scale = discharge_power_scale = charge_efficiency_scale = discharge_efficiency_scale = 0.0
+    charge_power_floor_kwh = discharge_power_floor_kwh = 0.0
+    inverse_efficiency_discharge_max = inverse_efficiency_discharge
+    charge_power_first, charge_power_last = 0.0, -1.0
+    discharge_power_first, discharge_power_last = 0.0, -1.0
+    if charge_power_curve is not None:
+        charge_power_scale = (len(charge_power_curve) - 1) / usable_kwh if usable_kwh > 0 else 0.0
+        charge_power_floor_kwh = max_charge_kwh * min(charge_power_curve)
+        charge_power_first = float(len(charge_power_curve))
+        for j in range(len(charge_power_curve)):
+            if charge_power_curve[j] != 1.0:
+                charge_power_first, charge_power_last = min(charge_power_first, float(j)), float(j)
+    if discharge_power_curve is not None:
+        discharge_power_scale = (len(discharge_power_curve) - 1) / usable_kwh if usable_kwh > 0 else 0.0
+        discharge_power_floor_kwh = max_discharge_kwh * min(discharge_power_curve)
+        discharge_power_first = float(len(discharge_power_curve))
+        for j in range(len(discharge_power_curve)):
+            if discharge_power_curve[j] != 1.0:
+                discharge_power_first, discharge_power_last = min(discharge_power_first, float(j)), float(j)
+    if charge_efficiency_curve is not None:
+        charge_efficiency_scale = (len(charge_efficiency_curve) - 1) / max_charge_kwh if max_charge_kwh > 0 else 0.0
+    if discharge_efficiency_curve is not None:
+        discharge_efficiency_scale = (len(discharge_efficiency_curve) - 1) / max_discharge_kwh if max_discharge_kwh > 0 else 0.0
+        inverse_efficiency_discharge_max = inverse_efficiency_discharge / min(min(discharge_efficiency_curve), 1.0)
+    return (charge_power_scale, discharge_power_scale, charge_efficiency_scale, discharge_efficiency_scale,
+            charge_power_floor_kwh, discharge_power_floor_kwh, inverse_efficiency_discharge,
+            inverse_efficiency_discharge_max, charge_power_first, charge_power_last,
+            discharge_power_first, discharge_power_last)
 
-    num_periods = len(consumption_series)
-    
-    # Bestimme die Zeitauflösung basierend auf der Länge der Daten
-    # Unterstützte Auflösungen: 1h, 30min, 15min, 10min, 5min, 1min
-    if num_periods == 8760:  # Stündliche Daten (normales Jahr)
-        time_interval_hours = 1.0
-        data_resolution = "hourly"
-    elif num_periods == 8784:  # Stündliche Daten (Schaltjahr)
-        time_interval_hours = 1.0
-        data_resolution = "hourly_leap_year"
-    elif num_periods == 17520:  # 30-Minuten-Daten (normales Jahr)
-        time_interval_hours = 0.5
-        data_resolution = "30min"
-    elif num_periods == 17568:  # 30-Minuten-Daten (Schaltjahr)
-        time_interval_hours = 0.5
-        data_resolution = "30min_leap_year"
-    elif num_periods == 35040:  # 15-Minuten-Daten (normales Jahr)
-        time_interval_hours = 0.25
-        data_resolution = "15min"
-    elif num_periods == 35136:  # 15-Minuten-Daten (Schaltjahr)
-        time_interval_hours = 0.25
-        data_resolution = "15min_leap_year"
-    elif num_periods == 52560:  # 10-Minuten-Daten (normales Jahr)
-        time_interval_hours = 1.0/6.0  # 10 Minuten = 1/6 Stunde
-        data_resolution = "10min"
-    elif num_periods == 52704:  # 10-Minuten-Daten (Schaltjahr)
-        time_interval_hours = 1.0/6.0
-        data_resolution = "10min_leap_year"
-    elif num_periods == 105120:  # 5-Minuten-Daten (normales Jahr)
-        time_interval_hours = 1.0/12.0  # 5 Minuten = 1/12 Stunde
-        data_resolution = "5min"
-    elif num_periods == 105408:  # 5-Minuten-Daten (Schaltjahr)
-        time_interval_hours = 1.0/12.0
-        data_resolution = "5min_leap_year"
-    elif num_periods == 525600:  # 1-Minuten-Daten (normales Jahr)
-        time_interval_hours = 1.0/60.0  # 1 Minute = 1/60 Stunde
-        data_resolution = "1min"
-    elif num_periods == 527040:  # 1-Minuten-Daten (Schaltjahr)
-        time_interval_hours = 1.0/60.0
-        data_resolution = "1min_leap_year"
-    else:
-        # ERFORDERT: Bekannte Datenauflösung für korrekte Simulation
-        raise ValueError(f"Unbekannte Datenauflösung: {num_periods} Perioden. "
-                       f"Unterstützte Auflösungen: 1h (8760), 30min (17520), 15min (35040), "
-                       f"10min (52560), 5min (105120), 1min (525600), 1min Schaltjahr (527040). "
-                       f"Bitte überprüfen Sie Ihre Zeitreihen-Daten.")
 
-    # Initialisierung der Zeitreihen für die Ergebnisse
-    soc_series = np.zeros(num_periods) # State of Charge
-    grid_import_series = np.zeros(num_periods) # Netzbezug
-    grid_export_series = np.zeros(num_periods) # Netzeinspeisung
-    battery_charge_series = np.zeros(num_periods) # Ladung der Batterie (Brutto - inkl. Verluste)
-    battery_discharge_series = np.zeros(num_periods) # Entladung der Batterie (Netto - nach Verlusten)
-    battery_charge_losses_series = np.zeros(num_periods) # Ladeverluste
-    battery_discharge_losses_series = np.zeros(num_periods) # Entladeverluste
-    direct_self_consumption_series = np.zeros(num_periods) # Direkter Eigenverbrauch
+def _curve_value(curve, index):
+    """Tabellenwert einer Kennlinie (nur in Zweigen mit curve is not None aufgerufen)."""
+    return curve[index]
 
-    # Kapazitätsalterung berechnen
-    capacity_loss_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (simulation_year - 1)
-    current_battery_capacity_kwh = battery_capacity_kwh * capacity_loss_factor
-    
-    # Aktueller Ladezustand der Batterie (in kWh) - begrenzt auf erlaubten Bereich
-    initial_soc_kwh = (initial_soc_percent / 100.0) * current_battery_capacity_kwh
-    min_soc_kwh = (min_soc_percent / 100.0) * current_battery_capacity_kwh
-    max_soc_kwh = (max_soc_percent / 100.0) * current_battery_capacity_kwh
-    current_soc_kwh = np.clip(initial_soc_kwh, min_soc_kwh, max_soc_kwh)
-
-    for i in range(num_periods):
-        pv_gen = pv_generation_series.iloc[i]
-        consumption = consumption_series.iloc[i]
-
-        # 1. Direkter Eigenverbrauch (PV direkt an Last)
-        direct_self_consumption = min(pv_gen, consumption)
-        direct_self_consumption_series[i] = direct_self_consumption  # Hier fehlte die Speicherung!
-        remaining_pv = pv_gen - direct_self_consumption
-        remaining_consumption = consumption - direct_self_consumption
-
-        # 2. Überschüssige PV-Energie in Batterie laden
-        if remaining_pv > 0:
-            # Maximal mögliche Ladung basierend auf SOC-Grenzen und max. Ladeleistung
-            # WICHTIG: Berücksichtige die Zeitauflösung für korrekte Ladegeschwindigkeit
-            max_charge_possible_kwh = min(max_soc_kwh - current_soc_kwh, battery_max_charge_kw * time_interval_hours)
-            charge_from_pv = min(remaining_pv, max_charge_possible_kwh)
-            
-            # Berechnung: Verluste beim Laden
-            charge_to_battery = charge_from_pv * battery_efficiency_charge
-            charge_losses = charge_from_pv - charge_to_battery
-            current_soc_kwh += charge_to_battery
-            battery_charge_series[i] = charge_from_pv  # Brutto-Ladung (inkl. Verluste)
-            battery_charge_losses_series[i] = charge_losses  # Ladeverluste
-            remaining_pv -= charge_from_pv
-
-        # 3. Fehlende Energie aus Batterie entladen oder aus Netz beziehen
-        # KORREKTUR 2025-11-03: Batterie-Entladungslogik überarbeitet
-        # Problem (alt): Division durch η und Multiplikation mit η hoben sich mathematisch auf
-        # Lösung (neu): Physikalisch korrekte Implementierung - erst maximale Entladung berechnen,
-        #               dann Verluste anwenden, dann auf Bedarf begrenzen
-        if remaining_consumption > 0:
-            # SCHRITT 1: Berechne maximale Entladung aus Batterie (physikalisch möglich)
-            # Berücksichtige: SOC-Grenzen und max. Entladeleistung
-            # WICHTIG: Berücksichtige die Zeitauflösung für korrekte Entladegeschwindigkeit
-            max_discharge_from_battery_kwh = min(
-                current_soc_kwh - min_soc_kwh,  # SOC-Grenze
-                battery_max_discharge_kw * time_interval_hours  # Leistungsgrenze
-            )
-            
-            # SCHRITT 2: Berechne wieviel beim Verbraucher ankommt (nach Verlusten)
-            # Aus Batterie entnommen → beim Verbraucher kommt weniger an (Wirkungsgrad!)
-            max_discharge_to_consumption_kwh = max_discharge_from_battery_kwh * battery_efficiency_discharge
-            
-            # SCHRITT 3: Wie viel wird tatsächlich verbraucht?
-            # Nicht mehr als benötigt!
-            actual_discharge_to_consumption = min(max_discharge_to_consumption_kwh, remaining_consumption)
-            
-            # SCHRITT 4: Rückrechnung: Wieviel wurde tatsächlich aus der Batterie entnommen?
-            # Bei Wirkungsgrad 95%: Um X kWh zu liefern, muss X/0.95 aus Batterie entnommen werden
-            actual_discharge_from_battery = actual_discharge_to_consumption / battery_efficiency_discharge
-            
-            # SCHRITT 5: Berechne Verluste
-            discharge_losses = actual_discharge_from_battery - actual_discharge_to_consumption
-            
-            # SCHRITT 6: Aktualisiere Zustandsvariablen
-            current_soc_kwh -= actual_discharge_from_battery
-            battery_discharge_series[i] = actual_discharge_to_consumption  # Netto-Entladung (nach Verlusten)
-            battery_discharge_losses_series[i] = discharge_losses  # Entladeverluste
-            remaining_consumption -= actual_discharge_to_consumption
-
-        # 4. Restlicher PV-Überschuss ins Netz einspeisen
-        if remaining_pv > 0:
-            grid_export_series[i] = remaining_pv
-
-        # 5. Restlicher Verbrauch aus dem Netz beziehen
-        if remaining_consumption > 0:
-            grid_import_series[i] = remaining_consumption
-
-        # Sicherstellen, dass SoC innerhalb der erlaubten Grenzen bleibt (kleine Rundungsfehler)
-        current_soc_kwh = np.clip(current_soc_kwh, min_soc_kwh, max_soc_kwh)
-        soc_series[i] = current_soc_kwh
-
-    # Erstellung eines Pandas DataFrame für die Zeitreihen-Ergebnisse
-    time_index = consumption_series.index
-    results_df = pd.DataFrame({
-        'PV_Generation_kWh': pv_generation_series.values,
-        'Consumption_kWh': consumption_series.values,
-        'SOC_kWh': soc_series,
-        'Battery_Charge_kWh': battery_charge_series,
-        'Battery_Discharge_kWh': battery_discharge_series,
-        'Battery_Charge_Losses_kWh': battery_charge_losses_series,
-        'Battery_Discharge_Losses_kWh': battery_discharge_losses_series,
-        'Grid_Import_kWh': grid_import_series,
-        'Grid_Export_kWh': grid_export_series,
-        'Direct_Self_Consumption_kWh': direct_self_consumption_series
-    }, index=time_index)
 
-    # Berechnung einfacher KPIs (können später in analysis.py verfeinert werden)
-    total_pv_generation = results_df['PV_Generation_kWh'].sum()
-    total_consumption = results_df['Consumption_kWh'].sum()
-    total_grid_import = results_df['Grid_Import_kWh'].sum()
-    total_grid_export = results_df['Grid_Export_kWh'].sum()
-    total_direct_self_consumption = results_df['Direct_Self_Consumption_kWh'].sum()
-    total_battery_charge = results_df['Battery_Charge_kWh'].sum()
-    total_battery_discharge = results_df['Battery_Discharge_kWh'].sum()
-    total_battery_charge_losses = results_df['Battery_Charge_Losses_kWh'].sum()
-    total_battery_discharge_losses = results_df['Battery_Discharge_Losses_kWh'].sum()
-    
-    # Kapazitätsalterung KPIs
-    original_capacity_kwh = battery_capacity_kwh
-    current_capacity_kwh = current_battery_capacity_kwh
-    if original_capacity_kwh > 0:
-        capacity_loss_percent = ((original_capacity_kwh - current_capacity_kwh) / original_capacity_kwh) * 100
-    else:
-        capacity_loss_percent = 0.0  # Keine Kapazität = kein Verlust
+if NUMBA_AVAILABLE:
+    @overload(_curve_value, inline="always")
+    def _curve_value_jit(curve, index):
+        """JIT-Variante: ohne Kennlinie (None) typisierbar, obwohl der Zweig nie ausgeführt wird."""
+        if isinstance(curve, numba_types.NoneType):
+            return lambda curve, index: 1.0
+        return lambda curve, index: curve[index]
 
-    # Autarkiegrad: Anteil des Verbrauchs, der nicht aus dem Netz bezogen wird
-    autarky_rate = (total_consumption - total_grid_import) / total_consumption if total_consumption > 0 else 0
 
-    # Eigenverbrauchsquote: Anteil der PV-Erzeugung, der selbst verbraucht wird
-    self_consumption_rate = (total_direct_self_consumption + total_battery_discharge) / total_pv_generation if total_pv_generation > 0 else 0
+def _borrowed_curves(charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve):
+    """
+    Kennlinien für die Zeitschleife eines Kerns. In Python unverändert; die JIT-Variante liefert
+    Sichten ohne Referenzzählung (die Kennlinien bleiben als Argumente des Kerns gültig), sonst
+    zählt numba die Arrays beim eingebetteten _dispatch_interval in jedem Intervall hoch und wieder
+    herunter, was den Kern mit Kennlinien um ein Mehrfaches verlangsamt (benchmark_kernel.py).
+    """
+    return charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
 
-    # Kosten und Ersparnisse
-    if isinstance(price_grid_per_kwh, pd.Series):
-        total_import_cost = (results_df['Grid_Import_kWh'] * price_grid_per_kwh).sum()
-    else:
-        total_import_cost = total_grid_import * price_grid_per_kwh
 
-    if isinstance(price_feed_in_per_kwh, pd.Series):
-        total_export_revenue = (results_df['Grid_Export_kWh'] * price_feed_in_per_kwh).sum()
-    else:
-        total_export_revenue = total_grid_export * price_feed_in_per_kwh
+if NUMBA_AVAILABLE:
+    @intrinsic
+    def _borrowed_view(typingctx, curve):
+        """Sicht auf ein Array ohne eigene Referenz (None bleibt None)."""
+        def codegen(context, builder, signature, args):
+            if isinstance(curve, numba_types.NoneType):
+                return args[0]
+            view = context.make_array(curve)(context, builder, value=args[0])
+            view.meminfo = cgutils.get_null_value(view.meminfo.type)
+            view.parent = cgutils.get_null_value(view.parent.type)
+            return view._getvalue()
+        return curve(curve), codegen
 
-    # Jährliche Stromkosten mit Speicher
-    effective_annual_energy_cost = total_import_cost - total_export_revenue
-    
-    # HINWEIS 2025-11-03: Referenzkosten OHNE Batterie werden NICHT hier berechnet!
-    # Grund: Bei variablen Tarifen wäre Durchschnittspreisberechnung (.mean()) ungenau.
-    # Die zeitliche Verteilung der Tarife würde ignoriert (z.B. wann PV einspeist, wann Strom gekauft wird).
-    # Korrekte Berechnung erfolgt in analysis.py durch echte Simulation ohne Batterie.
-    # Separation of Concerns: model.py simuliert, analysis.py bewertet wirtschaftlich.
-    
-    # Berechne KPIs für die finanzielle Analyse
-    # Verwende die korrekte Netto-Ersparnis für die KPI-Berechnung
-    # Die finanziellen Parameter werden später in der UI überschrieben
-    financial_kpis = {
-        'payback_period_years': np.nan,  # Wird später in der UI berechnet
-        'irr_percentage': np.nan  # Wird später in der UI berechnet
-    }
+    @overload(_borrowed_curves, inline="always")
+    def _borrowed_curves_jit(charge_power_curve, discharge_power_curve, charge_efficiency_curve,
+                             discharge_efficiency_curve):
+        return lambda charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve: (
+            _borrowed_view(charge_power_curve), _borrowed_view(discharge_power_curve),
+            _borrowed_view(charge_efficiency_curve), _borrowed_view(discharge_efficiency_curve)
+        )
 
-    # Validiere Energiebilanz (Qualitätssicherung)
-    energy_balance_validation = validate_energy_balance(
-        results_df, 
-        battery_efficiency_charge, 
-        battery_efficiency_discharge,
-        tolerance_percent=0.01  # 0.01% Toleranz für Rundungsfehler
+
+def _dispatch_interval(
+    remaining_pv, remaining_consumption, current_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh, battery_efficiency_charge, battery_efficiency_discharge,
+    buy_from_grid, sell_to_grid, max_grid_charge_kwh, max_grid_discharge_kwh,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve, curve_lookup
+):
+    """
+    Ein Intervall der PV-geführten Betriebsstrategie (PV-Überschuss → Batterie, Restlast ← Batterie,
+    optional Arbitrage am Netz). Gemeinsamer Schritt aller Schleifenkerne (_pv_first_dispatch_kernel,
+    _pv_first_totals_kernel, _pv_first_batch_kernel); arbeitet nur auf Skalaren, damit er in reinem
+    Python und JIT-kompiliert (siehe _jit_kernel) identisch rechnet.
+
+    Args:
+        remaining_pv, remaining_consumption (float): PV-Überschuss und Restlast nach Direktverbrauch (kWh).
+        current_soc_kwh (float): SOC zu Beginn des Intervalls.
+        buy_from_grid, sell_to_grid (bool): Arbitrage-Entscheidung des Intervalls (Preis gegen Schwellenwert).
+            Bei buy_from_grid wird nicht an die Last entladen, sondern zusätzlich aus dem Netz geladen.
+        curve_lookup: Ergebnis von _battery_curve_lookup (Tupel oder Matrixzeile).
+        Übrige Argumente wie _pv_first_dispatch_kernel. Die Leistungsgrenzen gelten beim SOC zu Beginn
+        des Intervalls, der Wirkungsgrad bei der Lade- bzw. Entnahmeleistung des Intervalls
+        (Entladung an die Last: geschätzt mit dem Nennwirkungsgrad).
+
+    Returns:
+        tuple: (soc_kwh, charge_from_pv, charge_losses, discharge_to_consumption, discharge_losses,
+        grid_charge, grid_discharge, grid_import, grid_export); SOC am Intervallende in den Grenzen.
+    """
+    # Einzeln indiziert (Tupel oder Matrixzeile des Batch-Kerns; Entpacken einer Zeile prüft deren Länge)
+    charge_power_scale = curve_lookup[0]
+    discharge_power_scale = curve_lookup[1]
+    charge_efficiency_scale = curve_lookup[2]
+    discharge_efficiency_scale = curve_lookup[3]
+    charge_power_floor_kwh = curve_lookup[4]
+    discharge_power_floor_kwh = curve_lookup[5]
+    inverse_efficiency_discharge = curve_lookup[6]
+    inverse_efficiency_discharge_max = curve_lookup[7]
+    charge_power_first = curve_lookup[8]
+    charge_power_last = curve_lookup[9]
+    discharge_power_first = curve_lookup[10]
+    discharge_power_last = curve_lookup[11]
+    charge_from_pv = 0.0
+    charge_losses = 0.0
+    discharge_to_consumption = 0.0
+    discharge_from_battery = 0.0
+    discharge_losses = 0.0
+    grid_charge = 0.0
+    grid_discharge = 0.0
+
+    # Leistungsgrenzen beim SOC zu Beginn des Intervalls (Kennlinie nur, wenn in der Richtung Energie fließen kann)
+    soc_position = current_soc_kwh - min_soc_kwh
+    charge_limit_kwh = max_charge_kwh
+    if (charge_power_curve is not None and current_soc_kwh < max_soc_kwh
+            and remaining_pv + (max_grid_charge_kwh if buy_from_grid else 0.0) > charge_power_floor_kwh):
+        power_index = soc_position * charge_power_scale + 0.5
+        if charge_power_first <= power_index < charge_power_last + 1:
+            charge_limit_kwh *= _curve_value(charge_power_curve, int(power_index))
+    discharge_limit_kwh = max_discharge_kwh
+    if (discharge_power_curve is not None and (soc_position > 0 or remaining_pv > 0)
+            and ((0.0 if buy_from_grid else remaining_consumption) + (max_grid_discharge_kwh if sell_to_grid else 0.0))
+            * inverse_efficiency_discharge_max > discharge_power_floor_kwh):
+        power_index = soc_position * discharge_power_scale + 0.5
+        if discharge_power_first <= power_index < discharge_power_last + 1:
+            discharge_limit_kwh *= _curve_value(discharge_power_curve, int(power_index))
+
+    # Überschüssige PV-Energie in Batterie laden (Brutto inkl. Ladeverluste)
+    if remaining_pv > 0:
+        charge_from_pv = min(remaining_pv, min(max_soc_kwh - current_soc_kwh, charge_limit_kwh))
+        efficiency_charge = battery_efficiency_charge
+        if charge_efficiency_curve is not None and charge_from_pv > 0:
+            efficiency_charge *= _curve_value(charge_efficiency_curve, int(charge_from_pv * charge_efficiency_scale + 0.5))
+        charge_to_battery = charge_from_pv * efficiency_charge
+        charge_losses = charge_from_pv - charge_to_battery
+        current_soc_kwh += charge_to_battery
+        remaining_pv -= charge_from_pv
+
+    # Fehlende Energie aus Batterie entladen (Netto nach Entladeverlusten), außer bei günstigem Netzstrom
+    if remaining_consumption > 0 and not buy_from_grid:
+        max_discharge_from_battery_kwh = min(current_soc_kwh - min_soc_kwh, discharge_limit_kwh)
+        efficiency_discharge = battery_efficiency_discharge
+        if discharge_efficiency_curve is not None and max_discharge_from_battery_kwh > 0:
+            efficiency_discharge *= _curve_value(discharge_efficiency_curve, int(
+                min(max_discharge_from_battery_kwh, remaining_consumption * inverse_efficiency_discharge)
+                * discharge_efficiency_scale + 0.5))
+        max_discharge_to_consumption_kwh = max_discharge_from_battery_kwh * efficiency_discharge
+        discharge_to_consumption = min(max_discharge_to_consumption_kwh, remaining_consumption)
+        discharge_from_battery = discharge_to_consumption / efficiency_discharge
+        discharge_losses = discharge_from_battery - discharge_to_consumption
+        current_soc_kwh -= discharge_from_battery
+        remaining_consumption -= discharge_to_consumption
+
+    # Arbitrage: bei niedrigem Bezugspreis aus dem Netz laden (Brutto, restliche Ladeleistung),
+    # bei hohem Einspeisepreis ins Netz entladen (Netto, restliche Entladeleistung);
+    # Wirkungsgrad bei der gesamten Lade- bzw. Entnahmeleistung des Intervalls
+    if buy_from_grid:
+        grid_charge = min(max_grid_charge_kwh, min(charge_limit_kwh - charge_from_pv, max_soc_kwh - current_soc_kwh))
+        if grid_charge > 0:
+            efficiency_charge = battery_efficiency_charge
+            if charge_efficiency_curve is not None:
+                efficiency_charge *= _curve_value(charge_efficiency_curve, int(
+                    (charge_from_pv + grid_charge) * charge_efficiency_scale + 0.5))
+            grid_charge_to_battery = grid_charge * efficiency_charge
+            charge_losses += grid_charge - grid_charge_to_battery
+            current_soc_kwh += grid_charge_to_battery
+        else:
+            grid_charge = 0.0
+    elif sell_to_grid:
+        max_grid_discharge_from_battery_kwh = min(current_soc_kwh - min_soc_kwh, discharge_limit_kwh - discharge_from_battery)
+        efficiency_discharge = battery_efficiency_discharge
+        if discharge_efficiency_curve is not None:
+            efficiency_discharge *= _curve_value(discharge_efficiency_curve, int(
+                (discharge_from_battery + max(min(max_grid_discharge_from_battery_kwh,
+                                                  max_grid_discharge_kwh * inverse_efficiency_discharge), 0.0))
+                * discharge_efficiency_scale + 0.5))
+        grid_discharge = min(max_grid_discharge_kwh, max_grid_discharge_from_battery_kwh * efficiency_discharge)
+        if grid_discharge > 0:
+            grid_discharge_from_battery = grid_discharge / efficiency_discharge
+            discharge_losses += grid_discharge_from_battery - grid_discharge
+            current_soc_kwh -= grid_discharge_from_battery
+        else:
+            grid_discharge = 0.0
+
+    # Restlicher PV-Überschuss ins Netz, restlicher Verbrauch aus dem Netz (inkl. Arbitrage);
+    # SOC innerhalb der erlaubten Grenzen halten (kleine Rundungsfehler)
+    grid_export = (remaining_pv if remaining_pv > 0 else 0.0) + grid_discharge
+    grid_import = (remaining_consumption if remaining_consumption > 0 else 0.0) + grid_charge
+    current_soc_kwh = min(max(current_soc_kwh, min_soc_kwh), max_soc_kwh)
+    return (current_soc_kwh, charge_from_pv, charge_losses, discharge_to_consumption, discharge_losses,
+            grid_charge, grid_discharge, grid_import, grid_export)
+
+
+# Die gemeinsamen Intervall-Funktionen bleiben reine Python-Funktionen (Python-Backend) und sind über
+# register_jitable zugleich in JIT-Kernen aufrufbar; der Schritt wird in die Schleife eingebettet, als
+# Funktionsaufruf kostet er ein Vielfaches
+if NUMBA_AVAILABLE:
+    register_jitable(nogil=True)(_battery_curve_lookup)
+    register_jitable(nogil=True, inline="always")(_dispatch_interval)
+
+
+def _jit_kernel(kernel):
+    """
+    JIT-Variante eines Schleifenkerns (None ohne numba). Der Kern ruft _dispatch_interval und
+    _battery_curve_lookup auf, die als register_jitable in den JIT-Code übernommen werden; die
+    Python-Variante desselben Kerns ruft die Python-Funktionen auf. So teilen alle Kerne und
+    Backends einen Intervall-Schritt.
+    """
+    if not NUMBA_AVAILABLE:
+        return None
+    return njit(cache=True, nogil=True)(kernel)
+
+
+def _pv_first_dispatch_kernel(
+    pv_generation, consumption, price_grid, price_feed_in,
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge, battery_efficiency_discharge,
+    buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+    skip_to_when_empty, skip_to_when_full,
+    soc_out, charge_out, discharge_out, charge_losses_out, discharge_losses_out,
+    grid_import_out, grid_export_out, direct_self_consumption_out,
+    grid_charge_out, grid_discharge_out
+):
+    """
+    Simulationskern der PV-geführten Betriebsstrategie (PV → Last → Batterie → Netz),
+    optional mit Schwellenwert-Arbitrage am Netz.
+
+    Arbeitet ausschließlich auf Skalaren und indexierbaren Puffern, damit dieselbe
+    Funktion sowohl als Referenz in reinem Python (Listen) als auch JIT-kompiliert
+    (numba, float64-Arrays) ausgeführt werden kann. Die Ergebnisse werden in die
+    übergebenen Ausgabepuffer geschrieben.
+
+    Args:
+        pv_generation, consumption: PV-Erzeugung und Verbrauch je Intervall in kWh.
+        price_grid, price_feed_in: Bezugs- und Einspeisepreis je Intervall (Euro/kWh).
+        initial_soc_kwh, min_soc_kwh, max_soc_kwh (float): Anfangs-SOC und SOC-Grenzen in kWh.
+        max_charge_kwh, max_discharge_kwh (float): Leistungsgrenzen je Intervall in kWh
+            (max. Leistung in kW × Intervalldauer in h).
+        battery_efficiency_charge, battery_efficiency_discharge (float): Wirkungsgrade (0-1).
+        buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh (float):
+            Arbitrage (siehe arbitrage_parameters). Liegt der Bezugspreis unter buy_threshold, wird
+            nicht an die Last entladen, sondern zusätzlich aus dem Netz geladen; liegt der
+            Einspeisepreis über sell_threshold, wird zusätzlich ins Netz entladen.
+            PV-geführt: (-inf, inf, 0, 0).
+        charge_power_curve ... discharge_efficiency_curve: Gleichabständige Nachschlagetabellen über
+            0..1 (siehe resolve_battery_curves). Die Leistungsgrenzen gelten beim SOC zu Beginn des
+            Intervalls, der Wirkungsgrad bei der Lade- bzw. Entnahmeleistung des Intervalls
+            (Entladung: geschätzt mit dem Nennwirkungsgrad). None = konstant.
+        skip_to_when_empty, skip_to_when_full: Sprungziele für Leerlauf-Abschnitte (siehe
+            _idle_run_targets). Ist die Batterie leer (voll), kann sie bis zum Intervall
+            skip_to_when_empty[i] (skip_to_when_full[i]) weder entladen (laden) noch ihren SOC ändern.
+        *_out: Ausgabepuffer mit Länge der Eingangsreihen. Für übersprungene Intervalle werden
+            die vorbelegten Leerlaufwerte übernommen; soc_out wird nur am Anfang eines
+            übersprungenen Abschnitts geschrieben (Rest wird vom Aufrufer fortgeschrieben).
+
+    Returns:
+        float: SOC in kWh am Ende des letzten Intervalls.
+    """
+    current_soc_kwh = min(max(initial_soc_kwh, min_soc_kwh), max_soc_kwh)
+    curve_lookup = _battery_curve_lookup(
+        min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh, battery_efficiency_discharge,
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+    )
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve = _borrowed_curves(
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+    )
+
+    num_periods = len(pv_generation)
+    i = 0
+    while i < num_periods:
+        # Leerlauf: leere Batterie ohne PV-Überschuss/Netzladung bzw. volle Batterie ohne
+        # Restlast/Netzentladung -> ganzen Abschnitt überspringen (Netzflüsse sind vorbelegt, SOC bleibt konstant)
+        if current_soc_kwh == min_soc_kwh and skip_to_when_empty[i] > i:
+            soc_out[i] = current_soc_kwh
+            i = skip_to_when_empty[i]
+            continue
+        if current_soc_kwh == max_soc_kwh and skip_to_when_full[i] > i:
+            soc_out[i] = current_soc_kwh
+            i = skip_to_when_full[i]
+            continue
+
+        # Direkter Eigenverbrauch (PV direkt an Last), danach Batterie und Netz (_dispatch_interval)
+        direct_self_consumption = min(pv_generation[i], consumption[i])
+        direct_self_consumption_out[i] = direct_self_consumption
+        (current_soc_kwh, charge_out[i], charge_losses_out[i], discharge_out[i], discharge_losses_out[i],
+         grid_charge_out[i], grid_discharge_out[i], grid_import_out[i], grid_export_out[i]) = _dispatch_interval(
+            pv_generation[i] - direct_self_consumption, consumption[i] - direct_self_consumption, current_soc_kwh,
+            min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh,
+            battery_efficiency_charge, battery_efficiency_discharge,
+            price_grid[i] < buy_threshold, price_feed_in[i] > sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+            charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve, curve_lookup
+        )
+        soc_out[i] = current_soc_kwh
+        i += 1
+
+    return current_soc_kwh
+
+
+# JIT-kompilierte Variante des Kerns (nur falls numba verfügbar); cache=True legt
+# den Maschinencode in NUMBA_CACHE_DIR ab.
+_pv_first_dispatch_kernel_jit = _jit_kernel(_pv_first_dispatch_kernel)
+
+# Reihenfolge der Ausgabepuffer des Simulationskerns
+KERNEL_OUTPUT_COLUMNS = (
+    'SOC_kWh',
+    'Battery_Charge_kWh',
+    'Battery_Discharge_kWh',
+    'Battery_Charge_Losses_kWh',
+    'Battery_Discharge_Losses_kWh',
+    'Grid_Import_kWh',
+    'Grid_Export_kWh',
+    'Direct_Self_Consumption_kWh',
+)
+
+# Zusätzliche Ausgabepuffer für Arbitrage am Netz (nur bei dispatch_strategy="threshold" im Ergebnis)
+ARBITRAGE_OUTPUT_COLUMNS = (
+    'Grid_Charge_kWh',
+    'Grid_Discharge_kWh',
+)
+DISPATCH_KERNEL_BUFFERS = KERNEL_OUTPUT_COLUMNS + ARBITRAGE_OUTPUT_COLUMNS
+
+# Betriebsstrategien des Simulationskerns
+DISPATCH_STRATEGIES = ("pv_first", "threshold", "optimal", "rolling_horizon")
+
+# Alterungsmodelle der Lebensdauer-Simulation (siehe resolve_aging_model)
+AGING_MODELS = ("flat", "cycle_calendar")
+
+# Eingebaute Prognosen der rollierenden Optimierung
+MPC_FORECASTS = ("persistence", "noisy", "perfect")
+
+# Arbitrage-Parameter der PV-geführten Strategie (keine Netzladung/-entladung)
+NO_ARBITRAGE = (-np.inf, np.inf, 0.0, 0.0)
+
+# Kennlinien des Speichers (Reihenfolge der Nachschlagetabellen im Kern, siehe resolve_battery_curves)
+BATTERY_CURVE_NAMES = ('charge_power', 'discharge_power', 'charge_efficiency', 'discharge_efficiency')
+_CONFIG_BATTERY_CURVES = {
+    'charge_power': BATTERY_CHARGE_POWER_CURVE,
+    'discharge_power': BATTERY_DISCHARGE_POWER_CURVE,
+    'charge_efficiency': BATTERY_CHARGE_EFFICIENCY_CURVE,
+    'discharge_efficiency': BATTERY_DISCHARGE_EFFICIENCY_CURVE,
+}
+# Konstantes Modell: keine Tabellen (Kern rechnet bitgleich zu festen Grenzen/Wirkungsgraden, numba
+# übersetzt die Kennlinienzweige dann gar nicht erst)
+CONSTANT_BATTERY_CURVES = (None,) * len(BATTERY_CURVE_NAMES)
+
+
+def resolve_dispatch_strategy(dispatch_strategy: str | None = None) -> str:
+    """
+    Bestimmt die Betriebsstrategie des Speichers.
+
+    Args:
+        dispatch_strategy (str | None): "pv_first" (Eigenverbrauch), "threshold"
+            (zusätzlich Arbitrage mit THRESHOLD_BUY_PRICE/THRESHOLD_SELL_PRICE aus config.py) oder
+            "optimal" (kostenoptimal mit vollständiger Voraussicht, siehe solve_optimal_dispatch_batch)
+            oder "rolling_horizon" (kostenoptimal über ein rollierendes Prognosefenster, siehe
+            solve_rolling_horizon_batch). None verwendet DEFAULT_DISPATCH_STRATEGY.
+
+    Returns:
+        str: Betriebsstrategie
+    """
+    strategy = (dispatch_strategy or DEFAULT_DISPATCH_STRATEGY).lower()
+    if strategy not in DISPATCH_STRATEGIES:
+        raise ValueError(f"Unbekannte Betriebsstrategie: {strategy}. Erlaubt: {', '.join(DISPATCH_STRATEGIES)}.")
+    return strategy
+
+
+def arbitrage_parameters(dispatch_strategy: str | None, time_interval_hours: float) -> tuple:
+    """
+    Arbitrage-Parameter des Simulationskerns für eine Betriebsstrategie.
+
+    Args:
+        dispatch_strategy (str | None): siehe resolve_dispatch_strategy.
+        time_interval_hours (float): Intervalldauer in Stunden (Umrechnung der Netzleistung in kWh).
+
+    Returns:
+        tuple: (buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh);
+        NO_ARBITRAGE für alle Strategien außer "threshold".
+    """
+    if resolve_dispatch_strategy(dispatch_strategy) != "threshold":
+        return NO_ARBITRAGE
+    return (
+        float(THRESHOLD_BUY_PRICE),
+        float(THRESHOLD_SELL_PRICE),
+        MAX_GRID_CHARGE_KW * time_interval_hours,
+        MAX_GRID_DISCHARGE_KW * time_interval_hours,
     )
 
+
+def rolling_horizon_parameters(time_interval_hours: float) -> dict:
+    """
+    Parameter der rollierenden Optimierung aus config.py (MPC_*), umgerechnet in Intervalle.
+
+    Args:
+        time_interval_hours (float): Intervalldauer in Stunden.
+
+    Returns:
+        dict: Schlüsselwortargumente für solve_rolling_horizon_batch.
+    """
     return {
-        'time_series_data': results_df,
-        'kpis': {
-            'autarky_rate': autarky_rate,
-            'self_consumption_rate': self_consumption_rate,
-            'total_grid_import_kwh': total_grid_import,
-            'total_grid_export_kwh': total_grid_export,
-            'annual_energy_cost': effective_annual_energy_cost,  # Rückwärtskompatibilität
-            'effective_annual_energy_cost': effective_annual_energy_cost,
-            'grid_import_cost': total_import_cost,
-            'grid_export_revenue': total_export_revenue,
-            # 'annual_energy_cost_savings' entfernt - wird korrekt in analysis.py berechnet (2025-11-03)
-            'payback_period_years': financial_kpis['payback_period_years'],
-            'irr_percentage': financial_kpis['irr_percentage'],
-            'total_pv_generation_kwh': total_pv_generation,
-            'total_consumption_kwh': total_consumption,
-            'total_direct_self_consumption_kwh': total_direct_self_consumption,
-            'total_battery_charge_kwh': total_battery_charge,
-            'total_battery_discharge_kwh': total_battery_discharge,
-            'total_battery_charge_losses_kwh': total_battery_charge_losses,
-            'total_battery_discharge_losses_kwh': total_battery_discharge_losses,
-            'battery_efficiency_charge': battery_efficiency_charge,
-            'battery_efficiency_discharge': battery_efficiency_discharge,
-            'original_capacity_kwh': original_capacity_kwh,
-            'current_capacity_kwh': current_capacity_kwh,
-            'capacity_loss_percent': capacity_loss_percent,
-            'simulation_year': simulation_year
-        },
-        'simulation_metadata': {
-            'data_resolution': data_resolution,
-            'time_interval_hours': time_interval_hours,
-            'num_periods': num_periods,
-            'battery_max_charge_kw': battery_max_charge_kw,
-            'battery_max_discharge_kw': battery_max_discharge_kw,
-            'energy_balance_validation': energy_balance_validation
+        'horizon_periods': max(int(round(MPC_HORIZON_HOURS / time_interval_hours)), 1),
+        'reoptimize_periods': max(int(round(MPC_REOPTIMIZE_HOURS / time_interval_hours)), 1),
+        'periods_per_day': max(int(round(24 / time_interval_hours)), 1),
+        'forecast': MPC_FORECAST,
+        'forecast_noise': float(MPC_FORECAST_NOISE),
+        'forecast_seed': MPC_FORECAST_SEED,
+        'soc_levels': MPC_SOC_LEVELS,
+        'window_time_budget_seconds': MPC_WINDOW_TIME_BUDGET_SECONDS,
+    }
+
+
+def resolve_aging_model(aging_model: str | None = None) -> str:
+    """
+    Bestimmt das Alterungsmodell der Lebensdauer-Simulation.
+
+    Args:
+        aging_model (str | None): "flat" (fester jährlicher Kapazitätsverlust) oder "cycle_calendar"
+            (Zyklen aus Rainflow-Zählung plus kalendarische Alterung, siehe
+            cycle_calendar_capacity_loss_percent). None verwendet DEFAULT_AGING_MODEL.
+
+    Returns:
+        str: Alterungsmodell
+    """
+    model = (aging_model or DEFAULT_AGING_MODEL).lower()
+    if model not in AGING_MODELS:
+        raise ValueError(f"Unbekanntes Alterungsmodell: {model}. Erlaubt: {', '.join(AGING_MODELS)}.")
+    return model
+
+
+def _battery_curve_table(name: str, points, table_size: int) -> np.ndarray | None:
+    """Tastet eine stückweise lineare Kennlinie gleichabständig über 0..1 ab (None ohne Kennlinie)."""
+    if points is None:
+        return None
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) == 0:
+        raise ValueError(f"Kennlinie '{name}' muss aus Stützstellen (x, Faktor) bestehen.")
+    x, factor = points[:, 0], points[:, 1]
+    if np.any(np.diff(x) <= 0) or x[0] < 0 or x[-1] > 1:
+        raise ValueError(f"Stützstellen der Kennlinie '{name}' müssen streng steigend zwischen 0 und 1 liegen.")
+    if name.endswith('_power') and np.any((factor < 0) | (factor > 1)):
+        raise ValueError(f"Leistungsfaktoren der Kennlinie '{name}' müssen zwischen 0 und 1 liegen.")
+    if name.endswith('_efficiency') and np.any(factor <= 0):
+        raise ValueError(f"Wirkungsgradfaktoren der Kennlinie '{name}' müssen größer als 0 sein.")
+    return np.interp(np.linspace(0.0, 1.0, max(int(table_size), 2)), x, factor)
+
+
+def resolve_battery_curves(battery_curves=None) -> tuple:
+    """
+    Nachschlagetabellen der Leistungs- und Wirkungsgradkennlinien für den Simulationskern.
+
+    Jede Kennlinie besteht aus Stützstellen (x, Faktor) mit x zwischen 0 und 1 und wird stückweise
+    linear auf BATTERY_CURVE_TABLE_SIZE gleichabständige Punkte abgetastet. Der Kern liest den Faktor
+    ohne Suche über den gerundeten Index x × (Tabellenlänge - 1):
+        'charge_power', 'discharge_power': SOC als Anteil des nutzbaren Bereichs (min. bis max. SOC)
+            zu Beginn des Intervalls -> Faktor auf die max. Lade- bzw. Entladeleistung.
+        'charge_efficiency', 'discharge_efficiency': Lade- bzw. Entnahmeleistung als Anteil der
+            Nennleistung -> Faktor auf den Lade- bzw. Entladewirkungsgrad.
+
+    Args:
+        battery_curves (dict | tuple | None): Kennlinien je Name aus BATTERY_CURVE_NAMES (fehlende
+            Einträge aus config.py, Wert None = konstant) oder bereits aufbereitete Tabellen.
+            None verwendet die Kennlinien aus config.py.
+
+    Returns:
+        tuple: Vier float64-Arrays (None = konstant) in der Reihenfolge BATTERY_CURVE_NAMES.
+    """
+    if isinstance(battery_curves, tuple):
+        return battery_curves
+    curves = dict(_CONFIG_BATTERY_CURVES)
+    if battery_curves is not None:
+        unknown = set(battery_curves) - set(BATTERY_CURVE_NAMES)
+        if unknown:
+            raise ValueError(f"Unbekannte Kennlinie: {', '.join(sorted(unknown))}. Erlaubt: {', '.join(BATTERY_CURVE_NAMES)}.")
+        curves.update(battery_curves)
+    if all(curves[name] is None for name in BATTERY_CURVE_NAMES):
+        return CONSTANT_BATTERY_CURVES
+    return tuple(_battery_curve_table(name, curves[name], BATTERY_CURVE_TABLE_SIZE) for name in BATTERY_CURVE_NAMES)
+
+
+def has_variable_efficiency(battery_curves: tuple) -> bool:
+    """True, wenn die Wirkungsgrade von der Leistung abhängen (Verlustprüfung mit Nennwirkungsgrad entfällt)."""
+    return any(curve is not None and np.any(curve != 1.0) for curve in battery_curves[2:])
+
+
+def _curve_or_unit(curve: np.ndarray | None) -> np.ndarray:
+    """Nachschlagetabelle für die vektorisierten Rechenwege (konstante Kennlinie als Faktor 1)."""
+    return np.ones(2) if curve is None else curve
+
+
+def resolve_simulation_backend(backend: str | None = None) -> str:
+    """
+    Bestimmt das zu verwendende Backend des Simulationskerns.
+
+    Args:
+        backend (str | None): "auto", "numba" oder "python". None verwendet DEFAULT_SIMULATION_BACKEND.
+
+    Returns:
+        str: "numba" oder "python"
+    """
+    backend = (backend or DEFAULT_SIMULATION_BACKEND).lower()
+    if backend == "auto":
+        return "numba" if NUMBA_AVAILABLE else "python"
+    if backend == "numba":
+        if not NUMBA_AVAILABLE:
+            raise ImportError("Simulations-Backend 'numba' angefordert, aber numba ist nicht installiert.")
+        return "numba"
+    if backend == "python":
+        return "python"
+    raise ValueError(f"Unbekanntes Simulations-Backend: {backend}. Erlaubt: 'auto', 'numba', 'python'.")
+
+
+def _as_float_array(values) -> np.ndarray:
+    """Wandelt eine Series/Sequenz in ein zusammenhängendes float64-Array um (ohne Kopie, wenn möglich)."""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def is_storage_inactive(min_soc_kwh: float, max_soc_kwh: float, max_charge_kwh: float, max_discharge_kwh: float) -> bool:
+    """
+    Prüft, ob die Batterie keine Energie aufnehmen oder abgeben kann (z.B. 0 kWh Kapazität
+    oder 0 kW Leistung). In diesem Fall liefert der Simulationskern keine Batterieflüsse.
+    """
+    if min_soc_kwh > max_soc_kwh:
+        return False  # Ungültige SOC-Grenzen: Verhalten des Kerns unverändert lassen
+    return max_soc_kwh == min_soc_kwh or (max_charge_kwh == 0 and max_discharge_kwh == 0)
+
+
+def _no_storage_flows(pv: np.ndarray, load: np.ndarray, soc_kwh: float) -> dict:
+    """
+    Geschlossene Lösung der Energieflüsse ohne Speicher (Referenzfall ohne Batterie):
+    Direktverbrauch = min(PV, Last), Einspeisung = PV - Direktverbrauch, Netzbezug = Last - Direktverbrauch.
+    Liefert dieselben Arrays wie der Simulationskern.
+    """
+    direct_self_consumption = np.minimum(pv, load)
+    zeros = np.zeros(len(pv))
+    return {
+        'SOC_kWh': np.full(len(pv), soc_kwh),
+        'Battery_Charge_kWh': zeros,
+        'Battery_Discharge_kWh': zeros.copy(),
+        'Battery_Charge_Losses_kWh': zeros.copy(),
+        'Battery_Discharge_Losses_kWh': zeros.copy(),
+        'Grid_Import_kWh': np.maximum(load - direct_self_consumption, 0.0),
+        'Grid_Export_kWh': np.maximum(pv - direct_self_consumption, 0.0),
+        'Direct_Self_Consumption_kWh': direct_self_consumption,
+        'Grid_Charge_kWh': zeros.copy(),
+        'Grid_Discharge_kWh': zeros.copy(),
+    }
+
+
+def run_dispatch_kernel(
+    pv_generation_kwh,
+    consumption_kwh,
+    initial_soc_kwh: float,
+    min_soc_kwh: float,
+    max_soc_kwh: float,
+    max_charge_kwh: float,
+    max_discharge_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    backend: str | None = None,
+    price_grid_per_kwh=0.0,
+    price_feed_in_per_kwh=0.0,
+    arbitrage: tuple = NO_ARBITRAGE,
+    battery_curves=None
+) -> dict:
+    """
+    Führt den Simulationskern auf reinen float64-Arrays aus.
+
+    Args:
+        pv_generation_kwh (array-like): PV-Erzeugung je Intervall in kWh.
+        consumption_kwh (array-like): Verbrauch je Intervall in kWh.
+        initial_soc_kwh, min_soc_kwh, max_soc_kwh (float): Anfangs-SOC und SOC-Grenzen in kWh.
+        max_charge_kwh, max_discharge_kwh (float): Lade-/Entladegrenze je Intervall in kWh.
+        battery_efficiency_charge, battery_efficiency_discharge (float): Wirkungsgrade (0-1).
+        backend (str | None): "auto", "numba" oder "python".
+        price_grid_per_kwh, price_feed_in_per_kwh (float | pd.Series): Preise (nur für die Arbitrage relevant).
+        arbitrage (tuple): Arbitrage-Parameter aus arbitrage_parameters(); Standard: PV-geführt.
+        battery_curves (dict | tuple | None): SOC-abhängige Leistungsgrenzen und leistungsabhängige
+            Wirkungsgrade (siehe resolve_battery_curves). None: Kennlinien aus config.py.
+
+    Returns:
+        dict: Arrays je Spalte aus DISPATCH_KERNEL_BUFFERS sowie 'final_soc_kwh'.
+    """
+    pv = _as_float_array(pv_generation_kwh)
+    load = _as_float_array(consumption_kwh)
+    if pv.shape != load.shape:
+        raise ValueError(f"PV- und Verbrauchsreihe haben unterschiedliche Längen: {len(pv)} vs. {len(load)}")
+    num_periods = len(load)
+    scalars = (
+        float(initial_soc_kwh), float(min_soc_kwh), float(max_soc_kwh),
+        float(max_charge_kwh), float(max_discharge_kwh),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge),
+        *(float(value) for value in arbitrage)
+    )
+
+    if is_storage_inactive(*scalars[1:5]):
+        # Ohne nutzbaren Speicher sind alle Flüsse elementweise -> geschlossene Lösung ohne Schleife
+        result = _no_storage_flows(pv, load, min(max(scalars[0], scalars[1]), scalars[2]))
+        result['final_soc_kwh'] = float(result['SOC_kWh'][-1]) if num_periods else scalars[0]
+        return result
+
+    index = consumption_kwh.index if isinstance(consumption_kwh, pd.Series) else None
+    prices = tuple(np.ascontiguousarray(_price_array(price, index, num_periods))
+                   for price in (price_grid_per_kwh, price_feed_in_per_kwh))
+    outputs = [np.empty(num_periods) for _ in DISPATCH_KERNEL_BUFFERS]
+    final_soc_kwh = _run_kernel_segment(
+        pv, load, prices, scalars[0], scalars[1:], outputs, resolve_simulation_backend(backend),
+        resolve_battery_curves(battery_curves)
+    )
+
+    result = dict(zip(DISPATCH_KERNEL_BUFFERS, outputs))
+    result['final_soc_kwh'] = float(final_soc_kwh)
+    return result
+
+
+def _next_index_where(mask: np.ndarray) -> np.ndarray:
+    """Für jedes Intervall i den kleinsten Index j >= i mit mask[j] (len(mask), falls keiner folgt)."""
+    positions = np.append(np.flatnonzero(mask), len(mask))
+    preceding = np.cumsum(mask) - mask  # Anzahl Treffer vor Intervall i
+    return positions[preceding]
+
+
+def _idle_run_targets_loop(pv_generation, consumption, price_grid, price_feed_in, buy_threshold, sell_threshold,
+                           skip_to_when_empty, skip_to_when_full):
+    """Sprungziele für Leerlauf-Abschnitte in einem Rückwärtsdurchlauf (JIT-Variante von _idle_run_targets)."""
+    num_periods = len(pv_generation)
+    next_surplus = num_periods
+    next_deficit = num_periods
+    for i in range(num_periods - 1, -1, -1):
+        direct_self_consumption = min(pv_generation[i], consumption[i])
+        if pv_generation[i] - direct_self_consumption > 0 or price_grid[i] < buy_threshold:
+            next_surplus = i
+        if consumption[i] - direct_self_consumption > 0 or price_feed_in[i] > sell_threshold:
+            next_deficit = i
+        skip_to_when_empty[i] = next_surplus
+        skip_to_when_full[i] = next_deficit
+
+
+def _fill_idle_runs_loop(
+    pv_generation, consumption,
+    soc_out, charge_out, discharge_out, charge_losses_out, discharge_losses_out,
+    grid_import_out, grid_export_out, direct_self_consumption_out,
+    grid_charge_out, grid_discharge_out
+):
+    """Füllt die vom Kern übersprungenen Intervalle (Netzbezug NaN) mit den Leerlaufwerten (JIT-Variante)."""
+    for i in range(len(pv_generation)):
+        if grid_import_out[i] == grid_import_out[i]:
+            continue  # vom Kern berechnet
+        direct_self_consumption = min(pv_generation[i], consumption[i])
+        remaining_pv = pv_generation[i] - direct_self_consumption
+        remaining_consumption = consumption[i] - direct_self_consumption
+        direct_self_consumption_out[i] = direct_self_consumption
+        charge_out[i] = 0.0
+        discharge_out[i] = 0.0
+        charge_losses_out[i] = 0.0
+        discharge_losses_out[i] = 0.0
+        grid_charge_out[i] = 0.0
+        grid_discharge_out[i] = 0.0
+        grid_export_out[i] = remaining_pv if remaining_pv > 0 else 0.0
+        grid_import_out[i] = remaining_consumption if remaining_consumption > 0 else 0.0
+        if i > 0:
+            soc_out[i] = soc_out[i - 1]
+
+
+_idle_run_targets_loop_jit = (
+    njit(cache=True, nogil=True)(_idle_run_targets_loop) if NUMBA_AVAILABLE else None
+)
+_fill_idle_runs_loop_jit = (
+    njit(cache=True, nogil=True)(_fill_idle_runs_loop) if NUMBA_AVAILABLE else None
+)
+
+
+def _idle_run_targets(pv: np.ndarray, load: np.ndarray, prices: tuple, scalars, resolved_backend: str) -> tuple:
+    """
+    Vorlauf der Lauflängenkompression: Sprungziele für Leerlauf-Abschnitte des Kerns.
+
+    Eine leere Batterie (SOC = min) bleibt bis zum nächsten PV-Überschuss (bzw. zur nächsten
+    Netzladung) unverändert (reiner Netzbezug, typisch nachts), eine volle Batterie (SOC = max)
+    bis zur nächsten Restlast bzw. Netzentladung (reine Einspeisung). Diese Abschnitte muss der
+    Kern nicht schrittweise rechnen.
+
+    Returns:
+        tuple: (skip_to_when_empty, skip_to_when_full) als int64-Arrays
+    """
+    (min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh, _, battery_efficiency_discharge,
+     buy_threshold, sell_threshold, _, _) = scalars
+    price_grid, price_feed_in = prices
+    num_periods = len(pv)
+    if resolved_backend == "numba":
+        skip_to_when_empty = np.empty(num_periods, dtype=np.int64)
+        skip_to_when_full = np.empty(num_periods, dtype=np.int64)
+        _idle_run_targets_loop_jit(pv, load, price_grid, price_feed_in, buy_threshold, sell_threshold,
+                                   skip_to_when_empty, skip_to_when_full)
+    else:
+        direct_self_consumption = np.minimum(pv, load)
+        skip_to_when_empty = _next_index_where((pv - direct_self_consumption > 0) | (price_grid < buy_threshold))
+        skip_to_when_full = _next_index_where((load - direct_self_consumption > 0) | (price_feed_in > sell_threshold))
+    # Sonderfälle (ungültige Grenzen, negative Leistung, Wirkungsgrad 0) weiterhin schrittweise rechnen
+    if min_soc_kwh > max_soc_kwh or max_discharge_kwh < 0 or battery_efficiency_discharge <= 0:
+        skip_to_when_empty = np.zeros(num_periods, dtype=np.int64)
+    if min_soc_kwh > max_soc_kwh or max_charge_kwh < 0:
+        skip_to_when_full = np.zeros(num_periods, dtype=np.int64)
+    return skip_to_when_empty, skip_to_when_full
+
+
+def _run_kernel_segment(pv, load, prices, start_soc_kwh, scalars, outputs, resolved_backend, curves) -> float:
+    """
+    Führt den Simulationskern für einen Zeitabschnitt aus und schreibt in die übergebenen Array-Ausschnitte.
+
+    Der Kern rechnet nur Intervalle mit aktiver Batterie schrittweise; übersprungene Leerlauf-Abschnitte
+    (erkennbar am nicht geschriebenen Netzbezug) werden anschließend aufgefüllt:
+    Netzbezug = Restlast, Einspeisung = PV-Überschuss, keine Batterieflüsse, SOC konstant.
+    """
+    skip_targets = _idle_run_targets(pv, load, prices, scalars, resolved_backend)
+    grid_import_out = outputs[DISPATCH_KERNEL_BUFFERS.index('Grid_Import_kWh')]
+
+    if resolved_backend == "numba":
+        grid_import_out.fill(np.nan)
+        final_soc_kwh = _pv_first_dispatch_kernel_jit(
+            pv, load, *prices, start_soc_kwh, *scalars, *curves, *skip_targets, *outputs
+        )
+        _fill_idle_runs_loop_jit(pv, load, *outputs)
+        return final_soc_kwh
+
+    # Referenz-Backend: Python-Listen sind im Interpreter deutlich schneller als Array-Indexierung
+    num_periods = len(pv)
+    buffers = [[np.nan if column in ('SOC_kWh', 'Grid_Import_kWh') else 0.0] * num_periods
+               for column in DISPATCH_KERNEL_BUFFERS]
+    final_soc_kwh = _pv_first_dispatch_kernel(
+        pv.tolist(), load.tolist(), *(price.tolist() for price in prices), start_soc_kwh, *scalars,
+        *(None if curve is None else curve.tolist() for curve in curves), *(targets.tolist() for targets in skip_targets), *buffers
+    )
+    for output, buffer in zip(outputs, buffers):
+        output[:] = buffer
+
+    # Übersprungene Intervalle vektorisiert auffüllen (gleiche Rechenschritte wie im Kern)
+    skipped = np.isnan(grid_import_out)
+    if skipped.any():
+        soc_out, grid_export_out, direct_self_consumption_out = (
+            outputs[DISPATCH_KERNEL_BUFFERS.index(column)]
+            for column in ('SOC_kWh', 'Grid_Export_kWh', 'Direct_Self_Consumption_kWh')
+        )
+        direct_self_consumption = np.minimum(pv, load)
+        surplus = pv - direct_self_consumption
+        deficit = load - direct_self_consumption
+        direct_self_consumption_out[skipped] = direct_self_consumption[skipped]
+        grid_import_out[skipped] = np.where(deficit > 0, deficit, 0.0)[skipped]
+        grid_export_out[skipped] = np.where(surplus > 0, surplus, 0.0)[skipped]
+        written = np.where(np.isnan(soc_out), 0, np.arange(num_periods))
+        soc_out[:] = soc_out[np.maximum.accumulate(written)]
+    return final_soc_kwh
+
+
+def run_dispatch_kernel_parallel(
+    pv_generation_kwh,
+    consumption_kwh,
+    initial_soc_kwh: float,
+    min_soc_kwh: float,
+    max_soc_kwh: float,
+    max_charge_kwh: float,
+    max_discharge_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    backend: str | None = None,
+    max_workers: int | None = None,
+    segment_periods: int | None = None,
+    resync_periods: int = 96,
+    price_grid_per_kwh=0.0,
+    price_feed_in_per_kwh=0.0,
+    arbitrage: tuple = NO_ARBITRAGE,
+    battery_curves=None
+) -> dict:
+    """
+    Zeitparallele Variante von run_dispatch_kernel mit bitgleichen Ergebnissen.
+
+    Der einzige Zustand des Kerns ist der SOC. Erreicht ein Lauf mit falsch angenommenem
+    Start-SOC irgendwann exakt denselben SOC wie der richtige Lauf (typisch: leere Batterie in
+    der Nacht, volle Batterie am Mittag), sind alle folgenden Intervalle identisch.
+    Das Jahr wird daher in Abschnitte geteilt, die parallel mit angenommenem Start-SOC
+    (min_soc_kwh) simuliert werden. Anschließend wird jeder Abschnitt ab dem tatsächlichen
+    Start-SOC nur so weit neu gerechnet, bis der SOC wieder mit dem spekulativen Lauf übereinstimmt.
+
+    Args:
+        Wie run_dispatch_kernel, zusätzlich:
+        max_workers (int | None): Anzahl Threads. None: Anzahl CPU-Kerne.
+        segment_periods (int | None): Intervalle je Abschnitt (z.B. ein Vielfaches eines Tages,
+            damit Abschnitte um Mitternacht beginnen). None: gleichmäßig auf die Threads verteilt.
+        resync_periods (int): Fenstergröße der Nachrechnung (wird bei fehlender Übereinstimmung verdoppelt).
+
+    Returns:
+        dict: Wie run_dispatch_kernel, zusätzlich 'num_segments' und 'resimulated_periods'
+        (Anzahl nachgerechneter Intervalle).
+    """
+    pv = _as_float_array(pv_generation_kwh)
+    load = _as_float_array(consumption_kwh)
+    if pv.shape != load.shape:
+        raise ValueError(f"PV- und Verbrauchsreihe haben unterschiedliche Längen: {len(pv)} vs. {len(load)}")
+    num_periods = len(load)
+    max_workers = max_workers or os.cpu_count() or 1
+    if segment_periods is None:
+        segment_periods = -(-num_periods // max_workers)
+    segment_periods = max(int(segment_periods), 1)
+    resolved_backend = resolve_simulation_backend(backend)
+    scalars = (
+        float(min_soc_kwh), float(max_soc_kwh),
+        float(max_charge_kwh), float(max_discharge_kwh),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge),
+        *(float(value) for value in arbitrage)
+    )
+    index = consumption_kwh.index if isinstance(consumption_kwh, pd.Series) else None
+    prices = tuple(np.ascontiguousarray(_price_array(price, index, num_periods))
+                   for price in (price_grid_per_kwh, price_feed_in_per_kwh))
+    curves = resolve_battery_curves(battery_curves)
+
+    # Threads bringen nur mit dem JIT-Kern (ohne GIL) einen Gewinn
+    if (max_workers <= 1 or segment_periods >= num_periods or resolved_backend != "numba"
+            or is_storage_inactive(*scalars[:4])):
+        result = run_dispatch_kernel(
+            pv, load, initial_soc_kwh, *scalars[:6], backend=backend,
+            price_grid_per_kwh=prices[0], price_feed_in_per_kwh=prices[1], arbitrage=scalars[6:],
+            battery_curves=curves
+        )
+        result['num_segments'] = 1
+        result['resimulated_periods'] = 0
+        return result
+
+    boundaries = list(range(0, num_periods, segment_periods)) + [num_periods]
+    segments = list(zip(boundaries[:-1], boundaries[1:]))
+    outputs = [np.empty(num_periods) for _ in DISPATCH_KERNEL_BUFFERS]
+
+    # 1. Spekulative Läufe aller Abschnitte (erster Abschnitt mit dem tatsächlichen Anfangs-SOC)
+    assumed_start_soc_kwh = [float(initial_soc_kwh)] + [scalars[0]] * (len(segments) - 1)
+
+    def simulate_segment(k):
+        start, end = segments[k]
+        return _run_kernel_segment(
+            pv[start:end], load[start:end], tuple(price[start:end] for price in prices),
+            assumed_start_soc_kwh[k], scalars,
+            [output[start:end] for output in outputs], resolved_backend, curves
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        segment_final_soc_kwh = list(executor.map(simulate_segment, range(len(segments))))
+
+    # 2. Nachrechnung in zeitlicher Reihenfolge ab dem tatsächlichen Start-SOC, bis der SOC
+    #    wieder bitgleich mit dem spekulativen Lauf ist (danach sind alle Flüsse identisch)
+    soc_out = outputs[DISPATCH_KERNEL_BUFFERS.index('SOC_kWh')]
+    resimulated_periods = 0
+    for k in range(1, len(segments)):
+        start, end = segments[k]
+        current_soc_kwh = segment_final_soc_kwh[k - 1]
+        if current_soc_kwh == assumed_start_soc_kwh[k]:
+            continue
+        window = resync_periods
+        position = start
+        while position < end:
+            window_end = min(position + window, end)
+            window_outputs = [np.empty(window_end - position) for _ in DISPATCH_KERNEL_BUFFERS]
+            current_soc_kwh = _run_kernel_segment(
+                pv[position:window_end], load[position:window_end],
+                tuple(price[position:window_end] for price in prices), current_soc_kwh, scalars,
+                window_outputs, resolved_backend, curves
+            )
+            matches = np.flatnonzero(window_outputs[DISPATCH_KERNEL_BUFFERS.index('SOC_kWh')] == soc_out[position:window_end])
+            copy_until = matches[0] + 1 if len(matches) else window_end - position
+            for output, window_output in zip(outputs, window_outputs):
+                output[position:position + copy_until] = window_output[:copy_until]
+            resimulated_periods += int(copy_until)
+            if len(matches):
+                break
+            position = window_end
+            window *= 2
+        else:
+            # Keine Übereinstimmung im Abschnitt: der neu gerechnete End-SOC gilt
+            segment_final_soc_kwh[k] = current_soc_kwh
+
+    result = dict(zip(DISPATCH_KERNEL_BUFFERS, outputs))
+    result['final_soc_kwh'] = float(segment_final_soc_kwh[-1])
+    result['num_segments'] = len(segments)
+    result['resimulated_periods'] = resimulated_periods
+    return result
+
+# Reihenfolge der Summen im KPI-Kern (Lean-Modus ohne Zeitreihen)
+LEAN_TOTAL_COLUMNS = (
+    'battery_charge',
+    'battery_discharge',
+    'battery_charge_losses',
+    'battery_discharge_losses',
+    'grid_import',
+    'grid_export',
+    'grid_import_cost',
+    'grid_export_revenue',
+    'direct_self_consumption',
+    'grid_charge',
+    'grid_discharge',
+)
+
+
+def _pv_first_totals_kernel(
+    pv_generation, consumption, price_grid, price_feed_in,
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge, battery_efficiency_discharge,
+    buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+    totals_out
+):
+    """
+    KPI-Variante des Simulationskerns: gleicher Intervall-Schritt wie _pv_first_dispatch_kernel
+    (_dispatch_interval), aber statt Zeitreihen werden nur laufende Summen (LEAN_TOTAL_COLUMNS) gebildet.
+    Der Speicherbedarf ist damit unabhängig von der Länge der Zeitreihe.
+
+    Returns:
+        float: SOC in kWh am Ende des letzten Intervalls.
+    """
+    charge_total = 0.0
+    discharge_total = 0.0
+    charge_losses_total = 0.0
+    discharge_losses_total = 0.0
+    import_total = 0.0
+    export_total = 0.0
+    import_cost_total = 0.0
+    export_revenue_total = 0.0
+    direct_total = 0.0
+    grid_charge_total = 0.0
+    grid_discharge_total = 0.0
+    current_soc_kwh = min(max(initial_soc_kwh, min_soc_kwh), max_soc_kwh)
+    curve_lookup = _battery_curve_lookup(
+        min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh, battery_efficiency_discharge,
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+    )
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve = _borrowed_curves(
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+    )
+
+    for i in range(len(pv_generation)):
+        direct_self_consumption = min(pv_generation[i], consumption[i])
+        direct_total += direct_self_consumption
+        (current_soc_kwh, charge_from_pv, charge_losses, discharge_to_consumption, discharge_losses,
+         grid_charge, grid_discharge, grid_import, grid_export) = _dispatch_interval(
+            pv_generation[i] - direct_self_consumption, consumption[i] - direct_self_consumption, current_soc_kwh,
+            min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh,
+            battery_efficiency_charge, battery_efficiency_discharge,
+            price_grid[i] < buy_threshold, price_feed_in[i] > sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+            charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve, curve_lookup
+        )
+        charge_total += charge_from_pv
+        charge_losses_total += charge_losses
+        discharge_total += discharge_to_consumption
+        discharge_losses_total += discharge_losses
+        grid_charge_total += grid_charge
+        grid_discharge_total += grid_discharge
+        if grid_export > 0:
+            export_total += grid_export
+            export_revenue_total += grid_export * price_feed_in[i]
+        if grid_import > 0:
+            import_total += grid_import
+            import_cost_total += grid_import * price_grid[i]
+
+    totals_out[0] = charge_total
+    totals_out[1] = discharge_total
+    totals_out[2] = charge_losses_total
+    totals_out[3] = discharge_losses_total
+    totals_out[4] = import_total
+    totals_out[5] = export_total
+    totals_out[6] = import_cost_total
+    totals_out[7] = export_revenue_total
+    totals_out[8] = direct_total
+    totals_out[9] = grid_charge_total
+    totals_out[10] = grid_discharge_total
+    return current_soc_kwh
+
+
+_pv_first_totals_kernel_jit = _jit_kernel(_pv_first_totals_kernel)
+
+
+def run_totals_kernel(
+    pv_generation_kwh,
+    consumption_kwh,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_kwh: float,
+    min_soc_kwh: float,
+    max_soc_kwh: float,
+    max_charge_kwh: float,
+    max_discharge_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    backend: str | None = None,
+    arbitrage: tuple = NO_ARBITRAGE,
+    battery_curves=None
+) -> dict:
+    """
+    Führt den KPI-Kern aus und liefert nur Jahressummen (keine Zeitreihen).
+
+    Args:
+        pv_generation_kwh, consumption_kwh (array-like): PV-Erzeugung und Verbrauch je Intervall in kWh.
+        price_grid_per_kwh, price_feed_in_per_kwh (float | pd.Series): Bezugs- und Einspeisepreis.
+        Übrige Argumente wie run_dispatch_kernel.
+
+    Returns:
+        dict: Summen aus LEAN_TOTAL_COLUMNS sowie 'pv_generation', 'consumption' und 'final_soc_kwh'.
+    """
+    index = consumption_kwh.index if isinstance(consumption_kwh, pd.Series) else None
+    pv = _as_float_array(pv_generation_kwh)
+    load = _as_float_array(consumption_kwh)
+    if pv.shape != load.shape:
+        raise ValueError(f"PV- und Verbrauchsreihe haben unterschiedliche Längen: {len(pv)} vs. {len(load)}")
+    num_periods = len(load)
+    price_grid = _price_array(price_grid_per_kwh, index, num_periods)
+    price_feed_in = _price_array(price_feed_in_per_kwh, index, num_periods)
+    scalars = (
+        float(initial_soc_kwh), float(min_soc_kwh), float(max_soc_kwh),
+        float(max_charge_kwh), float(max_discharge_kwh),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge),
+        *(float(value) for value in arbitrage)
+    )
+
+    totals_out = np.zeros(len(LEAN_TOTAL_COLUMNS))
+    if is_storage_inactive(*scalars[1:5]):
+        # Geschlossene Lösung ohne Speicher (vgl. _no_storage_flows)
+        direct_self_consumption = np.minimum(pv, load)
+        grid_import = np.maximum(load - direct_self_consumption, 0.0)
+        grid_export = np.maximum(pv - direct_self_consumption, 0.0)
+        totals_out[4] = grid_import.sum()
+        totals_out[5] = grid_export.sum()
+        totals_out[6] = grid_import @ price_grid
+        totals_out[7] = grid_export @ price_feed_in
+        totals_out[8] = direct_self_consumption.sum()
+        final_soc_kwh = min(max(scalars[0], scalars[1]), scalars[2])
+    elif resolve_simulation_backend(backend) == "numba":
+        final_soc_kwh = _pv_first_totals_kernel_jit(
+            pv, load, price_grid, price_feed_in, *scalars, *resolve_battery_curves(battery_curves), totals_out
+        )
+    else:
+        final_soc_kwh = _pv_first_totals_kernel(
+            pv.tolist(), load.tolist(), price_grid, price_feed_in, *scalars,
+            *(None if curve is None else curve.tolist() for curve in resolve_battery_curves(battery_curves)), totals_out
+        )
+
+    totals = dict(zip(LEAN_TOTAL_COLUMNS, totals_out.tolist()))
+    totals['pv_generation'] = pv.sum()
+    totals['consumption'] = load.sum()
+    totals['final_soc_kwh'] = float(final_soc_kwh)
+    return totals
+
+
+# Spaltenreihenfolge von time_series_data
+TIME_SERIES_COLUMNS = ('PV_Generation_kWh', 'Consumption_kWh') + KERNEL_OUTPUT_COLUMNS
+
+
+def _derive_direct_self_consumption(result):
+    return np.minimum(result.column('PV_Generation_kWh'), result.column('Consumption_kWh'))
+
+
+def _derive_grid_import(result):
+    # Gleiche Rechenschritte wie im Kern: Restlast nach Direktverbrauch minus Batterieentladung
+    remaining = (result.column('Consumption_kWh') - result.column('Direct_Self_Consumption_kWh')) - result.column('Battery_Discharge_kWh')
+    return np.where(remaining > 0, remaining, 0.0)
+
+
+def _derive_grid_export(result):
+    # Gleiche Rechenschritte wie im Kern: PV-Überschuss nach Direktverbrauch minus Batterieladung
+    remaining = (result.column('PV_Generation_kWh') - result.column('Direct_Self_Consumption_kWh')) - result.column('Battery_Charge_kWh')
+    return np.where(remaining > 0, remaining, 0.0)
+
+
+# Spalten, die sich bei PV-geführtem Betrieb exakt aus anderen Spalten ergeben
+# (Spaltenname -> (benötigte Spalten, Berechnungsfunktion))
+_DERIVED_TIME_SERIES_COLUMNS = {
+    'Direct_Self_Consumption_kWh': (('PV_Generation_kWh', 'Consumption_kWh'), _derive_direct_self_consumption),
+    'Grid_Import_kWh': (('Consumption_kWh', 'Battery_Discharge_kWh'), _derive_grid_import),
+    'Grid_Export_kWh': (('PV_Generation_kWh', 'Battery_Charge_kWh'), _derive_grid_export),
+}
+
+
+class SimulationResult(Mapping):
+    """
+    Kompakter Ergebnis-Container einer Simulation.
+
+    Verhält sich wie das bisherige Ergebnis-Dictionary ('time_series_data', 'kpis',
+    'simulation_metadata', ...), speichert die Zeitreihen aber spaltenweise statt in einem
+    DataFrame:
+    - Eingangsreihen (PV, Verbrauch) werden nur referenziert, nicht kopiert.
+    - Dicht besetzte Spalten (z.B. SOC) liegen in einem zusammenhängenden Array-Block.
+    - Überwiegend leere Spalten (Ladung, Entladung, Verluste) werden optional dünn besetzt
+      (Index + Wert) abgelegt, wahlweise in float32.
+    - Direktverbrauch, Netzbezug und Einspeisung werden, falls nicht übergeben, exakt aus den
+      übrigen Spalten berechnet (siehe _DERIVED_TIME_SERIES_COLUMNS).
+    Der DataFrame für analysis.py und excel_export.py wird erst beim Zugriff auf
+    'time_series_data' erzeugt und nicht zwischengespeichert, damit z.B. in st.session_state
+    nur die kompakte Form liegt.
+    """
+
+    TIME_SERIES_KEY = 'time_series_data'
+
+    def __init__(self, columns: dict, index, entries: dict, inputs: dict | None = None,
+                 storage_dtype=None, sparse: bool | None = None):
+        """
+        Args:
+            columns (dict): Zu speichernde Spalten (Spaltenname -> Array mit Länge des Index).
+            index (pd.Index): Zeitindex der Zeitreihen.
+            entries (dict): Übrige Einträge des Ergebnisses (z.B. 'kpis', 'simulation_metadata').
+            inputs (dict | None): Eingangsreihen (Spaltenname -> float64-Array), die nur referenziert werden.
+            storage_dtype (str | np.dtype | None): "float64" (verlustfrei) oder "float32".
+                None verwendet DEFAULT_RESULT_STORAGE_DTYPE.
+            sparse (bool | None): Dünn besetzte Spalten als Index/Wert-Paare speichern.
+                None verwendet DEFAULT_RESULT_SPARSE.
+        """
+        dtype = np.dtype(storage_dtype or DEFAULT_RESULT_STORAGE_DTYPE)
+        if dtype not in (np.dtype(np.float64), np.dtype(np.float32)):
+            raise ValueError(f"Nicht unterstützter Speicher-Datentyp: {dtype}. Erlaubt: float64, float32.")
+        if sparse is None:
+            sparse = DEFAULT_RESULT_SPARSE
+
+        num_periods = len(index)
+        index_dtype = np.int32 if num_periods < np.iinfo(np.int32).max else np.int64
+        dense_size = num_periods * dtype.itemsize
+        sparse_entry_size = np.dtype(index_dtype).itemsize + dtype.itemsize
+
+        self._index = index
+        self._dtype = dtype
+        self._inputs = dict(inputs or {})
+        self._sparse_columns = {}
+        dense_columns = []
+        for name, values in columns.items():
+            values = np.asarray(values)
+            if sparse:
+                nonzero = np.flatnonzero(values)
+                if len(nonzero) * sparse_entry_size < dense_size:
+                    self._sparse_columns[name] = (nonzero.astype(index_dtype), values[nonzero].astype(dtype))
+                    continue
+            dense_columns.append((name, values))
+
+        # Ein zusammenhängender Block (Spalten × Zeit) für alle dicht besetzten Spalten
+        self._dense_positions = {name: row for row, (name, _) in enumerate(dense_columns)}
+        self._dense_block = np.empty((len(dense_columns), num_periods), dtype=dtype)
+        for row, (_, values) in enumerate(dense_columns):
+            self._dense_block[row] = values
+
+        available = set(self._inputs) | set(columns)
+        for name, (required, _) in _DERIVED_TIME_SERIES_COLUMNS.items():
+            if name not in available and all(column in available for column in required):
+                available.add(name)
+        ordered = [name for name in TIME_SERIES_COLUMNS if name in available]
+        self._column_order = tuple(ordered + [name for name in columns if name not in ordered])
+        self._entries = dict(entries)
+
+    def replace(self, **entries) -> "SimulationResult":
+        """Gibt ein neues Ergebnis mit ersetzten/ergänzten Einträgen zurück (Zeitreihen werden geteilt)."""
+        result = copy.copy(self)
+        result._entries = {**self._entries, **entries}
+        return result
+
+    # --- Mapping-Schnittstelle (Kompatibilität zum bisherigen Dictionary) ---
+    def __getitem__(self, key):
+        if key == self.TIME_SERIES_KEY:
+            return self.to_dataframe()
+        return self._entries[key]
+
+    def __iter__(self):
+        yield self.TIME_SERIES_KEY
+        yield from self._entries
+
+    def __len__(self):
+        return len(self._entries) + 1
+
+    def __contains__(self, key):
+        return key == self.TIME_SERIES_KEY or key in self._entries
+
+    def __repr__(self):
+        return (f"SimulationResult(num_periods={len(self._index)}, columns={len(self._column_order)}, "
+                f"dtype={self._dtype.name}, sparse_columns={len(self._sparse_columns)}, nbytes={self.nbytes})")
+
+    # --- Zeitreihen-Zugriff ---
+    @property
+    def index(self) -> pd.Index:
+        return self._index
+
+    @property
+    def columns(self) -> tuple:
+        return self._column_order
+
+    @property
+    def nbytes(self) -> int:
+        """Speicherbedarf der eigenen Zeitreihen in Bytes (ohne referenzierte Eingangsreihen und Zeitindex)."""
+        sparse_bytes = sum(indices.nbytes + values.nbytes for indices, values in self._sparse_columns.values())
+        return int(self._dense_block.nbytes + sparse_bytes)
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Liefert eine Spalte als dichtes float64-Array.
+
+        Args:
+            name (str): Spaltenname (siehe TIME_SERIES_COLUMNS).
+
+        Returns:
+            np.ndarray: Werte je Intervall.
+        """
+        if name in self._inputs:
+            return self._inputs[name]
+        if name in self._dense_positions:
+            return self._dense_block[self._dense_positions[name]].astype(np.float64)
+        if name in self._sparse_columns:
+            indices, values = self._sparse_columns[name]
+            dense = np.zeros(len(self._index))
+            dense[indices] = values
+            return dense
+        if name in self._column_order and name in _DERIVED_TIME_SERIES_COLUMNS:
+            return _DERIVED_TIME_SERIES_COLUMNS[name][1](self)
+        raise KeyError(name)
+
+    def to_dataframe(self, columns=None) -> pd.DataFrame:
+        """
+        Erzeugt die pandas-Ansicht der Zeitreihen (wie bisher 'time_series_data').
+
+        Args:
+            columns (list | None): Auswahl von Spalten; None liefert alle Spalten.
+
+        Returns:
+            pd.DataFrame: float64-Zeitreihen mit dem Zeitindex der Simulation.
+        """
+        selected = self._column_order if columns is None else tuple(columns)
+        return pd.DataFrame({name: self.column(name) for name in selected}, index=self._index)
+
+
+def detect_data_resolution(num_periods: int) -> tuple:
+    """
+    Bestimmt die Zeitauflösung einer Jahreszeitreihe anhand ihrer Länge.
+
+    Args:
+        num_periods (int): Anzahl der Intervalle der Zeitreihe.
+
+    Returns:
+        tuple: (time_interval_hours, data_resolution)
+    """
+    # Bestimme die Zeitauflösung basierend auf der Länge der Daten
+    # Unterstützte Auflösungen: 1h, 30min, 15min, 10min, 5min, 1min
+    if num_periods == 8760:  # Stündliche Daten (normales Jahr)
+        time_interval_hours = 1.0
+        data_resolution = "hourly"
+    elif num_periods == 8784:  # Stündliche Daten (Schaltjahr)
+        time_interval_hours = 1.0
+        data_resolution = "hourly_leap_year"
+    elif num_periods == 17520:  # 30-Minuten-Daten (normales Jahr)
+        time_interval_hours = 0.5
+        data_resolution = "30min"
+    elif num_periods == 17568:  # 30-Minuten-Daten (Schaltjahr)
+        time_interval_hours = 0.5
+        data_resolution = "30min_leap_year"
+    elif num_periods == 35040:  # 15-Minuten-Daten (normales Jahr)
+        time_interval_hours = 0.25
+        data_resolution = "15min"
+    elif num_periods == 35136:  # 15-Minuten-Daten (Schaltjahr)
+        time_interval_hours = 0.25
+        data_resolution = "15min_leap_year"
+    elif num_periods == 52560:  # 10-Minuten-Daten (normales Jahr)
+        time_interval_hours = 1.0/6.0  # 10 Minuten = 1/6 Stunde
+        data_resolution = "10min"
+    elif num_periods == 52704:  # 10-Minuten-Daten (Schaltjahr)
+        time_interval_hours = 1.0/6.0
+        data_resolution = "10min_leap_year"
+    elif num_periods == 105120:  # 5-Minuten-Daten (normales Jahr)
+        time_interval_hours = 1.0/12.0  # 5 Minuten = 1/12 Stunde
+        data_resolution = "5min"
+    elif num_periods == 105408:  # 5-Minuten-Daten (Schaltjahr)
+        time_interval_hours = 1.0/12.0
+        data_resolution = "5min_leap_year"
+    elif num_periods == 525600:  # 1-Minuten-Daten (normales Jahr)
+        time_interval_hours = 1.0/60.0  # 1 Minute = 1/60 Stunde
+        data_resolution = "1min"
+    elif num_periods == 527040:  # 1-Minuten-Daten (Schaltjahr)
+        time_interval_hours = 1.0/60.0
+        data_resolution = "1min_leap_year"
+    else:
+        # ERFORDERT: Bekannte Datenauflösung für korrekte Simulation
+        raise ValueError(f"Unbekannte Datenauflösung: {num_periods} Perioden. "
+                       f"Unterstützte Auflösungen: 1h (8760), 30min (17520), 15min (35040), "
+                       f"10min (52560), 5min (105120), 1min (525600), 1min Schaltjahr (527040). "
+                       f"Bitte überprüfen Sie Ihre Zeitreihen-Daten.")
+
+    return time_interval_hours, data_resolution
+
+
+# Bezeichnungen der bisher unterstützten Auflösungen (Rasterschritt in Sekunden)
+_RESOLUTION_NAMES = {3600: "hourly", 1800: "30min", 900: "15min", 600: "10min", 300: "5min", 60: "1min"}
+
+
+def _snap_time_steps(step_seconds: np.ndarray) -> np.ndarray:
+    """
+    Rundet leicht verrauschte Intervalldauern auf Vielfache des Median-Schritts, wenn jede Dauer
+    höchstens TIME_GRID_SNAP_TOLERANCE des Median-Schritts davon abweicht (Lücken bleiben als
+    Vielfache erhalten). Sonst bleiben die Dauern unverändert.
+    """
+    median_step = int(round(float(np.median(step_seconds))))
+    if median_step <= 0:
+        return step_seconds
+    multiples = np.maximum(np.rint(step_seconds / median_step), 1).astype(np.int64)
+    deviation = np.abs(step_seconds - multiples * median_step)
+    if not np.any(deviation) or deviation.max() > TIME_GRID_SNAP_TOLERANCE * median_step:
+        return step_seconds
+    warnings.warn(f"Zeitstempel weichen um bis zu {int(deviation.max())} s vom Raster ab, "
+                  f"runde auf {median_step} s-Schritte.", stacklevel=3)
+    return multiples * median_step
+
+
+def detect_time_resolution(time_index, num_periods: int) -> tuple:
+    """
+    Bestimmt die Zeitauflösung aus dem Zeitindex (Zeitstempel = Intervallbeginn).
+
+    Gleichabständige Zeitreihen werden unabhängig von Länge und Schrittweite direkt simuliert
+    (z.B. stündliche Daten ohne Umweg über 15 min, Teil- oder Mehrjahresreihen). Leichter Jitter
+    der Zeitstempel wird zuvor auf den Median-Schritt gerundet (TIME_GRID_SNAP_TOLERANCE). Bei
+    unregelmäßigen Abständen wird jedes Intervall in gleich lange Rasterschritte geteilt
+    (größter gemeinsamer Teiler der Intervalldauern, siehe expand_to_time_grid); das letzte
+    Intervall erhält die Dauer des vorletzten. Bei nicht streng steigenden Zeitstempeln (z.B.
+    doppelte Stunde der Zeitumstellung ohne Zeitzone) gilt für jedes Intervall der Median der
+    positiven Schritte; ohne DatetimeIndex wird die Auflösung wie bisher aus der Länge bestimmt
+    (detect_data_resolution). Gerundete bzw. ersetzte Zeitstempel melden eine Warnung (warnings).
+
+    Args:
+        time_index (pd.Index | None): Zeitindex der Zeitreihe.
+        num_periods (int): Anzahl der Intervalle der Zeitreihe.
+
+    Returns:
+        tuple: (time_interval_hours, data_resolution, substeps); time_interval_hours ist die Dauer
+        eines Rasterschritts, substeps None bei gleichmäßigem Raster, sonst die Anzahl
+        Rasterschritte je Intervall (int-Array).
+    """
+    if not isinstance(time_index, pd.DatetimeIndex) or num_periods < 2:
+        return (*detect_data_resolution(num_periods), None)
+    step_seconds = np.diff(time_index.values).astype('timedelta64[s]').astype(np.int64)
+    if np.any(step_seconds <= 0):
+        positive_steps = step_seconds[step_seconds > 0]
+        if len(positive_steps) == 0:
+            return (*detect_data_resolution(num_periods), None)
+        # z.B. doppelte Stunde der Zeitumstellung ohne Zeitzone: Reihenfolge der Zeilen als Zeitachse,
+        # jedes Intervall mit dem Median-Schritt
+        median_step = int(round(float(np.median(positive_steps))))
+        warnings.warn(f"Zeitstempel nicht streng steigend, rechne jedes Intervall mit {median_step} s "
+                      f"(Median-Schritt).", stacklevel=2)
+        step_seconds = np.full(len(step_seconds), median_step, dtype=np.int64)
+
+    step_seconds = _snap_time_steps(step_seconds)
+    durations = np.append(step_seconds, step_seconds[-1])
+    grid_seconds = int(np.gcd.reduce(durations))
+    if grid_seconds in _RESOLUTION_NAMES:
+        data_resolution = _RESOLUTION_NAMES[grid_seconds]
+    elif grid_seconds % 3600 == 0:
+        data_resolution = f"{grid_seconds // 3600}h"
+    elif grid_seconds % 60 == 0:
+        data_resolution = f"{grid_seconds // 60}min"
+    else:
+        data_resolution = f"{grid_seconds}s"
+
+    substeps = None
+    if np.any(durations != grid_seconds):
+        substeps = durations // grid_seconds
+        if substeps.sum() > MAX_TIME_GRID_EXPANSION * num_periods:
+            raise ValueError(f"Unregelmäßige Zeitstempel ergeben ein zu feines Raster ({grid_seconds} s für "
+                             f"{num_periods} Intervalle). Bitte die Zeitreihen vorher auf ein festes Raster bringen.")
+        data_resolution += "_irregular"
+    elif num_periods * grid_seconds == 8784 * 3600:
+        data_resolution += "_leap_year"
+    return grid_seconds / 3600.0, data_resolution, substeps
+
+
+def expand_to_time_grid(consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+                        substeps: np.ndarray, time_interval_hours: float) -> tuple:
+    """
+    Teilt unregelmäßige Intervalle in gleich lange Rasterschritte (siehe detect_time_resolution).
+
+    Die Energie eines Intervalls wird gleichmäßig auf seine Rasterschritte verteilt (konstante
+    Leistung im Intervall), Preis-Zeitreihen gelten unverändert für alle Rasterschritte.
+
+    Returns:
+        tuple: (consumption, pv_generation, price_grid, price_feed_in) auf dem Raster; Verbrauch und
+        PV als pd.Series, Preise als pd.Series bzw. unveränderte Konstante.
+    """
+    index = consumption_series.index
+    grid_index = pd.date_range(index[0], periods=int(substeps.sum()),
+                               freq=pd.Timedelta(seconds=round(time_interval_hours * 3600)))
+
+    def energy_on_grid(series):
+        return pd.Series(np.repeat(_as_float_array(series) / substeps, substeps), index=grid_index)
+
+    def price_on_grid(price):
+        if not isinstance(price, pd.Series):
+            return price
+        return pd.Series(np.repeat(_price_array(price, index, len(index)), substeps), index=grid_index)
+
+    return (energy_on_grid(consumption_series), energy_on_grid(pv_generation_series),
+            price_on_grid(price_grid_per_kwh), price_on_grid(price_feed_in_per_kwh))
+
+
+def _aggregate_time_grid(flows: dict, substeps: np.ndarray) -> dict:
+    """Fasst Ergebnisse auf dem Raster je Eingangsintervall zusammen (Energien summiert, SOC am Intervallende)."""
+    ends = np.cumsum(substeps)
+    starts = ends - substeps
+    aggregated = dict(flows)
+    for column, values in flows.items():
+        if isinstance(values, np.ndarray) and values.shape[-1:] == (ends[-1],):
+            aggregated[column] = values[..., ends - 1] if column == 'SOC_kWh' else np.add.reduceat(values, starts, axis=-1)
+    return aggregated
+
+
+def coarsen_time_series(consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+                        target_interval_hours: float) -> tuple:
+    """
+    Fasst gleichabständige Zeitreihen zu gröberen Intervallen zusammen (z.B. 15 min -> 1 h).
+
+    Energien werden je Block aus target_interval_hours / time_interval_hours Intervallen summiert.
+    Preis-Zeitreihen werden energiegewichtet gemittelt, der Netzbezugspreis mit dem Restbedarf
+    max(Verbrauch - PV, 0), die Einspeisevergütung mit dem Überschuss max(PV - Verbrauch, 0), sodass
+    Kosten und Erlöse ohne Batterie im groben Raster erhalten bleiben; Blöcke ohne Restbedarf bzw.
+    Überschuss erhalten den zeitlichen Mittelwert (Konstanten bleiben unverändert). Der Zeitstempel
+    eines Blocks ist der seines ersten Intervalls, die Attribute der PV-Reihe werden übernommen.
+    Ein unvollständiger letzter Block wird mit den vorhandenen Intervallen gebildet. Sind die Daten
+    bereits so grob, unregelmäßig oder ist target_interval_hours kein ganzzahliges Vielfaches der
+    Auflösung, bleiben die Zeitreihen unverändert (Faktor 1).
+
+    Returns:
+        tuple: (consumption, pv_generation, price_grid, price_feed_in, factor) mit factor = Anzahl
+        zusammengefasster Intervalle je Block.
+    """
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+    num_periods = len(consumption_series)
+    time_interval_hours, _, substeps = detect_time_resolution(index, num_periods)
+    factor = int(round(target_interval_hours / time_interval_hours))
+    if substeps is not None or factor <= 1 or not np.isclose(factor * time_interval_hours, target_interval_hours):
+        return consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh, 1
+
+    starts = np.arange(0, num_periods, factor)
+    counts = np.diff(np.append(starts, num_periods))
+    coarse_index = index[starts] if index is not None else pd.RangeIndex(len(starts))
+
+    def energy_blocks(series):
+        coarse = pd.Series(np.add.reduceat(_as_float_array(series), starts), index=coarse_index)
+        coarse.attrs.update(getattr(series, 'attrs', None) or {})
+        return coarse
+
+    def price_blocks(price, weights):
+        if not isinstance(price, pd.Series):
+            return price
+        values = _price_array(price, index, num_periods)
+        weight_sums = np.add.reduceat(weights, starts)
+        has_weight = weight_sums > 0.0
+        weighted = np.add.reduceat(values * weights, starts) / np.where(has_weight, weight_sums, 1.0)
+        mean = np.add.reduceat(values, starts) / counts
+        return pd.Series(np.where(has_weight, weighted, mean), index=coarse_index)
+
+    net_load = _as_float_array(consumption_series) - _as_float_array(pv_generation_series)
+    return (energy_blocks(consumption_series), energy_blocks(pv_generation_series),
+            price_blocks(price_grid_per_kwh, np.maximum(net_load, 0.0)),
+            price_blocks(price_feed_in_per_kwh, np.maximum(-net_load, 0.0)), factor)
+
+
+def pv_limit_totals(curtailment_totals: dict | None = None) -> dict:
+    """
+    Abregelungsverluste der Vorverarbeitung ('inverter_clipping_kwh' und 'export_curtailment_kwh'
+    aus data_import.apply_pv_grid_limits bzw. den PV-Ladefunktionen mit return_pv_limits=True) als
+    Jahressummen für build_simulation_kpis (0 ohne Begrenzung).
+    """
+    curtailment_totals = curtailment_totals or {}
+    return {
+        'inverter_clipping': float(curtailment_totals.get('inverter_clipping_kwh', 0.0)),
+        'export_curtailment': float(curtailment_totals.get('export_curtailment_kwh', 0.0)),
+    }
+
+
+def _k_medoids(distances: np.ndarray, num_clusters: int, rng, max_iterations: int = 100) -> tuple:
+    """
+    k-Medoids (abwechselnd Zuordnung und Medoid-Wahl je Cluster) auf einer Distanzmatrix,
+    Startmedoide nach k-means++. Gibt (Medoide, Cluster je Punkt) zurück.
+    """
+    num_points = len(distances)
+    medoids = [int(rng.integers(num_points))]
+    while len(medoids) < num_clusters:
+        nearest = distances[:, medoids].min(axis=1) ** 2
+        if nearest.sum() <= 0.0:
+            break  # alle übrigen Punkte fallen mit einem Medoid zusammen
+        medoids.append(int(rng.choice(num_points, p=nearest / nearest.sum())))
+    medoids = np.array(medoids)
+    for _ in range(max_iterations):
+        assignment = np.argmin(distances[:, medoids], axis=1)
+        new_medoids = medoids.copy()
+        for cluster in range(len(medoids)):
+            members = np.flatnonzero(assignment == cluster)
+            if len(members):
+                new_medoids[cluster] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+    return medoids, np.argmin(distances[:, medoids], axis=1)
+
+
+def cluster_typical_days(consumption_series, pv_generation_series, num_days: int | None = None,
+                         price_series=None, seed: int | None = None, verbose: bool = False) -> dict:
+    """
+    Fasst die Tage des Jahres zu wenigen repräsentativen Tagen (Typtagen) zusammen.
+
+    Jeder Tag wird als Vektor seiner Last- und PV-Profile (optional zusätzlich des Preisprofils)
+    beschrieben, jeweils auf den Mittelwert der Reihe normiert. k-Medoids wählt num_days reale
+    Tage als Repräsentanten; ihr Gewicht ist die Anzahl der vertretenen Tage. Die Zuordnung jedes
+    Tages zu seinem Typtag erhält die Reihenfolge des Jahres, sodass simulate_typical_days den SOC
+    über die Tagesfolge fortschreiben kann. Angebrochene Tage am Ende gehen über die Gewichte ein.
+
+    Args:
+        consumption_series, pv_generation_series (pd.Series | array-like): Verbrauch und PV-Erzeugung in kWh.
+        num_days (int | None): Anzahl Typtage. None: SCREENING_TYPICAL_DAYS.
+        price_series (pd.Series | None): Variabler Bezugspreis als zusätzliches Merkmal (None: nur Last und PV).
+        seed (int | None): Startwert der Medoid-Initialisierung. None: TYPICAL_DAYS_SEED.
+        verbose (bool): Anzahl Typtage und Abweichung der Jahressummen ausgeben.
+
+    Returns:
+        dict: 'days' (Tagesnummern der Typtage, chronologisch), 'weights' (vertretene Tage je Typtag),
+        'assignment' (Typtag je Tag des Jahres, Index in 'days'), 'periods_per_day', 'time_interval_hours',
+        'num_days_total' sowie 'consumption_error_percent' und 'pv_error_percent' (Abweichung der
+        gewichteten Typtage von der Jahressumme).
+    """
+    num_days = SCREENING_TYPICAL_DAYS if num_days is None else int(num_days)
+    seed = TYPICAL_DAYS_SEED if seed is None else seed
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+    num_periods = len(consumption_series)
+    time_interval_hours, _, substeps = detect_time_resolution(index, num_periods)
+    if substeps is not None:
+        raise ValueError("Typtage erfordern ein gleichmäßiges Zeitraster (Zeitreihen vorher resamplen).")
+    periods_per_day = int(round(24.0 / time_interval_hours))
+    num_days_total = num_periods // periods_per_day
+    if num_days < 1 or num_days_total < 1:
+        raise ValueError(f"Typtage benötigen mindestens einen vollen Tag und num_days >= 1 (num_days={num_days}).")
+
+    load = _as_float_array(consumption_series)
+    pv = _as_float_array(pv_generation_series)
+    profiles = [load, pv]
+    if isinstance(price_series, pd.Series):
+        profiles.append(_price_array(price_series, index, num_periods))
+    features = []
+    for profile in profiles:
+        mean = profile.mean()
+        daily = profile[:num_days_total * periods_per_day].reshape(num_days_total, periods_per_day)
+        features.append(daily / mean if mean > 0 else daily)
+    features = np.hstack(features)
+    squared_norms = (features ** 2).sum(axis=1)
+    distances = np.sqrt(np.maximum(
+        squared_norms[:, np.newaxis] + squared_norms[np.newaxis, :] - 2.0 * features @ features.T, 0.0
+    ))
+
+    medoids, assignment = _k_medoids(distances, min(num_days, num_days_total), np.random.default_rng(seed))
+    order = np.argsort(medoids)
+    days = medoids[order]
+    assignment = np.argsort(order)[assignment]
+    # Angebrochener Resttag: Gewichte so skalieren, dass die Typtage die ganze Reihe vertreten
+    weights = np.bincount(assignment, minlength=len(days)) * (num_periods / (num_days_total * periods_per_day))
+
+    def weighted_error_percent(values):
+        daily_totals = values[:num_days_total * periods_per_day].reshape(num_days_total, periods_per_day).sum(axis=1)
+        total = values.sum()
+        return float((weights @ daily_totals[days] - total) / total * 100.0) if total > 0 else 0.0
+
+    result = {
+        'days': days,
+        'weights': weights,
+        'assignment': assignment,
+        'periods_per_day': periods_per_day,
+        'time_interval_hours': time_interval_hours,
+        'num_days_total': num_days_total,
+        'consumption_error_percent': weighted_error_percent(load),
+        'pv_error_percent': weighted_error_percent(pv),
+    }
+    if verbose:
+        print(f"Typtage: {len(days)} von {num_days_total} Tagen, Abweichung Verbrauch "
+              f"{result['consumption_error_percent']:+.2f}%, PV {result['pv_error_percent']:+.2f}%")
+    return result
+
+
+def build_simulation_kpis(
+    totals: dict,
+    battery_capacity_kwh: float,
+    current_capacity_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    simulation_year: int = 1
+) -> dict:
+    """
+    Erstellt das KPI-Dictionary einer Jahressimulation aus den aufsummierten Energieflüssen.
+
+    Args:
+        totals (dict): Jahressummen mit den Schlüsseln 'pv_generation', 'consumption', 'grid_import',
+            'grid_export', 'direct_self_consumption', 'battery_charge', 'battery_discharge',
+            'battery_charge_losses', 'battery_discharge_losses' (kWh) sowie 'grid_import_cost'
+            und 'grid_export_revenue' (Euro). Bei Arbitrage optional 'grid_charge' und
+            'grid_discharge' (in Netzbezug bzw. Einspeisung enthalten). Optional 'inverter_clipping'
+            und 'export_curtailment' (abgeregelte PV-Energie, nicht in 'pv_generation', siehe pv_limit_totals).
+        battery_capacity_kwh (float): Nennkapazität der Batterie in kWh.
+        current_capacity_kwh (float): Gealterte Kapazität im Simulationsjahr in kWh.
+        battery_efficiency_charge (float): Lade-Wirkungsgrad (0-1).
+        battery_efficiency_discharge (float): Entlade-Wirkungsgrad (0-1).
+        simulation_year (int): Jahr der Simulation (für Kapazitätsalterung).
+
+    Returns:
+        dict: KPIs im Format von simulate_one_year()['kpis'].
+    """
+    total_pv_generation = totals['pv_generation']
+    total_consumption = totals['consumption']
+    total_grid_import = totals['grid_import']
+    total_direct_self_consumption = totals['direct_self_consumption']
+    total_battery_discharge = totals['battery_discharge']
+    total_grid_charge = totals.get('grid_charge', 0.0)
+    total_grid_discharge = totals.get('grid_discharge', 0.0)
+    total_inverter_clipping = totals.get('inverter_clipping', 0.0)
+    total_export_curtailment = totals.get('export_curtailment', 0.0)
+
+    # Kapazitätsalterung KPIs
+    if battery_capacity_kwh > 0:
+        capacity_loss_percent = ((battery_capacity_kwh - current_capacity_kwh) / battery_capacity_kwh) * 100
+    else:
+        capacity_loss_percent = 0.0  # Keine Kapazität = kein Verlust
+
+    # Autarkiegrad: Anteil des Verbrauchs, der nicht aus dem Netz bezogen wird (ohne Netzladung der Batterie)
+    autarky_rate = (total_consumption - (total_grid_import - total_grid_charge)) / total_consumption if total_consumption > 0 else 0
+
+    # Eigenverbrauchsquote: Anteil der PV-Erzeugung, der selbst verbraucht wird
+    self_consumption_rate = (total_direct_self_consumption + total_battery_discharge) / total_pv_generation if total_pv_generation > 0 else 0
+
+    # Abregelungsquote: Anteil der möglichen PV-Erzeugung, der durch Wechselrichter und Einspeisegrenze verloren geht
+    total_curtailment = total_inverter_clipping + total_export_curtailment
+    potential_pv_generation = total_pv_generation + total_curtailment
+    curtailment_rate = total_curtailment / potential_pv_generation if potential_pv_generation > 0 else 0
+
+    # Jährliche Stromkosten mit Speicher
+    effective_annual_energy_cost = totals['grid_import_cost'] - totals['grid_export_revenue']
+    
+    # HINWEIS 2025-11-03: Referenzkosten OHNE Batterie werden NICHT hier berechnet!
+    # Grund: Bei variablen Tarifen wäre Durchschnittspreisberechnung (.mean()) ungenau.
+    # Die zeitliche Verteilung der Tarife würde ignoriert (z.B. wann PV einspeist, wann Strom gekauft wird).
+    # Korrekte Berechnung erfolgt in analysis.py durch echte Simulation ohne Batterie.
+    # Separation of Concerns: model.py simuliert, analysis.py bewertet wirtschaftlich.
+
+    return {
+        'autarky_rate': autarky_rate,
+        'self_consumption_rate': self_consumption_rate,
+        'total_grid_import_kwh': total_grid_import,
+        'total_grid_export_kwh': totals['grid_export'],
+        'annual_energy_cost': effective_annual_energy_cost,  # Rückwärtskompatibilität
+        'effective_annual_energy_cost': effective_annual_energy_cost,
+        'grid_import_cost': totals['grid_import_cost'],
+        'grid_export_revenue': totals['grid_export_revenue'],
+        # 'annual_energy_cost_savings' entfernt - wird korrekt in analysis.py berechnet (2025-11-03)
+        # Die finanziellen Parameter werden später in der UI berechnet
+        'payback_period_years': np.nan,
+        'irr_percentage': np.nan,
+        'total_pv_generation_kwh': total_pv_generation,
+        'total_consumption_kwh': total_consumption,
+        'total_direct_self_consumption_kwh': total_direct_self_consumption,
+        'total_battery_charge_kwh': totals['battery_charge'],
+        'total_battery_discharge_kwh': total_battery_discharge,
+        'total_battery_charge_losses_kwh': totals['battery_charge_losses'],
+        'total_battery_discharge_losses_kwh': totals['battery_discharge_losses'],
+        'total_grid_charge_kwh': total_grid_charge,
+        'total_grid_discharge_kwh': total_grid_discharge,
+        'total_inverter_clipping_kwh': total_inverter_clipping,
+        'total_export_curtailment_kwh': total_export_curtailment,
+        'curtailment_rate': curtailment_rate,
+        'battery_efficiency_charge': battery_efficiency_charge,
+        'battery_efficiency_discharge': battery_efficiency_discharge,
+        'original_capacity_kwh': battery_capacity_kwh,
+        'current_capacity_kwh': current_capacity_kwh,
+        'capacity_loss_percent': capacity_loss_percent,
+        'simulation_year': simulation_year
+    }
+
+
+def simulate_one_year(
+    consumption_series: pd.Series, 
+    pv_generation_series: pd.Series, 
+    battery_capacity_kwh: float, 
+    battery_efficiency_charge: float, # Wirkungsgrad beim Laden
+    battery_efficiency_discharge: float, # Wirkungsgrad beim Entladen
+    battery_max_charge_kw: float, # Maximale Ladeleistung in kW
+    battery_max_discharge_kw: float, # Maximale Entladeleistung in kW
+    price_grid_per_kwh: float, # Preis für Netzbezug in Euro/kWh (kann auch ein pd.Series für variable Tarife sein)
+    price_feed_in_per_kwh: float, # Preis für Netzeinspeisung in Euro/kWh (kann auch ein pd.Series für variable Tarife sein)
+    initial_soc_percent: float = 50.0, # Anfangsladezustand der Batterie in %
+    min_soc_percent: float = 10.0, # Minimaler Ladezustand in %
+    max_soc_percent: float = 90.0, # Maximaler Ladezustand in %
+    annual_capacity_loss_percent: float = 2.0, # Jährlicher Kapazitätsverlust in %
+    simulation_year: int = 1, # Jahr der Simulation (für Kapazitätsalterung)
+    backend: str | None = None, # Simulations-Backend: "auto", "numba" oder "python"
+    return_time_series: bool = True, # False: nur KPIs (Lean-Modus ohne Zeitreihen)
+    storage_dtype: str | None = None, # Speicherformat der Zeitreihen: "float64" oder "float32"
+    sparse_storage: bool | None = None, # Dünn besetzte Spalten kompakt speichern
+    validation_level: str | None = None, # Prüfstufe der Energiebilanz: "off", "summary", "interval"
+    time_parallel_workers: int | None = None, # Threads für die zeitparallele Simulation (1 = sequentiell)
+    dispatch_strategy: str | None = None, # Betriebsstrategie: "pv_first", "threshold", "optimal" oder "rolling_horizon"
+    battery_curves: dict | None = None, # SOC-abhängige Leistung / leistungsabhängiger Wirkungsgrad
+    curtailment_totals: dict | None = None # Abregelungsverluste der Vorverarbeitung (siehe pv_limit_totals)
+) -> dict:
+    """
+    Simuliert die Energieflüsse für ein Jahr mit automatischer Erkennung der Datenauflösung.
+
+    Die Intervalldauer wird aus dem Zeitindex bestimmt (siehe detect_time_resolution): Zeitreihen mit
+    beliebiger fester Schrittweite und Länge werden direkt simuliert, unregelmäßige Intervalle auf
+    einem gemeinsamen Raster (Ergebnisse wieder je Eingangsintervall).
+
+    Args:
+        consumption_series (pd.Series): Stromverbrauch in kWh je Intervall (Zeitstempel = Intervallbeginn).
+        pv_generation_series (pd.Series): PV-Erzeugung in kWh je Intervall (gleicher Zeitindex), nach
+            Wechselrichter- und Einspeisebegrenzung der Vorverarbeitung.
+        battery_capacity_kwh (float): Speicherkapazität der Batterie in kWh.
+        battery_efficiency_charge (float): Wirkungsgrad der Batterie beim Laden (0-1).
+        battery_efficiency_discharge (float): Wirkungsgrad der Batterie beim Entladen (0-1).
+        battery_max_charge_kw (float): Maximale Ladeleistung der Batterie in kW.
+        battery_max_discharge_kw (float): Maximale Entladeleistung der Batterie in kW.
+        price_grid_per_kwh (float | pd.Series): Preis für Netzbezug in Euro/kWh. Kann eine Konstante oder eine Zeitreihe sein.
+        price_feed_in_per_kwh (float | pd.Series): Preis für Netzeinspeisung in Euro/kWh. Kann eine Konstante oder eine Zeitreihe sein.
+        initial_soc_percent (float): Anfangsladezustand der Batterie in % (0-100).
+        min_soc_percent (float): Minimaler Ladezustand der Batterie in % (0-100).
+        max_soc_percent (float): Maximaler Ladezustand der Batterie in % (0-100).
+        annual_capacity_loss_percent (float): Jährlicher Kapazitätsverlust in % (0-10).
+        simulation_year (int): Jahr der Simulation (für Kapazitätsalterung).
+        backend (str | None): Backend des Simulationskerns ("auto", "numba", "python").
+            None verwendet DEFAULT_SIMULATION_BACKEND aus config.py.
+        return_time_series (bool): Bei False werden nur laufende Summen gebildet; das Ergebnis
+            enthält dann kein 'time_series_data' (für Optimierungsläufe, die nur KPIs benötigen).
+        storage_dtype (str | None): Speicherformat der Zeitreihen im SimulationResult
+            ("float64" verlustfrei, "float32" halber Speicher). None: DEFAULT_RESULT_STORAGE_DTYPE.
+        sparse_storage (bool | None): Überwiegend leere Spalten dünn besetzt speichern.
+            None: DEFAULT_RESULT_SPARSE.
+        validation_level (str | None): Prüfstufe der Energiebilanz. "summary" prüft die Jahressummen
+            aus den Akkumulatoren (auch im Lean-Modus), "interval" zusätzlich jedes Intervall
+            (AssertionError bei Verletzung), "off" keine Prüfung. None: DEFAULT_ENERGY_BALANCE_VALIDATION.
+        time_parallel_workers (int | None): Bei mehr als 1 wird das Jahr in tageweise ausgerichtete
+            Abschnitte geteilt und über run_dispatch_kernel_parallel parallel simuliert (bitgleich,
+            lohnt sich v.a. bei 1-min-Daten). None: DEFAULT_TIME_PARALLEL_WORKERS.
+        dispatch_strategy (str | None): "pv_first" (Eigenverbrauch) oder "threshold" (zusätzlich
+            Netzladung unter THRESHOLD_BUY_PRICE und Netzentladung über THRESHOLD_SELL_PRICE, jeweils
+            begrenzt auf MAX_GRID_CHARGE_KW/MAX_GRID_DISCHARGE_KW) oder "optimal" (kostenoptimale
+            Fahrweise mit vollständiger Voraussicht über run_optimal_dispatch; ohne Zeitparallelisierung)
+            oder "rolling_horizon" (rollierende Optimierung mit Prognose über run_rolling_horizon_dispatch,
+            Parameter MPC_* aus config.py; Lösungszeiten in simulation_metadata['rolling_horizon']).
+            None: DEFAULT_DISPATCH_STRATEGY.
+        battery_curves (dict | None): Kennlinien der Batterie (siehe resolve_battery_curves), z.B.
+            {'charge_power': [(0.0, 1.0), (0.8, 1.0), (1.0, 0.3)]} für die Ladeleistungsreduktion
+            bei hohem SOC. None: BATTERY_*_CURVE aus config.py (ohne Angabe konstant).
+        curtailment_totals (dict | None): Clipping und Abregelung der Vorverarbeitung
+            ('inverter_clipping_kwh', 'export_curtailment_kwh', z.B. das Ergebnis von
+            data_import.apply_pv_grid_limits). Sie gehen in die KPIs ein ('total_inverter_clipping_kwh',
+            'total_export_curtailment_kwh', 'curtailment_rate'). None: keine Begrenzung.
+
+    Returns:
+        SimulationResult | dict: Ergebnis mit Zeitreihen der Energieflüsse ('time_series_data',
+        als DataFrame beim Zugriff erzeugt), KPIs und Simulationsmetadaten. Im Lean-Modus ein
+        Dictionary ohne Zeitreihen.
+        Die Lade-/Entladegeschwindigkeiten werden automatisch basierend auf der Datenauflösung angepasst.
+    """
+
+    num_periods = len(consumption_series)
+    curtailment_totals = pv_limit_totals(curtailment_totals)
+    
+    time_interval_hours, data_resolution, substeps = detect_time_resolution(consumption_series.index, num_periods)
+    input_series = (consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh)
+    if substeps is not None:
+        # Unregelmäßige Intervalle: Simulation auf dem gemeinsamen Raster
+        consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh = expand_to_time_grid(
+            *input_series, substeps, time_interval_hours
+        )
+    validation_level = resolve_validation_level(validation_level)
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    curves = resolve_battery_curves(battery_curves)
+    # Mit Wirkungsgradkennlinie gibt es keinen festen Wirkungsgrad für die Verlustprüfung
+    balance_efficiencies = ((None, None) if has_variable_efficiency(curves)
+                            else (battery_efficiency_charge, battery_efficiency_discharge))
+
+    # Kapazitätsalterung berechnen
+    capacity_loss_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (simulation_year - 1)
+    current_battery_capacity_kwh = battery_capacity_kwh * capacity_loss_factor
+    
+    # SOC-Grenzen in kWh (Anfangs-SOC wird im Kern auf den erlaubten Bereich begrenzt)
+    initial_soc_kwh = (initial_soc_percent / 100.0) * current_battery_capacity_kwh
+    min_soc_kwh = (min_soc_percent / 100.0) * current_battery_capacity_kwh
+    max_soc_kwh = (max_soc_percent / 100.0) * current_battery_capacity_kwh
+
+    # WICHTIG: Lade-/Entladeleistung wird mit der Zeitauflösung in kWh je Intervall umgerechnet
+    kernel_params = dict(
+        initial_soc_kwh=initial_soc_kwh,
+        min_soc_kwh=min_soc_kwh,
+        max_soc_kwh=max_soc_kwh,
+        max_charge_kwh=battery_max_charge_kw * time_interval_hours,
+        max_discharge_kwh=battery_max_discharge_kw * time_interval_hours,
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        battery_curves=curves,
+        backend=backend
+    )
+    price_params = dict(price_grid_per_kwh=price_grid_per_kwh, price_feed_in_per_kwh=price_feed_in_per_kwh)
+    arbitrage_params = dict(arbitrage=arbitrage_parameters(dispatch_strategy, time_interval_hours))
+    simulation_metadata = {
+        'data_resolution': data_resolution,
+        'time_interval_hours': time_interval_hours,
+        'num_periods': num_periods,
+        'simulated_hours': len(consumption_series) * time_interval_hours,
+        'battery_max_charge_kw': battery_max_charge_kw,
+        'battery_max_discharge_kw': battery_max_discharge_kw,
+        'simulation_backend': resolve_simulation_backend(backend),
+        'dispatch_strategy': dispatch_strategy,
+        'battery_curves_active': any(curve is not None for curve in curves),
+    }
+
+    if not return_time_series and dispatch_strategy not in ("optimal", "rolling_horizon"):
+        # Lean-Modus: nur laufende Summen im Kern, keine Zeitreihen und kein DataFrame
+        totals = run_totals_kernel(
+            pv_generation_series,
+            consumption_series,
+            price_grid_per_kwh,
+            price_feed_in_per_kwh,
+            **kernel_params,
+            **arbitrage_params
+        )
+        totals.update(curtailment_totals)
+        if validation_level == "interval":
+            # Debug-Stufe: Energieflüsse nur für die Intervallprüfung erzeugen
+            _check_simulation_intervals(
+                run_dispatch_kernel(pv_generation_series, consumption_series, **kernel_params, **price_params, **arbitrage_params),
+                pv_generation_series, consumption_series, kernel_params
+            )
+        simulation_metadata['energy_balance_validation'] = _summarize_energy_balance(
+            validation_level, totals, *balance_efficiencies
+        )
+        return {
+            'kpis': build_simulation_kpis(
+                totals,
+                battery_capacity_kwh=battery_capacity_kwh,
+                current_capacity_kwh=current_battery_capacity_kwh,
+                battery_efficiency_charge=battery_efficiency_charge,
+                battery_efficiency_discharge=battery_efficiency_discharge,
+                simulation_year=simulation_year
+            ),
+            'simulation_metadata': simulation_metadata
+        }
+
+    # Simulationskern auf zusammenhängenden float64-Arrays
+    time_parallel_workers = time_parallel_workers or DEFAULT_TIME_PARALLEL_WORKERS
+    if dispatch_strategy == "optimal":
+        flows = run_optimal_dispatch(pv_generation_series, consumption_series, **price_params, **kernel_params)
+        # Der Anfangs-SOC liegt auf dem SOC-Raster der Optimierung
+        kernel_params['initial_soc_kwh'] = flows['initial_soc_kwh']
+    elif dispatch_strategy == "rolling_horizon":
+        flows = run_rolling_horizon_dispatch(
+            pv_generation_series, consumption_series, **price_params, **kernel_params,
+            time_interval_hours=time_interval_hours
+        )
+        kernel_params['initial_soc_kwh'] = flows['initial_soc_kwh']
+        simulation_metadata['rolling_horizon'] = {
+            'num_windows': flows['num_windows'],
+            'reused_plans': flows['reused_plans'],
+            'solve_times': summarize_solve_times(flows['solve_times']),
+        }
+    elif time_parallel_workers > 1:
+        # Abschnitte beginnen um Mitternacht (Batterie dann meist leer = angenommener Start-SOC)
+        periods_per_day = max(int(round(24 / time_interval_hours)), 1)
+        segment_days = max(-(-len(consumption_series) // (time_parallel_workers * periods_per_day)), 1)
+        flows = run_dispatch_kernel_parallel(
+            pv_generation_series, consumption_series, **kernel_params, **price_params, **arbitrage_params,
+            max_workers=time_parallel_workers,
+            segment_periods=segment_days * periods_per_day,
+            resync_periods=periods_per_day
+        )
+        simulation_metadata['time_parallel_segments'] = flows['num_segments']
+        simulation_metadata['time_parallel_resimulated_periods'] = flows['resimulated_periods']
+    else:
+        flows = run_dispatch_kernel(pv_generation_series, consumption_series, **kernel_params, **price_params, **arbitrage_params)
+    if substeps is not None:
+        # Ergebnisse wieder je Eingangsintervall
+        flows = _aggregate_time_grid(flows, substeps)
+        consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh = input_series
+    time_series_columns = {
+        'PV_Generation_kWh': _as_float_array(pv_generation_series),
+        'Consumption_kWh': _as_float_array(consumption_series),
+        **{column: flows[column] for column in KERNEL_OUTPUT_COLUMNS}
+    }
+
+    # Berechnung einfacher KPIs (können später in analysis.py verfeinert werden)
+    totals = {
+        'pv_generation': time_series_columns['PV_Generation_kWh'].sum(),
+        'consumption': time_series_columns['Consumption_kWh'].sum(),
+        'grid_import': flows['Grid_Import_kWh'].sum(),
+        'grid_export': flows['Grid_Export_kWh'].sum(),
+        'direct_self_consumption': flows['Direct_Self_Consumption_kWh'].sum(),
+        'battery_charge': flows['Battery_Charge_kWh'].sum(),
+        'battery_discharge': flows['Battery_Discharge_kWh'].sum(),
+        'battery_charge_losses': flows['Battery_Charge_Losses_kWh'].sum(),
+        'battery_discharge_losses': flows['Battery_Discharge_Losses_kWh'].sum(),
+        'grid_charge': flows['Grid_Charge_kWh'].sum(),
+        'grid_discharge': flows['Grid_Discharge_kWh'].sum(),
+        **curtailment_totals,
+    }
+
+    # Kosten und Ersparnisse (variable Tarife werden am Zeitindex ausgerichtet)
+    time_index = consumption_series.index
+    if isinstance(price_grid_per_kwh, pd.Series):
+        totals['grid_import_cost'] = flows['Grid_Import_kWh'] @ _price_array(price_grid_per_kwh, time_index, num_periods)
+    else:
+        totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+
+    if isinstance(price_feed_in_per_kwh, pd.Series):
+        totals['grid_export_revenue'] = flows['Grid_Export_kWh'] @ _price_array(price_feed_in_per_kwh, time_index, num_periods)
+    else:
+        totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+
+    # Validiere Energiebilanz (Qualitätssicherung) aus den bereits gebildeten Summen
+    if validation_level == "interval":
+        _check_simulation_intervals(flows, pv_generation_series, consumption_series, kernel_params)
+    energy_balance_validation = _summarize_energy_balance(
+        validation_level, totals, *balance_efficiencies
+    )
+    kpis = build_simulation_kpis(
+        totals,
+        battery_capacity_kwh=battery_capacity_kwh,
+        current_capacity_kwh=current_battery_capacity_kwh,
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        simulation_year=simulation_year
+    )
+    simulation_metadata['energy_balance_validation'] = energy_balance_validation
+    if not return_time_series:
+        # Lean-Modus der optimierten Fahrweisen (Zeitreihen werden für die Optimierung ohnehin erzeugt)
+        return {'kpis': kpis, 'simulation_metadata': simulation_metadata}
+
+    # Kompakter Ergebnis-Container; 'time_series_data' wird erst beim Zugriff als DataFrame erzeugt.
+    # Eingangsreihen werden referenziert, Direktverbrauch/Netzbezug/Einspeisung bei Bedarf abgeleitet.
+    stored_columns = ('SOC_kWh', 'Battery_Charge_kWh', 'Battery_Discharge_kWh',
+                      'Battery_Charge_Losses_kWh', 'Battery_Discharge_Losses_kWh')
+    if dispatch_strategy != "pv_first":
+        # Mit Arbitrage bzw. optimierter Fahrweise lassen sich Netzbezug/Einspeisung nicht aus den Batterieflüssen ableiten
+        stored_columns += ('Grid_Import_kWh', 'Grid_Export_kWh') + ARBITRAGE_OUTPUT_COLUMNS
+    return SimulationResult(
+        {column: flows[column] for column in stored_columns},
+        time_index,
+        inputs={column: time_series_columns[column] for column in ('PV_Generation_kWh', 'Consumption_kWh')},
+        entries={
+            'kpis': kpis,
+            'simulation_metadata': simulation_metadata
+        },
+        storage_dtype=storage_dtype,
+        sparse=sparse_storage
+    )
+
+
+# Reihenfolge der Jahressummen je Kapazität im Batch-Kern
+BATCH_TOTAL_COLUMNS = (
+    'battery_charge',
+    'battery_discharge',
+    'battery_charge_losses',
+    'battery_discharge_losses',
+    'grid_import',
+    'grid_export',
+    'grid_import_cost',
+    'grid_export_revenue',
+    'grid_charge',
+    'grid_discharge',
+)
+
+
+def _pv_first_batch_kernel(
+    surplus, deficit, input_row, price_grid, price_feed_in,
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge, battery_efficiency_discharge,
+    buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+    totals_out, soc_out, grid_import_out, grid_export_out,
+    cycle_counts_out, soc_sum_out, rainflow_state, rainflow_stack
+):
+    """
+    Batch-Variante des Simulationskerns für das JIT-Backend: alle Kapazitäten laufen im
+    Gleichschritt über die Zeitachse (äußere Schleife Zeit, innere Schleife Kapazität).
+
+    Args:
+        surplus, deficit: PV-Überschuss und Restlast nach Direktverbrauch (Eingangszeilen × Zeit, kWh).
+            Meist eine gemeinsame Zeile; bei Lebensdauer-Simulationen eine Zeile je Jahr.
+        input_row: Eingangszeile je Kapazität (int-Array).
+        price_grid, price_feed_in: Bezugs- und Einspeisepreis je Intervall (Euro/kWh).
+        initial_soc_kwh ... max_discharge_kwh: Arrays mit einem Eintrag je Kapazität.
+        battery_efficiency_charge, battery_efficiency_discharge (float): Wirkungsgrade (0-1).
+        buy_threshold ... max_grid_discharge_kwh (float): Arbitrage (siehe arbitrage_parameters).
+        charge_power_curve ... discharge_efficiency_curve: Kennlinien (siehe _pv_first_dispatch_kernel).
+            Je Kapazität und Intervall rechnet derselbe Schritt wie in den übrigen Kernen (_dispatch_interval).
+        totals_out: Ausgabe (Kapazitäten × BATCH_TOTAL_COLUMNS) mit Jahressummen.
+        soc_out: SOC-Matrix (Kapazitäten × Zeit) oder leeres Array (Kapazitäten × 0).
+        grid_import_out, grid_export_out: Netzbezug/Einspeisung (Kapazitäten × Zeit) oder leere Arrays.
+        cycle_counts_out, soc_sum_out, rainflow_state, rainflow_stack: Rainflow-Zählung des SOC-Verlaufs
+            (siehe new_rainflow_buffers) oder None (Standard: keine Zählung, numba übersetzt sie dann nicht).
+    """
+    num_capacities = len(initial_soc_kwh)
+    soc = np.empty(num_capacities)
+    for k in range(num_capacities):
+        soc[k] = min(max(initial_soc_kwh[k], min_soc_kwh[k]), max_soc_kwh[k])
+
+    # Rainflow-Zählung: SOC in Stufen des nutzbaren Bereichs, Startpunkt als erster Stapeleintrag
+    rainflow_scale = np.zeros(num_capacities)
+    if cycle_counts_out is not None:
+        for k in range(num_capacities):
+            if max_soc_kwh[k] > min_soc_kwh[k]:
+                rainflow_scale[k] = (cycle_counts_out.shape[1] - 1) / (max_soc_kwh[k] - min_soc_kwh[k])
+            level = int((soc[k] - min_soc_kwh[k]) * rainflow_scale[k] + 0.5)
+            rainflow_stack[k, 0] = level
+            rainflow_state[k, 0] = 1
+            rainflow_state[k, 1] = level
+            rainflow_state[k, 2] = 0
+
+    # Index-Skalierung der Kennlinien je Kapazität (siehe _battery_curve_lookup), eine Zeile je Kapazität
+    curve_lookups = np.empty((num_capacities, 12))
+    for k in range(num_capacities):
+        curve_lookups[k] = _battery_curve_lookup(
+            min_soc_kwh[k], max_soc_kwh[k], max_charge_kwh[k], max_discharge_kwh[k], battery_efficiency_discharge,
+            charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+        )
+
+    _pv_first_batch_steps(
+        surplus, deficit, input_row, price_grid, price_feed_in, min_soc_kwh, max_soc_kwh,
+        max_charge_kwh, max_discharge_kwh, battery_efficiency_charge, battery_efficiency_discharge,
+        buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+        curve_lookups, soc, rainflow_scale, totals_out, soc_out, grid_import_out, grid_export_out,
+        cycle_counts_out, soc_sum_out, rainflow_state, rainflow_stack
+    )
+
+
+def _pv_first_batch_steps(
+    surplus, deficit, input_row, price_grid, price_feed_in, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh, battery_efficiency_charge, battery_efficiency_discharge,
+    buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+    curve_lookups, soc, rainflow_scale, totals_out, soc_out, grid_import_out, grid_export_out,
+    cycle_counts_out, soc_sum_out, rainflow_state, rainflow_stack
+):
+    """
+    Zeitschleife von _pv_first_batch_kernel ohne eigene Arrays (JIT über register_jitable); soc und
+    rainflow_scale sind vom Aufrufer vorbelegte Arbeitspuffer je Kapazität.
+    """
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve = _borrowed_curves(
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+    )
+    num_capacities = len(soc)
+    record_soc = soc_out.shape[1] > 0
+    record_flows = grid_import_out.shape[1] > 0
+    for i in range(surplus.shape[1]):
+        buy_from_grid = price_grid[i] < buy_threshold
+        sell_to_grid = price_feed_in[i] > sell_threshold
+        for k in range(num_capacities):
+            (current_soc_kwh, charge_from_pv, charge_losses, discharge_to_consumption, discharge_losses,
+             grid_charge, grid_discharge, grid_import, grid_export) = _dispatch_interval(
+                surplus[input_row[k], i], deficit[input_row[k], i], soc[k], min_soc_kwh[k], max_soc_kwh[k],
+                max_charge_kwh[k], max_discharge_kwh[k], battery_efficiency_charge, battery_efficiency_discharge,
+                buy_from_grid, sell_to_grid, max_grid_charge_kwh, max_grid_discharge_kwh,
+                charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+                curve_lookups[k]
+            )
+            totals_out[k, 0] += charge_from_pv
+            totals_out[k, 1] += discharge_to_consumption
+            totals_out[k, 2] += charge_losses
+            totals_out[k, 3] += discharge_losses
+            totals_out[k, 8] += grid_charge
+            totals_out[k, 9] += grid_discharge
+            if grid_export > 0:
+                totals_out[k, 5] += grid_export
+                totals_out[k, 7] += grid_export * price_feed_in[i]
+                if record_flows:
+                    grid_export_out[k, i] = grid_export
+            if grid_import > 0:
+                totals_out[k, 4] += grid_import
+                totals_out[k, 6] += grid_import * price_grid[i]
+                if record_flows:
+                    grid_import_out[k, i] = grid_import
+
+            soc[k] = current_soc_kwh
+            if record_soc:
+                soc_out[k, i] = current_soc_kwh
+
+            if cycle_counts_out is not None:
+                # Rainflow-Zählung (siehe _rainflow_push): an jedem Umkehrpunkt wird das bisherige
+                # Extremum auf den Stapel gelegt; geschlossene Zyklen werden sofort gezählt
+                soc_sum_out[k] += current_soc_kwh
+                level = int((current_soc_kwh - min_soc_kwh[k]) * rainflow_scale[k] + 0.5)
+                extreme = rainflow_state[k, 1]
+                if level != extreme:
+                    direction = 1 if level > extreme else -1
+                    if direction != rainflow_state[k, 2]:
+                        if rainflow_state[k, 2] != 0:
+                            n = rainflow_state[k, 0]
+                            rainflow_stack[k, n] = extreme
+                            n += 1
+                            while n >= 3:
+                                latest_range = abs(rainflow_stack[k, n - 1] - rainflow_stack[k, n - 2])
+                                previous_range = abs(rainflow_stack[k, n - 2] - rainflow_stack[k, n - 3])
+                                if latest_range < previous_range:
+                                    break
+                                if n == 3:
+                                    cycle_counts_out[k, previous_range] += 0.5
+                                    rainflow_stack[k, 0] = rainflow_stack[k, 1]
+                                    rainflow_stack[k, 1] = rainflow_stack[k, 2]
+                                    n = 2
+                                else:
+                                    cycle_counts_out[k, previous_range] += 1.0
+                                    rainflow_stack[k, n - 3] = rainflow_stack[k, n - 1]
+                                    n -= 2
+                            rainflow_state[k, 0] = n
+                        rainflow_state[k, 2] = direction
+                    rainflow_state[k, 1] = level
+
+
+if NUMBA_AVAILABLE:
+    register_jitable(nogil=True)(_pv_first_batch_steps)
+_pv_first_batch_kernel_jit = _jit_kernel(_pv_first_batch_kernel)
+
+
+def _pv_first_batch_numpy(
+    surplus, deficit, input_row, price_grid, price_feed_in,
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge, battery_efficiency_discharge,
+    buy_threshold, sell_threshold, max_grid_charge_kwh, max_grid_discharge_kwh,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+    totals_out, soc_out, grid_import_out, grid_export_out,
+    cycle_counts_out, soc_sum_out, rainflow_state, rainflow_stack
+):
+    """
+    Referenz-Backend des Batch-Kerns: pro Intervall eine vektorisierte Operation über alle
+    Kapazitäten. Die Laufzeit hängt damit kaum von der Anzahl der Kapazitäten ab.
+    Signatur und Ergebnis wie _pv_first_batch_kernel; konstante Kennlinien werden nicht nachgeschlagen.
+    """
+    record_soc = soc_out.shape[1] > 0
+    record_flows = grid_import_out.shape[1] > 0
+    soc = np.minimum(np.maximum(initial_soc_kwh, min_soc_kwh), max_soc_kwh)
+    count_cycles = cycle_counts_out is not None
+    if count_cycles:
+        # Rainflow-Zählung (siehe _pv_first_batch_kernel); Umkehrpunkte je Spur über _rainflow_push
+        usable_kwh = max_soc_kwh - min_soc_kwh
+        rainflow_scale = np.where(usable_kwh > 0, (cycle_counts_out.shape[1] - 1) / np.where(usable_kwh > 0, usable_kwh, 1.0), 0.0)
+        start_level = ((soc - min_soc_kwh) * rainflow_scale + 0.5).astype(np.int64)
+        rainflow_stack[:, 0] = start_level
+        rainflow_state[:] = 0
+        rainflow_state[:, 0] = 1
+        rainflow_state[:, 1] = start_level
+    totals = [np.zeros(len(soc)) for _ in BATCH_TOTAL_COLUMNS]
+    charge_total, discharge_total, charge_losses_total, discharge_losses_total = totals[:4]
+    import_total, export_total, import_cost_total, export_revenue_total = totals[4:8]
+    grid_charge_total, grid_discharge_total = totals[8:]
+
+    # Kennlinien: Index-Skalierung je Kapazität (siehe _pv_first_dispatch_kernel)
+    variable_power = charge_power_curve is not None or discharge_power_curve is not None
+    variable_efficiency = charge_efficiency_curve is not None or discharge_efficiency_curve is not None
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve = (
+        _curve_or_unit(curve) for curve in (charge_power_curve, discharge_power_curve,
+                                            charge_efficiency_curve, discharge_efficiency_curve)
+    )
+    usable_kwh = max_soc_kwh - min_soc_kwh
+    safe_usable_kwh = np.where(usable_kwh > 0, usable_kwh, 1.0)
+    charge_power_scale = np.where(usable_kwh > 0, (len(charge_power_curve) - 1) / safe_usable_kwh, 0.0)
+    discharge_power_scale = np.where(usable_kwh > 0, (len(discharge_power_curve) - 1) / safe_usable_kwh, 0.0)
+    charge_efficiency_scale = np.where(max_charge_kwh > 0, (len(charge_efficiency_curve) - 1) / np.where(max_charge_kwh > 0, max_charge_kwh, 1.0), 0.0)
+    discharge_efficiency_scale = np.where(max_discharge_kwh > 0, (len(discharge_efficiency_curve) - 1) / np.where(max_discharge_kwh > 0, max_discharge_kwh, 1.0), 0.0)
+    inverse_efficiency_discharge = 1.0 / battery_efficiency_discharge if battery_efficiency_discharge > 0 else 0.0
+    efficiency_charge = battery_efficiency_charge
+    efficiency_discharge = battery_efficiency_discharge
+    charge_limit_kwh = max_charge_kwh
+    discharge_limit_kwh = max_discharge_kwh
+
+    shared_inputs = surplus.shape[0] == 1
+    if shared_inputs:
+        # Überschuss und Restlast sind für alle Kapazitäten gleich -> Verzweigung pro Intervall
+        intervals = zip(surplus[0].tolist(), deficit[0].tolist())
+    else:
+        # Eingänge je Kapazität (z.B. Jahre mit PV-Degradation): Zeilen je Intervall als Vektor.
+        # Kapazitäten ohne Überschuss bzw. Restlast erhalten in den Zweigen exakt 0 (keine Änderung).
+        intervals = zip(np.ascontiguousarray(surplus[input_row].T), np.ascontiguousarray(deficit[input_row].T))
+
+    for i, (remaining_pv, remaining_consumption) in enumerate(intervals):
+        # Arbitrage-Entscheidung hängt nur vom Preis ab und gilt für alle Kapazitäten
+        buy_from_grid = price_grid[i] < buy_threshold
+        sell_to_grid = not buy_from_grid and price_feed_in[i] > sell_threshold
+        charge_from_pv = 0.0
+        discharge_from_battery = 0.0
+        export = None
+        grid_import = None
+        if variable_power:
+            soc_position = soc - min_soc_kwh
+            charge_limit_kwh = max_charge_kwh * charge_power_curve[(soc_position * charge_power_scale + 0.5).astype(np.int64)]
+            discharge_limit_kwh = max_discharge_kwh * discharge_power_curve[(soc_position * discharge_power_scale + 0.5).astype(np.int64)]
+        if (remaining_pv > 0) if shared_inputs else (remaining_pv > 0).any():
+            charge_from_pv = np.minimum(remaining_pv, np.minimum(max_soc_kwh - soc, charge_limit_kwh))
+            if variable_efficiency:
+                efficiency_charge = battery_efficiency_charge * charge_efficiency_curve[
+                    (charge_from_pv * charge_efficiency_scale + 0.5).astype(np.int64)]
+            charge_to_battery = charge_from_pv * efficiency_charge
+            soc = soc + charge_to_battery
+            charge_total += charge_from_pv
+            charge_losses_total += charge_from_pv - charge_to_battery
+            export = remaining_pv - charge_from_pv
+        if not buy_from_grid and ((remaining_consumption > 0) if shared_inputs else (remaining_consumption > 0).any()):
+            max_discharge_from_battery_kwh = np.minimum(soc - min_soc_kwh, discharge_limit_kwh)
+            if variable_efficiency:
+                efficiency_discharge = battery_efficiency_discharge * discharge_efficiency_curve[(
+                    np.minimum(max_discharge_from_battery_kwh, remaining_consumption * inverse_efficiency_discharge)
+                    * discharge_efficiency_scale + 0.5).astype(np.int64)]
+            max_discharge_to_consumption_kwh = max_discharge_from_battery_kwh * efficiency_discharge
+            discharge_to_consumption = np.minimum(max_discharge_to_consumption_kwh, remaining_consumption)
+            discharge_from_battery = discharge_to_consumption / efficiency_discharge
+            soc = soc - discharge_from_battery
+            discharge_total += discharge_to_consumption
+            discharge_losses_total += discharge_from_battery - discharge_to_consumption
+            grid_import = remaining_consumption - discharge_to_consumption
+        if buy_from_grid:
+            grid_charge = np.maximum(np.minimum(max_grid_charge_kwh, np.minimum(charge_limit_kwh - charge_from_pv, max_soc_kwh - soc)), 0.0)
+            if variable_efficiency:
+                efficiency_charge = battery_efficiency_charge * charge_efficiency_curve[
+                    ((charge_from_pv + grid_charge) * charge_efficiency_scale + 0.5).astype(np.int64)]
+            grid_charge_to_battery = grid_charge * efficiency_charge
+            soc = soc + grid_charge_to_battery
+            grid_charge_total += grid_charge
+            charge_losses_total += grid_charge - grid_charge_to_battery
+            grid_import = (remaining_consumption if grid_import is None else grid_import) + grid_charge
+        elif sell_to_grid:
+            max_grid_discharge_from_battery_kwh = np.minimum(soc - min_soc_kwh, discharge_limit_kwh - discharge_from_battery)
+            if variable_efficiency:
+                efficiency_discharge = battery_efficiency_discharge * discharge_efficiency_curve[((discharge_from_battery + np.maximum(
+                    np.minimum(max_grid_discharge_from_battery_kwh, max_grid_discharge_kwh * inverse_efficiency_discharge), 0.0))
+                    * discharge_efficiency_scale + 0.5).astype(np.int64)]
+            grid_discharge = np.maximum(np.minimum(max_grid_discharge_kwh, max_grid_discharge_from_battery_kwh * efficiency_discharge), 0.0)
+            grid_discharge_from_battery = grid_discharge / efficiency_discharge
+            soc = soc - grid_discharge_from_battery
+            grid_discharge_total += grid_discharge
+            discharge_losses_total += grid_discharge_from_battery - grid_discharge
+            export = (remaining_pv if export is None else export) + grid_discharge
+        if export is not None:
+            export_total += export
+            export_revenue_total += export * price_feed_in[i]
+            if record_flows:
+                grid_export_out[:, i] = export
+        if grid_import is not None:
+            import_total += grid_import
+            import_cost_total += grid_import * price_grid[i]
+            if record_flows:
+                grid_import_out[:, i] = grid_import
+        soc = np.minimum(np.maximum(soc, min_soc_kwh), max_soc_kwh)
+        if record_soc:
+            soc_out[:, i] = soc
+        if count_cycles:
+            soc_sum_out += soc
+            level = ((soc - min_soc_kwh) * rainflow_scale + 0.5).astype(np.int64)
+            changed = level != rainflow_state[:, 1]
+            if changed.any():
+                direction = np.where(level > rainflow_state[:, 1], 1, -1)
+                for k in np.flatnonzero(changed & (direction != rainflow_state[:, 2]) & (rainflow_state[:, 2] != 0)):
+                    rainflow_state[k, 0] = _rainflow_push(
+                        rainflow_stack[k], rainflow_state[k, 0], cycle_counts_out[k], rainflow_state[k, 1]
+                    )
+                rainflow_state[changed, 2] = direction[changed]
+                rainflow_state[changed, 1] = level[changed]
+
+    totals_out += np.column_stack(totals)
+
+
+def new_rainflow_buffers(num_lanes: int, soc_levels: int | None = None) -> tuple:
+    """
+    Zähler und Zustand der Rainflow-Zählung im Batch-Kern (je Spur eine Zeile).
+
+    Der SOC wird je Intervall auf soc_levels Stufen des nutzbaren Bereichs gerundet. Gezählt wird
+    nach ASTM E1049 (Drei-Punkt-Verfahren) auf dem Stapel der Umkehrpunkte; Zyklentiefen sind ganze
+    Stufen, der Stapel bleibt daher kürzer als soc_levels + 2 Einträge. Speicherbedarf und Laufzeit
+    hängen nicht von der Länge der Zeitreihe ab.
+
+    Args:
+        num_lanes (int): Anzahl Spuren (Kapazitäten bzw. Kapazitäten × Jahre).
+        soc_levels (int | None): Anzahl Stufen. None: RAINFLOW_SOC_LEVELS.
+
+    Returns:
+        tuple: (cycle_counts, soc_sum, rainflow_state, rainflow_stack) mit
+        cycle_counts (Spuren × (Stufen + 1)): Zyklen je Tiefe in Stufen (Halbzyklen zählen 0.5),
+        soc_sum (Spuren): Summe des SOC am Intervallende in kWh (für den mittleren SOC),
+        rainflow_state (Spuren × 3, int64): Stapellänge, laufendes Extremum, Richtung (-1, 0, 1),
+        rainflow_stack (Spuren × (Stufen + 2), int64): Umkehrpunkte in Stufen.
+    """
+    soc_levels = int(soc_levels or RAINFLOW_SOC_LEVELS)
+    return (
+        np.zeros((num_lanes, soc_levels + 1)),
+        np.zeros(num_lanes),
+        np.zeros((num_lanes, 3), dtype=np.int64),
+        np.zeros((num_lanes, soc_levels + 2), dtype=np.int64),
+    )
+
+
+def _rainflow_push(stack, stack_length: int, cycle_counts, point: int) -> int:
+    """
+    Legt einen Umkehrpunkt auf den Rainflow-Stapel und zählt die dabei geschlossenen Zyklen
+    (Referenz des Verfahrens im Batch-Kern). Gibt die neue Stapellänge zurück.
+    """
+    stack[stack_length] = point
+    stack_length += 1
+    while stack_length >= 3:
+        latest_range = abs(stack[stack_length - 1] - stack[stack_length - 2])
+        previous_range = abs(stack[stack_length - 2] - stack[stack_length - 3])
+        if latest_range < previous_range:
+            break
+        if stack_length == 3:
+            # Bereich enthält den Startpunkt: Halbzyklus, Startpunkt rückt vor
+            cycle_counts[previous_range] += 0.5
+            stack[0], stack[1] = stack[1], stack[2]
+            stack_length = 2
+        else:
+            cycle_counts[previous_range] += 1.0
+            stack[stack_length - 3] = stack[stack_length - 1]
+            stack_length -= 2
+    return stack_length
+
+
+def finish_rainflow(cycle_counts, rainflow_state, rainflow_stack) -> np.ndarray:
+    """
+    Schließt die Rainflow-Zählung nach dem letzten Intervall ab: Der Endpunkt wird als letzter
+    Umkehrpunkt gezählt, die verbleibenden Bereiche des Stapels (Residuum) als Halbzyklen.
+
+    Args:
+        cycle_counts, rainflow_state, rainflow_stack: Puffer aus new_rainflow_buffers nach dem Kernlauf.
+
+    Returns:
+        np.ndarray: cycle_counts (in place ergänzt).
+    """
+    for k in range(len(rainflow_state)):
+        stack_length = rainflow_state[k, 0]
+        if rainflow_state[k, 2] != 0:
+            stack_length = _rainflow_push(rainflow_stack[k], stack_length, cycle_counts[k], rainflow_state[k, 1])
+        residue_ranges = np.abs(np.diff(rainflow_stack[k, :stack_length]))
+        np.add.at(cycle_counts[k], residue_ranges, 0.5)
+        rainflow_state[k, 0] = 0
+    return cycle_counts
+
+
+def count_rainflow_cycles(soc_kwh, min_soc_kwh: float, max_soc_kwh: float, initial_soc_kwh: float | None = None,
+                          soc_levels: int | None = None) -> np.ndarray:
+    """
+    Rainflow-Zählung einer vorhandenen SOC-Zeitreihe (gleiches Verfahren wie im Batch-Kern).
+
+    Args:
+        soc_kwh (array-like): SOC am Ende jedes Intervalls in kWh.
+        min_soc_kwh, max_soc_kwh (float): Nutzbarer Bereich.
+        initial_soc_kwh (float | None): SOC vor dem ersten Intervall (Startpunkt der Zählung).
+        soc_levels (int | None): Anzahl Stufen. None: RAINFLOW_SOC_LEVELS.
+
+    Returns:
+        np.ndarray: Zyklen je Tiefe in Stufen (Länge soc_levels + 1, siehe new_rainflow_buffers).
+    """
+    soc_levels = int(soc_levels or RAINFLOW_SOC_LEVELS)
+    soc_kwh = _as_float_array(soc_kwh)
+    if initial_soc_kwh is not None:
+        soc_kwh = np.concatenate(([float(initial_soc_kwh)], soc_kwh))
+    cycle_counts = np.zeros(soc_levels + 1)
+    if len(soc_kwh) == 0 or max_soc_kwh <= min_soc_kwh:
+        return cycle_counts
+    scale = soc_levels / (max_soc_kwh - min_soc_kwh)
+    levels = ((np.clip(soc_kwh, min_soc_kwh, max_soc_kwh) - min_soc_kwh) * scale + 0.5).astype(np.int64)
+    # Gleiche Stufen zusammenfassen, Umkehrpunkte über Vorzeichenwechsel der Differenzen
+    levels = levels[np.concatenate(([True], np.diff(levels) != 0))]
+    direction = np.sign(np.diff(levels))
+    reversals = np.flatnonzero(direction[1:] != direction[:-1]) + 1
+    points = np.concatenate((levels[:1], levels[reversals], levels[-1:] if len(levels) > 1 else levels[:0]))
+    stack = np.zeros(soc_levels + 2, dtype=np.int64)
+    stack_length = 0
+    for point in points.tolist():
+        stack_length = _rainflow_push(stack, stack_length, cycle_counts, point)
+    np.add.at(cycle_counts, np.abs(np.diff(stack[:stack_length])), 0.5)
+    return cycle_counts
+
+
+def summarize_rainflow(cycle_counts) -> dict:
+    """
+    Kennzahlen einer Rainflow-Zählung (eine Zeile oder eine Zeile je Spur).
+
+    Args:
+        cycle_counts (array-like): Zyklen je Tiefe in Stufen (siehe new_rainflow_buffers).
+
+    Returns:
+        dict: 'equivalent_full_cycles' (Summe der Zyklentiefen als Anteil des nutzbaren Bereichs),
+        'dod_histogram' (Zyklen je Entladetiefen-Klasse, AGING_DOD_HISTOGRAM_BINS gleich breite
+        Klassen über 0-100%) und 'dod_bin_edges_percent' (Klassengrenzen in %).
+    """
+    cycle_counts = np.asarray(cycle_counts, dtype=np.float64)
+    soc_levels = cycle_counts.shape[-1] - 1
+    depth = np.arange(soc_levels + 1) / soc_levels
+    bins = AGING_DOD_HISTOGRAM_BINS
+    bin_index = np.clip(np.ceil(depth[1:] * bins).astype(np.int64) - 1, 0, bins - 1)
+    return {
+        'equivalent_full_cycles': (cycle_counts * depth).sum(axis=-1),  # zeilenweise, unabhängig von der Spurzahl
+        'dod_histogram': cycle_counts[..., 1:] @ np.eye(bins)[bin_index],
+        'dod_bin_edges_percent': np.linspace(0.0, 100.0, bins + 1),
+    }
+
+
+def cycle_calendar_capacity_loss_percent(cycle_counts, mean_soc_percent) -> np.ndarray:
+    """
+    Kapazitätsverlust eines Jahres im Alterungsmodell "cycle_calendar" in Prozentpunkten der Nennkapazität.
+
+    Zyklenalterung nach Wöhler mit linearer Schadensakkumulation (Miner): ein Zyklus der Tiefe d
+    (Anteil des nutzbaren Bereichs) verbraucht d^AGING_DOD_EXPONENT / AGING_CYCLE_LIFE der Lebensdauer,
+    die Lebensdauer entspricht dem Verlust bis AGING_END_OF_LIFE_CAPACITY_PERCENT. Dazu kommt die
+    kalendarische Alterung, linear im mittleren SOC zwischen AGING_CALENDAR_LOSS_PERCENT_EMPTY und _FULL.
+
+    Args:
+        cycle_counts (array-like): Zyklen je Tiefe in Stufen (eine Zeile oder eine Zeile je Spur).
+        mean_soc_percent (float | array-like): Mittlerer SOC in % der Kapazität.
+
+    Returns:
+        np.ndarray: Verlust in Prozentpunkten je Zeile.
+    """
+    cycle_counts = np.asarray(cycle_counts, dtype=np.float64)
+    soc_levels = cycle_counts.shape[-1] - 1
+    damage = (cycle_counts * (np.arange(soc_levels + 1) / soc_levels) ** AGING_DOD_EXPONENT).sum(axis=-1) / AGING_CYCLE_LIFE
+    cycle_loss = (100.0 - AGING_END_OF_LIFE_CAPACITY_PERCENT) * damage
+    calendar_loss = AGING_CALENDAR_LOSS_PERCENT_EMPTY + (
+        AGING_CALENDAR_LOSS_PERCENT_FULL - AGING_CALENDAR_LOSS_PERCENT_EMPTY
+    ) * np.asarray(mean_soc_percent, dtype=np.float64) / 100.0
+    return cycle_loss + calendar_loss
+
+
+def _price_array(price, index, num_periods: int) -> np.ndarray:
+    """
+    Wandelt einen Preis (Konstante oder pd.Series) in ein float64-Array je Intervall um.
+    Zeitreihen werden wie bei der pandas-Multiplikation am Index ausgerichtet; fehlende
+    Zeitpunkte gehen mit 0 in die Kosten ein.
+    """
+    if isinstance(price, pd.Series):
+        if index is not None and not price.index.equals(index):
+            price = price.reindex(index)
+        return np.nan_to_num(_as_float_array(price), nan=0.0)
+    # Konstanter Preis als Array ohne Speicherbedarf (Schrittweite 0)
+    return np.broadcast_to(np.float64(price), (num_periods,))
+
+
+def _optimal_dispatch_backward(
+    residual, input_row, price_grid, price_feed_in, grid_delta, first_offset, last_offset, idle_offset,
+    policy_out, value_out
+):
+    """
+    Rückwärtsinduktion der kostenoptimalen Fahrweise (JIT-Variante von _optimal_dispatch_backward_numpy).
+
+    Args:
+        residual: Restlast minus PV-Überschuss (Eingangszeilen × Zeit, kWh).
+        input_row: Eingangszeile je Spur (int-Array).
+        price_grid, price_feed_in: Bezugs- und Einspeisepreis je Intervall (Euro/kWh).
+        grid_delta: Änderung des Netzsaldos je Spur und SOC-Schritt (Spuren × Schritte, kWh).
+        first_offset, last_offset: Erster/letzter zulässiger Schritt-Index je Spur und SOC-Stufe
+            (Leistungsgrenzen, Spuren × Stufen).
+        idle_offset (int): Schritt-Index ohne SOC-Änderung.
+        policy_out: Optimaler Schritt-Index je Intervall, Spur und SOC-Stufe (Zeit × Spuren × Stufen).
+        value_out: Restkosten ab dem ersten Intervall je Spur und SOC-Stufe (wird überschrieben).
+    """
+    num_lanes, num_levels = value_out.shape
+    num_offsets = grid_delta.shape[1]
+    value_next = np.zeros(num_levels)
+    cost = np.empty(num_offsets)
+    lane_first = np.empty(num_lanes, dtype=np.int64)
+    lane_last = np.empty(num_lanes, dtype=np.int64)
+    for lane in range(num_lanes):
+        lane_first[lane] = first_offset[lane, 0]
+        lane_last[lane] = last_offset[lane, 0]
+        for j in range(num_levels):
+            value_out[lane, j] = 0.0
+            lane_first[lane] = min(lane_first[lane], first_offset[lane, j])
+            lane_last[lane] = max(lane_last[lane], last_offset[lane, j])
+    for t in range(residual.shape[1] - 1, -1, -1):
+        for lane in range(num_lanes):
+            r = residual[input_row[lane], t]
+            for m in range(lane_first[lane], lane_last[lane] + 1):
+                net = r + grid_delta[lane, m]
+                cost[m] = price_grid[t] * net if net > 0 else price_feed_in[t] * net
+            for j in range(num_levels):
+                value_next[j] = value_out[lane, j]
+            for j in range(num_levels):
+                # Leerlauf bevorzugen: andere Schritte nur bei echt geringeren Kosten
+                best_value = cost[idle_offset] + value_next[j]
+                best_offset = idle_offset
+                for m in range(first_offset[lane, j], last_offset[lane, j] + 1):
+                    target = j + m - idle_offset
+                    if target < 0 or target >= num_levels:
+                        continue
+                    value = cost[m] + value_next[target]
+                    if value < best_value:
+                        best_value = value
+                        best_offset = m
+                value_out[lane, j] = best_value
+                policy_out[t, lane, j] = best_offset
+
+
+_optimal_dispatch_backward_jit = (
+    njit(cache=True, nogil=True)(_optimal_dispatch_backward) if NUMBA_AVAILABLE else None
+)
+
+
+def _optimal_dispatch_backward_numpy(
+    residual, input_row, price_grid, price_feed_in, grid_delta, first_offset, last_offset, idle_offset,
+    policy_out, value_out
+):
+    """
+    Referenz-Backend der Rückwärtsinduktion: je Intervall eine vektorisierte Operation über alle
+    Spuren, SOC-Stufen und SOC-Schritte. Signatur und Ergebnis wie _optimal_dispatch_backward.
+    """
+    num_lanes, num_levels = value_out.shape
+    num_offsets = grid_delta.shape[1]
+    offsets = np.arange(num_offsets)
+    # Leistungsgrenzen unabhängig vom SOC: Maske je Spur, sonst Strafkosten je Spur, Stufe und Schritt
+    level_independent = bool(np.all(first_offset == first_offset[:, :1]) and np.all(last_offset == last_offset[:, :1]))
+    invalid = (offsets < first_offset[:, :1]) | (offsets > last_offset[:, :1])
+    penalty = None
+    if not level_independent:
+        invalid = (offsets < first_offset.min(axis=1, keepdims=True)) | (offsets > last_offset.max(axis=1, keepdims=True))
+        penalty = np.where((offsets < first_offset[..., np.newaxis]) | (offsets > last_offset[..., np.newaxis]), np.inf, 0.0)
+    # Wertfunktion mit unendlichen Rändern: Schritt m von Stufe j führt auf padded[:, j + m]
+    padded = np.full((num_lanes, num_levels + num_offsets - 1), np.inf)
+    padded[:, idle_offset:idle_offset + num_levels] = 0.0
+    windows = np.lib.stride_tricks.sliding_window_view(padded, num_offsets, axis=1)
+    shared_inputs = bool(np.all(input_row == input_row[0]))
+    for t in range(residual.shape[1] - 1, -1, -1):
+        r = residual[input_row[0], t] if shared_inputs else residual[input_row, t][:, np.newaxis]
+        net = r + grid_delta
+        cost = np.where(net > 0, price_grid[t] * net, price_feed_in[t] * net)
+        cost[invalid] = np.inf
+        total = windows + cost[:, np.newaxis, :]
+        if penalty is not None:
+            total += penalty
+        best_offset = total.argmin(axis=2)
+        best_value = np.take_along_axis(total, best_offset[..., np.newaxis], axis=2)[..., 0]
+        # Leerlauf bevorzugen (wie im JIT-Kern)
+        best_offset[total[:, :, idle_offset] == best_value] = idle_offset
+        policy_out[t] = best_offset
+        padded[:, idle_offset:idle_offset + num_levels] = best_value
+    value_out[:] = padded[:, idle_offset:idle_offset + num_levels]
+
+
+def _optimal_dispatch_forward(policy, idle_offset, levels_out):
+    """Vorwärtsdurchlauf: SOC-Stufen je Spur aus der optimalen Politik (levels_out[:, 0] ist vorbelegt)."""
+    for lane in range(levels_out.shape[0]):
+        level = levels_out[lane, 0]
+        for t in range(policy.shape[0]):
+            level += policy[t, lane, level] - idle_offset
+            levels_out[lane, t + 1] = level
+
+
+_optimal_dispatch_forward_jit = (
+    njit(cache=True, nogil=True)(_optimal_dispatch_forward) if NUMBA_AVAILABLE else None
+)
+
+
+def _optimal_dispatch_forward_numpy(policy, idle_offset, levels_out):
+    """Referenz-Backend des Vorwärtsdurchlaufs (vektorisiert über alle Spuren)."""
+    lanes = np.arange(levels_out.shape[0])
+    level = levels_out[:, 0].copy()
+    for t in range(policy.shape[0]):
+        level += policy[t, lanes, level].astype(np.int64) - idle_offset
+        levels_out[:, t + 1] = level
+
+
+def _optimal_dispatch_flows(levels, soc_step, min_soc_kwh, surplus, deficit, grid_delta, idle_offset) -> dict:
+    """
+    Energieflüsse der optimalen Fahrweise aus den SOC-Stufen (Spuren × Zeit).
+
+    Die Batterie lädt zuerst aus PV-Überschuss und entlädt zuerst an die Last; der Rest wird
+    als Netzladung bzw. Netzentladung verbucht (gleiche Spalten wie bei dispatch_strategy="threshold").
+    Ladung (brutto) und Entladung (netto) je Schritt stammen aus dem Netzsaldo des SOC-Rasters.
+    """
+    level_steps = np.diff(levels, axis=1)
+    stored = level_steps * soc_step[:, np.newaxis]
+    step_grid_delta = np.take_along_axis(grid_delta, level_steps + idle_offset, axis=1)
+    stored_in = np.maximum(stored, 0.0)
+    charge_gross = np.where(level_steps > 0, step_grid_delta, 0.0)
+    discharge_gross = np.maximum(-stored, 0.0)
+    discharge_net = np.where(level_steps < 0, -step_grid_delta, 0.0)
+    charge_from_pv = np.minimum(charge_gross, surplus)
+    discharge_to_consumption = np.minimum(discharge_net, deficit)
+    grid_charge = charge_gross - charge_from_pv
+    grid_discharge = discharge_net - discharge_to_consumption
+    return {
+        'SOC_kWh': min_soc_kwh[:, np.newaxis] + levels[:, 1:] * soc_step[:, np.newaxis],
+        'Battery_Charge_kWh': charge_from_pv,
+        'Battery_Discharge_kWh': discharge_to_consumption,
+        'Battery_Charge_Losses_kWh': charge_gross - stored_in,
+        'Battery_Discharge_Losses_kWh': discharge_gross - discharge_net,
+        'Grid_Import_kWh': (deficit - discharge_to_consumption) + grid_charge,
+        'Grid_Export_kWh': (surplus - charge_from_pv) + grid_discharge,
+        'Grid_Charge_kWh': grid_charge,
+        'Grid_Discharge_kWh': grid_discharge,
+    }
+
+
+def _optimal_dispatch_grid(
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge: float, battery_efficiency_discharge: float, soc_levels: int | None,
+    battery_curves=None
+) -> dict:
+    """
+    SOC-Raster der optimalen Fahrweise je Spur: Stufenabstand, zulässige SOC-Schritte je Intervall
+    und SOC-Stufe (Leistungsgrenzen, ggf. SOC-abhängig), Netzsaldo je Schritt (Wirkungsgrad ggf.
+    abhängig von der Schrittleistung) und auf das Raster gerundete Anfangsstufe.
+    Inaktive Speicher (keine Kapazität oder Leistung) erhalten nur den Leerlauf-Schritt.
+    """
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve = (
+        _curve_or_unit(curve) for curve in resolve_battery_curves(battery_curves)
+    )
+    soc_levels = int(soc_levels or DEFAULT_OPTIMAL_DISPATCH_SOC_LEVELS)
+    if soc_levels < 2:
+        raise ValueError(f"Mindestens 2 SOC-Stufen erforderlich, erhalten: {soc_levels}")
+    min_soc_kwh = np.asarray(min_soc_kwh, dtype=np.float64)
+    max_soc_kwh = np.asarray(max_soc_kwh, dtype=np.float64)
+    max_charge_kwh = np.asarray(max_charge_kwh, dtype=np.float64)
+    max_discharge_kwh = np.asarray(max_discharge_kwh, dtype=np.float64)
+
+    window_kwh = max_soc_kwh - min_soc_kwh
+    active = (window_kwh > 0) & ((max_charge_kwh > 0) | (max_discharge_kwh > 0))
+    soc_step = np.where(active, window_kwh, 0.0) / (soc_levels - 1)
+    safe_step = np.where(active, soc_step, 1.0)
+    max_up = np.floor(max_charge_kwh * max(battery_efficiency_charge, 0.0) * charge_efficiency_curve.max() / safe_step + 1e-9)
+    max_down = np.floor(max_discharge_kwh / safe_step + 1e-9)
+    max_up = np.where(active, np.clip(max_up, 0, soc_levels - 1), 0).astype(np.int64)
+    max_down = np.where(active, np.clip(max_down, 0, soc_levels - 1), 0).astype(np.int64)
+    idle_offset = int(max_down.max())
+    steps = np.arange(idle_offset + int(max_up.max()) + 1) - idle_offset
+    stored = steps * soc_step[:, np.newaxis]
+    # Wirkungsgrad je Schritt bei der Lade- bzw. Entnahmeleistung (Ladeleistung geschätzt mit η_Laden)
+    charge_efficiency_scale = (len(charge_efficiency_curve) - 1) / np.where(max_charge_kwh > 0, max_charge_kwh, np.inf)
+    discharge_efficiency_scale = (len(discharge_efficiency_curve) - 1) / np.where(max_discharge_kwh > 0, max_discharge_kwh, np.inf)
+    charge_index = stored / max(battery_efficiency_charge, 1e-12) * charge_efficiency_scale[:, np.newaxis] + 0.5
+    discharge_index = -stored * discharge_efficiency_scale[:, np.newaxis] + 0.5
+    efficiency_charge = battery_efficiency_charge * charge_efficiency_curve[
+        np.clip(charge_index, 0, len(charge_efficiency_curve) - 1).astype(np.int64)]
+    efficiency_discharge = battery_efficiency_discharge * discharge_efficiency_curve[
+        np.clip(discharge_index, 0, len(discharge_efficiency_curve) - 1).astype(np.int64)]
+    # Netzsaldo je Schritt: Laden brutto (gespeichert / η_Laden), Entladen netto (entnommen × η_Entladen)
+    grid_delta = np.where(steps > 0, stored / np.maximum(efficiency_charge, 1e-12), stored * efficiency_discharge)
+
+    # Zulässige Schritte je SOC-Stufe: Leistungsgrenze beim SOC der Stufe (Kennlinie), jeweils
+    # zusammenhängend ab dem Leerlauf
+    level_position = np.arange(soc_levels) * soc_step[:, np.newaxis]
+    safe_window_kwh = np.where(window_kwh > 0, window_kwh, np.inf)
+    charge_power = charge_power_curve[np.clip(
+        level_position * ((len(charge_power_curve) - 1) / safe_window_kwh)[:, np.newaxis] + 0.5,
+        0, len(charge_power_curve) - 1).astype(np.int64)]
+    discharge_power = discharge_power_curve[np.clip(
+        level_position * ((len(discharge_power_curve) - 1) / safe_window_kwh)[:, np.newaxis] + 0.5,
+        0, len(discharge_power_curve) - 1).astype(np.int64)]
+    up_steps = np.arange(1, int(max_up.max()) + 1)
+    down_steps = np.arange(1, idle_offset + 1)
+    allowed_up = up_steps <= np.floor(
+        (max_charge_kwh[:, np.newaxis] * charge_power)[..., np.newaxis] * efficiency_charge[:, np.newaxis, idle_offset + up_steps]
+        / safe_step[:, np.newaxis, np.newaxis] + 1e-9)
+    allowed_down = down_steps <= np.floor(
+        (max_discharge_kwh[:, np.newaxis] * discharge_power)[..., np.newaxis] / safe_step[:, np.newaxis, np.newaxis] + 1e-9)
+    up_count = np.minimum(np.cumprod(allowed_up, axis=2).sum(axis=2), max_up[:, np.newaxis])
+    down_count = np.minimum(np.cumprod(allowed_down, axis=2).sum(axis=2), max_down[:, np.newaxis])
+
+    start_soc_kwh = np.minimum(np.maximum(np.asarray(initial_soc_kwh, dtype=np.float64), min_soc_kwh), max_soc_kwh)
+    start_level = np.where(active, np.clip(np.rint((start_soc_kwh - min_soc_kwh) / safe_step), 0, soc_levels - 1), 0)
+    return {
+        'soc_levels': soc_levels,
+        'active': active,
+        'min_soc_kwh': min_soc_kwh,
+        'soc_step': soc_step,
+        'idle_offset': idle_offset,
+        'first_offset': np.ascontiguousarray(idle_offset - down_count, dtype=np.int64),
+        'last_offset': np.ascontiguousarray(idle_offset + up_count, dtype=np.int64),
+        'grid_delta': np.ascontiguousarray(np.where(steps <= max_up[:, np.newaxis], grid_delta, 0.0)),
+        'start_level': start_level.astype(np.int64),
+        'policy_dtype': np.uint8 if len(steps) <= 256 else np.uint16,
+    }
+
+
+def _optimal_dispatch_functions(backend: str | None) -> tuple:
+    """Rückwärts- und Vorwärtsdurchlauf der optimalen Fahrweise für das gewählte Backend."""
+    if resolve_simulation_backend(backend) == "numba":
+        return _optimal_dispatch_backward_jit, _optimal_dispatch_forward_jit
+    return _optimal_dispatch_backward_numpy, _optimal_dispatch_forward_numpy
+
+
+def _optimal_dispatch_totals(flows: dict, price_grid: np.ndarray, price_feed_in: np.ndarray) -> np.ndarray:
+    """Jahressummen je Spur (Spuren × BATCH_TOTAL_COLUMNS) aus den Energieflüssen der optimalen Fahrweise."""
+    return np.column_stack([
+        flows['Battery_Charge_kWh'].sum(axis=1),
+        flows['Battery_Discharge_kWh'].sum(axis=1),
+        flows['Battery_Charge_Losses_kWh'].sum(axis=1),
+        flows['Battery_Discharge_Losses_kWh'].sum(axis=1),
+        flows['Grid_Import_kWh'].sum(axis=1),
+        flows['Grid_Export_kWh'].sum(axis=1),
+        np.einsum('ij,j->i', flows['Grid_Import_kWh'], price_grid),  # je Spur unabhängig von der Spurzahl
+        np.einsum('ij,j->i', flows['Grid_Export_kWh'], price_feed_in),
+        flows['Grid_Charge_kWh'].sum(axis=1),
+        flows['Grid_Discharge_kWh'].sum(axis=1),
+    ])
+
+
+def _rolling_horizon_steps(
+    surplus, deficit, input_row, price_grid, price_feed_in, start, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh, battery_efficiency_charge, battery_efficiency_discharge,
+    plan_buy, plan_grid_charge, plan_grid_discharge, plan_discharge_limit,
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+    curve_lookups, soc, totals_out, flows_out
+):
+    """
+    Ausführung eines Plans der rollierenden Optimierung mit den tatsächlichen Eingangsreihen ab
+    Intervall start (Spuren × plan_buy.shape[1] Intervalle).
+
+    Übernommen wird nur der netzgeführte Anteil des Plans: plan_grid_charge (Netzladung) bzw.
+    plan_grid_discharge (Netzentladung) je Spur und Intervall; plan_buy sperrt wie bei
+    buy_from_grid die Entladung an die Last, plan_discharge_limit begrenzt sie (vom Plan
+    zurückgehaltene Energie, inf: unbegrenzt). Im Übrigen fährt die Batterie PV-geführt mit dem
+    tatsächlichen Überschuss bzw. der tatsächlichen Restlast (_dispatch_interval). soc wird
+    fortgeschrieben, totals_out (Spuren × BATCH_TOTAL_COLUMNS) aufsummiert; flows_out
+    (Spalten aus DISPATCH_KERNEL_BUFFERS ohne Direktverbrauch × Spuren × Zeit) oder leeres Array.
+    """
+    charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve = _borrowed_curves(
+        charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve
+    )
+    num_lanes = len(soc)
+    record_flows = flows_out.shape[2] > 0
+    for t in range(plan_buy.shape[1]):
+        i = start + t
+        for k in range(num_lanes):
+            # Vom Plan zurückgehaltene Restlast deckt das Netz
+            held_consumption = max(deficit[input_row[k], i] - plan_discharge_limit[k, t], 0.0)
+            (current_soc_kwh, charge_from_pv, charge_losses, discharge_to_consumption, discharge_losses,
+             grid_charge, grid_discharge, grid_import, grid_export) = _dispatch_interval(
+                surplus[input_row[k], i], deficit[input_row[k], i] - held_consumption, soc[k], min_soc_kwh[k], max_soc_kwh[k],
+                max_charge_kwh[k], max_discharge_kwh[k], battery_efficiency_charge, battery_efficiency_discharge,
+                plan_buy[k, t], plan_grid_discharge[k, t] > 0, plan_grid_charge[k, t], plan_grid_discharge[k, t],
+                charge_power_curve, discharge_power_curve, charge_efficiency_curve, discharge_efficiency_curve,
+                curve_lookups[k]
+            )
+            grid_import += held_consumption
+            soc[k] = current_soc_kwh
+            totals_out[k, 0] += charge_from_pv
+            totals_out[k, 1] += discharge_to_consumption
+            totals_out[k, 2] += charge_losses
+            totals_out[k, 3] += discharge_losses
+            totals_out[k, 4] += grid_import
+            totals_out[k, 5] += grid_export
+            totals_out[k, 6] += grid_import * price_grid[i]
+            totals_out[k, 7] += grid_export * price_feed_in[i]
+            totals_out[k, 8] += grid_charge
+            totals_out[k, 9] += grid_discharge
+            if record_flows:
+                flows_out[0, k, i] = current_soc_kwh
+                flows_out[1, k, i] = charge_from_pv
+                flows_out[2, k, i] = discharge_to_consumption
+                flows_out[3, k, i] = charge_losses
+                flows_out[4, k, i] = discharge_losses
+                flows_out[5, k, i] = grid_import
+                flows_out[6, k, i] = grid_export
+                flows_out[7, k, i] = grid_charge
+                flows_out[8, k, i] = grid_discharge
+
+
+_rolling_horizon_steps_jit = _jit_kernel(_rolling_horizon_steps)
+
+
+def solve_optimal_dispatch_batch(
+    surplus, deficit, input_row, price_grid, price_feed_in,
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge: float, battery_efficiency_discharge: float,
+    soc_levels: int | None = None,
+    backend: str | None = None,
+    return_flows: bool = False,
+    battery_curves=None
+) -> dict:
+    """
+    Kostenoptimale Fahrweise mit vollständiger Voraussicht (dynamische Programmierung) für viele
+    Spuren (Kapazitäten bzw. Kapazität × Jahr) in einem Durchlauf.
+
+    Der SOC wird je Spur auf soc_levels Stufen zwischen min_soc_kwh und max_soc_kwh diskretisiert.
+    Je Intervall darf der SOC um so viele Stufen steigen bzw. fallen, wie die Lade-/Entladeleistung
+    zulässt. Laden und Entladen am Netz sind erlaubt; die Netzkosten je Intervall betragen
+    Bezugspreis × Netzbezug bzw. -Einspeisepreis × Einspeisung. Rückwärtsinduktion (ohne Restwert
+    am Jahresende) liefert die optimale Politik, ein Vorwärtsdurchlauf ab dem auf die nächste Stufe
+    gerundeten Anfangs-SOC die Energieflüsse. Die Ergebnisse sind eine obere Schranke für
+    heuristische Strategien (bis auf die Diskretisierung der Leistung in SOC-Stufen).
+
+    Args:
+        surplus, deficit (np.ndarray): PV-Überschuss und Restlast nach Direktverbrauch
+            (Eingangszeilen × Zeit, kWh), wie beim Batch-Kern.
+        input_row (np.ndarray): Eingangszeile je Spur.
+        price_grid, price_feed_in (np.ndarray): Preise je Intervall (Euro/kWh).
+        initial_soc_kwh ... max_discharge_kwh (np.ndarray): Ein Eintrag je Spur (kWh bzw. kWh je Intervall).
+        battery_efficiency_charge, battery_efficiency_discharge (float): Wirkungsgrade (0-1).
+        soc_levels (int | None): Anzahl SOC-Stufen. None: DEFAULT_OPTIMAL_DISPATCH_SOC_LEVELS.
+        backend (str | None): "auto", "numba" oder "python".
+        return_flows (bool): Zusätzlich Zeitreihen je Spur ('flows', Spalten aus DISPATCH_KERNEL_BUFFERS
+            ohne Direktverbrauch, je Matrix Spuren × Zeit).
+        battery_curves (dict | tuple | None): Kennlinien (siehe resolve_battery_curves); die zulässigen
+            SOC-Schritte hängen dann von der SOC-Stufe, der Netzsaldo eines Schritts von seiner Leistung ab.
+
+    Returns:
+        dict: 'totals' (Spuren × BATCH_TOTAL_COLUMNS), 'optimal_cost' (Netzkosten je Spur in Euro),
+        'initial_soc_kwh' und 'final_soc_kwh' (je Spur, auf Stufen gerundet), 'soc_levels'
+        und optional 'flows'.
+    """
+    grid = _optimal_dispatch_grid(
+        initial_soc_kwh, min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh,
+        battery_efficiency_charge, battery_efficiency_discharge, soc_levels, battery_curves
+    )
+    soc_levels = grid['soc_levels']
+    input_row = np.ascontiguousarray(input_row, dtype=np.int64)
+    num_lanes = len(input_row)
+    num_periods = surplus.shape[1]
+    residual = np.ascontiguousarray(deficit - surplus)
+    price_grid = np.ascontiguousarray(price_grid, dtype=np.float64)
+    price_feed_in = np.ascontiguousarray(price_feed_in, dtype=np.float64)
+    backward, forward = _optimal_dispatch_functions(backend)
+
+    # Politik (Zeit × Spuren × Stufen) blockweise, damit der Speicherbedarf begrenzt bleibt
+    policy_bytes_per_lane = max(num_periods * soc_levels * np.dtype(grid['policy_dtype']).itemsize, 1)
+    block_lanes = max(int(OPTIMAL_DISPATCH_MAX_POLICY_BYTES // policy_bytes_per_lane), 1)
+
+    totals_out = np.zeros((num_lanes, len(BATCH_TOTAL_COLUMNS)))
+    final_soc_kwh = np.zeros(num_lanes)
+    flows_out = {column: np.empty((num_lanes, num_periods)) for column in DISPATCH_KERNEL_BUFFERS
+                 if column != 'Direct_Self_Consumption_kWh'} if return_flows else None
+    for start in range(0, num_lanes, block_lanes):
+        block = slice(start, min(start + block_lanes, num_lanes))
+        num_block_lanes = block.stop - block.start
+        levels = np.empty((num_block_lanes, num_periods + 1), dtype=np.int64)
+        levels[:, 0] = grid['start_level'][block]
+        if grid['active'][block].any():
+            policy = np.empty((num_periods, num_block_lanes, soc_levels), dtype=grid['policy_dtype'])
+            value = np.empty((num_block_lanes, soc_levels))
+            backward(residual, input_row[block], price_grid, price_feed_in, grid['grid_delta'][block],
+                     grid['first_offset'][block], grid['last_offset'][block], grid['idle_offset'], policy, value)
+            forward(policy, grid['idle_offset'], levels)
+            del policy
+        else:
+            # Kein Speicher im Block: SOC bleibt auf der Anfangsstufe
+            levels[:, 1:] = levels[:, :1]
+
+        flows = _optimal_dispatch_flows(
+            levels, grid['soc_step'][block], grid['min_soc_kwh'][block],
+            surplus[input_row[block]], deficit[input_row[block]],
+            grid['grid_delta'][block], grid['idle_offset']
+        )
+        final_soc_kwh[block] = grid['min_soc_kwh'][block] + levels[:, -1] * grid['soc_step'][block]
+        totals_out[block] = _optimal_dispatch_totals(flows, price_grid, price_feed_in)
+        if flows_out is not None:
+            for column, values in flows_out.items():
+                values[block] = flows[column]
+
+    result = {
+        'totals': totals_out,
+        'optimal_cost': totals_out[:, 6] - totals_out[:, 7],
+        'initial_soc_kwh': grid['min_soc_kwh'] + grid['start_level'] * grid['soc_step'],
+        'final_soc_kwh': final_soc_kwh,
+        'soc_levels': soc_levels,
+    }
+    if flows_out is not None:
+        result['flows'] = flows_out
+    return result
+
+
+def run_optimal_dispatch(
+    pv_generation_kwh,
+    consumption_kwh,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_kwh: float,
+    min_soc_kwh: float,
+    max_soc_kwh: float,
+    max_charge_kwh: float,
+    max_discharge_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    backend: str | None = None,
+    soc_levels: int | None = None,
+    battery_curves=None
+) -> dict:
+    """
+    Kostenoptimale Fahrweise für eine Zeitreihe (siehe solve_optimal_dispatch_batch).
+
+    Args:
+        pv_generation_kwh, consumption_kwh (array-like): PV-Erzeugung und Verbrauch je Intervall in kWh.
+        price_grid_per_kwh, price_feed_in_per_kwh (float | pd.Series): Bezugs- und Einspeisepreis.
+        Übrige Argumente wie run_dispatch_kernel, zusätzlich soc_levels (Anzahl SOC-Stufen).
+
+    Returns:
+        dict: Arrays je Spalte aus DISPATCH_KERNEL_BUFFERS sowie 'final_soc_kwh',
+        'initial_soc_kwh' (auf eine SOC-Stufe gerundet) und 'optimal_cost' (Netzkosten in Euro).
+    """
+    index = consumption_kwh.index if isinstance(consumption_kwh, pd.Series) else None
+    pv = _as_float_array(pv_generation_kwh)
+    load = _as_float_array(consumption_kwh)
+    if pv.shape != load.shape:
+        raise ValueError(f"PV- und Verbrauchsreihe haben unterschiedliche Längen: {len(pv)} vs. {len(load)}")
+    num_periods = len(load)
+    direct_self_consumption = np.minimum(pv, load)
+    solution = solve_optimal_dispatch_batch(
+        (pv - direct_self_consumption)[np.newaxis, :], (load - direct_self_consumption)[np.newaxis, :],
+        np.zeros(1, dtype=np.int64),
+        _price_array(price_grid_per_kwh, index, num_periods), _price_array(price_feed_in_per_kwh, index, num_periods),
+        np.array([initial_soc_kwh], dtype=np.float64), np.array([min_soc_kwh], dtype=np.float64),
+        np.array([max_soc_kwh], dtype=np.float64), np.array([max_charge_kwh], dtype=np.float64),
+        np.array([max_discharge_kwh], dtype=np.float64),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge),
+        soc_levels=soc_levels, backend=backend, return_flows=True, battery_curves=battery_curves
+    )
+    result = {column: values[0] for column, values in solution['flows'].items()}
+    result['Direct_Self_Consumption_kWh'] = direct_self_consumption
+    result['final_soc_kwh'] = float(solution['final_soc_kwh'][0])
+    result['initial_soc_kwh'] = float(solution['initial_soc_kwh'][0])
+    result['optimal_cost'] = float(solution['optimal_cost'][0])
+    return result
+
+
+def _rolling_horizon_forecast(forecast, surplus, deficit, periods_per_day: int, forecast_noise: float, rng):
+    """
+    Prognosefunktion der rollierenden Optimierung: (start, stop) -> (PV-Überschuss, Restlast)
+    je Eingangszeile für die Intervalle start..stop-1.
+    """
+    if callable(forecast):
+        return lambda start, stop: forecast(surplus, deficit, start, stop)
+    forecast = str(forecast).lower()
+    if forecast == "perfect":
+        return lambda start, stop: (surplus[:, start:stop], deficit[:, start:stop])
+    if forecast == "noisy":
+        def noisy(start, stop):
+            # Neue Prognosefehler je Fenster (auch für bereits prognostizierte Intervalle)
+            noise = rng.normal(0.0, forecast_noise, size=(2,) + surplus[:, start:stop].shape)
+            return (np.maximum(surplus[:, start:stop] * (1.0 + noise[0]), 0.0),
+                    np.maximum(deficit[:, start:stop] * (1.0 + noise[1]), 0.0))
+        return noisy
+    if forecast == "persistence":
+        def persistence(start, stop):
+            # Die letzten 24 h wiederholen sich (am Jahresanfang: letzter Tag des Jahres)
+            source = (start - periods_per_day + np.arange(stop - start) % periods_per_day) % surplus.shape[1]
+            return surplus[:, source], deficit[:, source]
+        return persistence
+    raise ValueError(f"Unbekannte Prognose: {forecast}. Erlaubt: {', '.join(MPC_FORECASTS)} oder eine Funktion.")
+
+
+def solve_rolling_horizon_batch(
+    surplus, deficit, input_row, price_grid, price_feed_in,
+    initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+    max_charge_kwh, max_discharge_kwh,
+    battery_efficiency_charge: float, battery_efficiency_discharge: float,
+    horizon_periods: int, reoptimize_periods: int, periods_per_day: int,
+    forecast="persistence", forecast_noise: float = 0.0, forecast_seed: int | None = None,
+    window_time_budget_seconds: float | None = None,
+    soc_levels: int | None = None, backend: str | None = None, return_flows: bool = False,
+    battery_curves=None
+) -> dict:
+    """
+    Rollierende Optimierung (Model Predictive Control) für viele Speicher gleichzeitig.
+
+    Alle reoptimize_periods Intervalle wird ab dem aktuellen SOC ein Fenster von horizon_periods
+    Intervallen mit der dynamischen Programmierung der optimalen Fahrweise gelöst (alle Spuren
+    gemeinsam), jedoch auf Basis einer Prognose von PV-Überschuss und Restlast. Preise gelten im
+    Fenster als bekannt (Day-Ahead). Ausgeführt werden nur die ersten Intervalle des Plans, und
+    zwar nur dessen netzgeführter Anteil (Netzladung bzw. -entladung); im Übrigen fährt die Batterie
+    mit den tatsächlichen Reihen PV-geführt (_rolling_horizon_steps). Prognosefehler führen so nie
+    zu Netzladung, die der Plan aus prognostiziertem PV-Überschuss vorgesehen hatte.
+
+    Die dynamische Programmierung ist im Fenster exakt und braucht keinen iterativen Warmstart;
+    das Fenster startet auf der SOC-Stufe, die dem tatsächlichen SOC am nächsten liegt. Dauert eine
+    Fensterlösung länger als window_time_budget_seconds, wird der vorige Plan weitergefahren, solange er reicht.
+
+    Args:
+        surplus ... battery_efficiency_discharge: wie solve_optimal_dispatch_batch.
+        horizon_periods (int): Fensterlänge in Intervallen.
+        reoptimize_periods (int): Intervalle zwischen zwei Neuplanungen (höchstens horizon_periods).
+        periods_per_day (int): Intervalle je Tag (Persistenzprognose).
+        forecast (str | callable): "persistence", "noisy", "perfect" oder eine Funktion
+            forecast(surplus, deficit, start, stop) -> (Überschuss, Restlast) je Eingangszeile.
+        forecast_noise (float): Relative Standardabweichung der Prognose "noisy".
+        forecast_seed (int | None): Startwert des Zufallsgenerators der Prognose "noisy".
+        window_time_budget_seconds (float | None): Zeitbudget je Fensterlösung (None: unbegrenzt).
+        soc_levels (int | None): Anzahl SOC-Stufen. None: DEFAULT_OPTIMAL_DISPATCH_SOC_LEVELS.
+        backend (str | None): "auto", "numba" oder "python".
+        return_flows (bool): Energieflüsse je Spur und Intervall zurückgeben.
+        battery_curves (dict | tuple | None): Kennlinien (siehe solve_optimal_dispatch_batch).
+
+    Returns:
+        dict: wie solve_optimal_dispatch_batch ('optimal_cost' sind hier die tatsächlichen
+        Netzkosten der rollierenden Fahrweise, SOC-Werte nicht auf Stufen gerundet), zusätzlich 'solve_times' (Sekunden je gelöstem
+        Fenster), 'num_windows' und 'reused_plans' (Fenster ohne Neuplanung wegen Zeitbudget).
+    """
+    grid = _optimal_dispatch_grid(
+        initial_soc_kwh, min_soc_kwh, max_soc_kwh, max_charge_kwh, max_discharge_kwh,
+        battery_efficiency_charge, battery_efficiency_discharge, soc_levels, battery_curves
+    )
+    soc_levels = grid['soc_levels']
+    input_row = np.ascontiguousarray(input_row, dtype=np.int64)
+    num_lanes = len(input_row)
+    num_periods = surplus.shape[1]
+    horizon_periods = max(int(horizon_periods), 1)
+    reoptimize_periods = min(max(int(reoptimize_periods), 1), horizon_periods)
+    surplus = np.ascontiguousarray(surplus, dtype=np.float64)
+    deficit = np.ascontiguousarray(deficit, dtype=np.float64)
+    price_grid = np.ascontiguousarray(price_grid, dtype=np.float64)
+    price_feed_in = np.ascontiguousarray(price_feed_in, dtype=np.float64)
+    backward, forward = _optimal_dispatch_functions(backend)
+    predict = _rolling_horizon_forecast(
+        forecast, surplus, deficit, periods_per_day, forecast_noise, np.random.default_rng(forecast_seed)
+    )
+
+    # Ausführung mit dem Intervall-Schritt der PV-geführten Strategie (Kennlinien wie im Batch-Kern)
+    min_soc_kwh = grid['min_soc_kwh']
+    max_soc_kwh = np.asarray(max_soc_kwh, dtype=np.float64)
+    max_charge_kwh = np.asarray(max_charge_kwh, dtype=np.float64)
+    max_discharge_kwh = np.asarray(max_discharge_kwh, dtype=np.float64)
+    curves = resolve_battery_curves(battery_curves)
+    curve_lookups = np.array([
+        _battery_curve_lookup(min_soc_kwh[k], max_soc_kwh[k], max_charge_kwh[k], max_discharge_kwh[k],
+                              battery_efficiency_discharge, *curves)
+        for k in range(num_lanes)
+    ], dtype=np.float64).reshape(num_lanes, 12)
+    execute = _rolling_horizon_steps_jit if resolve_simulation_backend(backend) == "numba" else _rolling_horizon_steps
+    soc = np.minimum(np.maximum(np.asarray(initial_soc_kwh, dtype=np.float64), min_soc_kwh), max_soc_kwh)
+    initial_soc = soc.copy()
+    safe_step = np.where(grid['active'], grid['soc_step'], 1.0)
+    # Netzsaldo einer SOC-Stufe Laden (brutto) bzw. Entladen (netto) je Spur
+    idle_offset = grid['idle_offset']
+    step_charge_kwh = grid['grid_delta'][:, idle_offset + 1, np.newaxis] if grid['grid_delta'].shape[1] > idle_offset + 1 else np.inf
+    step_discharge_kwh = -grid['grid_delta'][:, idle_offset - 1, np.newaxis] if idle_offset > 0 else np.inf
+    totals_out = np.zeros((num_lanes, len(BATCH_TOTAL_COLUMNS)))
+    flows_out = np.zeros((len(DISPATCH_KERNEL_BUFFERS) - 1, num_lanes, num_periods if return_flows else 0))
+
+    # Politik und Wertfunktion werden je Fenster wiederverwendet
+    policy = np.empty((horizon_periods, num_lanes, soc_levels), dtype=grid['policy_dtype'])
+    value = np.empty((num_lanes, soc_levels))
+    plan = forecast_surplus = forecast_deficit = None
+    plan_start = plan_stop = 0
+    solve_times = []
+    num_windows = reused_plans = 0
+    active = bool(grid['active'].any())
+    for start in range(0, num_periods, reoptimize_periods):
+        stop = min(start + reoptimize_periods, num_periods)
+        num_windows += 1
+        if not active:
+            # Kein Speicher: kein Plan, der Schritt rechnet die Netzflüsse ohne Speicher
+            no_plan = np.zeros((num_lanes, stop - start))
+            execute(surplus, deficit, input_row, price_grid, price_feed_in, start, min_soc_kwh, max_soc_kwh,
+                    max_charge_kwh, max_discharge_kwh, battery_efficiency_charge, battery_efficiency_discharge,
+                    no_plan > 0, no_plan, no_plan, no_plan + np.inf, *curves, curve_lookups, soc, totals_out, flows_out)
+            continue
+        over_budget = (window_time_budget_seconds is not None and solve_times
+                       and solve_times[-1] > window_time_budget_seconds)
+        if over_budget and stop <= plan_stop:
+            reused_plans += 1
+        else:
+            window_stop = min(start + horizon_periods, num_periods)
+            window_periods = window_stop - start
+            forecast_surplus, forecast_deficit = (
+                np.asarray(values, dtype=np.float64) for values in predict(start, window_stop))
+            residual = np.ascontiguousarray(forecast_deficit - forecast_surplus)
+            started = time.perf_counter()
+            window_policy = policy[:window_periods]
+            backward(residual, input_row, price_grid[start:window_stop], price_feed_in[start:window_stop],
+                     grid['grid_delta'], grid['first_offset'], grid['last_offset'], grid['idle_offset'],
+                     window_policy, value)
+            # Fenster startet auf der Stufe, die dem tatsächlichen SOC am nächsten liegt
+            plan = np.empty((num_lanes, window_periods + 1), dtype=np.int64)
+            plan[:, 0] = np.where(grid['active'], np.clip(np.rint((soc - min_soc_kwh) / safe_step), 0, soc_levels - 1), 0)
+            forward(window_policy, grid['idle_offset'], plan)
+            solve_times.append(time.perf_counter() - started)
+            plan_start, plan_stop = start, window_stop
+
+        # Netzgeführter Anteil des Plans: Netzladung bzw. -entladung gegenüber der Prognose. Ladung,
+        # die der Plan aus prognostiziertem PV-Überschuss vorsieht, wird nie aus dem Netz nachgekauft;
+        # übersteigt der tatsächliche Überschuss die Prognose, verdrängt er entsprechend Netzladung.
+        # Mengen unter einer SOC-Stufe sind Rundung des Rasters und werden PV-geführt gefahren.
+        segment = slice(start - plan_start, stop - plan_start)
+        planned = _optimal_dispatch_flows(
+            plan[:, segment.start:segment.stop + 1], grid['soc_step'], min_soc_kwh,
+            forecast_surplus[input_row, segment], forecast_deficit[input_row, segment],
+            grid['grid_delta'], grid['idle_offset']
+        )
+        actual_surplus = surplus[input_row, start:stop]
+        actual_deficit = deficit[input_row, start:stop]
+        plan_buy = planned['Grid_Charge_kWh'] >= step_charge_kwh
+        plan_grid_charge = np.where(plan_buy, np.maximum(
+            planned['Grid_Charge_kWh'] - np.maximum(actual_surplus - forecast_surplus[input_row, segment], 0.0), 0.0), 0.0)
+        plan_grid_discharge = np.where(planned['Grid_Discharge_kWh'] >= step_discharge_kwh, planned['Grid_Discharge_kWh'], 0.0)
+        # Hält der Plan Energie zurück (mindestens eine SOC-Stufe der prognostizierten Restlast bleibt
+        # ungedeckt), wird nur die Mehrlast gegenüber der Prognose zusätzlich aus der Batterie gedeckt
+        held = planned['Battery_Discharge_kWh'] + step_discharge_kwh <= forecast_deficit[input_row, segment]
+        plan_discharge_limit = np.where(held, planned['Battery_Discharge_kWh'] + np.maximum(
+            actual_deficit - forecast_deficit[input_row, segment], 0.0), np.inf)
+        execute(surplus, deficit, input_row, price_grid, price_feed_in, start, min_soc_kwh, max_soc_kwh,
+                max_charge_kwh, max_discharge_kwh, battery_efficiency_charge, battery_efficiency_discharge,
+                plan_buy, plan_grid_charge, plan_grid_discharge, plan_discharge_limit,
+                *curves, curve_lookups, soc, totals_out, flows_out)
+
+    result = {
+        'totals': totals_out,
+        'optimal_cost': totals_out[:, 6] - totals_out[:, 7],
+        'initial_soc_kwh': initial_soc,
+        'final_soc_kwh': soc,
+        'soc_levels': soc_levels,
+        'solve_times': np.asarray(solve_times),
+        'num_windows': num_windows,
+        'reused_plans': reused_plans,
+    }
+    if return_flows:
+        columns = [column for column in DISPATCH_KERNEL_BUFFERS if column != 'Direct_Self_Consumption_kWh']
+        result['flows'] = dict(zip(columns, flows_out))
+    return result
+
+
+def run_rolling_horizon_dispatch(
+    pv_generation_kwh,
+    consumption_kwh,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_kwh: float,
+    min_soc_kwh: float,
+    max_soc_kwh: float,
+    max_charge_kwh: float,
+    max_discharge_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    time_interval_hours: float,
+    backend: str | None = None,
+    battery_curves=None,
+    **rolling_horizon
+) -> dict:
+    """
+    Rollierende Optimierung für eine Zeitreihe (siehe solve_rolling_horizon_batch).
+
+    Args:
+        pv_generation_kwh ... battery_efficiency_discharge: wie run_optimal_dispatch.
+        time_interval_hours (float): Intervalldauer in Stunden (Umrechnung der MPC_*-Werte).
+        backend (str | None): "auto", "numba" oder "python".
+        battery_curves (dict | tuple | None): Kennlinien (siehe resolve_battery_curves).
+        **rolling_horizon: Überschreibt einzelne Werte aus rolling_horizon_parameters
+            (z.B. forecast, horizon_periods, window_time_budget_seconds).
+
+    Returns:
+        dict: wie run_optimal_dispatch, zusätzlich 'solve_times', 'num_windows' und 'reused_plans'.
+    """
+    index = consumption_kwh.index if isinstance(consumption_kwh, pd.Series) else None
+    pv = _as_float_array(pv_generation_kwh)
+    load = _as_float_array(consumption_kwh)
+    if pv.shape != load.shape:
+        raise ValueError(f"PV- und Verbrauchsreihe haben unterschiedliche Längen: {len(pv)} vs. {len(load)}")
+    num_periods = len(load)
+    direct_self_consumption = np.minimum(pv, load)
+    solution = solve_rolling_horizon_batch(
+        (pv - direct_self_consumption)[np.newaxis, :], (load - direct_self_consumption)[np.newaxis, :],
+        np.zeros(1, dtype=np.int64),
+        _price_array(price_grid_per_kwh, index, num_periods), _price_array(price_feed_in_per_kwh, index, num_periods),
+        np.array([initial_soc_kwh], dtype=np.float64), np.array([min_soc_kwh], dtype=np.float64),
+        np.array([max_soc_kwh], dtype=np.float64), np.array([max_charge_kwh], dtype=np.float64),
+        np.array([max_discharge_kwh], dtype=np.float64),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge),
+        **{**rolling_horizon_parameters(time_interval_hours), **rolling_horizon},
+        backend=backend, return_flows=True, battery_curves=battery_curves
+    )
+    result = {column: values[0] for column, values in solution['flows'].items()}
+    result['Direct_Self_Consumption_kWh'] = direct_self_consumption
+    result['final_soc_kwh'] = float(solution['final_soc_kwh'][0])
+    result['initial_soc_kwh'] = float(solution['initial_soc_kwh'][0])
+    result['optimal_cost'] = float(solution['optimal_cost'][0])
+    for key in ('solve_times', 'num_windows', 'reused_plans'):
+        result[key] = solution[key]
+    return result
+
+
+def summarize_solve_times(solve_times) -> dict:
+    """Kennzahlen der Fensterlösungszeiten einer rollierenden Optimierung (Sekunden)."""
+    solve_times = np.asarray(solve_times, dtype=np.float64)
+    if len(solve_times) == 0:
+        return {'count': 0, 'total': 0.0, 'mean': 0.0, 'max': 0.0}
+    return {
+        'count': len(solve_times),
+        'total': float(solve_times.sum()),
+        'mean': float(solve_times.mean()),
+        'max': float(solve_times.max()),
+    }
+
+
+class DispatchCache:
+    """
+    LRU-Cache für Ergebnisse des Batch-Kerns.
+
+    Bei der PV-geführten Betriebsstrategie hängen die Energieflüsse nicht von den Strompreisen ab.
+    Gespeichert werden daher je Parametersatz (Eingangsreihen, Kapazitäten, Leistungen,
+    Wirkungsgrade, SOC-Fenster, Alterung) die Energiesummen und - für variable Tarife - die
+    Netzbezugs-/Einspeisematrizen (Kapazitäten × Zeit). Eine Preisänderung wird dann ohne
+    neue Simulation als Skalarprodukt über die gespeicherten Flüsse bewertet.
+    Zugriffe sind threadsicher (z.B. Rasterprüfung der adaptiven Suche im Hintergrund).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _entry_bytes(entry: dict) -> int:
+        return sum(value.nbytes for value in entry.values() if isinstance(value, np.ndarray))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._entry_bytes(entry) for entry in self._entries.values())
+
+    def get(self, key, require_flows: bool = False):
+        """Liefert einen Eintrag (oder None); mit require_flows nur, wenn die Flussmatrizen vorliegen."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (require_flows and entry.get('grid_import') is None):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry: dict):
+        """Speichert einen Eintrag und verdrängt bei Bedarf die am längsten ungenutzten Einträge."""
+        if self._entry_bytes(entry) > self.max_bytes:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while self.nbytes > self.max_bytes:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Prozessweiter Cache (bleibt bei Streamlit-Reruns erhalten, da das Modul nur einmal importiert wird)
+DISPATCH_CACHE = DispatchCache(DISPATCH_CACHE_MAX_BYTES)
+
+
+def _array_fingerprint(*arrays) -> str:
+    """Kurzer Hash über den Inhalt mehrerer Arrays (Schlüssel für den DispatchCache)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(str(values.shape).encode())
+        digest.update(values.view(np.uint8))
+    return digest.hexdigest()
+
+
+def reprice_flows(grid_import_kwh, grid_export_kwh, price_grid_per_kwh, price_feed_in_per_kwh, index=None) -> tuple:
+    """
+    Bewertet gespeicherte Netzflüsse mit (neuen) Preisen.
+
+    Args:
+        grid_import_kwh (np.ndarray): Netzbezug je Intervall (Vektor oder Matrix Kapazitäten × Zeit).
+        grid_export_kwh (np.ndarray): Einspeisung je Intervall (gleiche Form).
+        price_grid_per_kwh (float | pd.Series): Preis für Netzbezug in Euro/kWh.
+        price_feed_in_per_kwh (float | pd.Series): Preis für Netzeinspeisung in Euro/kWh.
+        index (pd.Index | None): Zeitindex der Flüsse (für die Ausrichtung von Preis-Zeitreihen).
+
+    Returns:
+        tuple: (grid_import_cost, grid_export_revenue) je Zeile.
+    """
+    num_periods = np.shape(grid_import_kwh)[-1]
+    # Zeilenweise Skalarprodukte (einsum statt BLAS): Ergebnis je Zeile unabhängig von der Zeilenzahl
+    import_cost = np.einsum('...j,j->...', grid_import_kwh, _price_array(price_grid_per_kwh, index, num_periods))
+    export_revenue = np.einsum('...j,j->...', grid_export_kwh, _price_array(price_feed_in_per_kwh, index, num_periods))
+    return import_cost, export_revenue
+
+
+def simulate_capacity_batch(
+    consumption_series: pd.Series,
+    pv_generation_series: pd.Series,
+    battery_capacities_kwh,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    battery_max_charge_kw,
+    battery_max_discharge_kw,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    annual_capacity_loss_percent: float = 2.0,
+    simulation_year: int = 1,
+    return_soc: bool = False,
+    backend: str | None = None,
+    use_cache: bool = True,
+    validation_level: str | None = None,
+    dispatch_strategy: str | None = None,
+    battery_curves: dict | None = None,
+    return_cycles: bool = False,
+    curtailment_totals: dict | None = None
+) -> dict:
+    """
+    Simuliert viele Speicherkapazitäten in einem gemeinsamen Durchlauf über das Jahr.
+
+    Direktverbrauch, PV-Überschuss und Restlast werden einmalig für alle Kapazitäten berechnet;
+    anschließend werden die SOC-Zustände aller Kapazitäten im Gleichschritt fortgeschrieben.
+    Es werden nur Jahressummen je Kapazität gebildet, keine Zeitreihen je Kapazität.
+
+    Args:
+        consumption_series (pd.Series): Stromverbrauch in kWh.
+        pv_generation_series (pd.Series): PV-Erzeugung in kWh.
+        battery_capacities_kwh (array-like): Speicherkapazitäten in kWh.
+        battery_efficiency_charge (float): Lade-Wirkungsgrad (0-1).
+        battery_efficiency_discharge (float): Entlade-Wirkungsgrad (0-1).
+        battery_max_charge_kw (float | array-like): Max. Ladeleistung in kW (je Kapazität oder global).
+        battery_max_discharge_kw (float | array-like): Max. Entladeleistung in kW (je Kapazität oder global).
+        price_grid_per_kwh (float | pd.Series): Preis für Netzbezug in Euro/kWh.
+        price_feed_in_per_kwh (float | pd.Series): Preis für Netzeinspeisung in Euro/kWh.
+        initial_soc_percent, min_soc_percent, max_soc_percent (float): SOC-Parameter in %.
+        annual_capacity_loss_percent (float): Jährlicher Kapazitätsverlust in %.
+        simulation_year (int): Jahr der Simulation (für Kapazitätsalterung).
+        return_soc (bool): Wenn True, wird die SOC-Matrix (Kapazitäten × Zeit) zurückgegeben
+            (bei unregelmäßigen Intervallen der SOC am Ende jedes Eingangsintervalls).
+        backend (str | None): "auto", "numba" oder "python".
+        use_cache (bool): Energieflüsse im DispatchCache ablegen bzw. wiederverwenden. Bei reinen
+            Preisänderungen entfällt dann die Simulation (Neubewertung über reprice_flows).
+        validation_level (str | None): Prüfstufe der Energiebilanz je Kapazität ("off", "summary").
+            Da keine Zeitreihen je Kapazität entstehen, wird "interval" wie "summary" behandelt.
+            None: DEFAULT_ENERGY_BALANCE_VALIDATION.
+        dispatch_strategy (str | None): "pv_first", "threshold", "optimal" oder "rolling_horizon" (siehe
+            simulate_one_year; "optimal" und "rolling_horizon" lösen alle Kapazitäten gemeinsam über
+            solve_optimal_dispatch_batch bzw. solve_rolling_horizon_batch).
+            Außer bei "pv_first" hängen die Energieflüsse von den Preisen ab; die Preise gehen dann in
+            den Cache-Schlüssel ein (keine Neubewertung über reprice_flows).
+        battery_curves (dict | None): Leistungs-/Wirkungsgradkennlinien (siehe simulate_one_year).
+        return_cycles (bool): Wenn True, zählt der Kern die Zyklen je Kapazität während der Simulation
+            (Rainflow-Zählung ohne SOC-Matrix, siehe new_rainflow_buffers; ohne Dispatch-Cache).
+        curtailment_totals (dict | None): Clipping und Abregelung der Vorverarbeitung (siehe simulate_one_year).
+
+    Returns:
+        dict: 'battery_capacity_kwh' (Array), 'kpis' (Liste von KPI-Dictionaries im Format von
+        simulate_one_year()['kpis']), 'soc_kwh' (Matrix oder None), 'cycles' (bei return_cycles
+        summarize_rainflow je Kapazität plus 'cycle_counts' und 'mean_soc_percent', sonst None) und 'simulation_metadata'
+        (mit 'energy_balance_validation' als Liste je Kapazität oder None und bei "rolling_horizon"
+        'rolling_horizon' mit Fensteranzahl und Lösungszeiten, sonst None).
+    """
+    num_input_periods = len(consumption_series)
+    curtailment_totals = pv_limit_totals(curtailment_totals)
+    time_interval_hours, data_resolution, substeps = detect_time_resolution(
+        consumption_series.index if isinstance(consumption_series, pd.Series) else None, num_input_periods
+    )
+    if substeps is not None:
+        # Unregelmäßige Intervalle: Simulation auf dem gemeinsamen Raster (siehe simulate_one_year)
+        consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh = expand_to_time_grid(
+            consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+            substeps, time_interval_hours
+        )
+    pv = _as_float_array(pv_generation_series)
+    load = _as_float_array(consumption_series)
+    num_periods = len(load)
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+
+    capacities = np.atleast_1d(np.asarray(battery_capacities_kwh, dtype=np.float64))
+    num_capacities = len(capacities)
+    max_charge_kw = np.broadcast_to(np.asarray(battery_max_charge_kw, dtype=np.float64), capacities.shape)
+    max_discharge_kw = np.broadcast_to(np.asarray(battery_max_discharge_kw, dtype=np.float64), capacities.shape)
+
+    # Kapazitätsalterung und SOC-Grenzen je Kapazität
+    capacity_loss_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (simulation_year - 1)
+    current_capacities = capacities * capacity_loss_factor
+    initial_soc_kwh = (initial_soc_percent / 100.0) * current_capacities
+    min_soc_kwh = (min_soc_percent / 100.0) * current_capacities
+    max_soc_kwh = (max_soc_percent / 100.0) * current_capacities
+
+    # Gemeinsame Größen für alle Kapazitäten (einmalig)
+    direct_self_consumption = np.minimum(pv, load)
+    surplus = pv - direct_self_consumption
+    deficit = load - direct_self_consumption
+    price_grid = _price_array(price_grid_per_kwh, index, num_periods)
+    price_feed_in = _price_array(price_feed_in_per_kwh, index, num_periods)
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    arbitrage = arbitrage_parameters(dispatch_strategy, time_interval_hours)
+    curves = resolve_battery_curves(battery_curves)
+    balance_efficiencies = ((None, None) if has_variable_efficiency(curves)
+                            else (battery_efficiency_charge, battery_efficiency_discharge))
+
+    # PV-geführt hängen die Energieflüsse nicht von den Preisen ab -> Cache-Schlüssel ohne Preise
+    # und Neubewertung variabler Tarife über die Flüsse; mit Arbitrage gehören die Preise zum Schlüssel
+    price_dependent = dispatch_strategy != "pv_first"
+    variable_prices = (isinstance(price_grid_per_kwh, pd.Series) or isinstance(price_feed_in_per_kwh, pd.Series)) and not price_dependent
+    cache_key = None
+    cached = None
+    if use_cache and not return_soc and not return_cycles:
+        cache_key = (
+            f'{dispatch_strategy}_batch',
+            _array_fingerprint(pv, load, capacities, max_charge_kw, max_discharge_kw,
+                               *((price_grid, price_feed_in) if price_dependent else ())),
+            tuple(None if curve is None else _array_fingerprint(curve) for curve in curves),
+            DEFAULT_OPTIMAL_DISPATCH_SOC_LEVELS if dispatch_strategy == "optimal" else None,
+            tuple(sorted(rolling_horizon_parameters(time_interval_hours).items()))
+            if dispatch_strategy == "rolling_horizon" else None,
+            float(battery_efficiency_charge), float(battery_efficiency_discharge),
+            float(initial_soc_percent), float(min_soc_percent), float(max_soc_percent),
+            float(annual_capacity_loss_percent), int(simulation_year),
+            # Schrittdauer (kWh-Grenzen je Schritt) und Aufteilung unregelmäßiger Intervalle
+            float(time_interval_hours), None if substeps is None else _array_fingerprint(substeps)
+        )
+        cached = DISPATCH_CACHE.get(cache_key, require_flows=variable_prices)
+
+    resolved_backend = resolve_simulation_backend(backend)
+    rolling_horizon_summary = None
+    if cached is not None:
+        totals_out = cached['totals']
+        grid_import_out = cached['grid_import']
+        grid_export_out = cached['grid_export']
+    else:
+        # Bei variablen Tarifen werden Netzflüsse für spätere Neubewertung mitgeschrieben
+        flow_periods = num_periods if cache_key is not None and variable_prices else 0
+        totals_out = np.zeros((num_capacities, len(BATCH_TOTAL_COLUMNS)))
+        soc_out = np.zeros((num_capacities, num_periods if return_soc else 0))
+        grid_import_out = np.zeros((num_capacities, flow_periods))
+        grid_export_out = np.zeros((num_capacities, flow_periods))
+        rainflow = new_rainflow_buffers(num_capacities) if return_cycles else (None,) * 4
+        kernel_args = (
+            surplus[np.newaxis, :], deficit[np.newaxis, :], np.zeros(num_capacities, dtype=np.int64),
+            price_grid, price_feed_in,
+            initial_soc_kwh, min_soc_kwh, max_soc_kwh,
+            np.ascontiguousarray(max_charge_kw * time_interval_hours),
+            np.ascontiguousarray(max_discharge_kw * time_interval_hours),
+            float(battery_efficiency_charge), float(battery_efficiency_discharge)
+        )
+        if dispatch_strategy == "optimal":
+            solution = solve_optimal_dispatch_batch(
+                *kernel_args, backend=resolved_backend, return_flows=return_soc or return_cycles, battery_curves=curves
+            )
+            totals_out[:] = solution['totals']
+            if return_soc:
+                soc_out = solution['flows']['SOC_kWh']
+        elif dispatch_strategy == "rolling_horizon":
+            solution = solve_rolling_horizon_batch(
+                *kernel_args, **rolling_horizon_parameters(time_interval_hours),
+                backend=resolved_backend, return_flows=return_soc or return_cycles, battery_curves=curves
+            )
+            totals_out[:] = solution['totals']
+            if return_soc:
+                soc_out = solution['flows']['SOC_kWh']
+            rolling_horizon_summary = {
+                'num_windows': solution['num_windows'],
+                'reused_plans': solution['reused_plans'],
+                'solve_times': summarize_solve_times(solution['solve_times']),
+            }
+        elif resolved_backend == "numba":
+            _pv_first_batch_kernel_jit(*kernel_args, *arbitrage, *curves, totals_out, soc_out, grid_import_out, grid_export_out, *rainflow)
+        else:
+            _pv_first_batch_numpy(*kernel_args, *arbitrage, *curves, totals_out, soc_out, grid_import_out, grid_export_out, *rainflow)
+        if return_cycles:
+            if dispatch_strategy in ("optimal", "rolling_horizon"):
+                # Die Optimierung liefert den SOC-Verlauf ohnehin -> Zählung im Anschluss
+                for k in range(num_capacities):
+                    rainflow[0][k] = count_rainflow_cycles(
+                        solution['flows']['SOC_kWh'][k], min_soc_kwh[k], max_soc_kwh[k], solution['initial_soc_kwh'][k]
+                    )
+                rainflow[1][:] = solution['flows']['SOC_kWh'].sum(axis=1)
+            else:
+                finish_rainflow(rainflow[0], rainflow[2], rainflow[3])
+        if cache_key is not None:
+            DISPATCH_CACHE.put(cache_key, {
+                'totals': totals_out,
+                'grid_import': grid_import_out if flow_periods else None,
+                'grid_export': grid_export_out if flow_periods else None,
+            })
+
+    # Preisbewertung: konstante Preise aus den Energiesummen, variable Tarife als Skalarprodukt
+    # über die gespeicherten Flüsse (ohne erneute Simulation)
+    import_cost = totals_out[:, BATCH_TOTAL_COLUMNS.index('grid_import_cost')]
+    export_revenue = totals_out[:, BATCH_TOTAL_COLUMNS.index('grid_export_revenue')]
+    if grid_import_out is not None and grid_import_out.shape[1] > 0:
+        import_cost, export_revenue = reprice_flows(
+            grid_import_out, grid_export_out, price_grid_per_kwh, price_feed_in_per_kwh, index
+        )
+
+    shared_totals = {
+        'pv_generation': pv.sum(),
+        'consumption': load.sum(),
+        'direct_self_consumption': direct_self_consumption.sum(),
+        **curtailment_totals,
+    }
+    validation_level = resolve_validation_level(validation_level)
+    kpis = []
+    energy_balance_validation = [] if validation_level != "off" else None
+    for k in range(num_capacities):
+        totals = dict(shared_totals)
+        totals.update(zip(BATCH_TOTAL_COLUMNS, totals_out[k]))
+        totals['grid_import_cost'] = import_cost[k]
+        totals['grid_export_revenue'] = export_revenue[k]
+        # Konstante Preise wie in simulate_one_year aus den Energiesummen bewerten
+        if not isinstance(price_grid_per_kwh, pd.Series):
+            totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+        if not isinstance(price_feed_in_per_kwh, pd.Series):
+            totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+        if energy_balance_validation is not None:
+            energy_balance_validation.append(_summarize_energy_balance(
+                validation_level, totals, *balance_efficiencies
+            ))
+        kpis.append(build_simulation_kpis(
+            totals,
+            battery_capacity_kwh=float(capacities[k]),
+            current_capacity_kwh=float(current_capacities[k]),
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge,
+            simulation_year=simulation_year
+        ))
+
+    if return_soc and substeps is not None:
+        soc_out = _aggregate_time_grid({'SOC_kWh': soc_out}, substeps)['SOC_kWh']
+
+    cycles = None
+    if return_cycles:
+        safe_capacities = np.where(current_capacities > 0, current_capacities, 1.0)
+        cycles = summarize_rainflow(rainflow[0])
+        cycles['cycle_counts'] = rainflow[0]
+        cycles['mean_soc_percent'] = np.where(current_capacities > 0, rainflow[1] / num_periods / safe_capacities * 100.0, 0.0)
+
+    return {
+        'battery_capacity_kwh': capacities,
+        'kpis': kpis,
+        'soc_kwh': soc_out if return_soc else None,
+        'cycles': cycles,
+        'simulation_metadata': {
+            'data_resolution': data_resolution,
+            'time_interval_hours': time_interval_hours,
+            'num_periods': num_input_periods,
+            'simulated_hours': num_periods * time_interval_hours,
+            'num_capacities': num_capacities,
+            'battery_max_charge_kw': max_charge_kw.copy(),
+            'battery_max_discharge_kw': max_discharge_kw.copy(),
+            'simulation_backend': resolved_backend,
+            'dispatch_strategy': dispatch_strategy,
+            'dispatch_cache_hit': cached is not None,
+            'battery_curves_active': any(curve is not None for curve in curves),
+            'rolling_horizon': rolling_horizon_summary,
+            'energy_balance_validation': energy_balance_validation
+        }
+    }
+
+
+def simulate_pv_capacity_batch(
+    consumption_series: pd.Series,
+    pv_generation_rows,
+    battery_capacities_kwh,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    battery_max_charge_kw,
+    battery_max_discharge_kw,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    annual_capacity_loss_percent: float = 2.0,
+    simulation_year: int = 1,
+    backend: str | None = None,
+    validation_level: str | None = None,
+    dispatch_strategy: str | None = None,
+    battery_curves: dict | None = None,
+    curtailment_totals: list | None = None
+) -> dict:
+    """
+    Simuliert alle Kombinationen aus PV-Variante (z.B. Anlagengröße) und Speicherkapazität in einem
+    gemeinsamen Durchlauf des Batch-Kerns (2-D-Suchlauf, scenarios.find_optimal_system_size).
+
+    Jede PV-Variante bildet eine Eingangszeile des Kerns (PV-Überschuss und Restlast je Zeile),
+    jede Kombination eine Spur (Zeile × Kapazität, Kapazitäten innerhalb einer Zeile aufsteigend
+    wie übergeben). Die Referenz ohne Speicher wird je Zeile in geschlossener Form berechnet.
+
+    Args:
+        consumption_series (pd.Series): Stromverbrauch in kWh (gemeinsam für alle Zeilen).
+        pv_generation_rows (pd.DataFrame | np.ndarray): PV-Erzeugung in kWh je Variante (DataFrame mit
+            einer Spalte je Variante oder Array Varianten × Zeit, gleicher Zeitindex wie der Verbrauch).
+        battery_capacities_kwh (array-like): Speicherkapazitäten in kWh (für jede Zeile dieselben).
+        battery_max_charge_kw, battery_max_discharge_kw (float | array-like): Leistung je Kapazität oder global.
+        curtailment_totals (list | None): Clipping und Abregelung der Vorverarbeitung je Zeile (dicts wie
+            bei simulate_one_year, z.B. aus data_import.apply_pv_grid_limits je Anlagengröße). None: keine.
+        Übrige Argumente wie simulate_capacity_batch (ohne Dispatch-Cache).
+
+    Returns:
+        dict: 'battery_capacity_kwh' (Array), 'kpis' (je Zeile eine Liste der KPI-dicts je Kapazität),
+        'reference_kpis' (je Zeile ohne Speicher) und 'simulation_metadata' (mit
+        'energy_balance_validation' je Zeile und Kapazität oder None).
+    """
+    num_input_periods = len(consumption_series)
+    time_interval_hours, data_resolution, substeps = detect_time_resolution(
+        consumption_series.index if isinstance(consumption_series, pd.Series) else None, num_input_periods
+    )
+    pv_rows = _household_rows(pv_generation_rows)
+    if pv_rows.shape[1] != num_input_periods:
+        raise ValueError(f"PV-Varianten und Verbrauch haben unterschiedliche Längen: {pv_rows.shape[1]} vs. {num_input_periods}")
+    load = _as_float_array(consumption_series)
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+    num_periods = num_input_periods
+    price_grid = _price_array(price_grid_per_kwh, index, num_periods)
+    price_feed_in = _price_array(price_feed_in_per_kwh, index, num_periods)
+    if substeps is not None:
+        # Unregelmäßige Intervalle: Simulation auf dem gemeinsamen Raster (siehe expand_to_time_grid)
+        pv_rows = np.repeat(pv_rows / substeps, substeps, axis=1)
+        load = np.repeat(load / substeps, substeps)
+        price_grid = np.repeat(price_grid, substeps)
+        price_feed_in = np.repeat(price_feed_in, substeps)
+        num_periods = len(load)
+
+    # Eingangszeilen je PV-Variante
+    num_rows = len(pv_rows)
+    direct_rows = np.minimum(pv_rows, load)
+    surplus_rows = np.ascontiguousarray(pv_rows - direct_rows)
+    deficit_rows = np.ascontiguousarray(load - direct_rows)
+
+    # Spuren: Zeile × Kapazität
+    capacities = np.atleast_1d(np.asarray(battery_capacities_kwh, dtype=np.float64))
+    num_capacities = len(capacities)
+    max_charge_kw = np.broadcast_to(np.asarray(battery_max_charge_kw, dtype=np.float64), capacities.shape)
+    max_discharge_kw = np.broadcast_to(np.asarray(battery_max_discharge_kw, dtype=np.float64), capacities.shape)
+    capacity_loss_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (simulation_year - 1)
+    current_capacities = np.tile(capacities * capacity_loss_factor, num_rows)
+    input_row = np.repeat(np.arange(num_rows), num_capacities).astype(np.int64)
+
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    arbitrage = arbitrage_parameters(dispatch_strategy, time_interval_hours)
+    curves = resolve_battery_curves(battery_curves)
+    balance_efficiencies = ((None, None) if has_variable_efficiency(curves)
+                            else (battery_efficiency_charge, battery_efficiency_discharge))
+    resolved_backend = resolve_simulation_backend(backend)
+    totals_out = np.zeros((len(input_row), len(BATCH_TOTAL_COLUMNS)))
+    empty = np.zeros((len(input_row), 0))
+    kernel_args = (
+        surplus_rows, deficit_rows, input_row, price_grid, price_feed_in,
+        (initial_soc_percent / 100.0) * current_capacities,
+        (min_soc_percent / 100.0) * current_capacities,
+        (max_soc_percent / 100.0) * current_capacities,
+        np.ascontiguousarray(np.tile(max_charge_kw, num_rows) * time_interval_hours),
+        np.ascontiguousarray(np.tile(max_discharge_kw, num_rows) * time_interval_hours),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge)
+    )
+    rolling_horizon_summary = None
+    if dispatch_strategy == "optimal":
+        totals_out[:] = solve_optimal_dispatch_batch(*kernel_args, backend=resolved_backend, battery_curves=curves)['totals']
+    elif dispatch_strategy == "rolling_horizon":
+        solution = solve_rolling_horizon_batch(
+            *kernel_args, **rolling_horizon_parameters(time_interval_hours), backend=resolved_backend,
+            battery_curves=curves
+        )
+        totals_out[:] = solution['totals']
+        rolling_horizon_summary = {
+            'num_windows': solution['num_windows'],
+            'reused_plans': solution['reused_plans'],
+            'solve_times': summarize_solve_times(solution['solve_times']),
+        }
+    elif resolved_backend == "numba":
+        _pv_first_batch_kernel_jit(*kernel_args, *arbitrage, *curves, totals_out, empty, empty, empty, None, None, None, None)
+    else:
+        _pv_first_batch_numpy(*kernel_args, *arbitrage, *curves, totals_out, empty, empty, empty, None, None, None, None)
+
+    # Jahressummen je Eingangszeile (Referenz ohne Speicher)
+    reference_columns = {
+        'pv_generation': pv_rows.sum(axis=1),
+        'consumption': np.full(num_rows, load.sum()),
+        'direct_self_consumption': direct_rows.sum(axis=1),
+        'grid_import': deficit_rows.sum(axis=1),
+        'grid_export': surplus_rows.sum(axis=1),
+        'grid_import_cost': deficit_rows @ price_grid,
+        'grid_export_revenue': surplus_rows @ price_feed_in,
+    }
+    row_totals = [{key: float(values[row]) for key, values in reference_columns.items()} for row in range(num_rows)]
+    for row, totals in enumerate(curtailment_totals or ()):
+        row_totals[row].update(pv_limit_totals(totals))
+
+    def lane_kpis(totals, battery_capacity_kwh, current_capacity_kwh):
+        """KPIs aus Jahressummen (konstante Preise wie in simulate_one_year aus den Energiesummen)."""
+        if not isinstance(price_grid_per_kwh, pd.Series):
+            totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+        if not isinstance(price_feed_in_per_kwh, pd.Series):
+            totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+        return build_simulation_kpis(
+            totals,
+            battery_capacity_kwh=battery_capacity_kwh,
+            current_capacity_kwh=current_capacity_kwh,
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge,
+            simulation_year=simulation_year
+        )
+
+    validation_level = resolve_validation_level(validation_level)
+    energy_balance_validation = [[] for _ in range(num_rows)] if validation_level != "off" else None
+    kpis = [[] for _ in range(num_rows)]
+    for lane in range(len(input_row)):
+        row = input_row[lane]
+        totals = dict(row_totals[row])
+        totals.update(zip(BATCH_TOTAL_COLUMNS, totals_out[lane]))
+        if energy_balance_validation is not None:
+            energy_balance_validation[row].append(_summarize_energy_balance(validation_level, totals, *balance_efficiencies))
+        kpis[row].append(lane_kpis(totals, float(capacities[lane % num_capacities]), float(current_capacities[lane])))
+    reference_kpis = [
+        lane_kpis(dict(dict.fromkeys(BATCH_TOTAL_COLUMNS, 0.0), **totals), 0.0, 0.0) for totals in row_totals
+    ]
+
+    return {
+        'battery_capacity_kwh': capacities,
+        'kpis': kpis,
+        'reference_kpis': reference_kpis,
+        'simulation_metadata': {
+            'data_resolution': data_resolution,
+            'time_interval_hours': time_interval_hours,
+            'num_periods': num_input_periods,
+            'simulated_hours': num_periods * time_interval_hours,
+            'num_pv_variants': num_rows,
+            'num_capacities': num_capacities,
+            'simulation_backend': resolved_backend,
+            'dispatch_strategy': dispatch_strategy,
+            'battery_curves_active': any(curve is not None for curve in curves),
+            'rolling_horizon': rolling_horizon_summary,
+            'energy_balance_validation': energy_balance_validation
+        }
+    }
+
+
+def _typical_days_walk(assignment, day_effects, day_final_soc, soc_kwh, min_soc_kwh, soc_span, battery_effect):
+    """
+    SOC-Fortschreibung über die Tagesfolge (siehe simulate_typical_days): je Tag Speicherwirkung und
+    End-SOC des Typtags, linear interpoliert zwischen den Start-SOC-Stufen; summiert in battery_effect.
+    """
+    soc_levels = day_final_soc.shape[1]
+    for k in range(soc_kwh.shape[0]):
+        soc = soc_kwh[k]
+        for typical_day in assignment:
+            position = min(max((soc - min_soc_kwh[k]) / soc_span[k], 0.0), 1.0) * (soc_levels - 1)
+            lower = min(int(position), soc_levels - 2)
+            upper_weight = position - lower
+            for column in range(battery_effect.shape[1]):
+                battery_effect[k, column] += (day_effects[typical_day, lower, k, column] * (1.0 - upper_weight)
+                                              + day_effects[typical_day, lower + 1, k, column] * upper_weight)
+            soc = (day_final_soc[typical_day, lower, k] * (1.0 - upper_weight)
+                   + day_final_soc[typical_day, lower + 1, k] * upper_weight)
+
+
+_typical_days_walk_jit = (
+    njit(cache=True, nogil=True)(_typical_days_walk) if NUMBA_AVAILABLE else None
+)
+
+
+def _typical_days_walk_numpy(assignment, day_effects, day_final_soc, soc_kwh, min_soc_kwh, soc_span, battery_effect):
+    """Referenz-Backend der SOC-Fortschreibung (vektorisiert über alle Kapazitäten)."""
+    soc_levels = day_final_soc.shape[1]
+    lanes = np.arange(len(soc_kwh))
+    soc = soc_kwh.copy()
+    for typical_day in assignment:
+        position = np.clip((soc - min_soc_kwh) / soc_span, 0.0, 1.0) * (soc_levels - 1)
+        lower = np.minimum(position.astype(np.int64), soc_levels - 2)
+        upper_weight = position - lower
+        effects = day_effects[typical_day]
+        battery_effect += (effects[lower, lanes] * (1.0 - upper_weight)[:, np.newaxis]
+                           + effects[lower + 1, lanes] * upper_weight[:, np.newaxis])
+        final_soc = day_final_soc[typical_day]
+        soc = final_soc[lower, lanes] * (1.0 - upper_weight) + final_soc[lower + 1, lanes] * upper_weight
+
+
+def simulate_typical_days(
+    typical_days: dict,
+    consumption_series: pd.Series,
+    pv_generation_series: pd.Series,
+    battery_capacities_kwh,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    battery_max_charge_kw,
+    battery_max_discharge_kw,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    annual_capacity_loss_percent: float = 2.0,
+    simulation_year: int = 1,
+    backend: str | None = None,
+    validation_level: str | None = None,
+    dispatch_strategy: str | None = None,
+    battery_curves: dict | None = None,
+    soc_levels: int | None = None,
+    curtailment_totals: dict | None = None
+) -> dict:
+    """
+    Screening-Variante von simulate_capacity_batch: simuliert nur die Typtage aus cluster_typical_days.
+
+    Jeder Typtag wird für alle Kapazitäten von soc_levels Start-SOC-Stufen (min. SOC bis max. SOC)
+    aus simuliert. Anschließend wird der SOC in der tatsächlichen Reihenfolge der Tage des Jahres
+    fortgeschrieben (ordnungserhaltend): Jeder Tag übernimmt Energieflüsse und End-SOC seines
+    Typtags, linear interpoliert zwischen den Start-SOC-Stufen. Die Jahressummen bildet ein
+    Differenzenschätzer: exakte Netzflüsse und -kosten ohne Speicher plus die so hochgerechnete
+    Wirkung des Speichers (Typtag mit minus ohne Speicher). Referenz und Energiebilanz bleiben
+    damit exakt, genähert ist nur die Speicherwirkung. Der Rechenaufwand sinkt etwa um den Faktor
+    Tage / (Typtage × soc_levels); "optimal" und "rolling_horizon" lösen je Typtag zusätzlich den
+    folgenden Kalendertag als Vorschau mit (doppelter Aufwand je Typtag).
+
+    Args:
+        typical_days (dict): Ergebnis von cluster_typical_days für dieselben Zeitreihen.
+        soc_levels (int | None): Start-SOC-Stufen je Typtag (mind. 2). None: TYPICAL_DAYS_SOC_LEVELS.
+        Übrige Argumente wie simulate_capacity_batch (ohne SOC-Matrix, Zyklenzählung und Cache).
+
+    Returns:
+        dict: 'battery_capacity_kwh', 'kpis' und 'simulation_metadata' wie simulate_capacity_batch,
+        die Metadaten zusätzlich mit 'typical_days' (Anzahl), 'soc_levels' und 'speedup'
+        (Intervalle des Jahres je simuliertem Intervall und Start-SOC-Stufe).
+    """
+    num_periods = len(consumption_series)
+    time_interval_hours = typical_days['time_interval_hours']
+    periods_per_day = typical_days['periods_per_day']
+    num_days_total = typical_days['num_days_total']
+    if num_days_total != num_periods // periods_per_day:
+        raise ValueError("Typtage passen nicht zu den Zeitreihen (cluster_typical_days erneut ausführen).")
+    soc_levels = TYPICAL_DAYS_SOC_LEVELS if soc_levels is None else int(soc_levels)
+    if soc_levels < 2:
+        raise ValueError(f"soc_levels muss mindestens 2 sein (erhalten: {soc_levels}).")
+    curtailment_totals = pv_limit_totals(curtailment_totals)
+    pv = _as_float_array(pv_generation_series)
+    load = _as_float_array(consumption_series)
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+
+    capacities = np.atleast_1d(np.asarray(battery_capacities_kwh, dtype=np.float64))
+    num_capacities = len(capacities)
+    max_charge_kw = np.broadcast_to(np.asarray(battery_max_charge_kw, dtype=np.float64), capacities.shape)
+    max_discharge_kw = np.broadcast_to(np.asarray(battery_max_discharge_kw, dtype=np.float64), capacities.shape)
+    capacity_loss_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (simulation_year - 1)
+    current_capacities = capacities * capacity_loss_factor
+    min_soc_kwh = (min_soc_percent / 100.0) * current_capacities
+    max_soc_kwh = (max_soc_percent / 100.0) * current_capacities
+
+    direct_self_consumption = np.minimum(pv, load)
+    surplus = pv - direct_self_consumption
+    deficit = load - direct_self_consumption
+    price_grid = _price_array(price_grid_per_kwh, index, num_periods)
+    price_feed_in = _price_array(price_feed_in_per_kwh, index, num_periods)
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    arbitrage = arbitrage_parameters(dispatch_strategy, time_interval_hours)
+    curves = resolve_battery_curves(battery_curves)
+    balance_efficiencies = ((None, None) if has_variable_efficiency(curves)
+                            else (battery_efficiency_charge, battery_efficiency_discharge))
+    resolved_backend = resolve_simulation_backend(backend)
+
+    def reference_totals(periods):
+        """Summen ohne Speicher (Spalten wie BATCH_TOTAL_COLUMNS) über einen Zeitabschnitt."""
+        totals = dict.fromkeys(BATCH_TOTAL_COLUMNS, 0.0)
+        totals['grid_import'] = deficit[periods].sum()
+        totals['grid_export'] = surplus[periods].sum()
+        totals['grid_import_cost'] = deficit[periods] @ price_grid[periods]
+        totals['grid_export_revenue'] = surplus[periods] @ price_feed_in[periods]
+        return np.array(list(totals.values()))
+
+    # Spuren je Typtag: Start-SOC-Stufe × Kapazität
+    lane_capacity = np.tile(np.arange(num_capacities), soc_levels)
+    lane_fraction = np.repeat(np.linspace(0.0, 1.0, soc_levels), num_capacities)
+    num_lanes = len(lane_capacity)
+    lane_kernel_args = (
+        min_soc_kwh[lane_capacity] + lane_fraction * (max_soc_kwh - min_soc_kwh)[lane_capacity],
+        min_soc_kwh[lane_capacity], max_soc_kwh[lane_capacity],
+        np.ascontiguousarray(max_charge_kw[lane_capacity] * time_interval_hours),
+        np.ascontiguousarray(max_discharge_kw[lane_capacity] * time_interval_hours),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge)
+    )
+    num_typical_days = len(typical_days['days'])
+    day_effects = np.zeros((num_typical_days, soc_levels, num_capacities, len(BATCH_TOTAL_COLUMNS)))
+    day_final_soc = np.zeros((num_typical_days, soc_levels, num_capacities))
+    empty = np.zeros((num_lanes, 0))
+    rolling_solutions = []
+    simulated_periods = 0
+    for typical_day, day in enumerate(typical_days['days']):
+        periods = slice(day * periods_per_day, (day + 1) * periods_per_day)
+        totals_out = np.zeros((num_lanes, len(BATCH_TOTAL_COLUMNS)))
+        if dispatch_strategy in ("optimal", "rolling_horizon"):
+            # Ohne Restwert am Horizontende würde die Optimierung den Speicher zum Tagesende leeren:
+            # der folgende Kalendertag wird als Vorschau mitgelöst, gezählt wird nur der Typtag
+            solve_periods = slice(periods.start, min(periods.stop + periods_per_day, num_periods))
+        else:
+            solve_periods = periods
+        simulated_periods += (solve_periods.stop - solve_periods.start) * soc_levels
+        kernel_args = (
+            np.ascontiguousarray(surplus[np.newaxis, solve_periods]),
+            np.ascontiguousarray(deficit[np.newaxis, solve_periods]),
+            np.zeros(num_lanes, dtype=np.int64),
+            np.ascontiguousarray(price_grid[solve_periods]), np.ascontiguousarray(price_feed_in[solve_periods]),
+            *lane_kernel_args
+        )
+        if dispatch_strategy == "optimal":
+            solution = solve_optimal_dispatch_batch(
+                *kernel_args, backend=resolved_backend, return_flows=True, battery_curves=curves
+            )
+        elif dispatch_strategy == "rolling_horizon":
+            solution = solve_rolling_horizon_batch(
+                *kernel_args, **rolling_horizon_parameters(time_interval_hours),
+                backend=resolved_backend, return_flows=True, battery_curves=curves
+            )
+            rolling_solutions.append(solution)
+        else:
+            soc_out = np.zeros((num_lanes, periods_per_day))
+            kernel = _pv_first_batch_kernel_jit if resolved_backend == "numba" else _pv_first_batch_numpy
+            kernel(*kernel_args, *arbitrage, *curves, totals_out, soc_out, empty, empty, None, None, None, None)
+            final_soc_kwh = soc_out[:, -1]
+        if dispatch_strategy in ("optimal", "rolling_horizon"):
+            day_flows = {name: values[:, :periods_per_day] for name, values in solution['flows'].items()}
+            totals_out[:] = _optimal_dispatch_totals(day_flows, price_grid[periods], price_feed_in[periods])
+            final_soc_kwh = day_flows['SOC_kWh'][:, -1]
+        day_effects[typical_day] = (totals_out - reference_totals(periods)).reshape(soc_levels, num_capacities, -1)
+        day_final_soc[typical_day] = np.reshape(final_soc_kwh, (soc_levels, num_capacities))
+
+    # SOC in Kalenderreihenfolge fortschreiben, je Tag zwischen den Start-SOC-Stufen interpolieren
+    walk = _typical_days_walk_jit if resolved_backend == "numba" else _typical_days_walk_numpy
+    battery_effect = np.zeros((num_capacities, len(BATCH_TOTAL_COLUMNS)))
+    walk(
+        np.asarray(typical_days['assignment'], dtype=np.int64), day_effects, day_final_soc,
+        np.clip((initial_soc_percent / 100.0) * current_capacities, min_soc_kwh, max_soc_kwh),
+        min_soc_kwh, np.where(max_soc_kwh > min_soc_kwh, max_soc_kwh - min_soc_kwh, 1.0), battery_effect
+    )
+    # Angebrochener Resttag: wie in cluster_typical_days anteilig hochrechnen
+    battery_effect *= num_periods / (num_days_total * periods_per_day)
+    totals_out = reference_totals(slice(None)) + battery_effect
+
+    rolling_horizon_summary = None
+    if rolling_solutions:
+        rolling_horizon_summary = {
+            'num_windows': sum(solution['num_windows'] for solution in rolling_solutions),
+            'reused_plans': sum(solution['reused_plans'] for solution in rolling_solutions),
+            'solve_times': summarize_solve_times(
+                [seconds for solution in rolling_solutions for seconds in solution['solve_times']]
+            ),
+        }
+
+    shared_totals = {
+        'pv_generation': pv.sum(),
+        'consumption': load.sum(),
+        'direct_self_consumption': direct_self_consumption.sum(),
+        **curtailment_totals,
+    }
+    validation_level = resolve_validation_level(validation_level)
+    kpis = []
+    energy_balance_validation = [] if validation_level != "off" else None
+    for k in range(num_capacities):
+        totals = dict(shared_totals)
+        totals.update(zip(BATCH_TOTAL_COLUMNS, totals_out[k]))
+        if not isinstance(price_grid_per_kwh, pd.Series):
+            totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+        if not isinstance(price_feed_in_per_kwh, pd.Series):
+            totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+        if energy_balance_validation is not None:
+            energy_balance_validation.append(_summarize_energy_balance(
+                validation_level, totals, *balance_efficiencies
+            ))
+        kpis.append(build_simulation_kpis(
+            totals,
+            battery_capacity_kwh=float(capacities[k]),
+            current_capacity_kwh=float(current_capacities[k]),
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge,
+            simulation_year=simulation_year
+        ))
+
+    return {
+        'battery_capacity_kwh': capacities,
+        'kpis': kpis,
+        'simulation_metadata': {
+            'time_interval_hours': time_interval_hours,
+            'num_periods': num_periods,
+            'num_capacities': num_capacities,
+            'typical_days': num_typical_days,
+            'soc_levels': soc_levels,
+            'speedup': num_periods / simulated_periods,
+            'simulation_backend': resolved_backend,
+            'dispatch_strategy': dispatch_strategy,
+            'battery_curves_active': any(curve is not None for curve in curves),
+            'rolling_horizon': rolling_horizon_summary,
+            'energy_balance_validation': energy_balance_validation
+        }
+    }
+
+
+def simulate_lifetime(
+    consumption_series: pd.Series,
+    pv_generation_series: pd.Series,
+    battery_capacities_kwh,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    battery_max_charge_kw,
+    battery_max_discharge_kw,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    project_lifetime_years: int,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    annual_capacity_loss_percent: float = 2.0,
+    annual_pv_degradation_percent: float = 0.0,
+    annual_load_growth_percent: float = 0.0,
+    backend: str | None = None,
+    dispatch_strategy: str | None = None,
+    battery_curves: dict | None = None,
+    aging_model: str | None = None,
+    curtailment_totals: dict | None = None
+) -> dict:
+    """
+    Simuliert alle Jahre der Projektlaufzeit für viele Speicherkapazitäten in einem gemeinsamen
+    Durchlauf des Batch-Kerns (je Kapazität und Jahr eine Spur im Gleichschritt).
+
+    Jedes Jahr wird mit der gealterten Kapazität simuliert; optional sinkt die PV-Erzeugung
+    (Moduldegradation) und steigt der Verbrauch jährlich. Das Referenzjahr ohne Batterie wird je
+    Jahr in geschlossener Form berechnet. Jedes Jahr beginnt mit dem Anfangs-SOC (wie simulate_one_year).
+
+    Mit aging_model="cycle_calendar" folgt der Kapazitätsverlust eines Jahres aus dessen Betrieb:
+    Der Batch-Kern zählt die Zyklen während der Simulation (Rainflow, ohne SOC-Zeitreihe), daraus und
+    aus dem mittleren SOC ergibt sich die Kapazität des Folgejahres (cycle_calendar_capacity_loss_percent).
+    Die Jahre laufen dann nacheinander, alle Kapazitäten eines Jahres gemeinsam.
+
+    Args:
+        consumption_series, pv_generation_series (pd.Series): Zeitreihen des ersten Jahres in kWh.
+        battery_capacities_kwh (array-like): Speicherkapazitäten in kWh (Neuzustand).
+        battery_efficiency_charge ... price_feed_in_per_kwh: wie simulate_capacity_batch.
+        project_lifetime_years (int): Anzahl simulierter Jahre.
+        initial_soc_percent, min_soc_percent, max_soc_percent (float): SOC-Parameter in %.
+        annual_capacity_loss_percent (float): Jährlicher Kapazitätsverlust in %.
+        annual_pv_degradation_percent (float): Jährlicher Rückgang der PV-Erzeugung in %.
+        annual_load_growth_percent (float): Jährliche Änderung des Verbrauchs in %.
+        backend (str | None): "auto", "numba" oder "python".
+        dispatch_strategy (str | None): "pv_first", "threshold", "optimal" oder "rolling_horizon"
+            (siehe simulate_one_year).
+        battery_curves (dict | None): Leistungs-/Wirkungsgradkennlinien (siehe simulate_one_year).
+        aging_model (str | None): "flat" (annual_capacity_loss_percent) oder "cycle_calendar"
+            (siehe resolve_aging_model). None verwendet DEFAULT_AGING_MODEL.
+        curtailment_totals (dict | None): Clipping und Abregelung der Vorverarbeitung, bezogen auf das
+            erste Jahr (siehe simulate_one_year).
+
+    Returns:
+        dict: 'battery_capacity_kwh' (Array), 'years' (1..N), 'kpis' (je Kapazität eine Liste mit
+        KPI-Dictionaries je Jahr), 'reference_kpis' (KPI-Dictionaries je Jahr ohne Batterie),
+        'annual_savings' (Matrix Kapazitäten × Jahre: Energiekosten ohne minus mit Batterie in Euro),
+        'aging' (bei "cycle_calendar" Matrizen Kapazitäten × Jahre: 'capacity_kwh', 'capacity_loss_percent',
+        'equivalent_full_cycles', 'mean_soc_percent', 'dod_histogram' (× Klassen) sowie
+        'end_of_life_capacity_kwh' und 'dod_bin_edges_percent'; sonst None) und 'simulation_metadata'.
+    """
+    num_input_periods = len(consumption_series)
+    curtailment_totals = pv_limit_totals(curtailment_totals)
+    time_interval_hours, data_resolution, substeps = detect_time_resolution(
+        consumption_series.index if isinstance(consumption_series, pd.Series) else None, num_input_periods
+    )
+    if substeps is not None:
+        # Unregelmäßige Intervalle: Simulation auf dem gemeinsamen Raster (siehe simulate_one_year)
+        consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh = expand_to_time_grid(
+            consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+            substeps, time_interval_hours
+        )
+    pv = _as_float_array(pv_generation_series)
+    load = _as_float_array(consumption_series)
+    num_periods = len(load)
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+
+    capacities = np.atleast_1d(np.asarray(battery_capacities_kwh, dtype=np.float64))
+    num_capacities = len(capacities)
+    max_charge_kw = np.broadcast_to(np.asarray(battery_max_charge_kw, dtype=np.float64), capacities.shape)
+    max_discharge_kw = np.broadcast_to(np.asarray(battery_max_discharge_kw, dtype=np.float64), capacities.shape)
+    years = np.arange(1, project_lifetime_years + 1)
+
+    # Eingangsreihen je Jahr (eine gemeinsame Zeile, falls sich PV und Verbrauch nicht ändern)
+    pv_factors = (1.0 - annual_pv_degradation_percent / 100.0) ** (years - 1)
+    load_factors = (1.0 + annual_load_growth_percent / 100.0) ** (years - 1)
+    varying_inputs = annual_pv_degradation_percent != 0 or annual_load_growth_percent != 0
+    if varying_inputs:
+        pv_rows = pv_factors[:, np.newaxis] * pv
+        load_rows = load_factors[:, np.newaxis] * load
+    else:
+        pv_rows = pv[np.newaxis, :]
+        load_rows = load[np.newaxis, :]
+    direct_rows = np.minimum(pv_rows, load_rows)
+    surplus_rows = pv_rows - direct_rows
+    deficit_rows = load_rows - direct_rows
+
+    # Spuren: Kapazität k, Jahr y -> Index k * Jahre + y
+    lane_capacity = np.repeat(np.arange(num_capacities), project_lifetime_years)
+    lane_year = np.tile(years, num_capacities)
+    input_row = (lane_year - 1) if varying_inputs else np.zeros(len(lane_year), dtype=np.int64)
+    price_grid = _price_array(price_grid_per_kwh, index, num_periods)
+    price_feed_in = _price_array(price_feed_in_per_kwh, index, num_periods)
+
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    aging_model = resolve_aging_model(aging_model)
+    arbitrage = arbitrage_parameters(dispatch_strategy, time_interval_hours)
+    curves = resolve_battery_curves(battery_curves)
+    resolved_backend = resolve_simulation_backend(backend)
+    rolling_horizon_solutions = []
+
+    def dispatch_lanes(lanes, lane_capacities, count_cycles):
+        """Simuliert die Spuren lanes mit den Kapazitäten lane_capacities (Jahressummen, optional Rainflow-Zählung)."""
+        totals = np.zeros((len(lanes), len(BATCH_TOTAL_COLUMNS)))
+        empty = np.zeros((len(lanes), 0))
+        initial_soc = (initial_soc_percent / 100.0) * lane_capacities
+        min_soc = (min_soc_percent / 100.0) * lane_capacities
+        max_soc = (max_soc_percent / 100.0) * lane_capacities
+        lane_args = (
+            surplus_rows, deficit_rows, np.ascontiguousarray(input_row[lanes], dtype=np.int64),
+            price_grid, price_feed_in, initial_soc, min_soc, max_soc,
+            np.ascontiguousarray(max_charge_kw[lane_capacity[lanes]] * time_interval_hours),
+            np.ascontiguousarray(max_discharge_kw[lane_capacity[lanes]] * time_interval_hours),
+            float(battery_efficiency_charge), float(battery_efficiency_discharge)
+        )
+        rainflow = new_rainflow_buffers(len(lanes)) if count_cycles else (None,) * 4
+        if dispatch_strategy in ("optimal", "rolling_horizon"):
+            if dispatch_strategy == "optimal":
+                solution = solve_optimal_dispatch_batch(
+                    *lane_args, backend=resolved_backend, return_flows=count_cycles, battery_curves=curves
+                )
+            else:
+                solution = solve_rolling_horizon_batch(
+                    *lane_args, **rolling_horizon_parameters(time_interval_hours), backend=resolved_backend,
+                    return_flows=count_cycles, battery_curves=curves
+                )
+                rolling_horizon_solutions.append(solution)
+            totals[:] = solution['totals']
+            if count_cycles:
+                # Die Optimierung liefert den SOC-Verlauf ohnehin -> Zählung im Anschluss
+                soc_kwh = solution['flows']['SOC_kWh']
+                for lane in range(len(lanes)):
+                    rainflow[0][lane] = count_rainflow_cycles(
+                        soc_kwh[lane], min_soc[lane], max_soc[lane], solution['initial_soc_kwh'][lane]
+                    )
+                rainflow[1][:] = soc_kwh.sum(axis=1)
+        else:
+            batch_kernel = _pv_first_batch_kernel_jit if resolved_backend == "numba" else _pv_first_batch_numpy
+            batch_kernel(*lane_args, *arbitrage, *curves, totals, empty, empty, empty, *rainflow)
+            if count_cycles:
+                finish_rainflow(rainflow[0], rainflow[2], rainflow[3])
+        return totals, rainflow[0], rainflow[1]
+
+    if aging_model == "flat":
+        current_capacities = capacities[lane_capacity] * (1.0 - annual_capacity_loss_percent / 100.0) ** (lane_year - 1)
+        totals_out = dispatch_lanes(np.arange(len(lane_year)), current_capacities, False)[0]
+        aging = None
+    else:
+        # Zyklen- und kalendarische Alterung: die Kapazität eines Jahres folgt aus dem Betrieb des
+        # Vorjahres -> Jahre nacheinander, alle Kapazitäten eines Jahres gemeinsam im Batch-Kern
+        current_capacities = np.zeros(len(lane_year))
+        totals_out = np.zeros((len(lane_year), len(BATCH_TOTAL_COLUMNS)))
+        cycle_counts = np.zeros((len(lane_year), RAINFLOW_SOC_LEVELS + 1))
+        mean_soc_percent = np.zeros(len(lane_year))
+        capacity_loss_percent = np.zeros(len(lane_year))
+        year_capacities = capacities.copy()
+        for year in years:
+            lanes = np.flatnonzero(lane_year == year)
+            current_capacities[lanes] = year_capacities
+            totals_out[lanes], cycle_counts[lanes], soc_sum = dispatch_lanes(lanes, year_capacities, True)
+            safe_capacities = np.where(year_capacities > 0, year_capacities, 1.0)
+            mean_soc_percent[lanes] = np.where(year_capacities > 0, soc_sum / num_periods / safe_capacities * 100.0, 0.0)
+            capacity_loss_percent[lanes] = np.where(
+                capacities > 0, cycle_calendar_capacity_loss_percent(cycle_counts[lanes], mean_soc_percent[lanes]), 0.0
+            )
+            # Verlust in Prozentpunkten der Nennkapazität (linearer Kapazitätsabfall)
+            year_capacities = np.maximum(year_capacities - capacities * capacity_loss_percent[lanes] / 100.0, 0.0)
+        cycle_summary = summarize_rainflow(cycle_counts)
+        aging = {
+            'capacity_kwh': current_capacities.reshape(num_capacities, project_lifetime_years),
+            'end_of_life_capacity_kwh': year_capacities,
+            'capacity_loss_percent': capacity_loss_percent.reshape(num_capacities, project_lifetime_years),
+            'equivalent_full_cycles': cycle_summary['equivalent_full_cycles'].reshape(num_capacities, project_lifetime_years),
+            'mean_soc_percent': mean_soc_percent.reshape(num_capacities, project_lifetime_years),
+            'dod_histogram': cycle_summary['dod_histogram'].reshape(num_capacities, project_lifetime_years, -1),
+            'dod_bin_edges_percent': cycle_summary['dod_bin_edges_percent'],
+        }
+
+    rolling_horizon_summary = None
+    if rolling_horizon_solutions:
+        rolling_horizon_summary = {
+            'num_windows': sum(solution['num_windows'] for solution in rolling_horizon_solutions),
+            'reused_plans': sum(solution['reused_plans'] for solution in rolling_horizon_solutions),
+            'solve_times': summarize_solve_times(np.concatenate(
+                [solution['solve_times'] for solution in rolling_horizon_solutions])),
+        }
+
+    # Jahressummen je Eingangszeile (für Referenz ohne Batterie und gemeinsame Summen)
+    row_totals = [
+        {
+            'pv_generation': pv_rows[row].sum(),
+            'consumption': load_rows[row].sum(),
+            'direct_self_consumption': direct_rows[row].sum(),
+            'grid_import': deficit_rows[row].sum(),
+            'grid_export': surplus_rows[row].sum(),
+            'grid_import_cost': deficit_rows[row] @ price_grid,
+            'grid_export_revenue': surplus_rows[row] @ price_feed_in,
+            # Abregelung aus der Vorverarbeitung (bezogen auf die PV-Reihe des ersten Jahres)
+            **curtailment_totals,
+        }
+        for row in range(len(pv_rows))
+    ]
+    for totals in row_totals:
+        # Konstante Preise wie in simulate_one_year aus den Energiesummen bewerten
+        if not isinstance(price_grid_per_kwh, pd.Series):
+            totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+        if not isinstance(price_feed_in_per_kwh, pd.Series):
+            totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+    reference_kpis = []
+    for year in years:
+        totals = dict.fromkeys(BATCH_TOTAL_COLUMNS[:4], 0.0)
+        totals.update(row_totals[year - 1 if varying_inputs else 0])
+        reference_kpis.append(build_simulation_kpis(
+            totals,
+            battery_capacity_kwh=0.0,
+            current_capacity_kwh=0.0,
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge,
+            simulation_year=int(year)
+        ))
+
+    kpis = [[] for _ in range(num_capacities)]
+    annual_savings = np.zeros((num_capacities, project_lifetime_years))
+    for lane in range(len(lane_year)):
+        k, year = lane_capacity[lane], int(lane_year[lane])
+        totals = dict(row_totals[input_row[lane]])
+        totals.update(zip(BATCH_TOTAL_COLUMNS, totals_out[lane]))
+        # Konstante Preise wie in simulate_one_year aus den Energiesummen bewerten
+        if not isinstance(price_grid_per_kwh, pd.Series):
+            totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+        if not isinstance(price_feed_in_per_kwh, pd.Series):
+            totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+        year_kpis = build_simulation_kpis(
+            totals,
+            battery_capacity_kwh=float(capacities[k]),
+            current_capacity_kwh=float(current_capacities[lane]),
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge,
+            simulation_year=year
+        )
+        if aging is not None:
+            year_kpis['equivalent_full_cycles'] = float(aging['equivalent_full_cycles'][k, year - 1])
+            year_kpis['mean_soc_percent'] = float(aging['mean_soc_percent'][k, year - 1])
+        kpis[k].append(year_kpis)
+        annual_savings[k, year - 1] = (
+            reference_kpis[year - 1]['effective_annual_energy_cost'] - year_kpis['effective_annual_energy_cost']
+        )
+
+    return {
+        'battery_capacity_kwh': capacities,
+        'years': years,
+        'kpis': kpis,
+        'reference_kpis': reference_kpis,
+        'annual_savings': annual_savings,
+        'aging': aging,
+        'simulation_metadata': {
+            'data_resolution': data_resolution,
+            'time_interval_hours': time_interval_hours,
+            'num_periods': num_input_periods,
+            'simulated_hours': num_periods * time_interval_hours,
+            'num_capacities': num_capacities,
+            'project_lifetime_years': project_lifetime_years,
+            'annual_capacity_loss_percent': annual_capacity_loss_percent,
+            'annual_pv_degradation_percent': annual_pv_degradation_percent,
+            'annual_load_growth_percent': annual_load_growth_percent,
+            'simulation_backend': resolved_backend,
+            'dispatch_strategy': dispatch_strategy,
+            'aging_model': aging_model,
+            'rolling_horizon': rolling_horizon_summary
+        }
+    }
+
+
+def _household_rows(values, num_households: int | None = None) -> np.ndarray:
+    """Zeitreihen je Haushalt als Matrix Haushalte × Zeit (DataFrame: eine Spalte je Haushalt)."""
+    if isinstance(values, pd.DataFrame):
+        rows = values.to_numpy(dtype=np.float64).T
+    else:
+        rows = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    if num_households is not None and len(rows) == 1:
+        rows = np.broadcast_to(rows, (num_households, rows.shape[1]))
+    return rows
+
+
+def simulate_quarter(
+    consumption_matrix,
+    pv_generation_matrix,
+    household_battery_kwh,
+    community_battery_kwh,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    household_max_charge_kw,
+    household_max_discharge_kw,
+    community_max_charge_kw,
+    community_max_discharge_kw,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    time_index=None,
+    backend: str | None = None,
+    validation_level: str | None = None,
+    dispatch_strategy: str | None = None,
+    battery_curves: dict | None = None
+) -> dict:
+    """
+    Simuliert ein Quartier aus vielen Haushalten in einem gemeinsamen Durchlauf des Batch-Kerns:
+    je Haushalt ein eigener Speicher am eigenen Anschluss und zusätzlich ein Quartiersspeicher
+    am Summenprofil (Verbrauch und Erzeugung werden im Quartier saldiert).
+
+    Jeder Haushalt und das Quartier bilden eine Eingangszeile des Kerns; Haushaltsspeicher und
+    Quartiersspeicher (auch mehrere Größen zum Vergleich) laufen als Spuren im Gleichschritt.
+    Die Referenz ohne Speicher wird je Zeile in geschlossener Form berechnet.
+
+    Args:
+        consumption_matrix (pd.DataFrame | np.ndarray): Verbrauch in kWh je Intervall, als DataFrame mit
+            einer Spalte je Haushalt (Zeitindex = Intervallbeginn) oder Array Haushalte × Zeit.
+        pv_generation_matrix (pd.DataFrame | pd.Series | np.ndarray): PV-Erzeugung in kWh je Haushalt
+            (gleiche Form) oder ein gemeinsames Profil für alle Haushalte.
+        household_battery_kwh (float | array-like): Speicherkapazität je Haushalt (0 = ohne Speicher).
+        community_battery_kwh (float | array-like): Kapazität(en) des Quartiersspeichers.
+        battery_efficiency_charge, battery_efficiency_discharge (float): Wirkungsgrade (0-1).
+        household_max_charge_kw, household_max_discharge_kw (float | array-like): Leistung je Haushaltsspeicher.
+        community_max_charge_kw, community_max_discharge_kw (float | array-like): Leistung je Quartiersspeicher.
+        price_grid_per_kwh, price_feed_in_per_kwh (float | pd.Series): Preise wie simulate_capacity_batch.
+        initial_soc_percent, min_soc_percent, max_soc_percent (float): SOC-Parameter in %.
+        time_index (pd.DatetimeIndex | None): Zeitindex, falls consumption_matrix ein Array ist.
+        backend (str | None): "auto", "numba" oder "python".
+        validation_level (str | None): Prüfstufe der Energiebilanz je Spur ("off", "summary").
+        dispatch_strategy (str | None): siehe simulate_capacity_batch.
+        battery_curves (dict | None): Leistungs-/Wirkungsgradkennlinien (siehe simulate_one_year).
+
+    Returns:
+        dict: 'household_kpis' und 'household_reference_kpis' (je Haushalt mit bzw. ohne eigenen
+        Speicher), 'community_battery_kwh' (Array), 'community_kpis' (je Quartiersspeicher, am
+        Summenprofil), 'quarter_kpis' mit 'individual_batteries' (Summe der Haushalte mit eigenen
+        Speichern), 'without_battery' (Summe der Haushalte ohne Speicher) und 'shared_without_battery'
+        (saldiertes Quartier ohne Speicher), 'household_savings' (Energiekosten ohne minus mit eigenem
+        Speicher je Haushalt in Euro) und 'simulation_metadata'. KPI-Dictionaries im Format von
+        simulate_one_year()['kpis'].
+    """
+    if time_index is None and isinstance(consumption_matrix, pd.DataFrame):
+        time_index = consumption_matrix.index
+    load_rows = _household_rows(consumption_matrix)
+    num_households, num_periods = load_rows.shape
+    pv_rows = _household_rows(pv_generation_matrix, num_households)
+    if pv_rows.shape != load_rows.shape:
+        raise ValueError(f"PV- und Verbrauchsmatrix passen nicht zusammen: {pv_rows.shape} vs. {load_rows.shape}")
+    time_interval_hours, data_resolution, substeps = detect_time_resolution(time_index, num_periods)
+    if substeps is not None:
+        raise ValueError("Quartierssimulation erfordert einen gleichmäßigen Zeitindex (Daten vorher resamplen).")
+
+    # Eingangszeilen: Haushalte 0..N-1, Quartier (Summenprofil) N
+    pv_rows = np.vstack((pv_rows, pv_rows.sum(axis=0)))
+    load_rows = np.vstack((load_rows, load_rows.sum(axis=0)))
+    direct_rows = np.minimum(pv_rows, load_rows)
+    surplus_rows = pv_rows - direct_rows
+    deficit_rows = load_rows - direct_rows
+
+    # Spuren: Haushaltsspeicher (Zeile je Haushalt), danach Quartiersspeicher (Zeile N)
+    household_capacities = np.broadcast_to(np.asarray(household_battery_kwh, dtype=np.float64), (num_households,))
+    community_capacities = np.atleast_1d(np.asarray(community_battery_kwh, dtype=np.float64))
+    num_community = len(community_capacities)
+    capacities = np.concatenate((household_capacities, community_capacities))
+    input_row = np.concatenate((np.arange(num_households), np.full(num_community, num_households))).astype(np.int64)
+    max_charge_kw = np.concatenate((
+        np.broadcast_to(np.asarray(household_max_charge_kw, dtype=np.float64), (num_households,)),
+        np.broadcast_to(np.asarray(community_max_charge_kw, dtype=np.float64), (num_community,))
+    ))
+    max_discharge_kw = np.concatenate((
+        np.broadcast_to(np.asarray(household_max_discharge_kw, dtype=np.float64), (num_households,)),
+        np.broadcast_to(np.asarray(community_max_discharge_kw, dtype=np.float64), (num_community,))
+    ))
+    price_grid = _price_array(price_grid_per_kwh, time_index, num_periods)
+    price_feed_in = _price_array(price_feed_in_per_kwh, time_index, num_periods)
+
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    arbitrage = arbitrage_parameters(dispatch_strategy, time_interval_hours)
+    curves = resolve_battery_curves(battery_curves)
+    balance_efficiencies = ((None, None) if has_variable_efficiency(curves)
+                            else (battery_efficiency_charge, battery_efficiency_discharge))
+    resolved_backend = resolve_simulation_backend(backend)
+    totals_out = np.zeros((len(capacities), len(BATCH_TOTAL_COLUMNS)))
+    empty = np.zeros((len(capacities), 0))
+    kernel_args = (
+        surplus_rows, deficit_rows, input_row, price_grid, price_feed_in,
+        (initial_soc_percent / 100.0) * capacities,
+        (min_soc_percent / 100.0) * capacities,
+        (max_soc_percent / 100.0) * capacities,
+        np.ascontiguousarray(max_charge_kw * time_interval_hours),
+        np.ascontiguousarray(max_discharge_kw * time_interval_hours),
+        float(battery_efficiency_charge), float(battery_efficiency_discharge)
+    )
+    rolling_horizon_summary = None
+    if dispatch_strategy == "optimal":
+        totals_out[:] = solve_optimal_dispatch_batch(*kernel_args, backend=resolved_backend, battery_curves=curves)['totals']
+    elif dispatch_strategy == "rolling_horizon":
+        solution = solve_rolling_horizon_batch(
+            *kernel_args, **rolling_horizon_parameters(time_interval_hours), backend=resolved_backend,
+            battery_curves=curves
+        )
+        totals_out[:] = solution['totals']
+        rolling_horizon_summary = {
+            'num_windows': solution['num_windows'],
+            'reused_plans': solution['reused_plans'],
+            'solve_times': summarize_solve_times(solution['solve_times']),
+        }
+    elif resolved_backend == "numba":
+        _pv_first_batch_kernel_jit(*kernel_args, *arbitrage, *curves, totals_out, empty, empty, empty, None, None, None, None)
+    else:
+        _pv_first_batch_numpy(*kernel_args, *arbitrage, *curves, totals_out, empty, empty, empty, None, None, None, None)
+
+    # Jahressummen je Eingangszeile (Referenz ohne Speicher)
+    reference_columns = {
+        'pv_generation': pv_rows.sum(axis=1),
+        'consumption': load_rows.sum(axis=1),
+        'direct_self_consumption': direct_rows.sum(axis=1),
+        'grid_import': deficit_rows.sum(axis=1),
+        'grid_export': surplus_rows.sum(axis=1),
+        'grid_import_cost': deficit_rows @ price_grid,
+        'grid_export_revenue': surplus_rows @ price_feed_in,
+    }
+    row_totals = [{key: float(values[row]) for key, values in reference_columns.items()} for row in range(len(pv_rows))]
+
+    def lane_kpis(totals, battery_capacity_kwh):
+        """KPIs aus Jahressummen (konstante Preise wie in simulate_one_year aus den Energiesummen)."""
+        if not isinstance(price_grid_per_kwh, pd.Series):
+            totals['grid_import_cost'] = totals['grid_import'] * price_grid_per_kwh
+        if not isinstance(price_feed_in_per_kwh, pd.Series):
+            totals['grid_export_revenue'] = totals['grid_export'] * price_feed_in_per_kwh
+        return build_simulation_kpis(
+            totals,
+            battery_capacity_kwh=battery_capacity_kwh,
+            current_capacity_kwh=battery_capacity_kwh,
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge
+        )
+
+    validation_level = resolve_validation_level(validation_level)
+    energy_balance_validation = [] if validation_level != "off" else None
+    lane_totals = []
+    for lane in range(len(capacities)):
+        totals = dict(row_totals[input_row[lane]])
+        totals.update(zip(BATCH_TOTAL_COLUMNS, totals_out[lane]))
+        lane_totals.append(totals)
+        if energy_balance_validation is not None:
+            energy_balance_validation.append(_summarize_energy_balance(validation_level, totals, *balance_efficiencies))
+    reference_totals = [dict(dict.fromkeys(BATCH_TOTAL_COLUMNS, 0.0), **totals) for totals in row_totals]
+
+    household_kpis = [lane_kpis(dict(lane_totals[k]), float(household_capacities[k])) for k in range(num_households)]
+    household_reference_kpis = [lane_kpis(dict(reference_totals[k]), 0.0) for k in range(num_households)]
+    community_kpis = [
+        lane_kpis(dict(lane_totals[num_households + c]), float(community_capacities[c])) for c in range(num_community)
+    ]
+
+    def summed(totals_list):
+        return {key: sum(totals[key] for totals in totals_list) for key in totals_list[0]}
+
+    quarter_kpis = {
+        'individual_batteries': lane_kpis(summed(lane_totals[:num_households]), float(household_capacities.sum())),
+        'without_battery': lane_kpis(summed(reference_totals[:num_households]), 0.0),
+        'shared_without_battery': lane_kpis(dict(reference_totals[num_households]), 0.0),
+    }
+    household_savings = np.array([
+        reference['effective_annual_energy_cost'] - kpis['effective_annual_energy_cost']
+        for reference, kpis in zip(household_reference_kpis, household_kpis)
+    ])
+
+    return {
+        'household_kpis': household_kpis,
+        'household_reference_kpis': household_reference_kpis,
+        'household_savings': household_savings,
+        'community_battery_kwh': community_capacities,
+        'community_kpis': community_kpis,
+        'quarter_kpis': quarter_kpis,
+        'simulation_metadata': {
+            'data_resolution': data_resolution,
+            'time_interval_hours': time_interval_hours,
+            'num_periods': num_periods,
+            'num_households': num_households,
+            'num_community_batteries': num_community,
+            'simulation_backend': resolved_backend,
+            'dispatch_strategy': dispatch_strategy,
+            'battery_curves_active': any(curve is not None for curve in curves),
+            'rolling_horizon': rolling_horizon_summary,
+            'energy_balance_validation': energy_balance_validation
+        }
+    }
+
+
+def iter_series_chunks(consumption_series: pd.Series, pv_generation_series: pd.Series, chunk_periods: int):
+    """
+    Teilt zwei gleich lange Zeitreihen in aufeinanderfolgende Blöcke (z.B. 96 Intervalle = ein Tag bei 15 min).
+
+    Args:
+        consumption_series (pd.Series): Stromverbrauch in kWh.
+        pv_generation_series (pd.Series): PV-Erzeugung in kWh.
+        chunk_periods (int): Anzahl Intervalle je Block.
+
+    Yields:
+        tuple: (consumption_chunk, pv_generation_chunk)
+    """
+    if chunk_periods <= 0:
+        raise ValueError("chunk_periods muss größer als 0 sein.")
+    for start in range(0, len(consumption_series), chunk_periods):
+        yield (
+            consumption_series.iloc[start:start + chunk_periods],
+            pv_generation_series.iloc[start:start + chunk_periods]
+        )
+
+
+def simulate_streaming(
+    chunks,
+    battery_capacity_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    battery_max_charge_kw: float,
+    battery_max_discharge_kw: float,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    time_interval_hours: float | None = None,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    annual_capacity_loss_percent: float = 2.0,
+    simulation_year: int = 1,
+    return_time_series: bool = True,
+    backend: str | None = None,
+    validation_level: str | None = None,
+    battery_curves: dict | None = None,
+    dispatch_strategy: str | None = None
+):
+    """
+    Simuliert Zeitreihen blockweise (z.B. tage- oder wochenweise aus einem CSV-Reader) mit
+    konstantem Speicherbedarf. Der SOC wird über die Blockgrenzen fortgeführt; die Energieflüsse
+    sind damit identisch zu einer Simulation der gesamten Zeitreihe am Stück.
+
+    Args:
+        chunks (iterable): Folge von (consumption_chunk, pv_generation_chunk) als pd.Series mit
+            gleichem Zeitindex, z.B. aus iter_series_chunks() oder data_import.read_time_series_csv_chunks().
+        battery_capacity_kwh ... battery_max_discharge_kw: Batterieparameter wie in simulate_one_year.
+        price_grid_per_kwh (float | pd.Series): Preis für Netzbezug; Zeitreihen werden je Block am Index ausgerichtet.
+        price_feed_in_per_kwh (float | pd.Series): Preis für Netzeinspeisung (wie oben).
+        time_interval_hours (float | None): Intervalldauer in Stunden. None: aus dem Zeitindex des ersten Blocks.
+        initial_soc_percent, min_soc_percent, max_soc_percent (float): SOC-Parameter in %.
+        annual_capacity_loss_percent (float): Jährlicher Kapazitätsverlust in %.
+        simulation_year (int): Jahr der Simulation (für Kapazitätsalterung).
+        return_time_series (bool): Bei False enthalten die Blöcke nur die laufenden KPIs.
+        backend (str | None): "auto", "numba" oder "python".
+        validation_level (str | None): Prüfstufe der Energiebilanz wie in simulate_one_year; die
+            Summenprüfung erfolgt auf den laufenden Summen, die Intervallprüfung je Block.
+        battery_curves (dict | None): Leistungs-/Wirkungsgradkennlinien (siehe simulate_one_year).
+        dispatch_strategy (str | None): "pv_first" oder "threshold" (siehe simulate_one_year).
+            "optimal" und "rolling_horizon" benötigen die Preise über den Block hinaus und sind
+            blockweise nicht möglich.
+
+    Yields:
+        dict: Je Block 'chunk_index', 'time_series_data' (DataFrame des Blocks oder None),
+        'kpis' (laufende KPIs über alle bisherigen Blöcke im Format von simulate_one_year()['kpis']),
+        'soc_kwh' (SOC am Blockende) und 'energy_balance_validation' (laufende Summenprüfung oder None).
+    """
+    capacity_loss_factor = (1.0 - annual_capacity_loss_percent / 100.0) ** (simulation_year - 1)
+    current_battery_capacity_kwh = battery_capacity_kwh * capacity_loss_factor
+    current_soc_kwh = (initial_soc_percent / 100.0) * current_battery_capacity_kwh
+    min_soc_kwh = (min_soc_percent / 100.0) * current_battery_capacity_kwh
+    max_soc_kwh = (max_soc_percent / 100.0) * current_battery_capacity_kwh
+
+    validation_level = resolve_validation_level(validation_level)
+    dispatch_strategy = resolve_dispatch_strategy(dispatch_strategy)
+    if dispatch_strategy in ("optimal", "rolling_horizon"):
+        raise ValueError(f"Betriebsstrategie {dispatch_strategy} benötigt die gesamte Zeitreihe und ist blockweise "
+                         f"nicht möglich. Bitte simulate_one_year verwenden.")
+    curves = resolve_battery_curves(battery_curves)
+    balance_efficiencies = ((None, None) if has_variable_efficiency(curves)
+                            else (battery_efficiency_charge, battery_efficiency_discharge))
+    running_totals = dict.fromkeys(LEAN_TOTAL_COLUMNS + ('pv_generation', 'consumption'), 0.0)
+    for chunk_index, (consumption_chunk, pv_chunk) in enumerate(chunks):
+        if len(consumption_chunk) == 0:
+            continue
+        if time_interval_hours is None:
+            if len(consumption_chunk) < 2:
+                raise ValueError("Intervalldauer kann nicht aus einem Block mit nur einem Zeitpunkt bestimmt werden. "
+                                 "Bitte time_interval_hours angeben.")
+            time_interval_hours = pd.Series(consumption_chunk.index).diff().median().total_seconds() / 3600.0
+
+        kernel_params = dict(
+            initial_soc_kwh=current_soc_kwh,
+            min_soc_kwh=min_soc_kwh,
+            max_soc_kwh=max_soc_kwh,
+            max_charge_kwh=battery_max_charge_kw * time_interval_hours,
+            max_discharge_kwh=battery_max_discharge_kw * time_interval_hours,
+            battery_efficiency_charge=battery_efficiency_charge,
+            battery_efficiency_discharge=battery_efficiency_discharge,
+            battery_curves=curves,
+            backend=backend,
+            arbitrage=arbitrage_parameters(dispatch_strategy, time_interval_hours)
+        )
+        price_params = dict(price_grid_per_kwh=price_grid_per_kwh, price_feed_in_per_kwh=price_feed_in_per_kwh)
+        if return_time_series:
+            flows = run_dispatch_kernel(pv_chunk, consumption_chunk, **kernel_params, **price_params)
+            index = consumption_chunk.index
+            num_periods = len(consumption_chunk)
+            chunk_totals = {
+                'battery_charge': flows['Battery_Charge_kWh'].sum(),
+                'battery_discharge': flows['Battery_Discharge_kWh'].sum(),
+                'battery_charge_losses': flows['Battery_Charge_Losses_kWh'].sum(),
+                'battery_discharge_losses': flows['Battery_Discharge_Losses_kWh'].sum(),
+                'grid_import': flows['Grid_Import_kWh'].sum(),
+                'grid_export': flows['Grid_Export_kWh'].sum(),
+                'grid_import_cost': flows['Grid_Import_kWh'] @ _price_array(price_grid_per_kwh, index, num_periods),
+                'grid_export_revenue': flows['Grid_Export_kWh'] @ _price_array(price_feed_in_per_kwh, index, num_periods),
+                'direct_self_consumption': flows['Direct_Self_Consumption_kWh'].sum(),
+                'grid_charge': flows['Grid_Charge_kWh'].sum(),
+                'grid_discharge': flows['Grid_Discharge_kWh'].sum(),
+                'pv_generation': _as_float_array(pv_chunk).sum(),
+                'consumption': _as_float_array(consumption_chunk).sum(),
+            }
+            time_series_data = pd.DataFrame({
+                'PV_Generation_kWh': _as_float_array(pv_chunk),
+                'Consumption_kWh': _as_float_array(consumption_chunk),
+                **{column: flows[column] for column in KERNEL_OUTPUT_COLUMNS}
+            }, index=index)
+        else:
+            flows = chunk_totals = run_totals_kernel(pv_chunk, consumption_chunk, **price_params, **kernel_params)
+            time_series_data = None
+
+        if validation_level == "interval":
+            _check_simulation_intervals(
+                flows if return_time_series else run_dispatch_kernel(
+                    pv_chunk, consumption_chunk, **kernel_params, **price_params
+                ),
+                pv_chunk, consumption_chunk, kernel_params
+            )
+
+        current_soc_kwh = flows['final_soc_kwh']
+        for key in running_totals:
+            running_totals[key] += chunk_totals[key]
+
+        yield {
+            'chunk_index': chunk_index,
+            'time_series_data': time_series_data,
+            'kpis': build_simulation_kpis(
+                running_totals,
+                battery_capacity_kwh=battery_capacity_kwh,
+                current_capacity_kwh=current_battery_capacity_kwh,
+                battery_efficiency_charge=battery_efficiency_charge,
+                battery_efficiency_discharge=battery_efficiency_discharge,
+                simulation_year=simulation_year
+            ),
+            'soc_kwh': current_soc_kwh,
+            'energy_balance_validation': _summarize_energy_balance(
+                validation_level, running_totals, *balance_efficiencies
+            )
         }
-    } 
\ No newline at end of file
@@ -1,8 +1,68 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
 import pandas as pd
 import numpy as np
-from model import simulate_one_year
-from analysis import calculate_financial_kpis
-from config import DEFAULT_ANNUAL_CAPACITY_LOSS_PERCENT
+from model import (simulate_one_year, simulate_capacity_batch, simulate_lifetime, cluster_typical_days,
+                   simulate_typical_days, coarsen_time_series, simulate_pv_capacity_batch, detect_time_resolution,
+                   resolve_dispatch_strategy, simulate_quarter)
+from analysis import calculate_contribution_margin_kpis, calculate_energy_savings, calculate_financial_kpis
+from config import (DEFAULT_ANNUAL_CAPACITY_LOSS_PERCENT, SCREENING_VERIFY_CAPACITIES, DEFAULT_SWEEP_WORKERS,
+                    SWEEP_CHUNKS_PER_WORKER, SWEEP_PARALLEL_MIN_WORK, SWEEP_DP_WORK_FACTOR,
+                    SWEEP_MIN_CAPACITIES_PER_WORKER, DEFAULT_OPTIMIZATION_CRITERION, DEFAULT_SEARCH_MODE,
+                    ADAPTIVE_SEARCH_COARSE_POINTS, DEFAULT_VERIFY_GRID, COARSE_TO_FINE_INTERVAL_HOURS,
+                    COARSE_TO_FINE_NEIGHBOR_STEPS, INTERPOLATION_ANCHOR_POINTS, INTERPOLATION_TOLERANCE_PERCENT,
+                    INVERTER_AC_POWER_KW, FEED_IN_LIMIT_PERCENT)
+
+# Suchverfahren über die Speichergröße (find_optimal_size)
+SEARCH_MODES = ("grid", "adaptive", "coarse_to_fine", "interpolated")
+
+# Goldener Schnitt: Anteil des inneren Punkts am Suchintervall
+GOLDEN_SECTION_RATIO = (np.sqrt(5.0) - 1.0) / 2.0
+
+def criterion_column(optimization_criterion: str | None = None) -> str:
+    """Ergebnisspalte des Optimierungskriteriums (wie in ui.run_analysis_job; None: DEFAULT_OPTIMIZATION_CRITERION)."""
+    optimization_criterion = DEFAULT_OPTIMIZATION_CRITERION if optimization_criterion is None else optimization_criterion
+    if optimization_criterion == "Deckungsbeitrag III gesamt (Nominal)":
+        return 'total_db3_nominal'
+    return 'total_db3_present_value'
+
+
+def resolve_search_mode(search_mode: str | None = None) -> str:
+    """Prüft das Suchverfahren (None: DEFAULT_SEARCH_MODE)."""
+    search_mode = DEFAULT_SEARCH_MODE if search_mode is None else search_mode
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Unbekanntes Suchverfahren '{search_mode}'. Erlaubt: {', '.join(SEARCH_MODES)}")
+    return search_mode
+
+
+def resolve_capacity_power(capacity_kwh: float, battery_max_charge_kw: float, battery_max_discharge_kw: float,
+                           battery_tech_params: dict | None = None) -> tuple:
+    """Lade-/Entladeleistung einer Kapazität (Excel-basierte Technikparameter, sonst die festen Werte)."""
+    cap_int = int(round(capacity_kwh))
+    if battery_tech_params and isinstance(battery_tech_params, dict):
+        # exakte Kapazität
+        if cap_int in battery_tech_params:
+            m = battery_tech_params[cap_int]
+            return (
+                float(m.get("max_charge_kw", battery_max_charge_kw)),
+                float(m.get("max_discharge_kw", battery_max_discharge_kw)),
+            )
+        # nächstliegende Kapazität suchen
+        keys = sorted(battery_tech_params.keys())
+        if keys:
+            nearest = min(keys, key=lambda k: abs(k - cap_int))
+            m = battery_tech_params.get(nearest, {})
+            return (
+                float(m.get("max_charge_kw", battery_max_charge_kw)),
+                float(m.get("max_discharge_kw", battery_max_discharge_kw)),
+            )
+    # Fallback auf feste UI/Default-Werte
+    return (battery_max_charge_kw, battery_max_discharge_kw)
+
 
 def find_optimal_size(
     consumption_series: pd.Series,
@@ -25,12 +85,165 @@ def find_optimal_size(
     annual_capacity_loss_percent: float = 2.0, # Jährlicher Kapazitätsverlust in %
     battery_tech_params: dict | None = None,
     project_interest_rate_db: float = 0.03,  # Zinssatz für DB-Rechnung
-) -> list:
+    lifetime_simulation: bool = False,  # Alle Projektjahre simulieren statt Jahr 1 hochzurechnen
+    annual_pv_degradation_percent: float = 0.0,  # Jährlicher Rückgang der PV-Erzeugung in % (nur Lebensdauer-Simulation)
+    annual_load_growth_percent: float = 0.0,  # Jährliche Verbrauchsänderung in % (nur Lebensdauer-Simulation)
+    dispatch_strategy: str | None = None,  # "pv_first", "threshold" (Arbitrage mit THRESHOLD_*-Werten), "optimal" oder "rolling_horizon"
+    aging_model: str | None = None,  # "flat" oder "cycle_calendar" (Zyklen- und kalendarische Alterung, nur Lebensdauer-Simulation)
+    screening: bool = False,  # Erstes Jahr nur auf Typtagen simulieren (schneller Suchlauf mit Fehlerangabe)
+    typical_days: int | None = None,  # Anzahl Typtage im Screening (None: SCREENING_TYPICAL_DAYS)
+    workers: int | None = None,  # Worker-Prozesse des Suchlaufs (None: DEFAULT_SWEEP_WORKERS, 0: alle Kerne)
+    search_mode: str | None = None,  # "grid" (alle Kapazitäten), "adaptive", "coarse_to_fine" oder "interpolated" (None: DEFAULT_SEARCH_MODE)
+    optimization_criterion: str | None = None,  # Zielgröße der adaptiven Suche (None: DEFAULT_OPTIMIZATION_CRITERION)
+    verify_grid: bool | None = None,  # Adaptive Suche: volles Raster im Hintergrund prüfen (None: DEFAULT_VERIFY_GRID)
+    return_metadata: bool = False,  # Zusätzlich Jahreswerte und Angaben zum Suchlauf zurückgeben (dict statt Liste)
+    curtailment_totals: dict | None = None,  # Clipping/Abregelung der Vorverarbeitung (siehe model.simulate_one_year)
+) -> list | dict:
     """
     Findet die wirtschaftlich optimale Speichergröße durch Iteration über verschiedene Kapazitäten.
+
+    Mit lifetime_simulation=True werden alle Jahre der Projektlaufzeit mit gealterter Kapazität
+    (optional PV-Degradation und Lastwachstum) in einem Batch-Durchlauf simuliert; NPV und DB III
+    basieren dann auf den simulierten Ersparnissen je Jahr. Mit aging_model="cycle_calendar" folgt die
+    Kapazität jedes Jahres aus den gezählten Zyklen und dem mittleren SOC des Vorjahres statt aus
+    annual_capacity_loss_percent. Die Jahreswerte stehen nicht in den Ergebnissen (eine Tabellenzeile
+    mit skalaren Kennzahlen je Kapazität), sondern mit return_metadata=True einmalig unter 'by_year'
+    (siehe _split_by_year).
+    Mit dispatch_strategy="threshold" lädt bzw. entlädt jede Kapazität zusätzlich am Netz,
+    mit "optimal" wird je Kapazität die kostenoptimale Fahrweise bei vollständiger Voraussicht
+    bestimmt (obere Schranke für die Heuristiken, siehe model.simulate_one_year), mit "rolling_horizon"
+    die rollierende Optimierung auf Basis einer Prognose (realistischer Informationsstand, MPC_* in config.py).
+    Mit screening=True wird das erste Jahr nur auf Typtagen simuliert (model.cluster_typical_days und
+    model.simulate_typical_days); an SCREENING_VERIFY_CAPACITIES Kapazitäten wird gegen die
+    Volljahressimulation geprüft, die Abweichung steht einmalig in search_metadata unter
+    'screening_error' (nicht bei search_mode="coarse_to_fine"). Die Ergebnisse sind dann Näherungen (DB III kann sich gegen das volle Jahr
+    spürbar verschieben) und tragen 'screened': True. Die Lebensdauer-Simulation läuft auch im
+    Screening über das volle Jahr.
+    Mit workers > 1 werden die Kapazitäten auf einen Prozesspool verteilt (siehe _run_capacity_sweep);
+    die Ergebnisse sind identisch mit dem seriellen Lauf und in derselben Reihenfolge.
+    Mit search_mode="adaptive" werden nicht alle Rasterpunkte simuliert, sondern ein Grobraster
+    und anschließend der Goldene Schnitt auf den Rasterpunkten um das beste Grobraster-Ergebnis
+    (Kriterium optimization_criterion, als nahezu unimodal angenommen). Zurückgegeben werden nur die
+    ausgewerteten Kapazitäten (aufsteigend), mit verify_grid zusätzlich in search_metadata unter
+    'grid_verification' ein Future der Rasterprüfung im Hintergrund (siehe _start_grid_verification).
+    Mit search_mode="coarse_to_fine" werden alle Kapazitäten zuerst mit stündlich zusammengefassten
+    Zeitreihen bewertet und nur die Nachbarschaft des Optimums in Originalauflösung nachgerechnet;
+    zurückgegeben werden die nachgerechneten Kapazitäten, die Abweichung der Stufen steht einmalig
+    in search_metadata unter 'resolution_error' (siehe _coarse_to_fine_search).
+    Mit search_mode="interpolated" werden nur Stützstellen simuliert und die Energie-KPIs der übrigen
+    Rasterpunkte monoton interpoliert, Finanz- und DB-Kennzahlen aber für jede Kapazität berechnet;
+    Stützstellen kommen hinzu, bis der geschätzte Interpolationsfehler unter der Toleranz liegt
+    (siehe _interpolated_sweep). Das Ergebnis enthält wie beim Raster alle Kapazitäten; 'interpolated'
+    markiert Ergebnisse ohne eigene Simulation, Stützstellen und Fehlerschätzung stehen einmalig in
+    search_metadata unter 'interpolation'.
+
+    Returns:
+        list | dict: Ergebnisse je Kapazität (aufsteigend); mit return_metadata=True ein dict mit
+        'results', 'by_year' (Jahreswerte der Lebensdauer-Simulation oder None) und 'search_metadata'
+        (Angaben zum Suchlauf: 'search_mode', 'screening_error', 'grid_verification', 'resolution_error',
+        'interpolation').
+    """
+    capacities = np.arange(min_capacity_kwh, max_capacity_kwh + step_kwh, step_kwh)
+    capacity_powers = [
+        resolve_capacity_power(capacity, battery_max_charge_kw, battery_max_discharge_kw, battery_tech_params)
+        for capacity in capacities
+    ]
+
+    settings = dict(
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        battery_cost_curve=battery_cost_curve,
+        project_lifetime_years=project_lifetime_years,
+        discount_rate=discount_rate,
+        initial_soc_percent=initial_soc_percent,
+        min_soc_percent=min_soc_percent,
+        max_soc_percent=max_soc_percent,
+        annual_capacity_loss_percent=annual_capacity_loss_percent,
+        project_interest_rate_db=project_interest_rate_db,
+        lifetime_simulation=lifetime_simulation,
+        annual_pv_degradation_percent=annual_pv_degradation_percent,
+        annual_load_growth_percent=annual_load_growth_percent,
+        dispatch_strategy=dispatch_strategy,
+        aging_model=aging_model,
+        curtailment_totals=curtailment_totals
+    )
+    search_mode = resolve_search_mode(search_mode)
+    search_metadata = {'search_mode': search_mode, 'screening_error': None, 'grid_verification': None,
+                       'resolution_error': None, 'interpolation': None}
+    if search_mode == "coarse_to_fine":
+        results, search_metadata['resolution_error'] = _coarse_to_fine_search(
+            consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+            capacities, capacity_powers, workers, settings, criterion_column(optimization_criterion),
+            screening, typical_days
+        )
+        return _search_output(results, search_metadata, return_metadata)
+
+    sweep_args = _sweep_arguments(consumption_series, pv_generation_series, price_grid_per_kwh,
+                                  price_feed_in_per_kwh, settings, screening, typical_days)
+    def evaluate(indices, use_cache=True):
+        return _run_capacity_sweep(consumption_series, pv_generation_series, capacities[indices],
+                                   [capacity_powers[i] for i in indices], workers,
+                                   dict(sweep_args, use_cache=use_cache))
+
+    if search_mode == "interpolated":
+        results, search_metadata['interpolation'] = _interpolated_sweep(
+            consumption_series, pv_generation_series, capacities, capacity_powers, sweep_args
+        )
+    elif search_mode == "adaptive":
+        column = criterion_column(optimization_criterion)
+        results = _adaptive_capacity_search(evaluate, len(capacities), column)
+        print(f"✅ Adaptive Suche: {len(results)} von {len(capacities)} Speichergrößen simuliert, "
+              f"Optimum bei {max(results, key=lambda result: result[column])['battery_capacity_kwh']} kWh")
+        if DEFAULT_VERIFY_GRID if verify_grid is None else verify_grid:
+            # Ohne DispatchCache: das volle Raster soll die Einträge der laufenden Sitzung nicht verdrängen
+            search_metadata['grid_verification'] = _start_grid_verification(
+                lambda indices: evaluate(indices, use_cache=False), len(capacities), column, results
+            )
+    else:
+        results = evaluate(np.arange(len(capacities)))
+
+    if screening:
+        # Screening an wenigen Kapazitäten gegen das volle Jahr prüfen
+        search_metadata['screening_error'] = _screening_error(
+            consumption_series, pv_generation_series, capacities, capacity_powers, sweep_args
+        )
+    return _search_output(results, search_metadata, return_metadata)
+
+
+def _search_output(results: list, search_metadata: dict, return_metadata: bool) -> list | dict:
+    """Rückgabe von find_optimal_size: Jahreswerte aus den Ergebnissen lösen, optional mit Angaben zum Suchlauf."""
+    by_year = _split_by_year(results)
+    if not return_metadata:
+        return results
+    return {'results': results, 'by_year': by_year, 'search_metadata': search_metadata}
+
+
+# Jahreswerte der Lebensdauer-Simulation je Ergebnis (von _evaluate_capacities gesetzt, von _split_by_year gelöst)
+BY_YEAR_COLUMNS = ('annual_savings_by_year', 'capacity_by_year_kwh', 'equivalent_full_cycles_by_year')
+
+
+def _split_by_year(results: list) -> dict | None:
+    """
+    Entfernt die Jahreswerte (BY_YEAR_COLUMNS) aus den Ergebnissen, damit jede Ergebniszeile nur
+    skalare Kennzahlen enthält (Tabellen, Excel-Export), und liefert sie einmalig je Kapazität.
+
+    Returns:
+        dict | None: 'battery_capacity_kwh' (Liste) und je Spalte aus BY_YEAR_COLUMNS eine Liste mit
+        den Werten je Projektjahr für jede Kapazität (None ohne Werte); None ohne Lebensdauer-Simulation.
+    """
+    by_year = {'battery_capacity_kwh': [float(result['battery_capacity_kwh']) for result in results]}
+    for column in BY_YEAR_COLUMNS:
+        values = [result.pop(column, None) for result in results]
+        by_year[column] = values if any(value is not None for value in values) else None
+    return by_year if by_year['annual_savings_by_year'] is not None else None
+
+
+def _sweep_arguments(consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+                     settings: dict, screening: bool = False, typical_days: int | None = None) -> dict:
+    """
+    Parameter des Suchlaufs für eine Eingangsreihe: Simulation ohne Batterie (einmalig, Referenz
+    aller Kapazitäten), bei screening die Typtage, Preise und die festen Einstellungen (settings).
     """
-    results = []
-    
     # OPTIMIERUNG: Simulation ohne Batterie nur EINMAL ausführen
     print("🔄 Führe Simulation ohne Batterie aus (einmalig)...")
     no_battery_sim = simulate_one_year(
@@ -47,106 +260,655 @@ def find_optimal_size(
         min_soc_percent=0.0,
         max_soc_percent=0.0,
         annual_capacity_loss_percent=0.0,
-        simulation_year=1
+        simulation_year=1,
+        return_time_series=False,  # Nur KPIs benötigt
+        curtailment_totals=settings.get('curtailment_totals')
     )
     print("✅ Simulation ohne Batterie abgeschlossen!")
-    
-    # Helper: pro Kapazität passende Lade-/Entladeleistung bestimmen
-    def resolve_power_for_capacity(capacity_kwh: float):
-        cap_int = int(round(capacity_kwh))
-        if battery_tech_params and isinstance(battery_tech_params, dict):
-            # exakte Kapazität
-            if cap_int in battery_tech_params:
-                m = battery_tech_params[cap_int]
-                return (
-                    float(m.get("max_charge_kw", battery_max_charge_kw)),
-                    float(m.get("max_discharge_kw", battery_max_discharge_kw)),
-                )
-            # nächstliegende Kapazität suchen
-            keys = sorted(battery_tech_params.keys())
-            if keys:
-                nearest = min(keys, key=lambda k: abs(k - cap_int))
-                m = battery_tech_params.get(nearest, {})
-                return (
-                    float(m.get("max_charge_kw", battery_max_charge_kw)),
-                    float(m.get("max_discharge_kw", battery_max_discharge_kw)),
-                )
-        # Fallback auf feste UI/Default-Werte
-        return (battery_max_charge_kw, battery_max_discharge_kw)
-    
-    for capacity in np.arange(min_capacity_kwh, max_capacity_kwh + step_kwh, step_kwh):
-        if capacity == 0: # Szenario ohne Speicher
-            # Verwende die bereits berechnete Simulation ohne Batterie
-            sim_result = no_battery_sim
+
+    typical = None
+    if screening:
+        typical = cluster_typical_days(
+            consumption_series, pv_generation_series, typical_days,
+            price_series=price_grid_per_kwh if isinstance(price_grid_per_kwh, pd.Series) else None,
+            verbose=True  # Zusammenfassung im Protokoll des Suchlaufs
+        )
+    return dict(
+        no_battery_sim=no_battery_sim,
+        typical=typical,
+        price_grid_per_kwh=price_grid_per_kwh,
+        price_feed_in_per_kwh=price_feed_in_per_kwh,
+        **settings
+    )
+
+
+def _pchip_interpolate(x: np.ndarray, y: np.ndarray, x_new: np.ndarray) -> np.ndarray:
+    """
+    Monotone stückweise kubische Hermite-Interpolation (PCHIP, Fritsch-Carlson) je Spalte von y.
+
+    Die Steigungen an inneren Stützstellen sind das gewichtete harmonische Mittel der benachbarten
+    Sekanten (0 bei Vorzeichenwechsel), an den Rändern die Dreipunktformel mit Begrenzung; monotone
+    Daten bleiben so monoton, ohne Überschwinger. Mit zwei Stützstellen linear.
+
+    Args:
+        x (np.ndarray): Stützstellen, streng steigend (n,).
+        y (np.ndarray): Werte an den Stützstellen (n, Spalten).
+        x_new (np.ndarray): Auswertungspunkte innerhalb [x[0], x[-1]].
+    """
+    h = np.diff(x)
+    delta = np.diff(y, axis=0) / h[:, None]
+    slopes = np.repeat(delta[:1], len(x), axis=0)
+    if len(x) > 2:
+        w1 = (2.0 * h[1:] + h[:-1])[:, None]
+        w2 = (h[1:] + 2.0 * h[:-1])[:, None]
+        same_sign = np.sign(delta[:-1]) * np.sign(delta[1:]) > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+        slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+        for end, (h0, h1, d0, d1) in ((0, (h[0], h[1], delta[0], delta[1])),
+                                       (-1, (h[-1], h[-2], delta[-1], delta[-2]))):
+            slope = ((2.0 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+            slope = np.where(np.sign(slope) != np.sign(d0), 0.0, slope)
+            slopes[end] = np.where((np.sign(d0) != np.sign(d1)) & (np.abs(slope) > 3.0 * np.abs(d0)), 3.0 * d0, slope)
+
+    segment = np.clip(np.searchsorted(x, x_new, side='right') - 1, 0, len(x) - 2)
+    width = h[segment][:, None]
+    t = ((x_new - x[segment]) / h[segment])[:, None]
+    return ((2 * t**3 - 3 * t**2 + 1) * y[segment] + (t**3 - 2 * t**2 + t) * width * slopes[segment]
+            + (-2 * t**3 + 3 * t**2) * y[segment + 1] + (t**3 - t**2) * width * slopes[segment + 1])
+
+
+def _interpolated_sweep(consumption_series, pv_generation_series, capacities, capacity_powers,
+                        sweep_args: dict) -> tuple:
+    """
+    Bewertet alle Kapazitäten mit Simulationen nur an Stützstellen.
+
+    Zu Beginn werden INTERPOLATION_ANCHOR_POINTS Rasterpunkte (inkl. Rand) in einem Batch simuliert.
+    Alle Gleitkomma-KPIs des ersten Jahres, die simulierten Ersparnisse je Projektjahr und die
+    Alterung (Lebensdauer-Simulation) werden über die Kapazität monoton interpoliert
+    (_pchip_interpolate); übrige Einträge stammen von der nächsten Stützstelle. Als Fehlerschätzung
+    je Intervall dient der größte Abstand zwischen PCHIP und linearer Interpolation der Energien
+    (kWh) bezogen auf den Jahresverbrauch; Intervalle über INTERPOLATION_TOLERANCE_PERCENT erhalten
+    ihren mittleren Rasterpunkt als neue Stützstelle, bis alle Intervalle die Toleranz einhalten.
+    Finanz- und DB-Kennzahlen werden danach für jede Kapazität aus den (interpolierten) Werten
+    berechnet (_evaluate_capacities). Jedes Ergebnis enthält 'interpolated' (True ohne eigene
+    Simulation).
+
+    Returns:
+        tuple: (results, interpolation) mit den Ergebnissen aller Kapazitäten und einem dict mit den
+        Stützstellen, der Anzahl Simulationen und dem geschätzten Restfehler.
+    """
+    simulation_params = {
+        name: sweep_args[name] for name in (
+            'typical', 'battery_efficiency_charge', 'battery_efficiency_discharge', 'price_grid_per_kwh',
+            'price_feed_in_per_kwh', 'project_lifetime_years', 'initial_soc_percent', 'min_soc_percent',
+            'max_soc_percent', 'annual_capacity_loss_percent', 'lifetime_simulation',
+            'annual_pv_degradation_percent', 'annual_load_growth_percent', 'dispatch_strategy', 'aging_model',
+            'curtailment_totals'
+        )
+    }
+    reference_kpis = sweep_args['no_battery_sim']['kpis']
+    consumption_kwh = max(abs(float(reference_kpis['total_consumption_kwh'])), 1e-9)
+    num_capacities = len(capacities)
+    anchor_kpis = {}
+    anchor_savings = {}
+    anchor_aging = {}
+
+    def simulate(indices):
+        kpis, lifetime_result = _simulate_capacities(
+            consumption_series, pv_generation_series, capacities[indices],
+            [capacity_powers[i] for i in indices], **simulation_params
+        )
+        for position, i in enumerate(indices):
+            # Kapazität 0 wie im Raster aus der Simulation ohne Batterie
+            anchor_kpis[i] = reference_kpis if capacities[i] == 0 else kpis[position]
+            if lifetime_result is not None:
+                anchor_savings[i] = lifetime_result['annual_savings'][position]
+                if lifetime_result['aging'] is not None:
+                    anchor_aging[i] = (lifetime_result['aging']['capacity_kwh'][position],
+                                       lifetime_result['aging']['equivalent_full_cycles'][position])
+
+    anchors = np.unique(np.linspace(0, num_capacities - 1, min(INTERPOLATION_ANCHOR_POINTS, num_capacities))
+                        .round().astype(int))
+    simulate(list(anchors))
+    columns = [name for name, value in anchor_kpis[int(anchors[0])].items()
+               if isinstance(value, float) and all(isinstance(anchor_kpis[int(i)].get(name), float) for i in anchors[1:])]
+    energy_columns = [name for name in columns if name.endswith('_kwh')]
+    while True:
+        anchors = np.array(sorted(anchor_kpis))
+        anchor_x = capacities[anchors].astype(float)
+        anchor_y = np.array([[anchor_kpis[i][name] for name in energy_columns] for i in anchors], dtype=float)
+        interior = np.setdiff1d(np.arange(num_capacities), anchors)
+        error_percent = np.zeros(len(anchors) - 1)
+        if len(anchors) > 1 and len(interior):
+            deviation = np.abs(
+                _pchip_interpolate(anchor_x, anchor_y, capacities[interior].astype(float))
+                - np.stack([np.interp(capacities[interior], anchor_x, column) for column in anchor_y.T], axis=1)
+            ).max(axis=1) / consumption_kwh * 100.0
+            np.maximum.at(error_percent, np.searchsorted(anchors, interior) - 1, deviation)
+        refine = [int((anchors[k] + anchors[k + 1]) // 2) for k in range(len(anchors) - 1)
+                  if error_percent[k] > INTERPOLATION_TOLERANCE_PERCENT and anchors[k + 1] - anchors[k] > 1]
+        if not refine:
+            break
+        print(f"🔄 Interpolation: {len(refine)} zusätzliche Stützstellen (Fehlerschätzung über "
+              f"{INTERPOLATION_TOLERANCE_PERCENT}% des Verbrauchs)...")
+        simulate(refine)
+
+    all_x = capacities.astype(float)
+    interpolated_columns = _pchip_interpolate(
+        anchor_x, np.array([[anchor_kpis[i][name] for name in columns] for i in anchors], dtype=float), all_x
+    ) if len(anchors) > 1 else None
+    kpis_by_capacity = []
+    for i in range(num_capacities):
+        if i in anchor_kpis:
+            kpis_by_capacity.append(anchor_kpis[i])
+            continue
+        kpis = dict(anchor_kpis[int(anchors[np.argmin(np.abs(anchors - i))])])
+        kpis.update(zip(columns, interpolated_columns[i].tolist()))
+        kpis_by_capacity.append(kpis)
+
+    lifetime_result = None
+    if anchor_savings:
+        def curve(values):
+            return _pchip_interpolate(anchor_x, np.array([values[i] for i in anchors], dtype=float), all_x) \
+                if len(anchors) > 1 else np.array([values[i] for i in anchors], dtype=float)
+        lifetime_result = {'annual_savings': curve(anchor_savings), 'aging': None}
+        if anchor_aging:
+            lifetime_result['aging'] = {
+                'capacity_kwh': curve({i: anchor_aging[i][0] for i in anchors}),
+                'equivalent_full_cycles': curve({i: anchor_aging[i][1] for i in anchors}),
+            }
+        for i in anchors:
+            # Stützstellen exakt übernehmen
+            lifetime_result['annual_savings'][i] = anchor_savings[i]
+            if anchor_aging:
+                lifetime_result['aging']['capacity_kwh'][i], lifetime_result['aging']['equivalent_full_cycles'][i] = anchor_aging[i]
+
+    results = _evaluate_capacities(consumption_series, pv_generation_series, capacities, capacity_powers,
+                                   **sweep_args, simulated=(kpis_by_capacity, lifetime_result))
+    interpolation = {
+        'anchor_capacity_kwh': [float(capacity) for capacity in capacities[anchors]],
+        'num_simulations': len(anchors),
+        'num_capacities': num_capacities,
+        'max_error_estimate_percent': float(error_percent.max()) if len(error_percent) else 0.0,
+        'tolerance_percent': float(INTERPOLATION_TOLERANCE_PERCENT),
+    }
+    for i, result in enumerate(results):
+        result['interpolated'] = i not in anchor_kpis
+    print(f"✅ Interpolation: {len(anchors)} von {num_capacities} Speichergrößen simuliert, geschätzter "
+          f"Restfehler max. {interpolation['max_error_estimate_percent']:.3f}% des Verbrauchs")
+    return results, interpolation
+
+
+def _coarse_to_fine_search(consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+                           capacities, capacity_powers, workers, settings: dict, column: str,
+                           screening: bool = False, typical_days: int | None = None) -> tuple:
+    """
+    Zweistufige Suche über die Zeitauflösung.
+
+    Stufe 1 bewertet alle Kapazitäten auf zu COARSE_TO_FINE_INTERVAL_HOURS zusammengefassten
+    Zeitreihen (model.coarsen_time_series, mit eigener Referenz ohne Speicher), Stufe 2 nur die
+    COARSE_TO_FINE_NEIGHBOR_STEPS Rasterpunkte je Seite um deren Optimum in Originalauflösung.
+
+    Returns:
+        tuple: (results, resolution_error) mit den Ergebnissen der Stufe 2 (aufsteigend nach
+        Kapazität) und dem Vergleich der Stufen als dict skalarer Werte (None bei bereits grober Auflösung):
+        Optimum beider Stufen, größte Abweichung des Kriteriums column und der Ersparnis über die
+        nachgerechneten Kapazitäten sowie 'optimum_at_edge' (Optimum der Stufe 2 am Rand der
+        Nachbarschaft: Abkürzung für diesen Standort unsicher).
+    """
+    coarse_consumption, coarse_pv, coarse_price_grid, coarse_price_feed_in, factor = coarsen_time_series(
+        consumption_series, pv_generation_series, price_grid_per_kwh, price_feed_in_per_kwh,
+        COARSE_TO_FINE_INTERVAL_HOURS
+    )
+    if factor == 1:
+        print("⚠️ Zeitreihen bereits in grober Auflösung, rechne alle Speichergrößen direkt...")
+    else:
+        print(f"🔄 Stufe 1: {len(capacities)} Speichergrößen mit {factor}x zusammengefassten Intervallen...")
+    coarse_args = _sweep_arguments(coarse_consumption, coarse_pv, coarse_price_grid, coarse_price_feed_in,
+                                   settings, screening, typical_days)
+    coarse_results = _run_capacity_sweep(coarse_consumption, coarse_pv, capacities, capacity_powers,
+                                         workers, coarse_args)
+    if factor == 1:
+        return coarse_results, None
+
+    coarse_best = int(np.argmax([result[column] for result in coarse_results]))
+    indices = np.arange(max(coarse_best - COARSE_TO_FINE_NEIGHBOR_STEPS, 0),
+                        min(coarse_best + COARSE_TO_FINE_NEIGHBOR_STEPS, len(capacities) - 1) + 1)
+    print(f"🔄 Stufe 2: {len(indices)} Speichergrößen um {capacities[coarse_best]} kWh in Originalauflösung...")
+    fine_args = _sweep_arguments(consumption_series, pv_generation_series, price_grid_per_kwh,
+                                 price_feed_in_per_kwh, settings, screening, typical_days)
+    results = _run_capacity_sweep(consumption_series, pv_generation_series, capacities[indices],
+                                  [capacity_powers[i] for i in indices], workers, fine_args)
+
+    fine_best = int(np.argmax([result[column] for result in results]))
+    coarse_reference_cost = coarse_args['no_battery_sim']['kpis']['effective_annual_energy_cost']
+    fine_reference_cost = fine_args['no_battery_sim']['kpis']['effective_annual_energy_cost']
+    criterion_error_percent = []
+    savings_error_percent = []
+    for i, result in zip(indices, results):
+        coarse = coarse_results[i]
+        criterion_error_percent.append(
+            float((coarse[column] - result[column]) / abs(result[column]) * 100.0) if result[column] != 0 else 0.0
+        )
+        fine_savings = fine_reference_cost - result['effective_annual_energy_cost']
+        coarse_savings = coarse_reference_cost - coarse['effective_annual_energy_cost']
+        savings_error_percent.append(
+            float((coarse_savings - fine_savings) / abs(fine_savings) * 100.0) if fine_savings != 0 else 0.0
+        )
+    fine_index = int(indices[fine_best])
+    resolution_error = {
+        'coarse_interval_hours': float(COARSE_TO_FINE_INTERVAL_HOURS),
+        'coarse_capacity_kwh': float(capacities[coarse_best]),
+        'fine_capacity_kwh': float(capacities[fine_index]),
+        'optimum_shift_steps': fine_index - coarse_best,
+        'optimum_at_edge': bool(fine_index in (indices[0], indices[-1]) and fine_index not in (0, len(capacities) - 1)),
+        'num_coarse_capacities': len(capacities),
+        'num_verified_capacities': len(indices),
+        'max_abs_criterion_error_percent': max(abs(error) for error in criterion_error_percent),
+        'max_abs_savings_error_percent': max(abs(error) for error in savings_error_percent),
+    }
+    print(f"{'⚠️' if resolution_error['optimum_at_edge'] else '✅'} Optimum Stufe 1 bei "
+          f"{resolution_error['coarse_capacity_kwh']} kWh, Originalauflösung bei "
+          f"{resolution_error['fine_capacity_kwh']} kWh; Abweichung der Ersparnis max. "
+          f"{resolution_error['max_abs_savings_error_percent']:.1f}%")
+    return results, resolution_error
+
+
+# Argumente der Batch-Simulation des ersten Jahres aus den Parametern des Suchlaufs
+_FIRST_YEAR_BATCH_ARGUMENTS = (
+    'battery_efficiency_charge', 'battery_efficiency_discharge', 'price_grid_per_kwh', 'price_feed_in_per_kwh',
+    'initial_soc_percent', 'min_soc_percent', 'max_soc_percent', 'annual_capacity_loss_percent', 'dispatch_strategy',
+    'curtailment_totals'
+)
+
+
+def _adaptive_capacity_search(evaluate, num_capacities: int, column: str) -> list:
+    """
+    Sucht das Maximum von column über die Rasterindizes 0..num_capacities-1.
+
+    Zuerst wird ein Grobraster aus ADAPTIVE_SEARCH_COARSE_POINTS Punkten ausgewertet; das Intervall
+    zwischen den Nachbarn des besten Grobraster-Punkts wird danach mit dem Goldenen Schnitt auf
+    ganzen Indizes eingegrenzt (je Schritt zwei innere Punkte in einem gemeinsamen Batch) und die
+    verbleibenden höchstens vier Punkte werden vollständig ausgewertet. Bereits ausgewertete Punkte
+    werden nicht erneut simuliert (Memoisierung). Der Aufwand wächst mit log(num_capacities).
+
+    Args:
+        evaluate (callable): Bewertet eine Liste von Rasterindizes, liefert Ergebnisse in gleicher Reihenfolge.
+        num_capacities (int): Anzahl der Rasterpunkte.
+        column (str): Zu maximierende Ergebnisspalte (siehe criterion_column).
+
+    Returns:
+        list: Ergebnisse aller ausgewerteten Rasterpunkte, aufsteigend nach Kapazität.
+    """
+    evaluated = {}
+
+    def values(indices):
+        new_indices = sorted({int(i) for i in indices} - evaluated.keys())
+        if new_indices:
+            evaluated.update(zip(new_indices, evaluate(new_indices)))
+        return [evaluated[int(i)][column] for i in indices]
+
+    coarse = np.unique(np.linspace(0, num_capacities - 1, min(ADAPTIVE_SEARCH_COARSE_POINTS, num_capacities))
+                       .round().astype(int))
+    best = int(np.argmax(values(coarse)))
+    lower = int(coarse[max(best - 1, 0)])
+    upper = int(coarse[min(best + 1, len(coarse) - 1)])
+    while upper - lower > 3:
+        step = int(round((upper - lower) * GOLDEN_SECTION_RATIO))
+        inner_lower, inner_upper = upper - step, lower + step
+        if inner_lower >= inner_upper:
+            inner_upper = inner_lower + 1
+        lower_value, upper_value = values([inner_lower, inner_upper])
+        if lower_value >= upper_value:
+            upper = inner_upper  # Maximum links von inner_upper
         else:
-            cap_charge_kw, cap_discharge_kw = resolve_power_for_capacity(capacity)
-            sim_result = simulate_one_year(
-                consumption_series=consumption_series,
-                pv_generation_series=pv_generation_series,
-                battery_capacity_kwh=capacity,
-                battery_efficiency_charge=battery_efficiency_charge,
-                battery_efficiency_discharge=battery_efficiency_discharge,
-                battery_max_charge_kw=cap_charge_kw,
-                battery_max_discharge_kw=cap_discharge_kw,
-                price_grid_per_kwh=price_grid_per_kwh,
-                price_feed_in_per_kwh=price_feed_in_per_kwh,
-                initial_soc_percent=initial_soc_percent,
-                min_soc_percent=min_soc_percent,
-                max_soc_percent=max_soc_percent,
-                annual_capacity_loss_percent=annual_capacity_loss_percent,
-                simulation_year=1  # Optimierung basiert auf erstem Jahr
-            )
-        
-        # Finanzielle KPIs berechnen - mit tatsächlichen Simulationsdaten
-        # OPTIMIERUNG: Verwende die bereits berechnete Simulation ohne Batterie
-        cap_charge_kw, cap_discharge_kw = resolve_power_for_capacity(capacity) if capacity > 0 else (0.0, 0.0)
-        financial_kpis = calculate_financial_kpis(
-            sim_result['kpis']['annual_energy_cost'], # Jährliche Kosten mit Speicher
-            total_consumption=sim_result['kpis']['total_consumption_kwh'],
-            total_pv_generation=sim_result['kpis']['total_pv_generation_kwh'],
-            battery_capacity_kwh=capacity,
-            battery_cost_curve=battery_cost_curve,
-            project_lifetime_years=project_lifetime_years,
-            discount_rate=discount_rate,
-            price_grid_per_kwh=price_grid_per_kwh, # Für Referenzkosten ohne Speicher
-            price_feed_in_per_kwh=price_feed_in_per_kwh, # Für Referenzkosten ohne Speicher
-            annual_capacity_loss_percent=annual_capacity_loss_percent,
-            # Neue Parameter für tatsächliche Simulation
+            lower = inner_lower  # Maximum rechts von inner_lower
+    values(range(lower, upper + 1))
+    return [evaluated[i] for i in sorted(evaluated)]
+
+
+def _start_grid_verification(evaluate, num_capacities: int, column: str, adaptive_results: list):
+    """
+    Rechnet das volle Raster in einem Hintergrund-Thread nach und vergleicht das Optimum mit der
+    adaptiven Suche. Gibt ein concurrent.futures.Future zurück; dessen Ergebnis ist ein dict mit
+    'adaptive_capacity_kwh', 'grid_capacity_kwh', 'matches', 'criterion_gap' (Kriterium am
+    Rasteroptimum minus adaptives Optimum) und 'results' (alle Rasterpunkte, ohne Jahreswerte).
+    Jede Prüfung hat ihren eigenen Executor; er wird nach dem Einreichen heruntergefahren, sein
+    Thread endet also mit der Prüfung (future.cancel() bricht eine noch nicht gestartete Prüfung ab).
+    """
+    adaptive_best = max(adaptive_results, key=lambda result: result[column])
+
+    def verify():
+        grid_results = evaluate(np.arange(num_capacities))
+        _split_by_year(grid_results)
+        grid_best = max(grid_results, key=lambda result: result[column])
+        verification = {
+            'adaptive_capacity_kwh': adaptive_best['battery_capacity_kwh'],
+            'grid_capacity_kwh': grid_best['battery_capacity_kwh'],
+            'matches': grid_best['battery_capacity_kwh'] == adaptive_best['battery_capacity_kwh'],
+            'criterion_gap': grid_best[column] - adaptive_best[column],
+            'results': grid_results,
+        }
+        print(f"{'✅' if verification['matches'] else '⚠️'} Rasterprüfung: Optimum im vollen Raster bei "
+              f"{verification['grid_capacity_kwh']} kWh, adaptive Suche {verification['adaptive_capacity_kwh']} kWh")
+        return verification
+
+    print(f"🔄 Prüfe das volle Raster ({num_capacities} Speichergrößen) im Hintergrund...")
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="grid_verification")
+    future = executor.submit(verify)
+    executor.shutdown(wait=False)
+    return future
+
+
+def _screening_error(consumption_series, pv_generation_series, capacities, capacity_powers, sweep_args) -> dict:
+    """
+    Abweichung des Typtag-Screenings gegen die Volljahressimulation an SCREENING_VERIFY_CAPACITIES
+    Kapazitäten (gleichmäßig über den Suchbereich, ohne Kapazität 0): Ersparnis gegenüber der
+    Simulation ohne Speicher in % und Autarkiegrad in Prozentpunkten.
+    """
+    batch_params = dict(
+        consumption_series=consumption_series,
+        pv_generation_series=pv_generation_series,
+        simulation_year=1,
+        **{name: sweep_args[name] for name in _FIRST_YEAR_BATCH_ARGUMENTS}
+    )
+    verify_indices = [
+        i for i in np.unique(np.linspace(0, len(capacities) - 1, SCREENING_VERIFY_CAPACITIES).round().astype(int))
+        if capacities[i] > 0
+    ]
+    screening_error = {
+        'typical_days': len(sweep_args['typical']['days']),
+        'speedup': None,
+        'verified_capacity_kwh': [],
+        'savings_error_percent': [],
+        'autarky_error_points': [],
+        'max_abs_savings_error_percent': None,
+    }
+    if not verify_indices:
+        print("✅ Screening abgeschlossen (ohne Prüfung gegen Volljahr)")
+        return screening_error
+
+    verify_params = dict(
+        battery_capacities_kwh=capacities[verify_indices],
+        battery_max_charge_kw=[capacity_powers[i][0] for i in verify_indices],
+        battery_max_discharge_kw=[capacity_powers[i][1] for i in verify_indices],
+        **batch_params
+    )
+    screening_result = simulate_typical_days(sweep_args['typical'], **verify_params)
+    full_result = simulate_capacity_batch(**verify_params)
+    reference_cost = sweep_args['no_battery_sim']['kpis']['effective_annual_energy_cost']
+    screening_error['speedup'] = float(screening_result['simulation_metadata']['speedup'])
+    for i, screening_kpis, full_kpis in zip(verify_indices, screening_result['kpis'], full_result['kpis']):
+        full_savings = reference_cost - full_kpis['effective_annual_energy_cost']
+        screening_savings = reference_cost - screening_kpis['effective_annual_energy_cost']
+        screening_error['verified_capacity_kwh'].append(float(capacities[i]))
+        screening_error['savings_error_percent'].append(
+            float((screening_savings - full_savings) / abs(full_savings) * 100.0) if full_savings != 0 else 0.0
+        )
+        screening_error['autarky_error_points'].append(
+            float((screening_kpis['autarky_rate'] - full_kpis['autarky_rate']) * 100.0)
+        )
+    screening_error['max_abs_savings_error_percent'] = max(
+        abs(error) for error in screening_error['savings_error_percent']
+    )
+    print(f"✅ Screening abgeschlossen (ca. {screening_error['speedup']:.0f}x weniger Intervalle), "
+          f"Abweichung der Ersparnis gegen Volljahr: max. {screening_error['max_abs_savings_error_percent']:.1f}%")
+    return screening_error
+
+
+def _simulate_capacities(
+    consumption_series: pd.Series,
+    pv_generation_series: pd.Series,
+    capacities: np.ndarray,
+    capacity_powers: list,
+    typical: dict | None,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    project_lifetime_years: int,
+    initial_soc_percent: float,
+    min_soc_percent: float,
+    max_soc_percent: float,
+    annual_capacity_loss_percent: float,
+    lifetime_simulation: bool,
+    annual_pv_degradation_percent: float,
+    annual_load_growth_percent: float,
+    dispatch_strategy: str | None,
+    aging_model: str | None,
+    use_cache: bool = True,
+    curtailment_totals: dict | None = None
+) -> tuple:
+    """
+    Batch-Simulation des ersten Jahres (bzw. der Typtage) und optional aller Projektjahre;
+    use_cache und curtailment_totals wie bei model.simulate_capacity_batch.
+
+    Returns:
+        tuple: (kpis, lifetime_result) mit kpis als Liste der KPI-dicts je Kapazität und
+        lifetime_result aus model.simulate_lifetime (None ohne Lebensdauer-Simulation).
+    """
+    batch_params = dict(
+        consumption_series=consumption_series,
+        pv_generation_series=pv_generation_series,
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        price_grid_per_kwh=price_grid_per_kwh,
+        price_feed_in_per_kwh=price_feed_in_per_kwh,
+        initial_soc_percent=initial_soc_percent,
+        min_soc_percent=min_soc_percent,
+        max_soc_percent=max_soc_percent,
+        annual_capacity_loss_percent=annual_capacity_loss_percent,
+        simulation_year=1,  # Optimierung basiert auf erstem Jahr
+        dispatch_strategy=dispatch_strategy,
+        curtailment_totals=curtailment_totals
+    )
+    power_params = dict(
+        battery_capacities_kwh=capacities,
+        battery_max_charge_kw=[charge_kw for charge_kw, _ in capacity_powers],
+        battery_max_discharge_kw=[discharge_kw for _, discharge_kw in capacity_powers],
+    )
+    if typical is not None:
+        # Screening: nur Typtage simulieren (Prüfung gegen das volle Jahr in _screening_error)
+        print(f"🔄 Screening: simuliere {len(capacities)} Speichergrößen auf Typtagen...")
+        batch_result = simulate_typical_days(typical, **power_params, **batch_params)
+    else:
+        # OPTIMIERUNG: Alle Kapazitäten in einem gemeinsamen Durchlauf simulieren (Batch-Kern)
+        print(f"🔄 Simuliere {len(capacities)} Speichergrößen im Batch...")
+        batch_result = simulate_capacity_batch(**power_params, **batch_params, use_cache=use_cache)
+        print("✅ Batch-Simulation abgeschlossen!")
+
+    lifetime_result = None
+    if lifetime_simulation:
+        print(f"🔄 Simuliere {project_lifetime_years} Projektjahre je Speichergröße im Batch...")
+        lifetime_result = simulate_lifetime(
             consumption_series=consumption_series,
             pv_generation_series=pv_generation_series,
+            battery_capacities_kwh=capacities,
             battery_efficiency_charge=battery_efficiency_charge,
             battery_efficiency_discharge=battery_efficiency_discharge,
-            battery_max_charge_kw=cap_charge_kw,
-            battery_max_discharge_kw=cap_discharge_kw,
+            battery_max_charge_kw=[charge_kw for charge_kw, _ in capacity_powers],
+            battery_max_discharge_kw=[discharge_kw for _, discharge_kw in capacity_powers],
+            price_grid_per_kwh=price_grid_per_kwh,
+            price_feed_in_per_kwh=price_feed_in_per_kwh,
+            project_lifetime_years=project_lifetime_years,
             initial_soc_percent=initial_soc_percent,
             min_soc_percent=min_soc_percent,
             max_soc_percent=max_soc_percent,
-            grid_import_with_battery=sim_result['kpis']['total_grid_import_kwh'],
-            grid_export_with_battery=sim_result['kpis']['total_grid_export_kwh'],
-            # OPTIMIERUNG: Übergebe die bereits berechnete Simulation ohne Batterie
-            no_battery_sim_result=no_battery_sim
+            annual_capacity_loss_percent=annual_capacity_loss_percent,
+            annual_pv_degradation_percent=annual_pv_degradation_percent,
+            annual_load_growth_percent=annual_load_growth_percent,
+            dispatch_strategy=dispatch_strategy,
+            aging_model=aging_model,
+            curtailment_totals=curtailment_totals
+        )
+        # Ersparnis je Jahr aus den Energiesummen in derselben Preiskonvention wie die KPIs des
+        # ersten Jahres bewerten (analysis.calculate_energy_savings)
+        lifetime_result['annual_savings'] = np.array([
+            [
+                calculate_energy_savings(
+                    reference['total_grid_import_kwh'] - year_kpis['total_grid_import_kwh'],
+                    reference['total_grid_export_kwh'] - year_kpis['total_grid_export_kwh'],
+                    price_grid_per_kwh,
+                    price_feed_in_per_kwh
+                )['annual_savings']
+                for year_kpis, reference in zip(capacity_kpis, lifetime_result['reference_kpis'])
+            ]
+            for capacity_kpis in lifetime_result['kpis']
+        ])
+        print("✅ Lebensdauer-Simulation abgeschlossen!")
+
+    return batch_result['kpis'], lifetime_result
+
+
+def _capacity_financials(
+    sim_kpis: dict,
+    no_battery_sim: dict,
+    capacity: float,
+    capacity_power: tuple,
+    consumption_series: pd.Series,
+    pv_generation_series,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    battery_cost_curve: dict,
+    project_lifetime_years: int,
+    discount_rate: float,
+    initial_soc_percent: float,
+    min_soc_percent: float,
+    max_soc_percent: float,
+    annual_capacity_loss_percent: float,
+    project_interest_rate_db: float,
+    annual_savings_by_year: list | None = None
+) -> tuple:
+    """
+    Finanz- und Deckungsbeitrags-KPIs einer Kapazität aus den simulierten Jahressummen und der
+    Referenz ohne Speicher (analysis.calculate_financial_kpis und calculate_contribution_margin_kpis),
+    gemeinsam für find_optimal_size und die Rastersuche von find_optimal_system_size.
+
+    Returns:
+        tuple: (financial_kpis, contribution_margin_kpis)
+    """
+    cap_charge_kw, cap_discharge_kw = capacity_power
+    financial_kpis = calculate_financial_kpis(
+        sim_kpis['annual_energy_cost'], # Jährliche Kosten mit Speicher
+        total_consumption=sim_kpis['total_consumption_kwh'],
+        total_pv_generation=sim_kpis['total_pv_generation_kwh'],
+        battery_capacity_kwh=capacity,
+        battery_cost_curve=battery_cost_curve,
+        project_lifetime_years=project_lifetime_years,
+        discount_rate=discount_rate,
+        price_grid_per_kwh=price_grid_per_kwh, # Für Referenzkosten ohne Speicher
+        price_feed_in_per_kwh=price_feed_in_per_kwh, # Für Referenzkosten ohne Speicher
+        annual_capacity_loss_percent=annual_capacity_loss_percent,
+        # Neue Parameter für tatsächliche Simulation
+        consumption_series=consumption_series,
+        pv_generation_series=pv_generation_series,
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        battery_max_charge_kw=cap_charge_kw,
+        battery_max_discharge_kw=cap_discharge_kw,
+        initial_soc_percent=initial_soc_percent,
+        min_soc_percent=min_soc_percent,
+        max_soc_percent=max_soc_percent,
+        grid_import_with_battery=sim_kpis['total_grid_import_kwh'],
+        grid_export_with_battery=sim_kpis['total_grid_export_kwh'],
+        # OPTIMIERUNG: Übergebe die bereits berechnete Simulation ohne Batterie
+        no_battery_sim_result=no_battery_sim,
+        annual_savings_by_year=annual_savings_by_year
+    )
+
+    # Deckungsbeitrags-KPIs berechnen - neue Funktion
+    contribution_margin_kpis = calculate_contribution_margin_kpis(
+        annual_energy_cost_with_battery=sim_kpis['annual_energy_cost'],
+        total_consumption=sim_kpis['total_consumption_kwh'],
+        total_pv_generation=sim_kpis['total_pv_generation_kwh'],
+        battery_capacity_kwh=capacity,
+        battery_cost_curve=battery_cost_curve,
+        price_grid_per_kwh=price_grid_per_kwh,
+        price_feed_in_per_kwh=price_feed_in_per_kwh,
+        project_lifetime_years=project_lifetime_years,  # Wird aus config.py geladen wenn None
+        discount_rate=discount_rate,  # UI-Wert nutzen
+        annual_capacity_loss_percent=annual_capacity_loss_percent,  # UI-Wert nutzen
+        project_interest_rate_db=project_interest_rate_db,
+        grid_import_with_battery=sim_kpis['total_grid_import_kwh'],
+        grid_export_with_battery=sim_kpis['total_grid_export_kwh'],
+        # OPTIMIERUNG: Referenz ohne Batterie aus der einmaligen Simulation übernehmen
+        grid_import_without_battery=no_battery_sim['kpis']['total_grid_import_kwh'],
+        grid_export_without_battery=no_battery_sim['kpis']['total_grid_export_kwh'],
+        consumption_series=consumption_series,  # Für echte Simulation ohne Batterie
+        pv_generation_series=pv_generation_series,  # Für echte Simulation ohne Batterie
+        annual_savings_by_year=annual_savings_by_year
+    )
+    return financial_kpis, contribution_margin_kpis
+
+
+def _evaluate_capacities(
+    consumption_series: pd.Series,
+    pv_generation_series: pd.Series,
+    capacities: np.ndarray,
+    capacity_powers: list,
+    no_battery_sim: dict,
+    typical: dict | None,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    battery_cost_curve: dict,
+    project_lifetime_years: int,
+    discount_rate: float,
+    initial_soc_percent: float,
+    min_soc_percent: float,
+    max_soc_percent: float,
+    annual_capacity_loss_percent: float,
+    project_interest_rate_db: float,
+    lifetime_simulation: bool,
+    annual_pv_degradation_percent: float,
+    annual_load_growth_percent: float,
+    dispatch_strategy: str | None,
+    aging_model: str | None,
+    simulated: tuple | None = None,
+    use_cache: bool = True,
+    curtailment_totals: dict | None = None
+) -> list:
+    """
+    Simulation und Bewertung einer Teilmenge der Kapazitäten von find_optimal_size (seriell oder
+    in einem Worker-Prozess von _run_capacity_sweep). Mit typical (cluster_typical_days) wird das
+    erste Jahr auf Typtagen simuliert. Mit simulated (KPIs je Kapazität und Lebensdauer-Ergebnis,
+    siehe _simulate_capacities) werden vorliegende, z.B. interpolierte Simulationsergebnisse bewertet.
+    use_cache=False umgeht den DispatchCache (Rasterprüfung im Hintergrund).
+    """
+    if simulated is None:
+        simulated = _simulate_capacities(
+            consumption_series, pv_generation_series, capacities, capacity_powers, typical,
+            battery_efficiency_charge, battery_efficiency_discharge, price_grid_per_kwh, price_feed_in_per_kwh,
+            project_lifetime_years, initial_soc_percent, min_soc_percent, max_soc_percent,
+            annual_capacity_loss_percent, lifetime_simulation, annual_pv_degradation_percent,
+            annual_load_growth_percent, dispatch_strategy, aging_model, use_cache, curtailment_totals
         )
+    kpis_by_capacity, lifetime_result = simulated
+    results = []
+    for capacity_index, capacity in enumerate(capacities):
+        if capacity == 0: # Szenario ohne Speicher
+            # Verwende die bereits berechnete Simulation ohne Batterie
+            sim_result = no_battery_sim
+        else:
+            sim_result = {'kpis': kpis_by_capacity[capacity_index]}
         
-        # Deckungsbeitrags-KPIs berechnen - neue Funktion
-        from analysis import calculate_contribution_margin_kpis
-        contribution_margin_kpis = calculate_contribution_margin_kpis(
-            annual_energy_cost_with_battery=sim_result['kpis']['annual_energy_cost'],
-            total_consumption=sim_result['kpis']['total_consumption_kwh'],
-            total_pv_generation=sim_result['kpis']['total_pv_generation_kwh'],
-            battery_capacity_kwh=capacity,
-            battery_cost_curve=battery_cost_curve,
-            price_grid_per_kwh=price_grid_per_kwh,
-            price_feed_in_per_kwh=price_feed_in_per_kwh,
-            project_lifetime_years=project_lifetime_years,  # Wird aus config.py geladen wenn None
-            discount_rate=discount_rate,  # UI-Wert nutzen
-            annual_capacity_loss_percent=annual_capacity_loss_percent,  # UI-Wert nutzen
-            project_interest_rate_db=project_interest_rate_db,
-            grid_import_with_battery=sim_result['kpis']['total_grid_import_kwh'],
-            grid_export_with_battery=sim_result['kpis']['total_grid_export_kwh'],
-            grid_import_without_battery=None,  # Wird intern berechnet
-            grid_export_without_battery=None,  # Wird intern berechnet
-            consumption_series=consumption_series,  # Für echte Simulation ohne Batterie
-            pv_generation_series=pv_generation_series  # Für echte Simulation ohne Batterie
+        # Finanzielle KPIs berechnen - mit tatsächlichen Simulationsdaten
+        # OPTIMIERUNG: Verwende die bereits berechnete Simulation ohne Batterie
+        annual_savings_by_year = (
+            lifetime_result['annual_savings'][capacity_index].tolist() if lifetime_result is not None else None
+        )
+        aging = lifetime_result['aging'] if lifetime_result is not None else None
+        financial_kpis, contribution_margin_kpis = _capacity_financials(
+            sim_result['kpis'], no_battery_sim, capacity,
+            capacity_powers[capacity_index] if capacity > 0 else (0.0, 0.0),
+            consumption_series, pv_generation_series, battery_efficiency_charge, battery_efficiency_discharge,
+            price_grid_per_kwh, price_feed_in_per_kwh, battery_cost_curve, project_lifetime_years,
+            discount_rate, initial_soc_percent, min_soc_percent, max_soc_percent,
+            annual_capacity_loss_percent, project_interest_rate_db, annual_savings_by_year
         )
 
         # Berechne zusätzliche Kennzahlen für die erweiterte Tabelle
@@ -182,10 +944,348 @@ def find_optimal_size(
             **financial_kpis, # Füge finanzielle KPIs hinzu (Cash Flow-basierte Amortisationszeit)
             **contribution_margin_kpis, # Füge Deckungsbeitrags-KPIs hinzu (DB3 für Rentabilität)
             # KORREKTUR: Verwende Cash Flow-basierte Amortisationszeit (wirtschaftlich üblich)
-            'payback_period_years': financial_kpis['payback_period_years']
+            'payback_period_years': financial_kpis['payback_period_years'],
+            # Simulierte Ersparnis je Projektjahr (nur mit Lebensdauer-Simulation; von _split_by_year gelöst)
+            'annual_savings_by_year': financial_kpis.get('annual_savings_by_year', annual_savings_by_year),
+            # Zyklenbasierte Alterung je Projektjahr (nur mit aging_model="cycle_calendar")
+            'capacity_by_year_kwh': aging['capacity_kwh'][capacity_index].tolist() if aging is not None else None,
+            'equivalent_full_cycles_by_year': aging['equivalent_full_cycles'][capacity_index].tolist() if aging is not None else None,
+            # Erstes Jahr nur auf Typtagen simuliert (Näherung, Abweichung siehe _screening_error)
+            'screened': typical is not None,
+            # Interpolierte Energie-KPIs ohne eigene Simulation (nur search_mode="interpolated")
+            'interpolated': False
         })
     return results
 
+
+# Zustand eines Worker-Prozesses des parallelen Suchlaufs (gesetzt von _init_sweep_worker)
+_sweep_worker_state = {}
+
+
+def resolve_sweep_workers(workers: int | None = None) -> int:
+    """Anzahl Worker-Prozesse des Suchlaufs (None: DEFAULT_SWEEP_WORKERS, 0: alle Kerne)."""
+    workers = DEFAULT_SWEEP_WORKERS if workers is None else workers
+    if workers == 0:
+        return os.cpu_count() or 1
+    if workers < 0:
+        raise ValueError(f"Ungültige Anzahl Worker '{workers}'. Erlaubt: 0 (alle Kerne) oder >= 1.")
+    return int(workers)
+
+
+def _sweep_work(num_capacities: int, num_periods: int, sweep_args: dict) -> float:
+    """Geschätzter Rechenaufwand eines Suchlaufs (siehe SWEEP_PARALLEL_MIN_WORK in config.py)."""
+    typical = sweep_args.get('typical')
+    if typical is not None:
+        num_periods = len(typical['days']) * typical['periods_per_day']
+    work = float(num_capacities) * num_periods
+    if sweep_args.get('lifetime_simulation'):
+        work *= 1 + sweep_args.get('project_lifetime_years', 1)
+    if resolve_dispatch_strategy(sweep_args.get('dispatch_strategy')) in ("optimal", "rolling_horizon"):
+        work *= SWEEP_DP_WORK_FACTOR
+    return work
+
+
+def _init_sweep_worker(shared_memory_name: str, index, sweep_args: dict):
+    """
+    Initialisierung eines Worker-Prozesses: Verbrauch und PV-Erzeugung als Sicht auf den Shared
+    Memory des Hauptprozesses (ohne Kopie), übrige Parameter einmalig je Worker.
+    """
+    shared = shared_memory.SharedMemory(name=shared_memory_name)
+    values = np.ndarray((2, len(index)), dtype=np.float64, buffer=shared.buf)
+    values.flags.writeable = False
+    pv_generation_series = pd.Series(values[1], index=index, copy=False)
+    _sweep_worker_state.update(
+        shared_memory=shared,  # Referenz halten, solange die Zeitreihen den Puffer nutzen
+        consumption_series=pd.Series(values[0], index=index, copy=False),
+        pv_generation_series=pv_generation_series,
+        sweep_args=sweep_args,
+    )
+
+
+def _sweep_worker_task(task: tuple) -> list:
+    """Bewertet eine Teilmenge der Kapazitäten im Worker-Prozess (task: Kapazitäten, Leistungen)."""
+    capacities, capacity_powers = task
+    return _evaluate_capacities(
+        _sweep_worker_state['consumption_series'], _sweep_worker_state['pv_generation_series'],
+        capacities, capacity_powers, **_sweep_worker_state['sweep_args']
+    )
+
+
+def _run_capacity_sweep(consumption_series, pv_generation_series, capacities, capacity_powers,
+                        workers: int | None, sweep_args: dict) -> list:
+    """
+    Bewertet alle Kapazitäten seriell oder verteilt auf einen Prozesspool.
+
+    Verbrauch und PV-Erzeugung liegen einmalig im Shared Memory, die Worker greifen ohne Kopie
+    darauf zu; übrige Parameter (Referenz ohne Speicher, Preise, Kostenkurve) erhält jeder Worker
+    einmalig bei der Initialisierung. Je Aufgabe werden nur Kapazitäten und Leistungen übertragen.
+    Die Kapazitäten werden verschränkt auf SWEEP_CHUNKS_PER_WORKER Teilmengen je Worker verteilt
+    (kleine und große Speicher gemischt, gleichmäßige Last) und danach wieder in die ursprüngliche
+    Reihenfolge gebracht. Lässt sich der Pool nicht starten, wird seriell gerechnet.
+
+    Der Start des Pools (Prozesse, Import, JIT je Worker) kostet 0,1 s bis einige Sekunden; ein
+    PV-first-Jahr mit einigen Dutzend Kapazitäten rechnet seriell in Hundertstelsekunden. Unter
+    SWEEP_PARALLEL_MIN_WORK (_sweep_work) oder mit weniger als SWEEP_MIN_CAPACITIES_PER_WORKER
+    Kapazitäten je Worker wird daher seriell gerechnet; der Pool lohnt sich vor allem für die
+    DP-Strategien ("optimal", "rolling_horizon") und große Lebensdauer-Suchläufe.
+    """
+    workers = resolve_sweep_workers(workers)
+    if workers > 1 and (len(capacities) < workers * SWEEP_MIN_CAPACITIES_PER_WORKER
+                        or _sweep_work(len(capacities), len(consumption_series), sweep_args) < SWEEP_PARALLEL_MIN_WORK):
+        print(f"🔄 Kleiner Suchlauf ({len(capacities)} Speichergrößen), rechne seriell statt mit {workers} Prozessen...")
+        workers = 1
+    num_chunks = min(len(capacities), workers * SWEEP_CHUNKS_PER_WORKER)
+    if workers <= 1 or num_chunks <= 1:
+        return _evaluate_capacities(consumption_series, pv_generation_series, capacities, capacity_powers,
+                                    **sweep_args)
+
+    chunk_indices = [np.arange(start, len(capacities), num_chunks) for start in range(num_chunks)]
+    tasks = [(capacities[indices], [capacity_powers[i] for i in indices]) for indices in chunk_indices]
+    index = consumption_series.index if isinstance(consumption_series, pd.Series) else None
+    num_periods = len(consumption_series)
+    print(f"🔄 Verteile {len(capacities)} Speichergrößen auf {workers} Prozesse...")
+    shared = None
+    try:
+        shared = shared_memory.SharedMemory(create=True, size=max(2 * num_periods * 8, 1))
+        values = np.ndarray((2, num_periods), dtype=np.float64, buffer=shared.buf)
+        values[0] = np.asarray(consumption_series, dtype=np.float64)
+        values[1] = np.asarray(pv_generation_series, dtype=np.float64)
+        del values  # Puffer freigeben, sonst lässt sich der Shared Memory nicht schließen
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_sweep_worker,
+            initargs=(shared.name, index if index is not None else pd.RangeIndex(num_periods), sweep_args)
+        ) as executor:
+            chunk_results = list(executor.map(_sweep_worker_task, tasks))
+    except (OSError, BrokenProcessPool, pickle.PicklingError) as error:
+        print(f"⚠️ Paralleler Suchlauf nicht möglich ({error}), rechne seriell...")
+        return _evaluate_capacities(consumption_series, pv_generation_series, capacities, capacity_powers,
+                                    **sweep_args)
+    finally:
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+
+    results = [None] * len(capacities)
+    for indices, chunk in zip(chunk_indices, chunk_results):
+        for capacity_index, result in zip(indices, chunk):
+            results[capacity_index] = result
+    return results
+
+
+# Kennzahlen des 2-D-Suchlaufs über PV-Größe und Speicherkapazität (Matrix kWp × kWh)
+SYSTEM_SWEEP_COLUMNS = (
+    'total_db3_present_value', 'total_db3_nominal', 'npv', 'autarky_rate', 'self_consumption_rate',
+    'effective_annual_energy_cost', 'investment_cost', 'payback_period_years', 'irr_percentage'
+)
+
+
+def _limited_pv_generation(consumption_series: pd.Series, pv_generation_series: pd.Series,
+                           pv_size_kwp: float) -> tuple:
+    """
+    PV-Erzeugung einer Anlagengröße nach Wechselrichter-Clipping (INVERTER_AC_POWER_KW) und
+    Einspeisegrenze (FEED_IN_LIMIT_PERCENT der Anlagengröße) über data_import.apply_pv_grid_limits,
+    im Zeitraster der Eingangsreihe. Gibt (PV-Erzeugung, Abregelungssummen oder None) zurück;
+    ohne Begrenzung in config.py bleibt die Reihe unverändert.
+    """
+    if INVERTER_AC_POWER_KW is None and FEED_IN_LIMIT_PERCENT is None:
+        return pv_generation_series, None
+    from data_import import apply_pv_grid_limits, feed_in_limit_kw
+
+    time_interval_hours = detect_time_resolution(pv_generation_series.index, len(pv_generation_series))[0]
+    limited = apply_pv_grid_limits(
+        [(consumption_series, pv_generation_series)],
+        export_limit_kw=feed_in_limit_kw(pv_size_kwp),
+        simulation_interval_minutes=max(int(round(time_interval_hours * 60)), 1)
+    )
+    return limited['pv_generation_series'].reindex(pv_generation_series.index, fill_value=0.0), limited
+
+
+def _system_sweep_batch(
+    consumption_series: pd.Series,
+    pv_rows: list,
+    row_limits: list,
+    min_capacity_kwh: float,
+    max_capacity_kwh: float,
+    step_kwh: float,
+    battery_efficiency_charge: float,
+    battery_efficiency_discharge: float,
+    battery_max_charge_kw: float,
+    battery_max_discharge_kw: float,
+    price_grid_per_kwh,
+    price_feed_in_per_kwh,
+    battery_cost_curve: dict,
+    project_lifetime_years: int = 20,
+    discount_rate: float = 0.05,
+    initial_soc_percent: float = 50.0,
+    min_soc_percent: float = 10.0,
+    max_soc_percent: float = 90.0,
+    annual_capacity_loss_percent: float = 2.0,
+    battery_tech_params: dict | None = None,
+    project_interest_rate_db: float = 0.03,
+    dispatch_strategy: str | None = None,
+    **search_params
+) -> list:
+    """
+    Rastersuche von find_optimal_system_size in einem Durchlauf: alle Kombinationen aus PV-Größe und
+    Kapazität laufen gemeinsam durch den Batch-Kern (model.simulate_pv_capacity_batch, eine
+    Eingangszeile je PV-Größe), die Referenz ohne Speicher je PV-Größe einmal, die Finanzkennzahlen
+    je Kombination wie in find_optimal_size (_capacity_financials). row_limits enthält die Abregelungssummen je PV-Größe
+    (_limited_pv_generation), übrige Parameter und Defaults wie find_optimal_size; search_params
+    (Suchverfahren, Worker ...) spielen für das volle Raster keine Rolle.
+
+    Returns:
+        list: Je PV-Größe die Ergebnisliste je Kapazität (Spalten wie find_optimal_size).
+    """
+    capacities = np.arange(min_capacity_kwh, max_capacity_kwh + step_kwh, step_kwh)
+    capacity_powers = [
+        resolve_capacity_power(capacity, battery_max_charge_kw, battery_max_discharge_kw, battery_tech_params)
+        for capacity in capacities
+    ]
+    print(f"🔄 Simuliere {len(pv_rows)} PV-Größen × {len(capacities)} Speichergrößen im Batch...")
+    batch_result = simulate_pv_capacity_batch(
+        consumption_series=consumption_series,
+        pv_generation_rows=np.vstack([np.asarray(pv_generation, dtype=np.float64) for pv_generation in pv_rows]),
+        battery_capacities_kwh=capacities,
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        battery_max_charge_kw=[charge_kw for charge_kw, _ in capacity_powers],
+        battery_max_discharge_kw=[discharge_kw for _, discharge_kw in capacity_powers],
+        price_grid_per_kwh=price_grid_per_kwh,
+        price_feed_in_per_kwh=price_feed_in_per_kwh,
+        initial_soc_percent=initial_soc_percent,
+        min_soc_percent=min_soc_percent,
+        max_soc_percent=max_soc_percent,
+        annual_capacity_loss_percent=annual_capacity_loss_percent,
+        simulation_year=1,  # Optimierung basiert auf erstem Jahr
+        dispatch_strategy=dispatch_strategy,
+        curtailment_totals=row_limits
+    )
+    print("✅ Batch-Simulation abgeschlossen!")
+
+    # 0 kWh: Referenz ohne Speicher der jeweiligen PV-Größe (wie _evaluate_capacities)
+    kpis = [
+        [reference if capacity == 0 else lane for capacity, lane in zip(capacities, row_kpis)]
+        for row_kpis, reference in zip(batch_result['kpis'], batch_result['reference_kpis'])
+    ]
+    reference_kpis = batch_result['reference_kpis']
+
+    row_results = []
+    for row, row_kpis in enumerate(kpis):
+        results = []
+        for capacity_index, (capacity, kpi) in enumerate(zip(capacities, row_kpis)):
+            # Finanzkennzahlen wie in find_optimal_size, Referenz ohne Speicher der jeweiligen PV-Größe
+            financial_kpis, contribution_margin_kpis = _capacity_financials(
+                kpi, {'kpis': reference_kpis[row]}, capacity,
+                capacity_powers[capacity_index] if capacity > 0 else (0.0, 0.0),
+                consumption_series, pv_rows[row], battery_efficiency_charge, battery_efficiency_discharge,
+                price_grid_per_kwh, price_feed_in_per_kwh, battery_cost_curve, project_lifetime_years,
+                discount_rate, initial_soc_percent, min_soc_percent, max_soc_percent,
+                annual_capacity_loss_percent, project_interest_rate_db
+            )
+            results.append({
+                'battery_capacity_kwh': capacity,
+                'autarky_rate': kpi['autarky_rate'],
+                'self_consumption_rate': kpi['self_consumption_rate'],
+                'effective_annual_energy_cost': kpi.get('effective_annual_energy_cost', kpi['annual_energy_cost']),
+                'grid_import_cost': kpi.get('grid_import_cost', 0),
+                'grid_export_revenue': kpi.get('grid_export_revenue', 0),
+                'self_consumption_kwh': kpi['total_direct_self_consumption_kwh'] + kpi['total_battery_discharge_kwh'],
+                'grid_export_kwh': kpi['total_grid_export_kwh'],
+                'pv_generation_kwh': kpi['total_pv_generation_kwh'],
+                'total_consumption_kwh': kpi['total_consumption_kwh'],
+                'grid_import_kwh': kpi['total_grid_import_kwh'],
+                'battery_losses_kwh': kpi['total_battery_charge_losses_kwh'] + kpi['total_battery_discharge_losses_kwh'],
+                **financial_kpis,
+                **contribution_margin_kpis,
+                'payback_period_years': financial_kpis['payback_period_years'],
+                'screened': False,
+                'interpolated': False
+            })
+        _split_by_year(results)  # Nur skalare Kennzahlen je Zeile (ohne Lebensdauer-Simulation keine Jahreswerte)
+        row_results.append(results)
+    return row_results
+
+
+def find_optimal_system_size(
+    consumption_series: pd.Series,
+    pv_generation_series: pd.Series,
+    pv_sizes_kwp,
+    reference_pv_capacity_kwp: float | None = None,
+    optimization_criterion: str | None = None,
+    **sizing_params
+) -> dict:
+    """
+    Gemeinsamer Suchlauf über PV-Anlagengröße (kWp) und Speicherkapazität (kWh).
+
+    Je PV-Größe wird die PV-Erzeugung mit data_import.scale_pv_generation skaliert (Referenzgröße
+    reference_pv_capacity_kwp bzw. deren Schätzung aus der Spitzenerzeugung) und, falls in config.py
+    gesetzt, Wechselrichter- und Einspeisebegrenzung für diese Größe angewandt (_limited_pv_generation;
+    Abregelungsverluste je Größe als curtailment_totals in den KPIs). Die Rastersuche (search_mode
+    "grid" ohne Lebensdauer-Simulation und Screening) simuliert alle Kombinationen in einem Durchlauf
+    des Batch-Kerns und bewertet sie wie find_optimal_size (_system_sweep_batch); die übrigen Suchverfahren
+    rufen find_optimal_size je PV-Größe auf, Kapazitäten, die eine Zeile nicht auswertet (adaptive
+    Suche), bleiben NaN. DB III und NPV bewerten wie bei find_optimal_size den Speicher bei der
+    jeweiligen PV-Größe (ohne PV-Investition); PV-Größen untereinander vergleicht
+    'effective_annual_energy_cost'.
+
+    Args:
+        pv_sizes_kwp: PV-Anlagengrößen in kWp (Zeilen der Matrix).
+        reference_pv_capacity_kwp (float | None): Anlagengröße der übergebenen PV-Erzeugung.
+        optimization_criterion (str | None): Zielgröße für das Optimum (siehe criterion_column).
+        **sizing_params: Übrige Parameter von find_optimal_size (Kapazitätsbereich, Preise, Kosten ...).
+
+    Returns:
+        dict: 'pv_sizes_kwp', 'battery_capacities_kwh', je Spalte aus SYSTEM_SWEEP_COLUMNS eine Matrix
+        (PV-Größen × Kapazitäten) für Heatmaps, 'results' (Ergebnislisten je PV-Größe) und 'optimum'
+        (PV-Größe, Kapazität und Wert des Kriteriums).
+    """
+    from data_import import scale_pv_generation
+
+    pv_sizes_kwp = np.asarray(pv_sizes_kwp, dtype=float)
+    column = criterion_column(optimization_criterion)
+    pv_rows, row_limits = zip(*[
+        _limited_pv_generation(
+            consumption_series,
+            scale_pv_generation(pv_generation_series, pv_size_kwp, reference_pv_capacity_kwp),
+            pv_size_kwp
+        )
+        for pv_size_kwp in pv_sizes_kwp
+    ])
+    batch_sweep = (resolve_search_mode(sizing_params.get('search_mode')) == "grid"
+                   and not sizing_params.get('lifetime_simulation') and not sizing_params.get('screening'))
+    if batch_sweep:
+        row_results = _system_sweep_batch(consumption_series, list(pv_rows), list(row_limits), **sizing_params)
+    else:
+        row_results = []
+        for row, (pv_size_kwp, pv_generation, limits) in enumerate(zip(pv_sizes_kwp, pv_rows, row_limits)):
+            print(f"🔄 PV-Größe {pv_size_kwp:g} kWp ({row + 1}/{len(pv_sizes_kwp)})...")
+            row_results.append(find_optimal_size(
+                consumption_series, pv_generation, optimization_criterion=optimization_criterion,
+                **dict(sizing_params, curtailment_totals=limits)
+            ))
+
+    capacities = np.unique([result['battery_capacity_kwh'] for results in row_results for result in results])
+    sweep = {'pv_sizes_kwp': pv_sizes_kwp, 'battery_capacities_kwh': capacities, 'results': row_results}
+    for name in SYSTEM_SWEEP_COLUMNS:
+        sweep[name] = np.full((len(pv_sizes_kwp), len(capacities)), np.nan)
+    for row, results in enumerate(row_results):
+        positions = np.searchsorted(capacities, [result['battery_capacity_kwh'] for result in results])
+        for name in SYSTEM_SWEEP_COLUMNS:
+            sweep[name][row, positions] = [result.get(name, np.nan) for result in results]
+
+    values = np.where(np.isnan(sweep[column]), -np.inf, sweep[column])
+    best_row, best_column = np.unravel_index(np.argmax(values), values.shape)
+    sweep['optimum'] = {
+        'pv_size_kwp': float(pv_sizes_kwp[best_row]),
+        'battery_capacity_kwh': float(capacities[best_column]),
+        'criterion': column,
+        'value': float(sweep[column][best_row, best_column]),
+    }
+    print(f"✅ Suchlauf PV × Speicher: {len(pv_sizes_kwp)} × {len(capacities)} Kombinationen, Optimum bei "
+          f"{sweep['optimum']['pv_size_kwp']:g} kWp und {sweep['optimum']['battery_capacity_kwh']:g} kWh")
+    return sweep
+
+
 def run_variable_tariff_scenario(
     consumption_series: pd.Series,
     pv_generation_series: pd.Series,
@@ -203,32 +1303,24 @@ def run_variable_tariff_scenario(
     min_soc_percent: float = 10.0, # Minimaler Ladezustand in %
     max_soc_percent: float = 90.0, # Maximaler Ladezustand in %
     annual_capacity_loss_percent: float = 2.0, # Jährlicher Kapazitätsverlust in %
-    battery_tech_params: dict | None = None
+    battery_tech_params: dict | None = None,
+    dispatch_strategy: str | None = None,  # "pv_first", "threshold" (Arbitrage mit THRESHOLD_*-Werten), "optimal" oder "rolling_horizon"
+    curtailment_totals: dict | None = None  # Clipping/Abregelung der Vorverarbeitung (siehe model.simulate_one_year)
 ) -> dict:
     """
     Führt eine Simulation mit variablen Stromtarifen durch.
+
+    Mit dispatch_strategy="threshold" lädt der Speicher bei Bezugspreisen unter THRESHOLD_BUY_PRICE
+    aus dem Netz und entlädt bei Einspeisepreisen über THRESHOLD_SELL_PRICE ins Netz; mit
+    dispatch_strategy="optimal" wird die kostenoptimale Fahrweise bei vollständiger Voraussicht
+    simuliert (Vergleichsmaßstab für die heuristischen Strategien), mit "rolling_horizon" die
+    rollierende Optimierung mit Prognose von PV und Verbrauch (MPC_* in config.py).
     """
-    # Pro Kapazität Lade-/Entladeleistung bestimmen (Excel-basiert, falls verfügbar)
-    def resolve_power_for_capacity(capacity_kwh: float):
-        cap_int = int(round(capacity_kwh))
-        if battery_tech_params and isinstance(battery_tech_params, dict):
-            if cap_int in battery_tech_params:
-                m = battery_tech_params[cap_int]
-                return (
-                    float(m.get("max_charge_kw", battery_max_charge_kw)),
-                    float(m.get("max_discharge_kw", battery_max_discharge_kw)),
-                )
-            keys = sorted(battery_tech_params.keys())
-            if keys:
-                nearest = min(keys, key=lambda k: abs(k - cap_int))
-                m = battery_tech_params.get(nearest, {})
-                return (
-                    float(m.get("max_charge_kw", battery_max_charge_kw)),
-                    float(m.get("max_discharge_kw", battery_max_discharge_kw)),
-                )
-        return (battery_max_charge_kw, battery_max_discharge_kw)
-
-    cap_charge_kw, cap_discharge_kw = resolve_power_for_capacity(battery_capacity_kwh) if battery_capacity_kwh > 0 else (0.0, 0.0)
+    # Lade-/Entladeleistung der Kapazität bestimmen (Excel-basiert, falls verfügbar)
+    cap_charge_kw, cap_discharge_kw = (
+        resolve_capacity_power(battery_capacity_kwh, battery_max_charge_kw, battery_max_discharge_kw, battery_tech_params)
+        if battery_capacity_kwh > 0 else (0.0, 0.0)
+    )
     sim_result = simulate_one_year(
         consumption_series=consumption_series,
         pv_generation_series=pv_generation_series,
@@ -243,7 +1335,9 @@ def run_variable_tariff_scenario(
         min_soc_percent=min_soc_percent,
         max_soc_percent=max_soc_percent,
         annual_capacity_loss_percent=annual_capacity_loss_percent,
-        simulation_year=1  # Variable Tarife basieren auf erstem Jahr
+        simulation_year=1,  # Variable Tarife basieren auf erstem Jahr
+        dispatch_strategy=dispatch_strategy,
+        curtailment_totals=curtailment_totals
     )
 
     financial_kpis = calculate_financial_kpis(
@@ -270,11 +1364,11 @@ def run_variable_tariff_scenario(
         grid_export_with_battery=sim_result['kpis']['total_grid_export_kwh']
     )
 
-    return {
-        'scenario_name': 'Variable Tarife',
-        'time_series_data': sim_result['time_series_data'],
-        'kpis': {**sim_result['kpis'], **financial_kpis}
-    }
+    # Zeitreihen bleiben im kompakten SimulationResult (DataFrame erst beim Zugriff)
+    return sim_result.replace(
+        scenario_name='Variable Tarife',
+        kpis={**sim_result['kpis'], **financial_kpis}
+    )
 
 def compare_household_scenarios(
     household_profiles: dict, # Dictionary mit {Name: {'consumption': Series, 'pv_gen': Series, ...}}
@@ -290,30 +1384,78 @@ def compare_household_scenarios(
     discount_rate: float = 0.05,
     initial_soc_percent: float = 50.0, # Anfangsladezustand der Batterie in %
     min_soc_percent: float = 10.0, # Minimaler Ladezustand in %
-    max_soc_percent: float = 90.0 # Maximaler Ladezustand in %
+    max_soc_percent: float = 90.0, # Maximaler Ladezustand in %
+    return_time_series: bool = True # Zeitreihen je Haushalt zurückgeben (False: gemeinsamer Batch-Kern)
 ) -> dict:
     """
     Vergleicht die Simulation für verschiedene Haushaltstypen.
+
+    Mit return_time_series=False laufen Haushalte mit gemeinsamem, gleichmäßigem Zeitindex
+    zusammen in einem Durchlauf des Batch-Kerns (model.simulate_quarter, ohne Quartiersspeicher);
+    die Referenz ohne Speicher kommt aus derselben Simulation. Der Batch-Kern liefert keine
+    Zeitreihen, daher wird sonst jeder Haushalt einzeln mit simulate_one_year simuliert.
+
+    Returns:
+        dict: Je Haushalt {'kpis': Simulations- und Finanzkennzahlen, 'simulation_metadata'} und mit
+        return_time_series zusätzlich 'time_series_data' (Energieflüsse, siehe simulate_one_year).
     """
-    all_scenario_results = {}
-    for name, profile_data in household_profiles.items():
-        sim_result = simulate_one_year(
-            consumption_series=profile_data['consumption'],
-            pv_generation_series=profile_data['pv_gen'],
-            battery_capacity_kwh=battery_capacity_kwh,
-            battery_efficiency_charge=battery_efficiency_charge,
-            battery_efficiency_discharge=battery_efficiency_discharge,
-            battery_max_charge_kw=battery_max_charge_kw,
-            battery_max_discharge_kw=battery_max_discharge_kw,
-            price_grid_per_kwh=price_grid_per_kwh,
-            price_feed_in_per_kwh=price_feed_in_per_kwh,
-            initial_soc_percent=initial_soc_percent,
-            min_soc_percent=min_soc_percent,
-            max_soc_percent=max_soc_percent,
-            annual_capacity_loss_percent=DEFAULT_ANNUAL_CAPACITY_LOSS_PERCENT,  # Aus config.py (vereinheitlicht)
-            simulation_year=1
+    names = list(household_profiles)
+    if not names:
+        return {}
+    simulation_params = dict(
+        battery_efficiency_charge=battery_efficiency_charge,
+        battery_efficiency_discharge=battery_efficiency_discharge,
+        price_grid_per_kwh=price_grid_per_kwh,
+        price_feed_in_per_kwh=price_feed_in_per_kwh,
+        initial_soc_percent=initial_soc_percent,
+        min_soc_percent=min_soc_percent,
+        max_soc_percent=max_soc_percent
+    )
+    index = household_profiles[names[0]]['consumption'].index
+    shared_index = not return_time_series and all(
+        profile['consumption'].index.equals(index) and profile['pv_gen'].index.equals(index)
+        for profile in household_profiles.values()
+    ) and detect_time_resolution(index, len(index))[2] is None
+
+    if shared_index:
+        print(f"🔄 Simuliere {len(names)} Haushalte gemeinsam im Batch-Kern...")
+        quarter_result = simulate_quarter(
+            consumption_matrix=pd.DataFrame({name: household_profiles[name]['consumption'] for name in names}),
+            pv_generation_matrix=pd.DataFrame({name: household_profiles[name]['pv_gen'] for name in names}),
+            household_battery_kwh=battery_capacity_kwh,
+            community_battery_kwh=[],  # Kein Quartiersspeicher
+            household_max_charge_kw=battery_max_charge_kw,
+            household_max_discharge_kw=battery_max_discharge_kw,
+            community_max_charge_kw=[],
+            community_max_discharge_kw=[],
+            **simulation_params
         )
+        sim_results = {
+            name: ({'kpis': kpis, 'simulation_metadata': quarter_result['simulation_metadata']}, {'kpis': reference_kpis})
+            for name, kpis, reference_kpis in zip(
+                names, quarter_result['household_kpis'], quarter_result['household_reference_kpis']
+            )
+        }
+    else:
+        print("🔄 Simuliere je Haushalt (Zeitreihen oder kein gemeinsamer gleichmäßiger Zeitindex)...")
+        sim_results = {
+            name: (simulate_one_year(
+                consumption_series=profile_data['consumption'],
+                pv_generation_series=profile_data['pv_gen'],
+                battery_capacity_kwh=battery_capacity_kwh,
+                battery_max_charge_kw=battery_max_charge_kw,
+                battery_max_discharge_kw=battery_max_discharge_kw,
+                annual_capacity_loss_percent=DEFAULT_ANNUAL_CAPACITY_LOSS_PERCENT,  # Aus config.py (vereinheitlicht)
+                simulation_year=1,
+                return_time_series=return_time_series,
+                **simulation_params
+            ), None)
+            for name, profile_data in household_profiles.items()
+        }
 
+    all_scenario_results = {}
+    for name, profile_data in household_profiles.items():
+        sim_result, no_battery_sim_result = sim_results[name]
         financial_kpis = calculate_financial_kpis(
             sim_result['kpis']['annual_energy_cost'],
             total_consumption=sim_result['kpis']['total_consumption_kwh'],
@@ -335,11 +1477,9 @@ def compare_household_scenarios(
             min_soc_percent=min_soc_percent,
             max_soc_percent=max_soc_percent,
             grid_import_with_battery=sim_result['kpis']['total_grid_import_kwh'],
-            grid_export_with_battery=sim_result['kpis']['total_grid_export_kwh']
+            grid_export_with_battery=sim_result['kpis']['total_grid_export_kwh'],
+            no_battery_sim_result=no_battery_sim_result  # Referenz aus dem Batch-Kern, sonst eigene Simulation
         )
 
-        all_scenario_results[name] = {
-            'time_series_data': sim_result['time_series_data'],
-            'kpis': {**sim_result['kpis'], **financial_kpis}
-        }
+        all_scenario_results[name] = dict(sim_result, kpis={**sim_result['kpis'], **financial_kpis})
     return all_scenario_results 
\ No newline at end of file
@@ -1217,12 +1217,17 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
         raise ValueError("Verbrauchsdaten konnten nicht geladen werden.")
 
     _update_status(status_placeholder, progress_bar, "Lade PV-Daten...", 15)
-    if pv_extension == 'csv':
-        pv_generation_series = load_pv_generation_from_csv(pv_file, selected_year)
-    else:
-        pv_generation_series = load_pv_generation_from_excel(pv_file, selected_year)
-    if pv_generation_series is None:
+    # Wechselrichter-/Einspeisebegrenzung beim Import (native Auflösung, Einspeisegrenze auf den
+    # Überschuss nach Verbrauch), Summen explizit weiterreichen
+    load_pv_generation = load_pv_generation_from_csv if pv_extension == 'csv' else load_pv_generation_from_excel
+    pv_import = load_pv_generation(
+        pv_file, selected_year, pv_peak_power_kwp=params.get('pv_system_size_kwp'), return_pv_limits=True,
+        consumption_series=consumption_series
+    )
+    if pv_import is None:
         raise ValueError("PV-Daten konnten nicht geladen werden.")
+    pv_generation_series = pv_import['pv_generation_series']
+    pv_limits = pv_import['pv_limits']
 
     _update_status(status_placeholder, progress_bar, "Lade technische Parameter...", 25)
     battery_cost_curve = load_battery_cost_curve()
@@ -1245,7 +1250,7 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
 
     # 2) Optimierung
     _update_status(status_placeholder, progress_bar, "Optimiere Batteriespeichergröße...", 45)
-    optimization_results = find_optimal_size(
+    optimization_output = find_optimal_size(
         consumption_series=scaled_consumption_series,
         pv_generation_series=scaled_pv_generation_series,
         min_capacity_kwh=params.get('min_battery_capacity'),
@@ -1265,14 +1270,39 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
         max_soc_percent=params.get('max_soc_percent'),
         annual_capacity_loss_percent=params.get('annual_capacity_loss_percent'),
         battery_tech_params=battery_tech_params,
-        project_interest_rate_db=params.get('project_interest_rate_db')
+        project_interest_rate_db=params.get('project_interest_rate_db'),
+        lifetime_simulation=params.get('lifetime_simulation', DEFAULT_LIFETIME_SIMULATION),
+        annual_pv_degradation_percent=params.get('annual_pv_degradation_percent', DEFAULT_ANNUAL_PV_DEGRADATION_PERCENT),
+        annual_load_growth_percent=params.get('annual_load_growth_percent', DEFAULT_ANNUAL_LOAD_GROWTH_PERCENT),
+        dispatch_strategy=params.get('dispatch_strategy', DEFAULT_DISPATCH_STRATEGY),
+        aging_model=params.get('aging_model', DEFAULT_AGING_MODEL),
+        screening=params.get('screening', DEFAULT_SCREENING),
+        workers=params.get('sweep_workers', DEFAULT_SWEEP_WORKERS),
+        search_mode=params.get('search_mode', DEFAULT_SEARCH_MODE),
+        optimization_criterion=params.get('optimization_criterion', 'Deckungsbeitrag III gesamt (Barwert)'),
+        verify_grid=params.get('verify_grid', DEFAULT_VERIFY_GRID),
+        return_metadata=True,
+        curtailment_totals=pv_limits
     )
+    optimization_results = optimization_output['results']
+    search_metadata = optimization_output['search_metadata']
     if not optimization_results:
         raise ValueError("Keine Ergebnisse bei der Optimierung erhalten.")
 
     df_results = pd.DataFrame(optimization_results)
     if df_results.empty:
         raise ValueError("Optimierungsliste ist leer.")
+    if df_results['screened'].any():
+        screening_error = search_metadata['screening_error'] or {}
+        max_error = screening_error.get('max_abs_savings_error_percent')
+        st.warning("⚠️ Screening: Die Optimierung beruht auf Typtagen und ist eine Näherung"
+                   + (f" (Abweichung der Ersparnis gegen das volle Jahr bis {max_error:.1f}%)." if max_error is not None else ".")
+                   + " Für die endgültige Auslegung ohne Screening rechnen.")
+    resolution_error = search_metadata['resolution_error']
+    if resolution_error is not None and resolution_error['optimum_at_edge']:
+        st.warning(f"⚠️ Grob-/Feinsuche: Das Optimum liegt am Rand der nachgerechneten Speichergrößen "
+                   f"({resolution_error['fine_capacity_kwh']:g} kWh). Für diesen Standort ist die Abkürzung "
+                   f"unsicher, bitte mit dem vollen Raster prüfen.")
 
     criterion = params.get('optimization_criterion', 'Deckungsbeitrag III gesamt (Barwert)')
     # Nur DB Barwert und DB Nominal unterstützen
@@ -1317,7 +1347,9 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
         min_soc_percent=params.get('min_soc_percent'),
         max_soc_percent=params.get('max_soc_percent'),
         annual_capacity_loss_percent=params.get('annual_capacity_loss_percent'),
-        battery_tech_params=battery_tech_params
+        battery_tech_params=battery_tech_params,
+        dispatch_strategy=params.get('dispatch_strategy', DEFAULT_DISPATCH_STRATEGY),
+        curtailment_totals=pv_limits
     )
 
     # 4) Simulation mit optimaler Kapazität
@@ -1355,7 +1387,8 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
         min_soc_percent=params.get('min_soc_percent'),
         max_soc_percent=params.get('max_soc_percent'),
         annual_capacity_loss_percent=params.get('annual_capacity_loss_percent'),
-        simulation_year=1
+        simulation_year=1,
+        curtailment_totals=pv_limits
     )
 
     _update_status(status_placeholder, progress_bar, "Berechne finanzielle Kennzahlen...", 88)
@@ -1432,10 +1465,12 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
         cost_comparison_details['payback_period_years'] = financials.get('payback_period_years')
         cost_comparison_details['annual_savings'] = annual_savings
 
+    # DataFrame-Ansicht einmalig erzeugen (SimulationResult speichert die Zeitreihen kompakt)
+    optimal_time_series = optimal_sim_result["time_series_data"]
     energy_flow_fig = plot_energy_flows_for_period(
-        optimal_sim_result["time_series_data"],
-        optimal_sim_result["time_series_data"].index.min().strftime('%Y-%m-%d'),
-        optimal_sim_result["time_series_data"].index.max().strftime('%Y-%m-%d'),
+        optimal_time_series,
+        optimal_time_series.index.min().strftime('%Y-%m-%d'),
+        optimal_time_series.index.max().strftime('%Y-%m-%d'),
         optimal_capacity
     )
 
@@ -1452,8 +1487,8 @@ def run_analysis_job(payload: dict, status_placeholder=None, progress_bar=None):
     st.session_state['scaled_pv_generation_series'] = scaled_pv_generation_series
     st.session_state['battery_cost_curve'] = battery_cost_curve
     st.session_state['time_series_timerange'] = {
-        'start': optimal_sim_result["time_series_data"].index.min().strftime('%Y-%m-%d'),
-        'end': optimal_sim_result["time_series_data"].index.max().strftime('%Y-%m-%d')
+        'start': optimal_time_series.index.min().strftime('%Y-%m-%d'),
+        'end': optimal_time_series.index.max().strftime('%Y-%m-%d')
     }
     st.session_state['energy_flow_fig_full'] = energy_flow_fig
 